@@ -1,14 +1,17 @@
 import streamlit as st
 import datetime
-import requests
 import sys
 import os
 
 # Garante que o Python encontre os módulos na raiz
 current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(current_dir)
+if current_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(current_dir)
 
-from modules import database as db
+from modules import avisos
+from modules import aquecimento
+from modules.pipeline import sessao
+from modules import liturgia as liturgia_mod
 
 # Configuração da Página
 st.set_page_config(
@@ -19,123 +22,12 @@ st.set_page_config(
 
 # --- FUNÇÕES AUXILIARES ---
 
-def formatar_referencia(ref_raw, tipo):
-    """Limpa e padroniza a referência bíblica."""
-    if not ref_raw:
-        return tipo
-    return ref_raw.strip()
-
 def fetch_liturgia(date_obj):
     """
-    Busca a liturgia na API V2 (Railway) respeitando a estrutura de Arrays e Extras.
+    Busca a liturgia (cache local ou API V2) exibindo avisos na página.
+    Os textos das leituras ficam de fora; só são lidos quando abertos.
     """
-    # 1. Verifica Cache Local
-    date_str_db = date_obj.strftime('%Y-%m-%d')
-    cached = db.carregar_liturgia(date_str_db)
-    if cached:
-        return cached
-
-    # 2. Requisição para API V2
-    BASE_URL = "https://liturgia.up.railway.app/v2/"
-    params = {
-        "dia": date_obj.day,
-        "mes": date_obj.month,
-        "ano": date_obj.year
-    }
-
-    try:
-        response = requests.get(BASE_URL, params=params, timeout=15)
-        
-        if response.status_code == 404:
-            st.warning("Liturgia não encontrada para esta data.")
-            return None
-            
-        response.raise_for_status()
-        data = response.json()
-
-        # Extração de Metadados
-        cor_liturgica = data.get('cor', 'Verde')
-        nome_dia = data.get('liturgia', data.get('dia', 'Dia Litúrgico'))
-        
-        # Lista final de leituras
-        leituras_formatadas = []
-        
-        obj_leituras = data.get('leituras', {})
-
-        # --- Lógica de Processamento da V2 ---
-        
-        def processar_secao(chave_json, titulo_padrao):
-            itens = obj_leituras.get(chave_json, [])
-            if not itens: return
-            if isinstance(itens, dict): itens = [itens]
-            
-            for i, item in enumerate(itens):
-                tipo_leitura = item.get('tipo', titulo_padrao)
-                
-                # Tratamento para múltiplas opções
-                if len(itens) > 1 and chave_json not in ['extras']:
-                    ref = item.get('referencia', '')
-                    if "Breve" in ref or "Breve" in item.get('titulo', ''):
-                        sufixo = " (Forma Breve)"
-                    elif "Longa" in ref or "Longa" in item.get('titulo', ''):
-                        sufixo = " (Forma Longa)"
-                    else:
-                        sufixo = f" (Opção {i+1})"
-                    tipo_leitura += sufixo
-
-                ref_bruta = item.get('referencia', '')
-                texto = item.get('texto', '')
-                titulo_texto = item.get('titulo', '')
-
-                if chave_json == 'salmo':
-                    tipo_leitura = "Salmo Responsorial"
-                    refrao = item.get('refrao', '')
-                    if refrao:
-                        texto = f"Refrão: {refrao}\n\n{texto}"
-
-                if texto:
-                    leituras_formatadas.append({
-                        'tipo': tipo_leitura,
-                        'titulo': titulo_texto if titulo_texto else tipo_leitura,
-                        'ref': formatar_referencia(ref_bruta, tipo_leitura),
-                        'texto': texto
-                    })
-
-        processar_secao('primeiraLeitura', 'Primeira Leitura')
-        processar_secao('salmo', 'Salmo Responsorial')
-        processar_secao('segundaLeitura', 'Segunda Leitura')
-        processar_secao('evangelho', 'Evangelho')
-        
-        itens_extras = obj_leituras.get('extras', [])
-        for item in itens_extras:
-            tipo = item.get('tipo', item.get('titulo', 'Leitura Extra'))
-            ref = item.get('referencia', '')
-            texto = item.get('texto', '')
-            titulo_texto = item.get('titulo', '')
-            if texto:
-                leituras_formatadas.append({
-                    'tipo': tipo,
-                    'titulo': titulo_texto,
-                    'ref': formatar_referencia(ref, tipo),
-                    'texto': texto
-                })
-
-        if not leituras_formatadas:
-            return None
-
-        final_data = {
-            'data': date_str_db,
-            'nome_dia': nome_dia,
-            'cor': cor_liturgica,
-            'leituras': leituras_formatadas
-        }
-        
-        db.salvar_liturgia(date_str_db, final_data)
-        return final_data
-
-    except Exception as e:
-        st.error(f"Erro de conexão: {e}")
-        return None
+    return liturgia_mod.fetch_liturgia(date_obj, notificar=avisos.streamlit, textos=False)
 
 # --- INTERFACE PRINCIPAL ---
 
@@ -174,18 +66,20 @@ if data_selecionada:
                 if item['ref']:
                     st.markdown(f"**{item['ref']}**")
                 
-                # Texto (Expander)
-                with st.expander("📖 Ler Texto Completo", expanded=False):
-                    st.write(item['texto'])
+                # Texto: o conteúdo de um st.expander roda mesmo fechado,
+                # então o texto só é descomprimido quando o toggle é ligado
+                if st.toggle("📖 Ler Texto Completo", key=f"txt_{i}"):
+                    with st.container(border=True):
+                        st.write(liturgia_mod.texto_leitura(liturgia['data'], item))
                 
                 # --- BOTÃO DE AÇÃO (Conexão com Pages) ---
                 col_btn, col_info = st.columns([1, 2])
                 with col_btn:
                     # Este é o botão que faz a "mágica" de conexão
                     if st.button(f"🎬 Criar Vídeo Viral", key=f"btn_start_{i}", type="primary"):
-                        # 1. Salva a leitura selecionada na Sessão Global
-                        st.session_state['leitura_atual'] = item
-                        st.session_state['data_atual_str'] = liturgia['data']
+                        # 1. Salva a leitura selecionada (com o texto) na Sessão Global
+                        liturgia_mod.texto_leitura(liturgia['data'], item)
+                        sessao.selecionar_leitura(item, liturgia['data'])
                         
                         # 2. Redireciona para a página de Roteiro
                         st.switch_page("pages/1_Roteiro_Viral.py")
@@ -197,3 +91,6 @@ if data_selecionada:
 
     else:
         st.info("Nenhuma leitura encontrada. Verifique a conexão ou a data.")
+
+# Com a página já desenhada, importa em segundo plano o que as próximas vão usar
+aquecimento.aquecer()
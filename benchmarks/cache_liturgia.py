@@ -0,0 +1,131 @@
+"""
+Benchmark do cache da liturgia: tamanho do banco e latência de leitura no
+formato antigo (JSON inteiro em `historico`) e no novo (cabeçalho +
+leituras comprimidas com dicionário).
+
+Usa uma cópia do banco informado (o original não é alterado); se ele não
+existir (ex.: checkout novo), um banco temporário com as liturgias de
+benchmarks/fixtures/liturgias.json:
+    python benchmarks/cache_liturgia.py --banco liturgia.db
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "liturgias.json")
+
+from modules import database as db
+
+
+def exportar_dias(caminho):
+    """Todos os dias do banco, no formato de dicionário da liturgia."""
+    db.DB_FILE = caminho
+    conn = db.get_connection()
+    datas = [r[0] for r in conn.execute(
+        'SELECT data_liturgia FROM historico UNION SELECT data_liturgia FROM liturgia_dias')]
+    conn.close()
+    return {d: db.carregar_liturgia(d) for d in sorted(datas)}
+
+
+def semear_fixtures(caminho):
+    """Banco novo com os dias das fixtures (o mesmo conjunto do benchmark do pipeline)."""
+    db.DB_FILE = caminho
+    with open(FIXTURES, encoding="utf-8") as f:
+        for dia in json.load(f):
+            db.salvar_liturgia(dia["data"], dia)
+
+
+def montar_antigo(caminho, dias):
+    conn = sqlite3.connect(caminho)
+    conn.execute('CREATE TABLE historico (data_liturgia TEXT PRIMARY KEY, json_completo TEXT)')
+    conn.executemany('INSERT INTO historico VALUES (?, ?)',
+                     [(d, json.dumps(j, ensure_ascii=False)) for d, j in dias.items()])
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def carregar_antigo(caminho, data_str):
+    # Como o carregar_liturgia antigo: conecta, garante a tabela e lê o JSON inteiro
+    conn = sqlite3.connect(caminho)
+    conn.execute('CREATE TABLE IF NOT EXISTS historico (data_liturgia TEXT PRIMARY KEY, json_completo TEXT)')
+    conn.commit()
+    row = conn.execute('SELECT json_completo FROM historico WHERE data_liturgia = ?', (data_str,)).fetchone()
+    conn.close()
+    return json.loads(row[0])
+
+
+def cronometrar(funcao, datas, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for d in datas:
+            funcao(d)
+    return (time.perf_counter() - inicio) * 1000 / (repeticoes * len(datas))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--banco", default=os.path.join(RAIZ, "liturgia.db"))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix="bench_liturgia_")
+    try:
+        copia = os.path.join(pasta, "origem.db")
+        if os.path.exists(args.banco):
+            shutil.copy(args.banco, copia)
+        else:
+            print(f"{args.banco} não existe; usando as liturgias de {os.path.relpath(FIXTURES, RAIZ)} "
+                  "(poucos dias: o tamanho mede mais o esquema do que a compressão).")
+            semear_fixtures(copia)
+        dias = exportar_dias(copia)
+        if not dias:
+            print("O banco não tem nenhum dia de liturgia em cache.")
+            return 1
+        datas = list(dias)
+        tipo = {d: j['leituras'][0]['tipo'] for d, j in dias.items() if j['leituras']}
+
+        antigo = os.path.join(pasta, "antigo.db")
+        montar_antigo(antigo, dias)
+
+        novo = os.path.join(pasta, "novo.db")
+        shutil.copy(antigo, novo)
+        db.DB_FILE = novo
+        db.MIN_AMOSTRAS_DICIONARIO = 0  # o benchmark mede já com dicionário
+        db.migrar_historico()
+        conn = db.get_connection()
+        conn.execute('VACUUM')
+        conn.close()
+
+        # conferência: o formato novo devolve exatamente o mesmo conteúdo
+        for d in datas:
+            assert db.carregar_liturgia(d) == dias[d], f"conteúdo divergente em {d}"
+
+        resultados = {
+            "dias": len(datas),
+            "leituras": sum(len(j['leituras']) for j in dias.values()),
+            "antigo_kb": round(os.path.getsize(antigo) / 1024, 1),
+            "novo_kb": round(os.path.getsize(novo) / 1024, 1),
+            "antigo_dia_completo_ms": cronometrar(lambda d: carregar_antigo(antigo, d), datas, args.repeticoes),
+            "novo_dia_completo_ms": cronometrar(db.carregar_liturgia, datas, args.repeticoes),
+            "novo_cabecalho_ms": cronometrar(lambda d: db.carregar_liturgia(d, textos=False), datas, args.repeticoes),
+            "novo_uma_leitura_ms": cronometrar(
+                lambda d: db.carregar_texto_leitura(d, tipo.get(d, "")), datas, args.repeticoes),
+        }
+        for chave, valor in resultados.items():
+            print(f"{chave:>24}: {round(valor, 3) if isinstance(valor, float) else valor}")
+        print(f"{'redução de tamanho':>24}: {1 - resultados['novo_kb'] / resultados['antigo_kb']:.0%}")
+        return 0
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark das consultas do dashboard sobre um banco sintético.
+
+Monta um banco temporário com `--videos` produções e `--dias` dias de
+métricas por vídeo e mede, para cada período do dashboard, a consulta fria
+(SQL + DataFrame), a quente (cache) e a releitura depois de uma escrita,
+além das tendências semanais por tipo de leitura (agregados) e da tabela de
+atributos usada na visão de correlação.
+
+    python benchmarks/dashboard.py --videos 3000 --dias 730
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from modules import database as db
+from modules import metricas
+
+META_MS = 500  # carga completa do resumo (frio), por período
+TIPOS = ["Primeira Leitura", "Salmo", "Segunda Leitura", "Evangelho"]
+CORES = ["Verde", "Roxo", "Branco", "Vermelho"]
+
+
+def montar_banco(caminho, videos, dias):
+    db.DB_FILE = caminho
+    conn = db.get_connection()
+    db.create_status_table(conn)
+    hoje = datetime.date.today()
+    random.seed(42)
+    chaves = []
+    for i in range(videos):
+        data_ref = (hoje - datetime.timedelta(days=i % dias)).isoformat()
+        chave = f"{data_ref}-Leitura {i}"
+        chaves.append(chave)
+        conn.execute('INSERT INTO producao_status VALUES (?, ?, ?, ?, ?)',
+                     (chave, data_ref, TIPOS[i % len(TIPOS)], '{"publicacao": true}', 7))
+        conn.execute('INSERT INTO videos_publicados (chave_id, titulo, publicado_em) VALUES (?, ?, ?)',
+                     (chave, f"Vídeo {i}", data_ref))
+        conn.execute('INSERT INTO videos_atributos (chave_id, cor, perfil_render, provedor_imagem, '
+                     'duracao_narracao_s, palavras_roteiro) VALUES (?, ?, ?, ?, ?, ?)',
+                     (chave, CORES[i % len(CORES)], random.choice(["overlay+legendas", "simples"]),
+                      random.choice(["pollinations", "google"]), random.uniform(40, 90), random.randint(100, 220)))
+    conn.commit()
+    linhas = (
+        (chave, (hoje - datetime.timedelta(days=d)).isoformat(), random.randint(0, 5000),
+         random.random() * 300, random.random() * 10, random.randint(0, 200), random.randint(0, 30), "sintetico", 0)
+        for chave in chaves for d in range(dias)
+    )
+    # Carga direta: agregados calculados uma vez no fim, não linha a linha pelos gatilhos
+    conn.execute('UPDATE rollup_controle SET adiado = 1')
+    conn.executemany('INSERT INTO metricas_diarias VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', linhas)
+    conn.execute('UPDATE rollup_controle SET adiado = 0')
+    db.reconstruir_rollups(conn)
+    conn.close()
+    return chaves
+
+
+def cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    funcao(*args, **kwargs)
+    return round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=3000)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        inicio = time.perf_counter()
+        chaves = montar_banco(os.path.join(pasta, "dashboard.db"), args.videos, args.dias)
+        print(f"Banco sintético: {args.videos} vídeos x {args.dias} dias "
+              f"({args.videos * args.dias:,} linhas) em {time.perf_counter() - inicio:.1f}s\n")
+
+        resultados, acima = {}, 0
+        for periodo, dias in metricas.PERIODOS.items():
+            r = {
+                "resumo_frio_ms": cronometrar(metricas.resumo_videos, dias),
+                "resumo_cache_ms": cronometrar(metricas.resumo_videos, dias),
+                "serie_frio_ms": cronometrar(metricas.serie_diaria, dias=dias),
+                "serie_video_frio_ms": cronometrar(metricas.serie_diaria, chaves[0], dias=dias),
+                "tendencia_semanal_frio_ms": cronometrar(metricas.tendencias, "semana", "tipo", dias),
+                "tendencia_diaria_frio_ms": cronometrar(metricas.tendencias, "dia", "cor", dias),
+                "atributos_frio_ms": cronometrar(metricas.videos_com_atributos, dias),
+            }
+            db.gravar_metricas([{"chave_id": chaves[0], "data": datetime.date.today().isoformat(), "views": 1}])
+            r["resumo_apos_escrita_ms"] = cronometrar(metricas.resumo_videos, dias)
+            resultados[periodo] = r
+            estouro = r["resumo_frio_ms"] + r["serie_frio_ms"] > META_MS
+            acima += estouro
+            print(f"{'⚠️' if estouro else '✅'} {periodo}: " + ", ".join(f"{k}={v}" for k, v in r.items()))
+
+    print(f"\nMeta: resumo + série (frios) <= {META_MS} ms por período. Acima da meta: {acima}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"videos": args.videos, "dias": args.dias, "periodos": resultados}, f, ensure_ascii=False, indent=2)
+    return 1 if acima else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Auditoria de tempo de import e de partida a frio das páginas.
+
+Para cada página (Inicio.py e pages/*.py), roda num processo novo os imports
+de nível de módulo dela com `python -X importtime` e mede:
+  - o tempo total de import (descontada a partida do próprio interpretador);
+  - os imports mais pesados (tempo cumulativo, do relatório do importtime).
+Com o Streamlit instalado, `--primeira-pintura` também mede a primeira
+execução completa da página (AppTest), também a frio.
+
+    python benchmarks/importacao.py
+    python benchmarks/importacao.py --primeira-pintura --json resultado.json
+"""
+import os
+import sys
+import ast
+import json
+import glob
+import time
+import argparse
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metas por página, em milissegundos (containers pequenos)
+META_IMPORT_MS = 300
+META_PRIMEIRA_PINTURA_MS = 1500
+
+
+def paginas():
+    return [os.path.join(RAIZ, "Inicio.py")] + sorted(glob.glob(os.path.join(RAIZ, "pages", "*.py")))
+
+
+def imports_da_pagina(caminho):
+    """Comandos de import executados ao abrir a página (nível de módulo e blocos try)."""
+    with open(caminho, encoding="utf-8") as f:
+        arvore = ast.parse(f.read())
+    comandos = []
+
+    def visitar(corpo):
+        for no in corpo:
+            if isinstance(no, (ast.Import, ast.ImportFrom)):
+                comandos.append(ast.unparse(no))
+            elif isinstance(no, ast.Try):
+                visitar(no.body)
+
+    visitar(arvore.body)
+    return comandos
+
+
+def executar(codigo, importtime=False):
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+    inicio = time.perf_counter()
+    proc = subprocess.run(args, cwd=RAIZ, capture_output=True, text=True)
+    return (time.perf_counter() - inicio) * 1000, proc
+
+
+def mais_pesados(stderr, ignorar=(), n=5):
+    """
+    Imports de primeiro nível do relatório `-X importtime`, por tempo
+    cumulativo, sem os que a partida do interpretador já faz (`ignorar`).
+    """
+    pesados = []
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        if not cumulativo.strip().isdigit() or nome.startswith("  ") or nome.strip() in ignorar:
+            continue  # cabeçalho, import aninhado ou da partida
+        pesados.append((nome.strip(), int(cumulativo) / 1000))
+    return sorted(pesados, key=lambda p: p[1], reverse=True)[:n]
+
+
+def medir_import(caminho, base_ms, da_partida):
+    comandos = imports_da_pagina(caminho)
+    codigo = f"import sys; sys.path.insert(0, {RAIZ!r})\n" + "\n".join(
+        f"try:\n    {c}\nexcept ImportError as e:\n    print('ausente:', e.name, file=sys.stderr)" for c in comandos
+    )
+    _, proc = executar(codigo, importtime=True)  # relatório (o -X importtime infla o tempo)
+    decorrido, _ = executar(codigo)
+    ausentes = [l.split(":", 1)[1].strip() for l in proc.stderr.splitlines() if l.startswith("ausente:")]
+    return {
+        "import_ms": round(max(decorrido - base_ms, 0.0), 1),
+        "mais_pesados": [{"modulo": m, "ms": round(ms, 1)} for m, ms in mais_pesados(proc.stderr, da_partida)],
+        "ausentes": ausentes,
+    }
+
+
+def medir_primeira_pintura(caminho):
+    codigo = (
+        f"import sys, time; sys.path.insert(0, {RAIZ!r})\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "t = time.perf_counter()\n"
+        f"AppTest.from_file({caminho!r}, default_timeout=60).run()\n"
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    _, proc = executar(codigo)
+    try:
+        return round(float(proc.stdout.strip().splitlines()[-1]), 1)
+    except (ValueError, IndexError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--primeira-pintura", action="store_true", help="Mede também a 1ª execução (requer streamlit)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Medições por página (vale a menor)")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    base_ms = min(executar("pass")[0] for _ in range(args.repeticoes))
+    da_partida = {m for m, _ in mais_pesados(executar("pass", importtime=True)[1].stderr, n=None)}
+    print(f"Partida do interpretador: {base_ms:.0f} ms (descontada)\n")
+
+    resultados, acima = {}, 0
+    for caminho in paginas():
+        nome = os.path.relpath(caminho, RAIZ)
+        medidas = [medir_import(caminho, base_ms, da_partida) for _ in range(args.repeticoes)]
+        r = min(medidas, key=lambda m: m["import_ms"])
+        if args.primeira_pintura:
+            r["primeira_pintura_ms"] = medir_primeira_pintura(caminho)
+        resultados[nome] = r
+
+        estouro = r["import_ms"] > META_IMPORT_MS or (r.get("primeira_pintura_ms") or 0) > META_PRIMEIRA_PINTURA_MS
+        acima += estouro
+        pintura = f" | 1ª pintura {r['primeira_pintura_ms']} ms" if args.primeira_pintura else ""
+        print(f"{'⚠️' if estouro else '✅'} {nome}: import {r['import_ms']} ms{pintura}")
+        for p in r["mais_pesados"]:
+            print(f"     {p['ms']:>8.1f} ms  {p['modulo']}")
+        if r["ausentes"]:
+            print(f"     (não instalados: {', '.join(r['ausentes'])})")
+
+    print(f"\nMetas: import <= {META_IMPORT_MS} ms, 1ª pintura <= {META_PRIMEIRA_PINTURA_MS} ms. "
+          f"Páginas acima da meta: {acima}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"metas": {"import_ms": META_IMPORT_MS, "primeira_pintura_ms": META_PRIMEIRA_PINTURA_MS},
+                       "paginas": resultados}, f, ensure_ascii=False, indent=2)
+    return 1 if acima else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
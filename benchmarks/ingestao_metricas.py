@@ -0,0 +1,101 @@
+"""
+Benchmark da importação de métricas em lote.
+
+Gera um CSV sintético no formato do YouTube Studio (`--linhas` linhas,
+espalhadas por `--videos` vídeos), importa num banco temporário e mede:
+importação inicial, reimportação do mesmo arquivo (pulada pelo hash),
+reimportação forçada sem mudanças e pico de memória de cada uma.
+
+    python benchmarks/ingestao_metricas.py --linhas 100000
+"""
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from modules import database as db
+from modules import ingestao
+
+META_SEGUNDOS = 10  # importação inicial de 100 mil linhas
+TIPOS = ["Primeira Leitura", "Salmo", "Segunda Leitura", "Evangelho"]
+
+
+def montar(pasta, linhas, videos):
+    db.DB_FILE = os.path.join(pasta, "ingestao.db")
+    conn = db.get_connection()
+    db.create_status_table(conn)
+    ids = []
+    for i in range(videos):
+        chave, youtube_id = f"2025-01-01-Leitura {i}", f"vid{i:08d}"
+        ids.append(youtube_id)
+        conn.execute('INSERT INTO producao_status VALUES (?, ?, ?, ?, ?)', (chave, "2025-01-01", TIPOS[i % len(TIPOS)], "{}", 7))
+        conn.execute('INSERT INTO videos_publicados (chave_id, titulo, youtube_url) VALUES (?, ?, ?)',
+                     (chave, f"Vídeo {i}", f"https://youtube.com/shorts/{youtube_id}"))
+    conn.commit()
+    conn.close()
+
+    caminho = os.path.join(pasta, "export.csv")
+    hoje = datetime.date.today()
+    random.seed(7)
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Date", "Content", "Video title", "Views", "Watch time (hours)",
+                    "Impressions click-through rate (%)", "Likes", "Comments added"])
+        w.writerow(["Total", "", "", 0, 0, 0, 0, 0])
+        for n in range(linhas):
+            i = n % videos
+            dia = hoje - datetime.timedelta(days=n // videos)
+            w.writerow([dia.isoformat(), ids[i], f"Vídeo {i}", random.randint(0, 5000),
+                        round(random.random() * 5, 3), round(random.random() * 10, 2),
+                        random.randint(0, 200), random.randint(0, 30)])
+    return caminho
+
+
+def pico_memoria(**kwargs):
+    """Pico de memória alocada (MB) numa importação (à parte: o tracemalloc deixa tudo mais lento)."""
+    tracemalloc.start()
+    ingestao.importar(**kwargs)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(pico / 1e6, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = montar(pasta, args.linhas, args.videos)
+        print(f"CSV sintético: {args.linhas} linhas, {os.path.getsize(caminho) / 1e6:.1f} MB\n")
+        resultados = {
+            "inicial": ingestao.importar(caminho),
+            "mesmo_arquivo": ingestao.importar(caminho),
+            "forcada_sem_mudancas": ingestao.importar(caminho, forcar=True),
+        }
+        resultados["forcada_sem_mudancas"]["pico_memoria_mb"] = pico_memoria(arquivo=caminho, forcar=True)
+    for nome, r in resultados.items():
+        print(f"{nome:>22}: {ingestao.formatar_relatorio(r)}")
+    print(f"Pico de memória (reimportação forçada, blocos de {ingestao.TAMANHO_LOTE}): "
+          f"{resultados['forcada_sem_mudancas']['pico_memoria_mb']} MB")
+
+    ok = resultados["inicial"]["segundos"] <= META_SEGUNDOS * args.linhas / 100_000
+    print(f"\nMeta: {META_SEGUNDOS}s por 100 mil linhas — {'✅' if ok else '⚠️'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
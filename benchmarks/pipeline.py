@@ -0,0 +1,619 @@
+"""
+Benchmark reprodutível do pipeline de produção inteiro, sem rede nem cota.
+
+Usa liturgias fixas (benchmarks/fixtures/liturgias.json), os stubs locais do
+Groq (stub_llm.py) e do Pollinations (stub_imagens.py), imagens de amostra
+geradas de forma determinística e um áudio sintético, num banco e numa
+pasta de dados temporários. Mede cada etapa isolada e a produção completa:
+
+- db: gravar/carregar liturgia (com e sem textos), status, busca FTS;
+- prompts: montagem dos prompts do roteiro e das imagens, cues e ASS;
+- midia: sondagem dos ativos sem cache, pelo banco e pela memória;
+- roteiro: os dois modos contra o stub (ritmo de `--ttft` e `--tokens-s`);
+- imagens: as 4 cenas contra o stub (latência de `--latencia-imagens`);
+- tts: fator de tempo real do Piper (modelo do repositório ou `--modelo-piper`);
+- masterizacao: loudness (EBU R128) e os bytes do WAV contra FLAC/Opus + AAC;
+- trilha: envelope de ducking (NumPy) e mixagem com a música, por minuto de áudio;
+- overlay: prévia e PNG final;
+- render: FFmpeg em cada perfil (simples, overlay, visualizer, legendas), o
+  simples com a faixa AAC masterizada (áudio copiado) e com trilha, e os
+  três formatos (9:16, 1:1, 16:9) num só render;
+- pipeline: `produzir_leitura` completo, com o tempo de cada nó e o
+  caminho crítico do grafo.
+
+Etapas sem dependência instalada (Piper, Pillow, FFmpeg) vão para "pulados"
+com o motivo. O resultado (JSON) traz o ambiente e os parâmetros; com
+`--base`, as medianas são comparadas às de uma execução anterior e o
+código de saída é 1 se alguma piorar além da tolerância.
+
+    python benchmarks/pipeline.py --gravar-base base_pipeline.json
+    python benchmarks/pipeline.py --base base_pipeline.json --tolerancia 0.15
+    python benchmarks/pipeline.py --etapas db,prompts,render --json resultado.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import wave
+import array
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "liturgias.json")
+
+ETAPAS = ["db", "prompts", "midia", "roteiro", "imagens", "tts", "masterizacao", "trilha", "overlay", "render",
+          "pipeline"]
+PERFIS_RENDER = {
+    "simples": {},
+    "overlay": {"overlay": True},
+    "overlay+visualizer": {"overlay": True, "visualizer": True},
+    "overlay+legendas": {"overlay": True, "legendas": True},
+}
+
+
+def medir(fn, repeticoes, aquecimento=1, extras=False):
+    """
+    Roda `fn` `aquecimento` vezes sem medir e `repeticoes` vezes medindo.
+    Com `extras`, `fn` retorna um dict cujos valores (a mediana, se
+    numéricos) entram no resultado (ex.: fator de tempo real).
+    """
+    for _ in range(aquecimento):
+        fn()
+    tempos, valores_extras = [], {}
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        retorno = fn()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        for k, v in (retorno.items() if extras else ()):
+            valores_extras.setdefault(k, []).append(v)
+    tempos.sort()
+    resultado = {
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, math.ceil(0.95 * len(tempos)) - 1)], 3),
+        "min_ms": round(tempos[0], 3),
+        "n": len(tempos),
+    }
+    for k, valores in valores_extras.items():
+        numericos = [v for v in valores if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        resultado[k] = round(statistics.median(numericos), 3) if numericos else valores[-1]
+    return resultado
+
+
+def ambiente():
+    def saida(cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, cwd=RAIZ).stdout.strip().splitlines()[0]
+        except (OSError, IndexError):
+            return None
+
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": saida(["ffmpeg", "-version"]) if shutil.which("ffmpeg") else None,
+        "commit": saida(["git", "rev-parse", "--short", "HEAD"]),
+    }
+
+
+def carregar_fixtures():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def wav_sintetico(caminho, segundos, taxa=22050, frequencia=220, pausas=False):
+    """
+    Tom com modulação lenta (volume de fala), 16 bits mono. Com `pausas`,
+    imita frases de 2 a 6 s separadas por silêncios de 0,3 a 1,8 s
+    (reprodutível: a sequência depende só da duração).
+    """
+    falando = None
+    if pausas:
+        rnd, falando, t = random.Random(int(segundos)), [], 0.0
+        while t < segundos:
+            frase = rnd.uniform(2, 6)
+            falando.append((t, t + frase))
+            t += frase + rnd.uniform(0.3, 1.8)
+
+    def amostra(i):
+        t = i / taxa
+        if falando and not any(a <= t < b for a, b in falando):
+            return 0
+        return int(9000 * (0.6 + 0.4 * math.sin(2 * math.pi * 0.5 * t)) * math.sin(2 * math.pi * frequencia * t))
+    amostras = array.array("h", (amostra(i) for i in range(int(segundos * taxa))))
+    with wave.open(caminho, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(taxa)
+        w.writeframes(amostras.tobytes())
+    return caminho
+
+
+def pil_disponivel():
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# ---------------------------------------------------------------------
+# Etapas
+# ---------------------------------------------------------------------
+
+def etapa_db(ctx):
+    from modules import database as db
+    dias = ctx["fixtures"]
+    chave = "2024-05-12-Evangelho"
+    progresso = {"roteiro": True, "bloco_leitura": "x" * 2000, "prompts_imagem": {f"bloco_{i}": "y" * 400 for i in range(1, 5)}}
+    r = ctx["repeticoes"]
+    return {
+        "db.salvar_liturgia": medir(lambda: [db.salvar_liturgia(d["data"], d) for d in dias], r),
+        "db.carregar_liturgia": medir(lambda: [db.carregar_liturgia(d["data"]) for d in dias], r),
+        "db.carregar_liturgia_cabecalho": medir(lambda: [db.carregar_liturgia(d["data"], textos=False) for d in dias], r),
+        "db.update_status": medir(lambda: db.update_status(chave, "2024-05-12", "Evangelho", progresso, 1), r),
+        "db.load_status": medir(lambda: db.load_status(chave), r),
+        "db.buscar": medir(lambda: db.buscar("Espírito Santo"), r),
+    }
+
+
+def etapa_prompts(ctx):
+    from modules import roteiro, legendas
+    leitura = ctx["leitura"]
+    texto, ref = leitura["texto"], leitura["ref"]
+    frases = legendas.dividir_frases(texto * 3)
+    segmentos = legendas.estimar_segmentos(frases, 90.0)
+    r = ctx["repeticoes"] * 10
+    return {
+        "prompts.agrupado": medir(lambda: roteiro.prompt_agrupado(texto, ref), r),
+        "prompts.por_bloco": medir(lambda: [roteiro.PROMPTS[b](texto, ref) for b in roteiro.BLOCOS], r),
+        "prompts.imagem": medir(lambda: roteiro.montar_prompts_imagem(texto), r),
+        "legendas.cues_ass": medir(lambda: legendas.formatar_ass(legendas.gerar_cues(segmentos)), r),
+    }
+
+
+def etapa_midia(ctx):
+    from modules import midia
+    from modules import database as db
+    from stub_imagens import png
+    pasta = os.path.join(ctx["pasta"], "midia")
+    os.makedirs(pasta, exist_ok=True)
+    ativos = [wav_sintetico(os.path.join(pasta, "audio.wav"), 5)]
+    for i in range(8):
+        ativos.append(os.path.join(pasta, f"img_{i}.png"))
+        with open(ativos[-1], "wb") as f:
+            f.write(png(semente=i, tamanho_kb=50))
+
+    def sem_cache():
+        midia.limpar_memoria()
+        conn = db.get_connection()
+        db.create_midia_table(conn)
+        conn.execute("DELETE FROM midia_info")
+        conn.commit()
+        conn.close()
+        midia.sondar_varios(ativos)
+
+    def pelo_banco():
+        midia.limpar_memoria()
+        midia.sondar_varios(ativos)
+
+    r = ctx["repeticoes"] * 10
+    return {
+        "midia.sem_cache": medir(sem_cache, r),
+        "midia.banco": medir(pelo_banco, r),
+        "midia.memoria": medir(lambda: midia.sondar_varios(ativos), r),
+    }
+
+
+def etapa_roteiro(ctx):
+    from modules import roteiro
+    from modules import database as db
+    leitura = ctx["leitura"]
+    resultados = {}
+    for modo in roteiro.MODOS:
+        def gerar():
+            # Sem o cache das cenas: cada repetição é uma geração nova
+            conn = db.get_connection()
+            db.create_cenas_table(conn)
+            conn.execute("DELETE FROM cenas_imagem")
+            conn.commit()
+            conn.close()
+            uso = {}
+            roteiro.gerar_conteudo_ia(ctx["llm"].cliente(), leitura["texto"], leitura["ref"], modo=modo, uso=uso)
+            return {"requisicoes": uso.get("requisicoes"), "tokens_saida": uso.get("tokens_saida")}
+        resultados[f"roteiro.{modo}"] = medir(gerar, ctx["repeticoes"], extras=True)
+    return resultados
+
+
+def etapa_imagens(ctx):
+    from modules import roteiro, imagens
+    prompts = list(roteiro.montar_prompts_imagem(ctx["leitura"]["texto"]).values())
+    pasta = os.path.join(ctx["pasta"], "bench_imagens")
+
+    def gerar():
+        caminhos = imagens.gerar_imagens(prompts, imagens.MOTORES[0], pasta, "bench", notificar=lambda *a: None)
+        mb = sum(os.path.getsize(c) for c in caminhos) / 1e6
+        shutil.rmtree(pasta, ignore_errors=True)
+        return {"imagens": len(caminhos), "mb": mb}
+    return {"imagens.gerar": medir(gerar, ctx["repeticoes"], extras=True)}
+
+
+def etapa_tts(ctx):
+    from modules import audio
+    texto = audio.limpar_texto(" ".join(ctx["leitura"]["texto"].split()[:80]))
+    caminho = os.path.join(ctx["pasta"], "tts.wav")
+
+    def sintetizar():
+        inicio = time.perf_counter()
+        ok, _ = audio.gerar_audio_piper_hibrido(texto, caminho, notificar=lambda *a: None)
+        segundos = time.perf_counter() - inicio
+        duracao = audio.duracao_wav(caminho) if ok else 0.0
+        return {"fator_tempo_real": segundos / duracao if duracao else None, "audio_s": duracao}
+    return {"tts.piper": medir(sintetizar, ctx["repeticoes"], extras=True)}
+
+
+def etapa_masterizacao(ctx):
+    from modules import masterizacao
+    wav = wav_sintetico(os.path.join(ctx["pasta"], "master.wav"), ctx["duracao_audio"])
+    resultados = {}
+    for formato in masterizacao.FORMATOS_ARQUIVO:
+        def masterizar():
+            ok, info = masterizacao.masterizar(wav, formato=formato, manter_wav=True)
+            if not ok:
+                raise RuntimeError(info)
+            return {"lufs_antes": info["lufs_antes"], "lufs_depois": info["lufs_depois"],
+                    "wav_mb": info["bytes_wav"] / 1e6, "arquivo_mb": info["bytes_arquivo"] / 1e6,
+                    "aac_mb": info["bytes_aac"] / 1e6,
+                    "economia": 1 - (info["bytes_arquivo"] + info["bytes_aac"]) / info["bytes_wav"]}
+        resultados[f"masterizacao.{formato}"] = medir(masterizar, ctx["repeticoes_render"], aquecimento=0,
+                                                      extras=True)
+    return resultados
+
+
+def etapa_trilha(ctx):
+    from modules import trilha, video
+    minutos = 1.0
+    narracao = wav_sintetico(os.path.join(ctx["pasta"], "narracao.wav"), 60 * minutos, pausas=True)
+    r = ctx["repeticoes"]
+    envelope = trilha.calcular_envelope(narracao)
+
+    def calcular():
+        e = trilha.calcular_envelope(narracao)
+        return {"trechos": len(e["pontos"]) // 4, "fala_s": e["fala_s"]}
+    resultados = {
+        "trilha.envelope_por_minuto": medir(calcular, r, extras=True),
+        "trilha.comandos_por_minuto": medir(lambda: trilha.comandos_ffmpeg(envelope), r),
+    }
+    if not shutil.which("ffmpeg"):
+        ctx["pulados"]["trilha.mixagem"] = "FFmpeg não encontrado no PATH"
+        return resultados
+
+    # Custo da mixagem dentro da codificação do áudio (a que o render já faz), por minuto
+    musica = wav_sintetico(os.path.join(ctx["pasta"], "musica.wav"), 20, taxa=44100, frequencia=330)
+    espec = {"arquivo": musica, "volume_db": trilha.VOLUME_PADRAO_DB, "envelope": envelope}
+    comandos = video.gravar_comandos_trilha(espec, os.path.join(ctx["pasta"], "narracao"))
+    saida = os.path.join(ctx["pasta"], "mixagem.m4a")
+    casos = {
+        "trilha.so_aac_por_minuto": ["-i", narracao, "-c:a", "aac", "-b:a", "192k"],
+        "trilha.mixagem_por_minuto": [
+            "-i", narracao, "-stream_loop", "-1", "-i", musica,
+            "-filter_complex", video.montar_filtro_trilha("0:a", "1:a", espec, 60 * minutos, comandos),
+            "-map", "[aout]", *video.args_audio_trilha(),
+        ],
+    }
+    for nome, args in casos.items():
+        def codificar():
+            processo = subprocess.run(["ffmpeg", "-y", "-hide_banner", *args, saida], capture_output=True, text=True)
+            if processo.returncode != 0:
+                raise RuntimeError(processo.stderr[-500:])
+        resultados[nome] = medir(codificar, ctx["repeticoes_render"])
+    return resultados
+
+
+def etapa_overlay(ctx):
+    from modules import overlay
+    config = overlay.config_overlay_padrao(ctx["leitura"], ctx["dia"]["data"])
+    config["visualizer"] = True
+    destino = os.path.join(ctx["pasta"], "overlay.png")
+    r = ctx["repeticoes"]
+    return {
+        "overlay.previa": medir(lambda: overlay.desenhar_overlay(config), r),
+        "overlay.png_final": medir(lambda: overlay.salvar_overlay_png(config, destino), r),
+    }
+
+
+def etapa_render(ctx):
+    from modules import video, overlay, legendas, masterizacao
+    from stub_imagens import png
+    pasta = os.path.join(ctx["pasta"], "render")
+    os.makedirs(pasta, exist_ok=True)
+
+    imagens = []
+    for i in range(4):
+        caminho = os.path.join(pasta, f"amostra_{i}.png")
+        with open(caminho, "wb") as f:
+            f.write(png(semente=i, tamanho_kb=400))
+        imagens.append(caminho)
+    segundos = ctx["duracao_audio"]
+    audio_path = wav_sintetico(os.path.join(pasta, "audio.wav"), segundos)
+
+    caminho_overlay = None
+    if pil_disponivel():
+        config = overlay.config_overlay_padrao(ctx["leitura"], ctx["dia"]["data"])
+        caminho_overlay = overlay.salvar_overlay_png(config, os.path.join(pasta, "overlay.png"))
+    frases = legendas.dividir_frases(ctx["leitura"]["texto"])
+    cues = legendas.gerar_cues(legendas.estimar_segmentos(frases, segundos))
+    _, caminho_ass = legendas.salvar_legendas(cues, os.path.join(pasta, "legenda"))
+
+    resultados = {}
+    for nome, perfil in PERFIS_RENDER.items():
+        if perfil.get("overlay") and not caminho_overlay:
+            ctx["pulados"][f"render.{nome}"] = "Pillow não instalado (PNG do overlay)"
+            continue
+        saida = os.path.join(pasta, f"video_{nome}.mp4")
+
+        def renderizar():
+            inicio = time.perf_counter()
+            ok, msg = video.gerar_video_ffmpeg(
+                imagens, audio_path, saida,
+                overlay_png=caminho_overlay if perfil.get("overlay") else None,
+                visualizer=perfil.get("visualizer", False),
+                caminho_ass=caminho_ass if perfil.get("legendas") else None,
+            )
+            if not ok:
+                raise RuntimeError(msg)
+            return {"x_tempo_real": segundos / (time.perf_counter() - inicio),
+                    "mb": os.path.getsize(saida) / 1e6}
+        resultados[f"render.{nome}"] = medir(renderizar, ctx["repeticoes_render"], aquecimento=0, extras=True)
+
+    # O perfil simples com a faixa AAC da masterização: o áudio é só copiado
+    ok, info = masterizacao.masterizar(audio_path, manter_wav=True)
+    if ok:
+        saida_aac = os.path.join(pasta, "video_simples_aac.mp4")
+
+        def renderizar_aac():
+            inicio = time.perf_counter()
+            ok, msg = video.gerar_video_ffmpeg(imagens, info["aac"], saida_aac)
+            if not ok:
+                raise RuntimeError(msg)
+            return {"x_tempo_real": segundos / (time.perf_counter() - inicio),
+                    "mb": os.path.getsize(saida_aac) / 1e6}
+        resultados["render.simples_aac"] = medir(renderizar_aac, ctx["repeticoes_render"], aquecimento=0,
+                                                 extras=True)
+
+        # O mesmo com trilha: o áudio volta a ser codificado, agora com a mixagem
+        from modules import trilha
+        musica = wav_sintetico(os.path.join(pasta, "musica.wav"), 10, taxa=44100, frequencia=330)
+        espec = {"arquivo": musica, "volume_db": trilha.VOLUME_PADRAO_DB,
+                 "envelope": trilha.calcular_envelope(audio_path)}
+        saida_trilha = os.path.join(pasta, "video_simples_trilha.mp4")
+
+        def renderizar_trilha():
+            inicio = time.perf_counter()
+            ok, msg = video.gerar_video_ffmpeg(imagens, info["aac"], saida_trilha, trilha=espec)
+            if not ok:
+                raise RuntimeError(msg)
+            return {"x_tempo_real": segundos / (time.perf_counter() - inicio),
+                    "mb": os.path.getsize(saida_trilha) / 1e6}
+        resultados["render.simples_trilha"] = medir(renderizar_trilha, ctx["repeticoes_render"], aquecimento=0,
+                                                    extras=True)
+    else:
+        ctx["pulados"]["render.simples_aac"] = info
+
+    # Os três formatos de uma vez (uma decodificação, áudio codificado uma vez)
+    saidas = []
+    for formato, (W, H) in video.FORMATOS.items():
+        sufixo = video.sufixo_formato(formato)
+        saidas.append({
+            "formato": formato, "video": os.path.join(pasta, f"video_formatos{sufixo}.mp4"),
+            "overlay_png": overlay.salvar_overlay_png(config, os.path.join(pasta, f"overlay{sufixo}.png"), W, H)
+            if caminho_overlay else None,
+            "ass": legendas.salvar_ass(cues, os.path.join(pasta, f"legenda{sufixo}.ass"), largura=W, altura=H),
+        })
+
+    def renderizar_formatos():
+        inicio = time.perf_counter()
+        ok, msg = video.gerar_videos_formatos(imagens, audio_path, saidas, visualizer=True)
+        if not ok:
+            raise RuntimeError(msg)
+        return {"x_tempo_real": segundos / (time.perf_counter() - inicio),
+                "mb": sum(os.path.getsize(s["video"]) for s in saidas) / 1e6}
+    resultados["render.tres_formatos"] = medir(renderizar_formatos, ctx["repeticoes_render"], aquecimento=0,
+                                               extras=True)
+    return resultados
+
+
+def etapa_pipeline(ctx):
+    from modules import database as db
+    from modules import producao, rastreio
+    from modules.agendador import caminho_critico
+    leitura = {**ctx["leitura"], "cor": ctx["dia"].get("cor", "")}
+    data_str = ctx["dia"]["data"]
+    ultimo = {}
+
+    def produzir():
+        ultimo["inicio"] = time.time()
+        prod = producao.produzir_leitura(leitura, data_str, client=ctx["llm"].cliente(), refazer=True,
+                                         notificar=lambda *a: None)
+        ultimo["prod"] = prod
+        return {"completo": not prod["falhou_em"]}
+
+    resultado = medir(produzir, ctx["repeticoes_render"], aquecimento=0, extras=True)
+    prod = ultimo["prod"]
+    if prod["falhou_em"]:
+        resultado["falhou_em"] = prod["falhou_em"]
+
+    nos = producao.montar_dag(prod)
+    estados = db.load_estado_nos(prod["chave"])
+    resultado["nos_s"] = {
+        nome: round(s["fim"] - s["inicio"], 3) for nome, s in estados.items() if s.get("fim") and s.get("inicio")
+    }
+    critico, soma = caminho_critico(prod["chave"], nos)
+    resultado["caminho_critico_s"] = round(critico, 3)
+    resultado["soma_etapas_s"] = round(soma, 3)
+
+    # Os trechos da última repetição (o rastro é a chave), somados por nome
+    rastreio.descarregar()
+    trechos = [t for t in db.carregar_trechos(rastro=prod["chave"]) if t["inicio"] >= ultimo["inicio"]]
+    por_nome = {}
+    for t in trechos:
+        por_nome[t["nome"]] = por_nome.get(t["nome"], 0.0) + t["wall_ms"]
+    resultado["trechos_ms"] = {k: round(v, 1) for k, v in sorted(por_nome.items(), key=lambda kv: -kv[1])}
+    return {"pipeline.produzir_leitura": resultado}
+
+
+# ---------------------------------------------------------------------
+# Requisitos e comparação com a base
+# ---------------------------------------------------------------------
+
+def motivo_para_pular(etapa):
+    """Dependência ausente que impede a etapa (None se pode rodar)."""
+    from modules import audio
+    if etapa == "tts":
+        if not os.path.exists(audio.MODEL_PATH):
+            return f"modelo do Piper não encontrado ({audio.MODEL_PATH}); use --modelo-piper"
+        if not audio._carregar_piper() and not shutil.which("piper"):
+            return "Piper não instalado (nem a biblioteca nem o executável)"
+    if etapa == "overlay" and not pil_disponivel():
+        return "Pillow não instalado"
+    if etapa in ("masterizacao", "render") and not shutil.which("ffmpeg"):
+        return "FFmpeg não encontrado no PATH"
+    return None
+
+
+def comparar(resultados, base, tolerancia, minimo_ms):
+    """
+    Medianas atuais contra as da base: regressão quando piora mais que
+    `tolerancia` (fração) e mais que `minimo_ms` (ruído de medidas curtas).
+    """
+    linhas = []
+    for nome, atual in resultados.items():
+        anterior = base.get(nome)
+        if not anterior or "mediana_ms" not in anterior:
+            continue
+        antes, agora = anterior["mediana_ms"], atual["mediana_ms"]
+        variacao = (agora - antes) / antes if antes else 0.0
+        regressao = variacao > tolerancia and agora - antes > minimo_ms
+        linhas.append((nome, antes, agora, variacao, regressao))
+    return linhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--etapas", default=",".join(ETAPAS), help=f"Subconjunto de: {','.join(ETAPAS)}")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--repeticoes-render", type=int, default=2, help="Para render e pipeline (mais lentos)")
+    parser.add_argument("--duracao-audio", type=float, default=20.0, help="Segundos do áudio sintético do render")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stub LLM: segundos até o primeiro token")
+    parser.add_argument("--tokens-s", type=float, default=250.0, help="Stub LLM: tokens por segundo")
+    parser.add_argument("--latencia-imagens", type=float, default=0.5, help="Stub de imagens: segundos por imagem")
+    parser.add_argument("--modelo-piper", help="Caminho do .onnx (o .onnx.json ao lado)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    parser.add_argument("--gravar-base", help="Grava os resultados como base de comparação neste arquivo")
+    parser.add_argument("--base", help="Compara com uma base gravada antes")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="Piora relativa aceita (0.15 = 15%%)")
+    parser.add_argument("--minimo-ms", type=float, default=2.0, help="Piora absoluta mínima para contar")
+    args = parser.parse_args(argv)
+
+    etapas = [e.strip() for e in args.etapas.split(",") if e.strip()]
+    desconhecidas = set(etapas) - set(ETAPAS)
+    if desconhecidas:
+        parser.error(f"etapas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    pasta = tempfile.mkdtemp(prefix="bench_pipeline_")
+    from stub_llm import ServidorLLM
+    from stub_imagens import ServidorImagens
+    stub_imagens = ServidorImagens(latencia=args.latencia_imagens)
+    # A URL do Pollinations é lida na importação dos módulos
+    os.environ["POLLINATIONS_URL"] = stub_imagens.url
+
+    from modules import database as db
+    from modules import limites, audio, producao, rastreio
+    from modules.pipeline import persistencia
+
+    random.seed(args.semente)
+    db.DB_FILE = os.path.join(pasta, "liturgia.db")
+    producao.PASTA_DADOS = os.path.join(pasta, "data")
+    # Os limites dos planos gratuitos mediriam a espera, não o pipeline
+    for nome in limites.LIMITES:
+        limites.LIMITES[nome] = limites.TokenBucket(1e6, 1e6)
+    if args.modelo_piper:
+        audio.MODEL_PATH = os.path.abspath(args.modelo_piper)
+        audio.CONFIG_PATH = audio.MODEL_PATH + ".json"
+
+    fixtures = carregar_fixtures()
+    for dia in fixtures:
+        db.salvar_liturgia(dia["data"], dia)
+    dia = fixtures[0]
+    ctx = {
+        "fixtures": fixtures, "dia": dia,
+        "leitura": next(l for l in dia["leituras"] if l["tipo"] == "Evangelho"),
+        "pasta": pasta, "repeticoes": args.repeticoes, "repeticoes_render": args.repeticoes_render,
+        "duracao_audio": args.duracao_audio, "pulados": {},
+    }
+
+    resultados = {}
+    try:
+        with ServidorLLM(ttft=args.ttft, tokens_s=args.tokens_s) as llm, stub_imagens:
+            ctx["llm"] = llm
+            for etapa in etapas:
+                motivo = motivo_para_pular(etapa)
+                if motivo:
+                    ctx["pulados"][etapa] = motivo
+                    print(f"{etapa:>10}: pulada ({motivo})")
+                    continue
+                inicio = time.perf_counter()
+                resultados.update(globals()[f"etapa_{etapa}"](ctx))
+                print(f"{etapa:>10}: {time.perf_counter() - inicio:.1f}s")
+            estatisticas = {"llm": dict(llm.estatisticas), "imagens": dict(stub_imagens.estatisticas)}
+        persistencia.gravador().descarregar()
+        rastreio.descarregar()
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    print()
+    for nome, r in resultados.items():
+        extras = ", ".join(f"{k}={v}" for k, v in r.items()
+                           if k not in ("mediana_ms", "p95_ms", "min_ms", "n") and not isinstance(v, dict))
+        print(f"{nome:>32}: mediana {r['mediana_ms']:>10.2f} ms  p95 {r['p95_ms']:>10.2f} ms"
+              + (f"  ({extras})" if extras else ""))
+
+    saida = {
+        "ambiente": ambiente(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("json", "gravar_base", "base")},
+        "resultados": resultados,
+        "pulados": ctx["pulados"],
+        "stubs": estatisticas,
+    }
+
+    codigo = 0
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("ambiente", {}).get("plataforma") != saida["ambiente"]["plataforma"]:
+            print("\nAviso: a base foi gravada em outra plataforma; compare com cautela.")
+        linhas = comparar(resultados, base.get("resultados", {}), args.tolerancia, args.minimo_ms)
+        print(f"\nComparação com {args.base} (tolerância {args.tolerancia:.0%}):")
+        for nome, antes, agora, variacao, regressao in linhas:
+            print(f"{nome:>32}: {antes:>10.2f} -> {agora:>10.2f} ms  {variacao:+7.1%}"
+                  + ("  REGRESSÃO" if regressao else ""))
+        regressoes = [l[0] for l in linhas if l[4]]
+        saida["comparacao"] = {"base": args.base, "tolerancia": args.tolerancia, "regressoes": regressoes}
+        codigo = 1 if regressoes else 0
+
+    for caminho in filter(None, (args.json, args.gravar_base)):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(saida, f, ensure_ascii=False, indent=2)
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Benchmark do envio resumível (modules/publicacao.py) contra o stub local.
+
+Cria `--videos` arquivos sintéticos de `--mb` MB, põe todos na fila de
+publicação de um banco temporário e mede, com falhas injetadas pelo stub
+(quedas de conexão, 503, sessões expiradas):
+
+- fila: envios em paralelo até esvaziar; tempo, vazão, retentativas, bytes
+  reenviados e conferência do SHA-256 de cada vídeo recebido;
+- retomada: um envio interrompido no meio (queda do processo simulada) e
+  retomado pela fila a partir do último byte confirmado;
+- limite de banda: vazão medida contra `--limite-mbps` (se informado).
+
+    python benchmarks/publicacao.py --videos 4 --mb 20 --paralelas 2 --queda-a-cada 5
+    python benchmarks/publicacao.py --limite-mbps 80
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from modules import database as db
+from modules import publicacao
+from modules import rastreio
+from modules.pipeline import persistencia
+from stub_youtube import ServidorYouTube
+
+
+class QuedaSimulada(Exception):
+    pass
+
+
+def criar_videos(pasta, quantidade, mb):
+    """Arquivos aleatórios e seus SHA-256; cada um vira uma produção no banco."""
+    conn = db.get_connection()
+    db.create_status_table(conn)
+    videos = []
+    for i in range(quantidade):
+        caminho = os.path.join(pasta, f"video_{i}.mp4")
+        dados = os.urandom(mb * 1024 * 1024 + 12345)  # tamanho que não é múltiplo do bloco
+        with open(caminho, "wb") as f:
+            f.write(dados)
+        chave = f"2025-01-0{i % 9 + 1}-Leitura {i}"
+        conn.execute('INSERT INTO producao_status VALUES (?, ?, ?, ?, ?)', (chave, "2025-01-01", "Evangelho", "{}", 6))
+        videos.append({"chave": chave, "caminho": caminho, "sha256": hashlib.sha256(dados).hexdigest(),
+                       "bytes": len(dados)})
+    conn.commit()
+    conn.close()
+    return videos
+
+
+def enfileirar(videos):
+    for v in videos:
+        db.enfileirar_publicacao(v["chave"], "2025-01-01", "Evangelho", v["caminho"],
+                                 publicacao.metadados_video(f"Teste {v['chave']}", "benchmark", ["teste"], "private"))
+
+
+def conferir(stub, videos):
+    """Quantos vídeos chegaram inteiros ao stub (mesmo SHA-256 e tamanho)."""
+    feitos = {p["chave_id"]: p["video_id"] for p in db.listar_publicacoes() if p["estado"] == "concluido"}
+    ok = 0
+    for v in videos:
+        recebido = stub.videos.get(feitos.get(v["chave"]))
+        ok += bool(recebido and recebido["sha256"] == v["sha256"] and recebido["bytes"] == v["bytes"])
+    return ok
+
+
+def cenario_fila(args, videos, stub):
+    enfileirar(videos)
+    publicador = publicacao.Publicador(
+        publicacao.TokenFixo(), paralelas=args.paralelas, url=stub.url,
+        tamanho_bloco=int(args.bloco_mb * 1024 * 1024), backoff_base=0.01, notificar=lambda *a: None,
+    )
+    inicio = time.perf_counter()
+    est = publicador.executar()
+    segundos = time.perf_counter() - inicio
+    total = sum(v["bytes"] for v in videos)
+    return {
+        "segundos": round(segundos, 2),
+        "mb_s": round(total / segundos / 1e6, 1),
+        "concluidos": est["concluidos"],
+        "integros": conferir(stub, videos),
+        "requisicoes": est["requisicoes"],
+        "retentativas": est["retentativas"],
+        "sessoes": est["sessoes"],
+        "bytes_reenviados_pct": round(100 * (est["bytes_enviados"] - total) / total, 1),
+        "falhas_injetadas": {k: stub.estatisticas[k] for k in ("quedas", "erros_503", "expiradas")},
+    }
+
+
+def cenario_retomada(args, video, stub):
+    """Interrompe o envio na metade (como uma queda do processo) e deixa a fila retomar."""
+    enfileirar([video])
+    pub = db.pegar_proxima_publicacao()
+    envio = publicacao.EnvioResumivel(publicacao.TokenFixo(), stub.url, int(args.bloco_mb * 1024 * 1024),
+                                      backoff_base=0.01)
+
+    def ao_confirmar(url, n, total):
+        db.registrar_progresso_publicacao(pub["id"], url, n)
+        if n >= total // 2:
+            raise QuedaSimulada()
+
+    try:
+        envio.enviar(video["caminho"], json.loads(pub["metadados_json"]), ao_confirmar=ao_confirmar)
+    except QuedaSimulada:
+        pass
+    confirmado = db.listar_publicacoes(video["chave"])[0]["bytes_confirmados"]
+
+    db.recuperar_publicacoes_interrompidas()  # o que a página faz ao reiniciar
+    publicador = publicacao.Publicador(publicacao.TokenFixo(), paralelas=1, url=stub.url,
+                                       tamanho_bloco=int(args.bloco_mb * 1024 * 1024), backoff_base=0.01,
+                                       notificar=lambda *a: None)
+    est = publicador.executar()
+    return {
+        "confirmado_antes_da_queda_pct": round(100 * confirmado / video["bytes"], 1),
+        "reenviado_na_retomada_pct": round(100 * est["bytes_enviados"] / video["bytes"], 1),
+        "sessoes_novas_na_retomada": est["sessoes"],
+        "integro": conferir(stub, [video]) == 1,
+    }
+
+
+def cenario_banda(args, videos, stub):
+    enfileirar(videos)
+    limite = args.limite_mbps * 1e6 / 8
+    publicador = publicacao.Publicador(publicacao.TokenFixo(), paralelas=args.paralelas, limite_bytes_s=limite,
+                                       url=stub.url, tamanho_bloco=int(args.bloco_mb * 1024 * 1024),
+                                       notificar=lambda *a: None)
+    inicio = time.perf_counter()
+    est = publicador.executar()
+    segundos = time.perf_counter() - inicio
+    medido = est["bytes_enviados"] * 8 / segundos / 1e6
+    return {"limite_mbps": args.limite_mbps, "medido_mbps": round(medido, 1),
+            "desvio_pct": round(100 * (medido - args.limite_mbps) / args.limite_mbps, 1),
+            "integros": conferir(stub, videos)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=4)
+    parser.add_argument("--mb", type=int, default=20, help="Tamanho de cada vídeo sintético")
+    parser.add_argument("--paralelas", type=int, default=2)
+    parser.add_argument("--bloco-mb", type=float, default=1.0, help="Tamanho do bloco (arredondado a 256 KiB)")
+    parser.add_argument("--queda-a-cada", type=int, default=7, help="Derruba a conexão a cada N blocos")
+    parser.add_argument("--erro-503-a-cada", type=int, default=11)
+    parser.add_argument("--expirar-a-cada", type=int, default=5, help="Expira a sessão a cada N consultas")
+    parser.add_argument("--limite-mbps", type=float, default=0, help="Também mede o limite de banda")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        db.DB_FILE = os.path.join(pasta, "publicacao.db")
+        videos = criar_videos(pasta, args.videos + 1 + (args.videos if args.limite_mbps else 0), args.mb)
+
+        with ServidorYouTube(queda_a_cada=args.queda_a_cada, erro_503_a_cada=args.erro_503_a_cada,
+                             expirar_a_cada=args.expirar_a_cada) as stub:
+            resultados["fila"] = cenario_fila(args, videos[:args.videos], stub)
+        with ServidorYouTube() as stub:
+            resultados["retomada"] = cenario_retomada(args, videos[args.videos], stub)
+        if args.limite_mbps:
+            with ServidorYouTube() as stub:
+                resultados["banda"] = cenario_banda(args, videos[args.videos + 1:], stub)
+        persistencia.gravador().descarregar()
+        rastreio.descarregar()
+
+    for nome, r in resultados.items():
+        print(f"{nome:>9}: " + ", ".join(f"{k}={v}" for k, v in r.items()))
+
+    falhou = resultados["fila"]["integros"] != args.videos or not resultados["retomada"]["integro"]
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Comparação dos modos de geração do roteiro: uma requisição por bloco (em
+paralelo) contra uma requisição só com os 4 blocos em JSON.
+
+Para cada leitura de amostra (do cache local, ou um texto fixo), gera o
+roteiro nos dois modos e mede tempo, requisições e tokens de entrada/saída
+informados pelo Groq. Sem chave da API, `--estimar` compara só o tamanho
+dos prompts (tokens estimados em ~4 caracteres cada).
+
+    python benchmarks/roteiro_modos.py --amostras 3
+    python benchmarks/roteiro_modos.py --estimar
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from modules import roteiro
+from modules import database as db
+
+TEXTO_FIXO = {
+    "ref": "Jo 10,11-18",
+    "texto": "Naquele tempo, disse Jesus: Eu sou o bom pastor. O bom pastor dá a vida por suas ovelhas. "
+             "O mercenário, que não é pastor e não é dono das ovelhas, vê o lobo chegar, abandona as ovelhas "
+             "e foge, e o lobo as ataca e dispersa. Pois ele é apenas um mercenário e não se importa com as "
+             "ovelhas. Eu sou o bom pastor. Conheço as minhas ovelhas, e elas me conhecem, assim como o Pai "
+             "me conhece e eu conheço o Pai. Eu dou minha vida pelas ovelhas.",
+}
+
+
+def amostras(n):
+    """Até `n` leituras do cache local (as mais recentes); o texto fixo se o cache estiver vazio."""
+    leituras = []
+    if os.path.exists(db.DB_FILE):
+        conn = db.get_connection()
+        datas = [r[0] for r in conn.execute(
+            'SELECT data_liturgia FROM liturgia_dias ORDER BY data_liturgia DESC LIMIT ?', (n,))]
+        conn.close()
+        for data in datas:
+            liturgia = db.carregar_liturgia(data) or {}
+            leituras += [l for l in liturgia.get('leituras', []) if l.get('texto')][:1]
+    return leituras[:n] or [TEXTO_FIXO]
+
+
+def estimar(leituras):
+    """Caracteres (e tokens estimados) dos prompts de cada modo."""
+    resultado = {}
+    for modo in roteiro.MODOS:
+        chars = [
+            len(roteiro.prompt_agrupado(l['texto'], l['ref'])) if modo == "agrupado"
+            else sum(len(roteiro.PROMPTS[c](l['texto'], l['ref'])) for c in roteiro.BLOCOS)
+            for l in leituras
+        ]
+        resultado[modo] = {
+            "requisicoes": 1 if modo == "agrupado" else len(roteiro.BLOCOS),
+            "caracteres_entrada": round(statistics.mean(chars)),
+            "tokens_entrada_estimados": round(statistics.mean(chars) / 4),
+        }
+    return resultado
+
+
+def medir(client, leituras, repeticoes):
+    resultado = {}
+    for modo in roteiro.MODOS:
+        usos = []
+        for leitura in leituras:
+            for _ in range(repeticoes):
+                uso = {}
+                roteiro.gerar_conteudo_ia(client, leitura['texto'], leitura['ref'], modo=modo, uso=uso)
+                usos.append(uso)
+        resultado[modo] = {
+            "segundos_mediana": round(statistics.median(u["segundos"] for u in usos), 2),
+            "primeiro_token_s_mediana": round(statistics.median(
+                min(b["ttft_s"] for b in u["blocos"].values() if b.get("ttft_s") is not None) for u in usos), 3),
+            "requisicoes": round(statistics.mean(u["requisicoes"] for u in usos), 2),
+            "tokens_entrada": round(statistics.mean(u["tokens_entrada"] for u in usos)),
+            "tokens_saida": round(statistics.mean(u["tokens_saida"] for u in usos)),
+            "respostas_refeitas": sum(bool(u.get("refeitos")) for u in usos),
+        }
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--amostras", type=int, default=3, help="Leituras do cache usadas")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Gerações por leitura e modo")
+    parser.add_argument("--estimar", action="store_true", help="Só compara o tamanho dos prompts (sem API)")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    os.chdir(RAIZ)
+    leituras = amostras(args.amostras)
+    if args.estimar:
+        resultado = estimar(leituras)
+        chave_entrada = "tokens_entrada_estimados"
+    else:
+        from produzir import ler_segredo
+        client = roteiro.criar_cliente_groq(ler_segredo("GROQ_API_KEY"))
+        if not client:
+            parser.error("GROQ_API_KEY não encontrada (use --estimar para comparar sem a API)")
+        resultado = medir(client, leituras, args.repeticoes)
+        chave_entrada = "tokens_entrada"
+
+    print(f"{len(leituras)} leitura(s) de amostra\n")
+    for modo, r in resultado.items():
+        print(f"{modo:>10}: " + ", ".join(f"{k}={v}" for k, v in r.items()))
+    reducao = 1 - resultado["agrupado"][chave_entrada] / resultado["por_bloco"][chave_entrada]
+    print(f"\nEntrada do modo agrupado: {reducao:.0%} menor que por bloco")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"leituras": [l['ref'] for l in leituras], "modos": resultado}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Servidor local que imita o Pollinations (GET /prompt/<texto>?width=...).
+
+Responde com PNGs de amostra gerados na partida (determinísticos, do
+tamanho em KB pedido, para o download pesar como uma imagem real), depois
+de uma latência fixa. `png()` também é usado pelos benchmarks para criar
+as imagens de amostra do render.
+
+    python benchmarks/stub_imagens.py --porta 8767 --latencia 2
+    POLLINATIONS_URL=http://127.0.0.1:8767 streamlit run Inicio.py
+
+Em código: `with ServidorImagens(latencia=0.5) as stub: ... stub.url ...`.
+"""
+import sys
+import zlib
+import time
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AMOSTRAS = 4
+
+
+def _bloco_png(tipo, dados):
+    return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados) & 0xFFFFFFFF)
+
+
+def png(largura=1080, altura=1920, semente=0, tamanho_kb=1500):
+    """
+    PNG RGB válido e reprodutível: um degradê (comprime quase tudo) com
+    faixas de ruído suficientes para o arquivo ficar perto de `tamanho_kb`.
+    """
+    rnd = random.Random(semente)
+    base = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(2)]
+    bytes_linha = largura * 3
+    ruidosas = min(altura, int(tamanho_kb * 1024 / bytes_linha))
+    passo = altura / ruidosas if ruidosas else altura + 1
+    marcadas = {int(i * passo) for i in range(ruidosas)}
+
+    linhas = []
+    for y in range(altura):
+        if y in marcadas:
+            linha = rnd.randbytes(bytes_linha)
+        else:
+            t = y / max(1, altura - 1)
+            cor = bytes(int(a + (b - a) * t) for a, b in zip(*base))
+            linha = cor * largura
+        linhas.append(b"\x00" + linha)  # filtro "None" por linha
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + _bloco_png(b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0))
+            + _bloco_png(b"IDAT", zlib.compress(b"".join(linhas), 6))
+            + _bloco_png(b"IEND", b""))
+
+
+class ServidorImagens:
+    """Stub com `estatisticas` (requisições, bytes servidos)."""
+
+    def __init__(self, porta=0, latencia=0.5, tamanho_kb=1500, largura=1080, altura=1920):
+        self.latencia = latencia
+        self.amostras = [png(largura, altura, i, tamanho_kb) for i in range(AMOSTRAS)]
+        self.estatisticas = {"requisicoes": 0, "bytes": 0}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, porta = self.httpd.server_address
+        return f"http://{host}:{porta}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                caminho = urlparse(self.path).path
+                if not caminho.startswith("/prompt/"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                time.sleep(stub.latencia)
+                # Mesmo prompt -> mesma amostra
+                dados = stub.amostras[hashlib.sha1(caminho.encode()).digest()[0] % len(stub.amostras)]
+                with stub.lock:
+                    stub.estatisticas["requisicoes"] += 1
+                    stub.estatisticas["bytes"] += len(dados)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8767)
+    parser.add_argument("--latencia", type=float, default=0.5, help="Segundos antes de responder")
+    parser.add_argument("--tamanho-kb", type=int, default=1500)
+    args = parser.parse_args(argv)
+
+    with ServidorImagens(args.porta, args.latencia, args.tamanho_kb) as stub:
+        print(f"Stub do Pollinations em {stub.url}. Ctrl+C para sair.")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
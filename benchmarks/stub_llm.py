@@ -0,0 +1,221 @@
+"""
+Servidor local que imita a API de chat do Groq (compatível com a da OpenAI).
+
+Implementa só o que modules/roteiro.py usa: POST em
+/openai/v1/chat/completions, com ou sem `stream` (eventos SSE "data: ...",
+o uso de tokens no último pedaço em `x_groq`). As respostas são fixas e
+válidas para cada tipo de prompt (os 4 blocos, o modo agrupado em JSON, as
+cenas das imagens), entregues no ritmo de `ttft` (tempo até o primeiro
+token) e `tokens_s`, para medir o pipeline sem rede nem cota.
+
+    python benchmarks/stub_llm.py --porta 8766 --tokens-s 250
+    GROQ_BASE_URL=http://127.0.0.1:8766 streamlit run Inicio.py   # com qualquer GROQ_API_KEY
+
+Em código: `with ServidorLLM() as stub: client = stub.cliente() ...`.
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CAMINHO_CHAT = "/openai/v1/chat/completions"
+CARACTERES_POR_TOKEN = 4
+
+LEITURA = ("Naquele tempo, Jesus reuniu os discípulos e falou-lhes com autoridade e ternura. " * 6).strip()
+REFLEXAO = ("Reflexão.\nEste Evangelho nos convida a olhar para a nossa própria vida com os olhos de Deus. "
+            "Jesus não fala apenas para os discípulos daquele tempo: fala para cada um de nós, hoje, no meio "
+            "das nossas preocupações, do trabalho, da família e das escolhas que fazemos todos os dias. " * 2).strip()
+APLICACAO = ("Aplicação na sua vida.\nHoje, escolha um gesto concreto: ligue para alguém que está sozinho, "
+             "perdoe uma ofensa antiga, reserve dez minutos para o silêncio e para a oração. " * 2).strip()
+ORACAO = ("Vamos orar:\nSenhor Jesus, obrigado pela tua Palavra que ilumina o nosso caminho. Dá-nos a graça "
+          "de colocá-la em prática com simplicidade e alegria. Amém.\n\nSe esta Palavra tocou o seu coração,\n"
+          "não guarde a Boa Nova só para você: compartilhe esta mensagem com um amigo e faça hoje um gesto "
+          "de caridade.")
+CENAS = {
+    "bloco_1": "Jesus speaking to his disciples on a hill at dawn, first century Galilee, warm golden light",
+    "bloco_2": "the call to follow Jesus and share the good news with others",
+    "bloco_3": "helping a lonely neighbor and forgiving an old offense in everyday city life",
+    "bloco_4": "quiet prayer with candlelight, peace and gratitude, soft divine light",
+}
+
+
+def responder_prompt(prompt, json_pedido=False):
+    """Resposta fixa e válida (no formato esperado pelo roteiro) para o prompt recebido."""
+    if "bloco_1, bloco_2, bloco_3 e bloco_4" in prompt:
+        return json.dumps(CENAS, ensure_ascii=False)
+    if '### Campo "leitura"' in prompt or json_pedido:
+        return json.dumps({"leitura": LEITURA, "reflexao": REFLEXAO, "aplicacao": APLICACAO, "oracao": ORACAO},
+                          ensure_ascii=False)
+    for marcador, texto in (("Vamos orar:", ORACAO), ("Aplicação na sua vida.", APLICACAO),
+                            ("Reflexão.", REFLEXAO)):
+        if marcador in prompt:
+            return texto
+    return LEITURA
+
+
+def _objeto(dados):
+    """JSON -> objetos com atributos (como os do SDK: chunk.choices[0].delta.content)."""
+    return json.loads(json.dumps(dados), object_hook=lambda d: SimpleNamespace(**d))
+
+
+class _Resposta:
+    """Resposta em streaming do ClienteHTTP: itera pedaços e pode ser fechada no meio."""
+
+    def __init__(self, response):
+        self.response = response
+
+    def __iter__(self):
+        for linha in self.response.iter_lines():
+            if not linha.startswith(b"data: "):
+                continue
+            dados = linha[len(b"data: "):]
+            if dados == b"[DONE]":
+                break
+            yield _objeto(json.loads(dados))
+
+    def close(self):
+        self.response.close()
+
+
+class ClienteHTTP:
+    """
+    O mínimo do cliente `groq.Groq` usado pelo roteiro
+    (`chat.completions.create`), falando HTTP com o stub. Usado quando o
+    SDK não está instalado.
+    """
+
+    def __init__(self, base_url):
+        import requests
+        self.sessao = requests.Session()
+        self.url = base_url.rstrip("/") + CAMINHO_CHAT
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._criar))
+
+    def _criar(self, messages, model, temperature=None, stream=False, response_format=None, **extra):
+        corpo = {"messages": messages, "model": model, "temperature": temperature, "stream": stream}
+        if response_format:
+            corpo["response_format"] = response_format
+        response = self.sessao.post(self.url, json=corpo, stream=stream, headers={"Authorization": "Bearer stub"})
+        response.raise_for_status()
+        return _Resposta(response) if stream else _objeto(response.json())
+
+
+class ServidorLLM:
+    """Stub com `estatisticas` (requisições, tokens enviados) e ritmo configurável."""
+
+    def __init__(self, porta=0, ttft=0.2, tokens_s=250.0):
+        self.ttft = ttft
+        self.tokens_s = tokens_s
+        self.estatisticas = {"requisicoes": 0, "streams": 0, "tokens_saida": 0}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, porta = self.httpd.server_address
+        return f"http://{host}:{porta}"
+
+    def cliente(self):
+        """Cliente Groq apontado para o stub (ou ClienteHTTP, sem o SDK)."""
+        try:
+            from groq import Groq
+        except ImportError:
+            return ClienteHTTP(self.url)
+        return Groq(api_key="stub", base_url=self.url)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, corpo):
+                dados = json.dumps(corpo, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if urlparse(self.path).path != CAMINHO_CHAT:
+                    return self._json(404, {"error": {"message": "not found"}})
+                pedido = json.loads(corpo or b"{}")
+                prompt = "\n".join(m.get("content", "") for m in pedido.get("messages", []))
+                texto = responder_prompt(prompt, bool(pedido.get("response_format")))
+                pedacos = [texto[i:i + CARACTERES_POR_TOKEN] for i in range(0, len(texto), CARACTERES_POR_TOKEN)]
+                uso = {"prompt_tokens": len(prompt) // CARACTERES_POR_TOKEN, "completion_tokens": len(pedacos)}
+                with stub.lock:
+                    stub.estatisticas["requisicoes"] += 1
+                    stub.estatisticas["tokens_saida"] += len(pedacos)
+
+                inicio = time.perf_counter()
+                if not pedido.get("stream"):
+                    time.sleep(stub.ttft + len(pedacos) / stub.tokens_s)
+                    return self._json(200, {
+                        "id": "stub", "object": "chat.completion", "model": pedido.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": texto},
+                                     "finish_reason": "stop"}],
+                        "usage": uso,
+                    })
+
+                with stub.lock:
+                    stub.estatisticas["streams"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()  # HTTP/1.0: o fim da resposta é o fechamento da conexão
+                try:
+                    for i, pedaco in enumerate(pedacos + [None]):
+                        # Ritmo fixo: primeiro token em `ttft`, depois `tokens_s`
+                        espera = inicio + stub.ttft + i / stub.tokens_s - time.perf_counter()
+                        if espera > 0:
+                            time.sleep(espera)
+                        evento = {"id": "stub", "object": "chat.completion.chunk", "model": pedido.get("model"),
+                                  "choices": [{"index": 0, "delta": {"content": pedaco},
+                                               "finish_reason": None if pedaco else "stop"}]}
+                        if pedaco is None:
+                            evento["x_groq"] = {"usage": uso}
+                        self.wfile.write(b"data: " + json.dumps(evento, ensure_ascii=False).encode() + b"\n\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # cliente fechou o stream no meio
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Segundos até o primeiro token")
+    parser.add_argument("--tokens-s", type=float, default=250.0)
+    args = parser.parse_args(argv)
+
+    with ServidorLLM(args.porta, args.ttft, args.tokens_s) as stub:
+        print(f"Stub do Groq em {stub.url}. Ctrl+C para sair.")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Servidor local que imita o upload resumível da YouTube Data API.
+
+Implementa só o necessário para testar modules/publicacao.py: POST abre a
+sessão (devolve Location), PUT com Content-Range recebe um bloco e responde
+308 com o cabeçalho Range (ou 200 com o vídeo no último bloco), PUT com
+"bytes */total" informa onde a sessão parou. Pode injetar falhas: derrubar a
+conexão no meio de um bloco, responder 503, ou expirar sessões (404).
+
+    python benchmarks/stub_youtube.py --porta 8765 --queda-a-cada 3
+    YOUTUBE_UPLOAD_URL=http://127.0.0.1:8765/upload/youtube/v3/videos streamlit run Inicio.py
+
+Em código: `with ServidorYouTube(queda_a_cada=3) as stub: ... stub.url ...`.
+"""
+import re
+import sys
+import json
+import socket
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CAMINHO_UPLOAD = "/upload/youtube/v3/videos"
+CAMINHO_SESSAO = "/upload/sessao/"
+
+
+class Sessao:
+    def __init__(self, total, metadados):
+        self.total = total
+        self.metadados = metadados
+        self.recebido = hashlib.sha256()
+        self.bytes = 0
+        self.video = None
+        self.lock = threading.Lock()
+
+
+class ServidorYouTube:
+    """
+    Stub com contadores (`estatisticas`) e o SHA-256 de cada vídeo recebido
+    (`videos`: id -> {"sha256", "bytes", "metadados"}), para conferir a
+    integridade do que foi enviado.
+
+    - `queda_a_cada`: a cada N PUTs com dados, lê metade do bloco e derruba a conexão
+    - `erro_503_a_cada`: a cada N PUTs com dados, responde 503 sem guardar nada
+    - `expirar_a_cada`: a cada N consultas de sessão, responde 404 (sessão expirada)
+    """
+
+    def __init__(self, porta=0, queda_a_cada=0, erro_503_a_cada=0, expirar_a_cada=0, token="teste"):
+        self.queda_a_cada = queda_a_cada
+        self.erro_503_a_cada = erro_503_a_cada
+        self.expirar_a_cada = expirar_a_cada
+        self.token = token
+        self.sessoes = {}
+        self.videos = {}
+        self.estatisticas = {"sessoes": 0, "puts": 0, "consultas": 0, "bytes_recebidos": 0,
+                             "quedas": 0, "erros_503": 0, "expiradas": 0}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, porta = self.httpd.server_address
+        return f"http://{host}:{porta}{CAMINHO_UPLOAD}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _contar(self, chave):
+        with self.lock:
+            self.estatisticas[chave] += 1
+            return self.estatisticas[chave]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo=None, **cabecalhos):
+                dados = json.dumps(corpo).encode() if corpo is not None else b""
+                self.send_response(status)
+                for nome, valor in cabecalhos.items():
+                    self.send_header(nome.replace("_", "-"), valor)
+                self.send_header("Content-Length", str(len(dados)))
+                if dados:
+                    self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _autorizado(self):
+                if self.headers.get("Authorization") != f"Bearer {stub.token}":
+                    self._responder(401, {"error": "invalid token"})
+                    return False
+                return True
+
+            def _descartar_corpo(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self):
+                if not self._autorizado():
+                    return
+                if urlparse(self.path).path != CAMINHO_UPLOAD:
+                    self._descartar_corpo()
+                    return self._responder(404, {"error": "not found"})
+                metadados = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                total = int(self.headers["X-Upload-Content-Length"])
+                with stub.lock:
+                    stub.estatisticas["sessoes"] += 1
+                    sessao_id = f"s{stub.estatisticas['sessoes']}"
+                    stub.sessoes[sessao_id] = Sessao(total, metadados)
+                host, porta = stub.httpd.server_address
+                self._responder(200, Location=f"http://{host}:{porta}{CAMINHO_SESSAO}{sessao_id}")
+
+            def _estado(self, sessao, sessao_id):
+                if sessao.video:
+                    return self._responder(200, sessao.video)
+                if sessao.bytes:
+                    return self._responder(308, Range=f"bytes=0-{sessao.bytes - 1}")
+                self._responder(308)
+
+            def do_PUT(self):
+                if not self._autorizado():
+                    return self._descartar_corpo()
+                sessao_id = urlparse(self.path).path[len(CAMINHO_SESSAO):]
+                sessao = stub.sessoes.get(sessao_id)
+                if not sessao:
+                    self._descartar_corpo()
+                    return self._responder(404, {"error": "session not found"})
+
+                faixa = self.headers.get("Content-Range", "")
+                if faixa.startswith("bytes */"):  # consulta de estado
+                    n = stub._contar("consultas")
+                    if stub.expirar_a_cada and n % stub.expirar_a_cada == 0:
+                        stub._contar("expiradas")
+                        del stub.sessoes[sessao_id]
+                        return self._responder(404, {"error": "session expired"})
+                    return self._estado(sessao, sessao_id)
+
+                m = re.match(r"bytes (\d+)-(\d+)/(\d+)", faixa)
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                if not m:
+                    self._descartar_corpo()
+                    return self._responder(400, {"error": "bad Content-Range"})
+                inicio, fim = int(m.group(1)), int(m.group(2))
+                n = stub._contar("puts")
+
+                if stub.erro_503_a_cada and n % stub.erro_503_a_cada == 0:
+                    stub._contar("erros_503")
+                    self._descartar_corpo()
+                    return self._responder(503, {"error": "backend error"})
+
+                with sessao.lock:
+                    if inicio != sessao.bytes or fim - inicio + 1 != tamanho:
+                        self._descartar_corpo()  # fora de ordem: diz ao cliente onde está
+                        return self._estado(sessao, sessao_id)
+
+                    queda = stub.queda_a_cada and n % stub.queda_a_cada == 0
+                    ler = tamanho // 2 if queda else tamanho
+                    while ler:
+                        dados = self.rfile.read(min(ler, 64 * 1024))
+                        if not dados:
+                            break
+                        sessao.recebido.update(dados)
+                        sessao.bytes += len(dados)
+                        ler -= len(dados)
+                        with stub.lock:
+                            stub.estatisticas["bytes_recebidos"] += len(dados)
+
+                    if queda:
+                        stub._contar("quedas")
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+
+                    if sessao.bytes == sessao.total:
+                        video_id = f"stub{sessao_id}"
+                        sessao.video = {"id": video_id, "kind": "youtube#video", **sessao.metadados}
+                        with stub.lock:
+                            stub.videos[video_id] = {"sha256": sessao.recebido.hexdigest(), "bytes": sessao.bytes,
+                                                     "metadados": sessao.metadados}
+                return self._estado(sessao, sessao_id)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--queda-a-cada", type=int, default=0)
+    parser.add_argument("--erro-503-a-cada", type=int, default=0)
+    parser.add_argument("--expirar-a-cada", type=int, default=0)
+    parser.add_argument("--token", default="teste")
+    args = parser.parse_args(argv)
+
+    with ServidorYouTube(args.porta, args.queda_a_cada, args.erro_503_a_cada, args.expirar_a_cada, args.token) as stub:
+        print(f"Stub do YouTube em {stub.url} (token: {args.token}). Ctrl+C para sair.")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
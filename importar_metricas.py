@@ -0,0 +1,36 @@
+"""
+Importa métricas de vídeos para o dashboard a partir de exportações do
+YouTube Studio (CSV), JSON Lines ou respostas da YouTube Analytics API.
+
+Exemplos:
+    python importar_metricas.py "Dados da tabela.csv" --data 2025-01-31
+    python importar_metricas.py metricas_*.csv          # arquivos já importados são pulados
+    python importar_metricas.py export.csv --forcar     # reimporta mesmo assim
+"""
+import os
+import sys
+import argparse
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(RAIZ)
+
+from modules import ingestao
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa métricas de vídeos (CSV/JSON) para o dashboard.")
+    parser.add_argument("arquivos", nargs="+")
+    parser.add_argument("--data", help="Data (AAAA-MM-DD) para arquivos sem coluna de data (totais do período)")
+    parser.add_argument("--forcar", action="store_true", help="Reimporta arquivos já importados")
+    args = parser.parse_args(argv)
+
+    caminhos = [os.path.abspath(c) for c in args.arquivos]
+    # O banco (liturgia.db) é relativo ao diretório de trabalho, como no `streamlit run Inicio.py`
+    os.chdir(RAIZ)
+    for caminho in caminhos:
+        print(ingestao.formatar_relatorio(ingestao.importar(caminho, data_padrao=args.data, forcar=args.forcar)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from modules import database as db
+from modules import avisos
+from modules import rastreio
+
+# ---------------------------------------------------------------------
+# Agendador de etapas em grafo (DAG)
+# ---------------------------------------------------------------------
+# Cada nó declara de quais nós depende e em qual pool roda:
+#   "io"  -> chamadas de rede (LLM, geração de imagens)
+#   "cpu" -> trabalho local pesado (Piper, FFmpeg)
+# Os dois pools são de threads: o Piper (onnxruntime) e o FFmpeg (subprocesso)
+# liberam o GIL, então o paralelismo é real sem precisar serializar o estado
+# da produção entre processos. O estado de cada nó é gravado em
+# `pipeline_nos`; uma nova execução pula os nós já concluídos.
+
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+BLOQUEADO = "bloqueado"
+EXECUTANDO = "executando"
+
+
+def criar_pools(max_io=4, max_cpu=None):
+    return {
+        "io": ThreadPoolExecutor(max_workers=max_io, thread_name_prefix="dag-io"),
+        "cpu": ThreadPoolExecutor(max_workers=max_cpu or os.cpu_count() or 2, thread_name_prefix="dag-cpu"),
+    }
+
+
+class No:
+    def __init__(self, nome, funcao, depende=(), pool="io"):
+        self.nome = nome
+        self.funcao = funcao
+        self.depende = tuple(depende)
+        self.pool = pool
+
+
+class Agendador:
+    def __init__(self, chave_id, nos, max_io=4, max_cpu=None, ja_concluidos=(), retomar=True,
+                 pools=None, ao_concluir_no=None, notificar=avisos.console):
+        """
+        `pools` permite compartilhar os executores entre várias produções
+        (modo fila); `ao_concluir_no(nome, pool, inicio, fim, ok)` é chamado
+        ao fim de cada nó.
+        """
+        self.chave_id = chave_id
+        self.retomar = retomar
+        self.pools_externos = pools
+        self.ao_concluir_no = ao_concluir_no
+        self.nos = {n.nome: n for n in nos}
+        self.max_io = max_io
+        self.max_cpu = max_cpu or os.cpu_count() or 2
+        self.ja_concluidos = set(ja_concluidos)
+        self.notificar = notificar
+        self._validar()
+
+    def _validar(self):
+        for no in self.nos.values():
+            for dep in no.depende:
+                if dep not in self.nos:
+                    raise ValueError(f"Nó '{no.nome}' depende de '{dep}', que não existe.")
+        # Detecta ciclos (ordenação topológica)
+        visitados, pilha = set(), set()
+
+        def visitar(nome):
+            if nome in pilha:
+                raise ValueError(f"Ciclo no grafo de etapas envolvendo '{nome}'.")
+            if nome in visitados:
+                return
+            pilha.add(nome)
+            for dep in self.nos[nome].depende:
+                visitar(dep)
+            pilha.discard(nome)
+            visitados.add(nome)
+
+        for nome in self.nos:
+            visitar(nome)
+
+    def _dependentes(self, nome):
+        """Todos os nós que dependem (direta ou indiretamente) de `nome`."""
+        saida = set()
+        fila = [nome]
+        while fila:
+            atual = fila.pop()
+            for n in self.nos.values():
+                if atual in n.depende and n.nome not in saida:
+                    saida.add(n.nome)
+                    fila.append(n.nome)
+        return saida
+
+    def _executar_no(self, no):
+        inicio = time.time()
+        db.update_estado_no(self.chave_id, no.nome, EXECUTANDO, inicio=inicio)
+        with rastreio.trecho(f"etapa.{no.nome}", rastro=self.chave_id, pool=no.pool) as trecho:
+            try:
+                ok = no.funcao()
+                erro = None if ok else "etapa retornou falha"
+            except Exception as e:
+                ok, erro = False, str(e)
+            if trecho:
+                trecho.erro = erro
+        fim = time.time()
+        db.update_estado_no(self.chave_id, no.nome, CONCLUIDO if ok else FALHOU, inicio, fim, erro)
+        if self.ao_concluir_no:
+            self.ao_concluir_no(no.nome, no.pool, inicio, fim, ok)
+        return ok
+
+    def executar(self):
+        """
+        Executa o grafo. Retorna {no: estado}. Nós em `ja_concluidos` e, com
+        `retomar`, os concluídos em execuções anteriores não são refeitos.
+        """
+        salvos = db.load_estado_nos(self.chave_id) if self.retomar else {}
+        estados = {}
+        for nome in self.nos:
+            if nome in self.ja_concluidos or salvos.get(nome, {}).get("estado") == CONCLUIDO:
+                estados[nome] = CONCLUIDO
+
+        pendentes = [n for n in self.nos if n not in estados]
+        pools = self.pools_externos or criar_pools(self.max_io, self.max_cpu)
+        em_execucao = {}
+
+        try:
+            while pendentes or em_execucao:
+                prontos = [n for n in pendentes if all(estados.get(d) == CONCLUIDO for d in self.nos[n].depende)]
+                for nome in prontos:
+                    pendentes.remove(nome)
+                    no = self.nos[nome]
+                    self.notificar("info", f"{self.chave_id}: iniciando '{nome}' ({no.pool})")
+                    em_execucao[pools[no.pool].submit(self._executar_no, no)] = nome
+
+                if not em_execucao:
+                    break  # o que sobrou depende de nós que falharam
+
+                terminados, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    nome = em_execucao.pop(futuro)
+                    if futuro.result():
+                        estados[nome] = CONCLUIDO
+                        continue
+
+                    estados[nome] = FALHOU
+                    self.notificar("erro", f"{self.chave_id}: etapa '{nome}' falhou.")
+                    for dep in self._dependentes(nome):
+                        if dep in pendentes:
+                            pendentes.remove(dep)
+                            estados[dep] = BLOQUEADO
+                            db.update_estado_no(self.chave_id, dep, BLOQUEADO, erro=f"depende de '{nome}'")
+        finally:
+            if not self.pools_externos:
+                for pool in pools.values():
+                    pool.shutdown(wait=True)
+
+        return estados
+
+
+def caminho_critico(chave_id, nos):
+    """
+    Duração do caminho mais longo do grafo (com os tempos gravados) e a soma
+    de todas as etapas, para comparar com a execução sequencial.
+    """
+    salvos = db.load_estado_nos(chave_id)
+    duracao = {
+        nome: (s["fim"] - s["inicio"]) if s.get("fim") and s.get("inicio") else 0.0
+        for nome, s in salvos.items()
+    }
+    mapa = {n.nome: n for n in nos}
+    memo = {}
+
+    def mais_longo(nome):
+        if nome not in memo:
+            deps = mapa[nome].depende if nome in mapa else ()
+            memo[nome] = duracao.get(nome, 0.0) + max((mais_longo(d) for d in deps), default=0.0)
+        return memo[nome]
+
+    critico = max((mais_longo(n) for n in mapa), default=0.0)
+    return critico, sum(duracao.get(n, 0.0) for n in mapa)
@@ -0,0 +1,36 @@
+import importlib
+import threading
+
+# ---------------------------------------------------------------------
+# Aquecimento de imports em segundo plano
+# ---------------------------------------------------------------------
+# As páginas só importam as dependências pesadas na ação que as usa, para
+# pintar rápido. Depois que a primeira página já foi desenhada, esta thread
+# importa o resto uma vez por processo: quando o usuário troca de página ou
+# clica em "Gerar", o import já está em `sys.modules`.
+
+MODULOS = [
+    # módulos do projeto usados pelas páginas
+    "modules.database", "modules.liturgia", "modules.roteiro", "modules.conteudo",
+    "modules.imagens", "modules.audio", "modules.overlay", "modules.legendas", "modules.video",
+    # dependências pesadas adiadas (o modelo do Piper continua sob demanda)
+    "requests", "PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "groq",
+]
+
+_iniciado = threading.Event()
+
+
+def _importar_todos(modulos):
+    for nome in modulos:
+        try:
+            importlib.import_module(nome)
+        except Exception:
+            pass  # dependência opcional ausente: a página avisa quando precisar
+
+
+def aquecer(modulos=MODULOS):
+    """Dispara (uma única vez por processo) a importação em segundo plano."""
+    if _iniciado.is_set():
+        return
+    _iniciado.set()
+    threading.Thread(target=_importar_todos, args=(modulos,), name="aquecimento", daemon=True).start()
@@ -0,0 +1,134 @@
+import os
+import re
+import wave
+
+from modules import avisos
+from modules import rastreio
+from modules import legendas
+from modules import midia
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(RAIZ, "piper_models", "pt_BR-faber-medium.onnx")
+CONFIG_PATH = os.path.join(RAIZ, "piper_models", "pt_BR-faber-medium.onnx.json")
+VOZ_PADRAO = "Piper Faber Medium"
+
+
+def _carregar_piper():
+    """Importa o Piper só quando a síntese é pedida (None se indisponível)."""
+    try:
+        from piper.voice import PiperVoice
+        return PiperVoice
+    except ImportError:
+        return None
+
+
+def limpar_texto(texto):
+    """Remove caracteres que quebram o TTS."""
+    if not texto: return ""
+    # Remove markdown
+    t = texto.replace("**", "").replace("*", "").replace("###", "").replace("##", "").replace("#", "")
+    t = re.sub(r'\s+', ' ', t).strip() # Remove espaços extras
+    return t
+
+
+def gerar_audio_sistema(texto, caminho_onnx, caminho_saida):
+    """Tenta gerar via comando de terminal (Fallback se a lib falhar)."""
+    try:
+        # Comando: echo 'texto' | piper -m modelo.onnx -f saida.wav
+        cmd = [
+            "piper",
+            "--model", caminho_onnx,
+            "--output_file", caminho_saida
+        ]
+        
+        # Executa processo (CPU e memória do Piper ficam no trecho)
+        with rastreio.trecho("piper.cli"):
+            entrada = texto.encode('utf-8')
+            process = rastreio.executar(cmd, entrada=entrada)
+            rastreio.contar(entrada=len(entrada), saida=rastreio.tamanho(caminho_saida))
+        
+        if process.returncode == 0 and os.path.exists(caminho_saida) and os.path.getsize(caminho_saida) > 100:
+            return True, "Sucesso via CLI"
+        else:
+            return False, f"Erro CLI: {process.stderr.decode()}"
+    except Exception as e:
+        return False, str(e)
+
+
+def sintetizar_pcm(voice, frase):
+    """PCM 16-bit de uma frase (compatível com piper-tts 1.2 e 1.3+)."""
+    if hasattr(voice, "synthesize_stream_raw"):
+        return b"".join(voice.synthesize_stream_raw(frase))
+    return b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(frase))
+
+
+def duracao_wav(caminho):
+    try:
+        return midia.duracao(caminho)
+    except midia.ErroMidia:
+        return 0.0
+
+
+@rastreio.medido("audio.piper")
+def gerar_audio_piper_hibrido(texto, caminho_saida, notificar=avisos.console):
+    """
+    Tenta via Python Lib (frase a frase, com tempos exatos para as legendas);
+    se falhar (0 bytes), tenta via Sistema e estima os tempos.
+    Retorna (sucesso, segmentos) onde segmentos = [{texto, inicio, fim}, ...].
+    """
+    model_path = MODEL_PATH
+    config_path = CONFIG_PATH
+
+    if not os.path.exists(model_path):
+        notificar("erro", f"Arquivo de modelo não encontrado: {model_path}")
+        return False, []
+
+    frases = legendas.dividir_frases(texto)
+
+    # 1. TENTATIVA VIA BIBLIOTECA PYTHON (Preferencial)
+    rastreio.anotar(caracteres=len(texto), frases=len(frases))
+    with rastreio.trecho("piper.carregar"):
+        PiperVoice = _carregar_piper()
+        voice = None
+        if PiperVoice:
+            try:
+                voice = PiperVoice.load(model_path, config_path=config_path)
+                rastreio.contar(entrada=rastreio.tamanho(model_path, config_path))
+            except Exception as e:
+                print(f"Erro Python Lib: {e}")
+    if voice:
+        try:
+            taxa = voice.config.sample_rate
+            silencio = b"\x00\x00" * int(taxa * legendas.PAUSA_ENTRE_FRASES)
+            segmentos = []
+            t = 0.0
+
+            with rastreio.trecho("piper.sintetizar"), wave.open(caminho_saida, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(taxa)
+                for frase in frases:
+                    pcm = sintetizar_pcm(voice, frase)
+                    dur = len(pcm) / 2 / taxa
+                    segmentos.append({"texto": frase, "inicio": round(t, 3), "fim": round(t + dur, 3)})
+                    wav.writeframes(pcm + silencio)
+                    rastreio.contar(saida=len(pcm) + len(silencio))
+                    t += dur + legendas.PAUSA_ENTRE_FRASES
+                rastreio.anotar(duracao_s=round(t, 2))
+            
+            # Verifica sucesso
+            if os.path.exists(caminho_saida) and os.path.getsize(caminho_saida) > 1000:
+                return True, segmentos
+            else:
+                print("Python Lib gerou arquivo vazio. Tentando fallback...")
+        except Exception as e:
+            print(f"Erro Python Lib: {e}")
+
+    # 2. TENTATIVA VIA FALLBACK (CLI DO SISTEMA)
+    # Útil se houver problema de dependência C++ na biblioteca Python
+    sucesso_cli, msg = gerar_audio_sistema(texto, model_path, caminho_saida)
+    if sucesso_cli:
+        return True, legendas.estimar_segmentos(frases, duracao_wav(caminho_saida))
+    
+    notificar("erro", f"Falha na geração de áudio. O arquivo final ficou vazio.\nDiagnóstico: {msg}")
+    return False, []
@@ -0,0 +1,14 @@
+# ---------------------------------------------------------------------
+# Canal de mensagens dos módulos de produção
+# ---------------------------------------------------------------------
+# As funções de produção não dependem do Streamlit: recebem um "notificar"
+# (nivel, mensagem). As páginas passam `streamlit`, a linha de comando usa
+# o padrão `console`.
+
+def console(nivel, msg):
+    print(f"[{nivel.upper()}] {msg}")
+
+
+def streamlit(nivel, msg):
+    import streamlit as st
+    {"info": st.info, "aviso": st.warning, "erro": st.error, "sucesso": st.success}.get(nivel, st.write)(msg)
@@ -0,0 +1,52 @@
+import re
+import zlib
+from collections import Counter
+
+# ---------------------------------------------------------------------
+# Compressão dos textos da liturgia com dicionário compartilhado
+# ---------------------------------------------------------------------
+# Cada leitura isolada é curta demais para o zlib achar repetições dentro
+# dela mesma; o que se repete é o vocabulário entre leituras ("Naquele
+# tempo, disse Jesus aos seus discípulos", "Palavra do Senhor", ...). Um
+# dicionário pré-carregado (`zdict`) com esses trechos faz cada texto
+# comprimir como se viesse depois deles.
+
+TAMANHO_DICIONARIO = 32 * 1024  # janela máxima do zlib
+NIVEL = 9
+
+
+def treinar_dicionario(amostras, tamanho=TAMANHO_DICIONARIO, n=4):
+    """
+    Monta um dicionário a partir dos trechos de `n` palavras mais frequentes
+    nas amostras. O zlib alcança melhor o fim do dicionário, então os trechos
+    mais valiosos (frequência x tamanho) ficam por último.
+    """
+    contagem = Counter()
+    for texto in amostras:
+        palavras = re.findall(r"\S+\s*", texto)
+        # conta cada trecho uma vez por texto: queremos o que se repete *entre* leituras
+        contagem.update({"".join(palavras[i:i + n]) for i in range(len(palavras) - n + 1)})
+
+    escolhidos, total = [], 0
+    for trecho, freq in sorted(contagem.items(), key=lambda kv: kv[1] * len(kv[0]), reverse=True):
+        if freq < 2:
+            break
+        dados = trecho.encode("utf-8")
+        if total + len(dados) > tamanho:
+            break
+        escolhidos.append(dados)
+        total += len(dados)
+    return b"".join(reversed(escolhidos))
+
+
+def comprimir(texto, dicionario=None):
+    if dicionario:
+        obj = zlib.compressobj(NIVEL, zdict=dicionario)
+    else:
+        obj = zlib.compressobj(NIVEL)
+    return obj.compress(texto.encode("utf-8")) + obj.flush()
+
+
+def descomprimir(dados, dicionario=None):
+    obj = zlib.decompressobj(zdict=dicionario) if dicionario else zlib.decompressobj()
+    return (obj.decompress(dados) + obj.flush()).decode("utf-8")
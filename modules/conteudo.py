@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import unicodedata
+
+from modules import database as db
+
+# ---------------------------------------------------------------------
+# Reaproveitamento de conteúdo entre produções
+# ---------------------------------------------------------------------
+# O calendário litúrgico repete as mesmas passagens em anos e festas
+# diferentes, mas a produção é indexada por "{data}-{tipo}". Aqui o índice é
+# pela passagem em si: referência normalizada + hash do texto. Cada ativo
+# guarda os campos do `progresso` que o reproduzem em outra produção, mais
+# o necessário para conferir que ainda valem: o mtime de cada arquivo no
+# registro e, nas imagens, o hash dos prompts que as geraram. Ao aplicar,
+# os arquivos são copiados: regerar a produção de origem no lugar não muda
+# as que reaproveitaram.
+
+# Campos do progresso copiados para cada ativo
+CAMPOS_ATIVO = {
+    "roteiro": ['bloco_leitura', 'bloco_reflexao', 'bloco_aplicacao', 'bloco_oracao',
+                'prompts_imagem', 'texto_roteiro_completo'],
+    "imagens": ['imagens_paths', 'imagens_provedor'],
+    "audio": ['audio_path', 'audio_aac', 'audio_master', 'audio_ducking', 'voz_usada', 'legendas_segmentos',
+              'texto_roteiro_completo'],
+}
+
+# Campos que apontam para arquivos (copiados ao aplicar)
+CAMPOS_ARQUIVO = ['audio_path', 'audio_aac', 'audio_ducking']
+
+# Código de etapa (producao_status.etapa_atual) de cada ativo
+ETAPA_POR_ATIVO = {"roteiro": 1, "imagens": 2, "audio": 3}
+
+
+def _normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode()
+    return re.sub(r"\W+", " ", sem_acento.lower()).strip()
+
+
+def chave_conteudo(leitura):
+    """Referência normalizada + hash do texto normalizado (pontuação e acentos não contam)."""
+    ref = _normalizar(leitura.get('ref', '')).replace(" ", "")
+    resumo = hashlib.sha1(_normalizar(leitura.get('texto', '')).encode()).hexdigest()[:16]
+    return f"{ref}|{resumo}"
+
+
+def _resumo_prompts(prompts):
+    return hashlib.sha1(json.dumps(prompts or {}, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _caminhos(dados):
+    caminhos = list(dados.get('imagens_paths') or [])
+    return caminhos + [dados[campo] for campo in CAMPOS_ARQUIVO if dados.get(campo)]
+
+
+def _arquivos_intactos(item):
+    """Todos os arquivos presentes e sem alteração desde o registro."""
+    mtimes = item.get("mtimes")
+    caminhos = _caminhos(item["dados"])
+    if caminhos and mtimes is None:
+        return False  # registro antigo, sem como conferir
+    return all(c and os.path.exists(c) and os.path.getmtime(c) == mtimes.get(c) for c in caminhos)
+
+
+def registrar(leitura, chave_id, progresso, ativo):
+    """Registra o ativo recém-produzido (chamado logo após salvar a etapa)."""
+    dados = {campo: progresso.get(campo) for campo in CAMPOS_ATIVO[ativo]}
+    verificacao = {"mtimes": {c: os.path.getmtime(c) for c in _caminhos(dados) if c and os.path.exists(c)}}
+    if ativo == "imagens":
+        verificacao["hash_prompts"] = _resumo_prompts(progresso.get('prompts_imagem'))
+    db.registrar_conteudo(chave_conteudo(leitura), ativo, chave_id, {**dados, "_verificacao": verificacao})
+
+
+def procurar(leitura, chave_id):
+    """
+    Ativos já produzidos para esta mesma passagem em *outra* produção.
+    Retorna {ativo: {"chave_id", "dados", ...}} só com o que ainda é
+    utilizável: arquivos presentes e sem alteração desde o registro, imagens
+    geradas pelos prompts do roteiro achado e áudio narrando exatamente esse
+    roteiro.
+    """
+    achados = {}
+    for ativo, item in db.buscar_conteudo(chave_conteudo(leitura)).items():
+        verificacao = item["dados"].pop("_verificacao", {})
+        item = {**item, **verificacao}
+        if item["chave_id"] != chave_id and _arquivos_intactos(item):
+            achados[ativo] = item
+    roteiro = achados.get("roteiro")
+    audio = achados.get("audio")
+    if audio and (not roteiro or audio["dados"].get('texto_roteiro_completo') != roteiro["dados"].get('texto_roteiro_completo')):
+        del achados["audio"]
+    imagens = achados.get("imagens")
+    if imagens and roteiro and imagens.get("hash_prompts") != _resumo_prompts(roteiro["dados"].get('prompts_imagem')):
+        del achados["imagens"]
+    if "roteiro" not in achados:
+        achados.pop("imagens", None)  # imagens sem o roteiro que as originou não fazem sentido
+    return achados
+
+
+def _copia(caminho, chave_id):
+    """Cópia do arquivo ao lado do original, com o nome da produção que reaproveita."""
+    pasta, nome = os.path.split(caminho)
+    base, extensao = os.path.splitext(nome)
+    base = base.split("__reuso_")[0]  # cópia de uma cópia: parte do nome original
+    destino = os.path.join(pasta, f"{base}__reuso_{_normalizar(chave_id).replace(' ', '-')}{extensao}")
+    shutil.copy2(caminho, destino)
+    return destino
+
+
+def _copiar_arquivos(dados, chave_id):
+    copia = dict(dados)
+    if dados.get('imagens_paths'):
+        copia['imagens_paths'] = [_copia(c, chave_id) for c in dados['imagens_paths']]
+    for campo in CAMPOS_ARQUIVO:
+        if dados.get(campo):
+            copia[campo] = _copia(dados[campo], chave_id)
+    return copia
+
+
+def aplicar(progresso, achados, chave_id):
+    """
+    Copia os ativos achados (e os arquivos deles, com nomes desta produção
+    `chave_id`) para o progresso e marca as etapas. Um ativo cujos arquivos
+    não puderam ser copiados fica de fora. Retorna os ativos aplicados.
+    """
+    aplicados = []
+    for ativo, item in achados.items():
+        try:
+            dados = _copiar_arquivos(item["dados"], chave_id)
+        except OSError as e:
+            print(f"Erro ao copiar os arquivos de {ativo} de {item['chave_id']}: {e}")
+            continue
+        progresso.update(dados)
+        progresso[ativo] = True
+        progresso[f'{ativo}_reaproveitado_de'] = item["chave_id"]
+        aplicados.append(ativo)
+    if "audio" in aplicados:
+        progresso['legendas'] = False  # legendas são refeitas a partir dos segmentos
+    return aplicados
+
+
+def etapa_apos(aplicados):
+    return max(ETAPA_POR_ATIVO[a] for a in aplicados)
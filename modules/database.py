@@ -1,63 +1,251 @@
+import re
 import sqlite3
 import json
+import hashlib
 import os
+import time
+
+from modules import compressao
 
 # Nome do arquivo do banco de dados
 DB_FILE = "liturgia.db"
 
+# Bancos cujas tabelas já foram criadas neste processo
+_bancos_prontos = set()
+
 def get_connection():
     """Conecta ao banco e garante que as tabelas existam."""
     conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-    # Sempre que conectar, garantimos que a tabela existe
-    create_tables(conn)
+    # Na primeira conexão do processo, garantimos que as tabelas existem
+    if DB_FILE not in _bancos_prontos:
+        create_tables(conn)
+        _bancos_prontos.add(DB_FILE)
     return conn
 
 def create_tables(conn):
-    """Cria a tabela 'historico' se ela não existir."""
+    """Cria as tabelas da liturgia se elas não existirem."""
     c = conn.cursor()
+    # Formato antigo (JSON inteiro por dia): só lido para migrar
     c.execute('''
         CREATE TABLE IF NOT EXISTS historico (
             data_liturgia TEXT PRIMARY KEY,
             json_completo TEXT
         )
     ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS liturgia_dias (
+            data_liturgia TEXT PRIMARY KEY,
+            nome_dia TEXT,
+            cor TEXT
+        )
+    ''')
+    # Um registro por leitura; o texto fica comprimido e só é lido quando pedido
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS liturgia_leituras (
+            data_liturgia TEXT,
+            ordem INTEGER,
+            tipo TEXT,
+            titulo TEXT,
+            ref TEXT,
+            dicionario_id INTEGER,
+            texto_z BLOB,
+            PRIMARY KEY (data_liturgia, ordem)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_leituras_tipo ON liturgia_leituras (data_liturgia, tipo)')
+    create_busca_tables(conn)
+    create_metricas_tables(conn)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS dicionarios_compressao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dados BLOB,
+            criado_em REAL
+        )
+    ''')
     conn.commit()
 
+# ---------------------------------------------------------------------
+# Cache da liturgia: cabeçalho do dia + leituras comprimidas
+# ---------------------------------------------------------------------
+
+# Leituras acumuladas antes de treinar o primeiro dicionário (~2 semanas)
+MIN_AMOSTRAS_DICIONARIO = 50
+
+# Os dicionários nunca mudam depois de gravados: cache por (banco, id), já
+# que os ids recomeçam em cada banco. Ids ausentes não entram no cache.
+_dicionarios = {}
+
+def _dicionario(c, dic_id):
+    if not dic_id:
+        return None
+    chave = (DB_FILE, dic_id)
+    if chave not in _dicionarios:
+        c.execute('SELECT dados FROM dicionarios_compressao WHERE id = ?', (dic_id,))
+        row = c.fetchone()
+        if not row:
+            return None
+        _dicionarios[chave] = row[0]
+    return _dicionarios[chave]
+
+def _dicionario_atual(c):
+    c.execute('SELECT MAX(id) FROM dicionarios_compressao')
+    dic_id = c.fetchone()[0]
+    return dic_id, _dicionario(c, dic_id)
+
+def _gravar_dia(c, data_str, json_data):
+    dic_id, dicionario = _dicionario_atual(c)
+    c.execute('''
+        INSERT OR REPLACE INTO liturgia_dias (data_liturgia, nome_dia, cor) VALUES (?, ?, ?)
+    ''', (data_str, json_data.get('nome_dia', ''), json_data.get('cor', '')))
+    c.execute('DELETE FROM liturgia_leituras WHERE data_liturgia = ?', (data_str,))
+    c.executemany('''
+        INSERT INTO liturgia_leituras (data_liturgia, ordem, tipo, titulo, ref, dicionario_id, texto_z)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (data_str, i, l['tipo'], l.get('titulo', ''), l.get('ref', ''), dic_id,
+         compressao.comprimir(l.get('texto', ''), dicionario))
+        for i, l in enumerate(json_data.get('leituras', []))
+    ])
+    _indexar_leituras(c, data_str, json_data.get('leituras', []))
+
+def _texto(c, dic_id, texto_z):
+    return compressao.descomprimir(texto_z, _dicionario(c, dic_id))
+
+def treinar_dicionario(conn=None):
+    """
+    Treina um dicionário novo com os textos já guardados e recomprime todas
+    as leituras com ele. Retorna o id do dicionário (ou None sem amostras).
+    """
+    propria = conn is None
+    conn = conn or get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('SELECT data_liturgia, ordem, dicionario_id, texto_z FROM liturgia_leituras')
+        linhas = [(d, o, _texto(c, dic, z)) for d, o, dic, z in c.fetchall()]
+        dados = compressao.treinar_dicionario([t for _, _, t in linhas])
+        if not dados:
+            return None
+        c.execute('INSERT INTO dicionarios_compressao (dados, criado_em) VALUES (?, ?)', (dados, time.time()))
+        dic_id = c.lastrowid
+        _dicionarios[(DB_FILE, dic_id)] = dados
+        c.executemany('UPDATE liturgia_leituras SET dicionario_id = ?, texto_z = ? WHERE data_liturgia = ? AND ordem = ?',
+                      [(dic_id, compressao.comprimir(t, dados), d, o) for d, o, t in linhas])
+        conn.commit()
+        return dic_id
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao treinar dicionário: {e}")
+        return None
+    finally:
+        if propria:
+            conn.close()
+
+def _talvez_treinar(conn):
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*) FROM dicionarios_compressao')
+    if c.fetchone()[0]:
+        return
+    c.execute('SELECT COUNT(*) FROM liturgia_leituras')
+    if c.fetchone()[0] >= MIN_AMOSTRAS_DICIONARIO:
+        treinar_dicionario(conn)
+
+def _migrar_dia(conn, data_str):
+    """Move um dia do formato antigo (`historico`) para as tabelas novas."""
+    c = conn.cursor()
+    c.execute('SELECT json_completo FROM historico WHERE data_liturgia = ?', (data_str,))
+    row = c.fetchone()
+    if not row:
+        return False
+    _gravar_dia(c, data_str, json.loads(row[0]))
+    c.execute('DELETE FROM historico WHERE data_liturgia = ?', (data_str,))
+    conn.commit()
+    return True
+
+def migrar_historico():
+    """Converte todos os dias ainda no formato antigo. Retorna quantos foram migrados."""
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('SELECT data_liturgia FROM historico')
+        datas = [row[0] for row in c.fetchall()]
+        for data_str in datas:
+            _migrar_dia(conn, data_str)
+        _talvez_treinar(conn)
+        return len(datas)
+    except Exception as e:
+        print(f"Erro ao migrar histórico: {e}")
+        return 0
+    finally:
+        conn.close()
+
 def salvar_liturgia(data_str, json_data):
-    """Salva o JSON da liturgia no banco."""
+    """Salva a liturgia do dia (cabeçalho e leituras comprimidas) no banco."""
     conn = get_connection()
     c = conn.cursor()
     try:
-        # Converte o dicionário Python para string JSON
-        json_text = json.dumps(json_data, ensure_ascii=False)
-        c.execute('''
-            INSERT OR REPLACE INTO historico (data_liturgia, json_completo)
-            VALUES (?, ?)
-        ''', (data_str, json_text))
+        _gravar_dia(c, data_str, json_data)
         conn.commit()
+        _talvez_treinar(conn)
     except Exception as e:
         print(f"Erro ao salvar no BD: {e}")
     finally:
         conn.close()
 
-def carregar_liturgia(data_str):
-    """Carrega o JSON da liturgia do banco, se existir."""
+def carregar_liturgia(data_str, textos=True):
+    """
+    Carrega a liturgia do banco, se existir. Com `textos=False` só o
+    cabeçalho e a lista de leituras (sem 'texto') são lidos; o texto de cada
+    uma vem depois, sob demanda, por `carregar_texto_leitura`.
+    """
     conn = get_connection()
     c = conn.cursor()
     try:
-        c.execute('SELECT json_completo FROM historico WHERE data_liturgia = ?', (data_str,))
-        row = c.fetchone()
-        
-        if row:
-            # Converte a string JSON de volta para dicionário Python
-            return json.loads(row[0])
-        return None
+        # Uma consulta só: cabeçalho repetido em cada linha de leitura
+        colunas = 'd.nome_dia, d.cor, l.tipo, l.titulo, l.ref' + (', l.dicionario_id, l.texto_z' if textos else '')
+        consulta = f'''
+            SELECT {colunas} FROM liturgia_dias d
+            LEFT JOIN liturgia_leituras l ON l.data_liturgia = d.data_liturgia
+            WHERE d.data_liturgia = ? ORDER BY l.ordem
+        '''
+        c.execute(consulta, (data_str,))
+        linhas = c.fetchall()
+        if not linhas:
+            if not _migrar_dia(conn, data_str):
+                return None
+            c.execute(consulta, (data_str,))
+            linhas = c.fetchall()
+
+        leituras = []
+        for r in linhas:
+            if r[2] is None:
+                continue  # dia sem leituras
+            leitura = {'tipo': r[2], 'titulo': r[3], 'ref': r[4]}
+            if textos:
+                leitura['texto'] = _texto(c, r[5], r[6])
+            leituras.append(leitura)
+        return {'data': data_str, 'nome_dia': linhas[0][0], 'cor': linhas[0][1], 'leituras': leituras}
     except Exception as e:
         print(f"Erro ao ler do BD: {e}")
         return None
     finally:
         conn.close()
-        # --- Adicionar ao final de modules/database.py ---
+
+def carregar_texto_leitura(data_str, tipo):
+    """Texto de uma única leitura do dia (descomprimido), ou '' se não existir."""
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('''
+            SELECT dicionario_id, texto_z FROM liturgia_leituras
+            WHERE data_liturgia = ? AND tipo = ? ORDER BY ordem LIMIT 1
+        ''', (data_str, tipo))
+        row = c.fetchone()
+        return _texto(c, *row) if row else ""
+    except Exception as e:
+        print(f"Erro ao ler leitura do BD: {e}")
+        return ""
+    finally:
+        conn.close()
 
 def create_status_table(conn):
     """Cria tabela para controlar o status de produção de cada vídeo."""
@@ -93,6 +281,23 @@ def load_status(chave_id):
     finally:
         conn.close()
 
+def load_status_etapa(chave_id):
+    """Como load_status, mas também com a etapa atual: (dict_progresso, etapa_atual, existe)."""
+    conn = get_connection()
+    create_status_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('SELECT progresso_json, etapa_atual FROM producao_status WHERE chave_id = ?', (chave_id,))
+        row = c.fetchone()
+        if row:
+            return json.loads(row[0]), row[1] or 0, True
+        return {}, 0, False
+    except Exception as e:
+        print(f"Erro load_status_etapa: {e}")
+        return {}, 0, False
+    finally:
+        conn.close()
+
 def update_status(chave_id, data_ref, tipo, progresso_dict, etapa_code):
     """Salva ou atualiza o progresso."""
     conn = get_connection()
@@ -100,12 +305,1213 @@ def update_status(chave_id, data_ref, tipo, progresso_dict, etapa_code):
     c = conn.cursor()
     try:
         progresso_json = json.dumps(progresso_dict, ensure_ascii=False)
+        antes = c.execute('SELECT data_ref, tipo_leitura, etapa_atual FROM producao_status WHERE chave_id = ?',
+                          (chave_id,)).fetchone()
         c.execute('''
             INSERT OR REPLACE INTO producao_status (chave_id, data_ref, tipo_leitura, progresso_json, etapa_atual)
             VALUES (?, ?, ?, ?, ?)
         ''', (chave_id, data_ref, tipo, progresso_json, etapa_code))
+        _indexar_roteiro(c, chave_id, data_ref, tipo, progresso_dict)
+        if antes != (data_ref, tipo, etapa_code):
+            # O dashboard mostra a etapa (e a publicação) de cada produção, não o progresso:
+            # salvar só o progresso não invalida o cache dele
+            _nova_versao_metricas(c)
         conn.commit()
     except Exception as e:
         print(f"Erro update_status: {e}")
     finally:
         conn.close()
+
+# ---------------------------------------------------------------------
+# Busca textual (FTS5) em leituras e roteiros
+# ---------------------------------------------------------------------
+# `busca_docs` guarda a identidade de cada documento (e uma assinatura do
+# conteúdo, para só reindexar o que mudou); o rowid dele é o rowid na tabela
+# FTS. O tokenizador remove acentos: "oracao" acha "oração".
+
+BLOCOS_ROTEIRO = ['bloco_leitura', 'bloco_reflexao', 'bloco_aplicacao', 'bloco_oracao']
+
+def create_busca_tables(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS busca_docs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origem TEXT,
+            chave TEXT,
+            data_ref TEXT,
+            tipo TEXT,
+            assinatura TEXT,
+            UNIQUE (origem, chave)
+        )
+    ''')
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(
+            ref, titulo, texto,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.commit()
+
+def _indexar_doc(c, origem, chave, data_ref, tipo, ref, titulo, texto):
+    assinatura = hashlib.sha1(f"{ref}\0{titulo}\0{texto}".encode("utf-8")).hexdigest()
+    c.execute('SELECT id, assinatura FROM busca_docs WHERE origem = ? AND chave = ?', (origem, chave))
+    row = c.fetchone()
+    if row and row[1] == assinatura:
+        return
+    if row:
+        doc_id = row[0]
+        c.execute('UPDATE busca_docs SET data_ref = ?, tipo = ?, assinatura = ? WHERE id = ?',
+                  (data_ref, tipo, assinatura, doc_id))
+        c.execute('DELETE FROM busca_fts WHERE rowid = ?', (doc_id,))
+    else:
+        c.execute('INSERT INTO busca_docs (origem, chave, data_ref, tipo, assinatura) VALUES (?, ?, ?, ?, ?)',
+                  (origem, chave, data_ref, tipo, assinatura))
+        doc_id = c.lastrowid
+    c.execute('INSERT INTO busca_fts (rowid, ref, titulo, texto) VALUES (?, ?, ?, ?)', (doc_id, ref, titulo, texto))
+
+def _remover_docs(c, ids):
+    for doc_id in ids:
+        c.execute('DELETE FROM busca_fts WHERE rowid = ?', (doc_id,))
+        c.execute('DELETE FROM busca_docs WHERE id = ?', (doc_id,))
+
+def _indexar_leituras(c, data_str, leituras):
+    chaves = []
+    for i, l in enumerate(leituras):
+        chave = f"{data_str}#{i}"
+        chaves.append(chave)
+        _indexar_doc(c, 'leitura', chave, data_str, l['tipo'], l.get('ref', ''), l.get('titulo', ''), l.get('texto', ''))
+    # leituras que sumiram do dia (a API pode mudar a lista)
+    c.execute("SELECT id, chave FROM busca_docs WHERE origem = 'leitura' AND data_ref = ?", (data_str,))
+    _remover_docs(c, [doc_id for doc_id, chave in c.fetchall() if chave not in chaves])
+
+def _indexar_roteiro(c, chave_id, data_ref, tipo, progresso):
+    texto = "\n\n".join(progresso.get(b, '') for b in BLOCOS_ROTEIRO if progresso.get(b))
+    if not texto:
+        return
+    c.execute('SELECT ref FROM liturgia_leituras WHERE data_liturgia = ? AND tipo = ? LIMIT 1', (data_ref, tipo))
+    row = c.fetchone()
+    _indexar_doc(c, 'roteiro', chave_id, data_ref, tipo, row[0] if row else '', tipo, texto)
+
+def reindexar_busca():
+    """
+    Indexa tudo o que já está no banco (leituras e roteiros). Documentos sem
+    mudança são pulados, então pode ser chamado a qualquer momento.
+    """
+    conn = get_connection()
+    create_status_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            SELECT data_liturgia, ordem, tipo, titulo, ref, dicionario_id, texto_z
+            FROM liturgia_leituras ORDER BY data_liturgia, ordem
+        ''')
+        por_dia = {}
+        for data_str, _, tipo, titulo, ref, dic_id, texto_z in c.fetchall():
+            por_dia.setdefault(data_str, []).append(
+                {'tipo': tipo, 'titulo': titulo, 'ref': ref, 'texto': _texto(c, dic_id, texto_z)})
+        for data_str, leituras in por_dia.items():
+            _indexar_leituras(c, data_str, leituras)
+
+        c.execute('SELECT chave_id, data_ref, tipo_leitura, progresso_json FROM producao_status')
+        for chave_id, data_ref, tipo, progresso_json in c.fetchall():
+            _indexar_roteiro(c, chave_id, data_ref, tipo, json.loads(progresso_json or '{}'))
+        conn.commit()
+        c.execute('SELECT COUNT(*) FROM busca_docs')
+        return c.fetchone()[0]
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao reindexar a busca: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def _consulta_fts(texto):
+    """Termos do usuário como frase FTS segura (todos obrigatórios, último como prefixo)."""
+    termos = re.findall(r"\w+", texto)
+    if not termos:
+        return ""
+    partes = ['"' + t + '"' for t in termos]
+    partes[-1] += "*"
+    return " ".join(partes)
+
+def buscar(texto, origem=None, limite=30):
+    """
+    Busca leituras e roteiros. Retorna uma lista de dicionários (origem, chave,
+    data_ref, tipo, ref, trecho, etapa_atual), do mais relevante para o menos.
+    `etapa_atual` vem da produção da mesma data/leitura, se ela existir.
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+    conn = get_connection()
+    create_status_table(conn)
+    c = conn.cursor()
+    try:
+        # Pesos do bm25: referência > título > texto
+        c.execute(f'''
+            SELECT d.origem, d.chave, d.data_ref, d.tipo, busca_fts.ref,
+                   snippet(busca_fts, 2, '**', '**', '…', 16), p.etapa_atual
+            FROM busca_fts
+            JOIN busca_docs d ON d.id = busca_fts.rowid
+            LEFT JOIN producao_status p ON p.chave_id = d.data_ref || '-' || d.tipo
+            WHERE busca_fts MATCH ? {"AND d.origem = ?" if origem else ""}
+            ORDER BY bm25(busca_fts, 10.0, 3.0, 1.0)
+            LIMIT ?
+        ''', (consulta, origem, limite) if origem else (consulta, limite))
+        colunas = ['origem', 'chave', 'data_ref', 'tipo', 'ref', 'trecho', 'etapa_atual']
+        return [dict(zip(colunas, row)) for row in c.fetchall()]
+    except Exception as e:
+        print(f"Erro na busca: {e}")
+        return []
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Índice de conteúdo (reaproveitamento entre produções)
+# ---------------------------------------------------------------------
+
+def create_conteudo_table(conn):
+    """Ativos já produzidos (roteiro, imagens, áudio) por passagem + hash do texto."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS conteudo_indice (
+            chave_conteudo TEXT,
+            ativo TEXT,
+            chave_id TEXT,
+            dados_json TEXT,
+            criado_em REAL,
+            PRIMARY KEY (chave_conteudo, ativo)
+        )
+    ''')
+    conn.commit()
+
+def registrar_conteudo(chave_conteudo, ativo, chave_id, dados):
+    """Grava (ou substitui) o ativo mais recente produzido para este conteúdo."""
+    conn = get_connection()
+    create_conteudo_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            INSERT OR REPLACE INTO conteudo_indice (chave_conteudo, ativo, chave_id, dados_json, criado_em)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (chave_conteudo, ativo, chave_id, json.dumps(dados, ensure_ascii=False), time.time()))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro registrar_conteudo: {e}")
+    finally:
+        conn.close()
+
+def buscar_conteudo(chave_conteudo):
+    """Retorna {ativo: {"chave_id": ..., "dados": {...}}} para o conteúdo."""
+    conn = get_connection()
+    create_conteudo_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('SELECT ativo, chave_id, dados_json FROM conteudo_indice WHERE chave_conteudo = ?', (chave_conteudo,))
+        return {ativo: {"chave_id": chave_id, "dados": json.loads(dados)} for ativo, chave_id, dados in c.fetchall()}
+    except Exception as e:
+        print(f"Erro buscar_conteudo: {e}")
+        return {}
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Cache das cenas de imagem (descrições curtas geradas a partir do texto)
+# ---------------------------------------------------------------------
+
+def create_cenas_table(conn):
+    """Cenas visuais por bloco, indexadas pelo hash do texto da leitura."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cenas_imagem (
+            hash_texto TEXT PRIMARY KEY,
+            cenas_json TEXT,
+            criado_em REAL
+        )
+    ''')
+    conn.commit()
+
+def salvar_cenas(hash_texto, cenas):
+    conn = get_connection()
+    create_cenas_table(conn)
+    try:
+        conn.execute('INSERT OR REPLACE INTO cenas_imagem (hash_texto, cenas_json, criado_em) VALUES (?, ?, ?)',
+                     (hash_texto, json.dumps(cenas, ensure_ascii=False), time.time()))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro salvar_cenas: {e}")
+    finally:
+        conn.close()
+
+def carregar_cenas(hash_texto):
+    """Retorna o dict de cenas em cache para o texto, ou None."""
+    conn = get_connection()
+    create_cenas_table(conn)
+    try:
+        row = conn.execute('SELECT cenas_json FROM cenas_imagem WHERE hash_texto = ?', (hash_texto,)).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception as e:
+        print(f"Erro carregar_cenas: {e}")
+        return None
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Métricas dos vídeos (dashboard)
+# ---------------------------------------------------------------------
+# `videos_publicados` guarda os dados de publicação de cada produção
+# (mesma chave_id de producao_status) e `metricas_diarias` uma linha por
+# vídeo e dia. Toda escrita incrementa `metricas_versao`: quem guarda
+# DataFrames em cache compara a versão para saber se precisa reler.
+
+def create_metricas_tables(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS videos_publicados (
+            chave_id TEXT PRIMARY KEY,
+            titulo TEXT,
+            youtube_url TEXT,
+            privacidade TEXT,
+            publicado_em TEXT,
+            atualizado_em REAL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS metricas_diarias (
+            chave_id TEXT,
+            data TEXT,
+            views INTEGER,
+            watch_time_min REAL,
+            ctr REAL,
+            likes INTEGER,
+            comentarios INTEGER,
+            fonte TEXT,
+            atualizado_em REAL,
+            PRIMARY KEY (chave_id, data)
+        ) WITHOUT ROWID
+    ''')
+    # Índice de cobertura por data: as consultas de um período leem só ele, sem tocar a tabela
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_metricas_data
+        ON metricas_diarias (data, chave_id, views, watch_time_min, ctr, likes, comentarios)
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS importacoes_metricas (
+            hash_arquivo TEXT PRIMARY KEY,
+            nome TEXT,
+            linhas INTEGER,
+            gravadas INTEGER,
+            importado_em REAL
+        )
+    ''')
+    c.execute('CREATE TABLE IF NOT EXISTS metricas_versao (id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER)')
+    c.execute('INSERT OR IGNORE INTO metricas_versao (id, versao) VALUES (1, 0)')
+    create_rollup_tables(conn)
+    conn.commit()
+
+def _nova_versao_metricas(c):
+    c.execute('UPDATE metricas_versao SET versao = versao + 1 WHERE id = 1')
+
+def versao_metricas():
+    """Contador que muda a cada escrita em produções, vídeos ou métricas."""
+    conn = get_connection()
+    try:
+        row = conn.execute('SELECT versao FROM metricas_versao WHERE id = 1').fetchone()
+        return row[0] if row else 0
+    finally:
+        conn.close()
+
+def registrar_video(chave_id, titulo=None, youtube_url=None, privacidade=None, publicado_em=None):
+    """Cria ou atualiza os dados de publicação (campos None mantêm o valor atual)."""
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('''
+            INSERT INTO videos_publicados (chave_id, titulo, youtube_url, privacidade, publicado_em, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (chave_id) DO UPDATE SET
+                titulo = COALESCE(excluded.titulo, titulo),
+                youtube_url = COALESCE(excluded.youtube_url, youtube_url),
+                privacidade = COALESCE(excluded.privacidade, privacidade),
+                publicado_em = COALESCE(excluded.publicado_em, publicado_em),
+                atualizado_em = excluded.atualizado_em
+        ''', (chave_id, titulo, youtube_url, privacidade, publicado_em, time.time()))
+        _nova_versao_metricas(c)
+        conn.commit()
+    except Exception as e:
+        print(f"Erro registrar_video: {e}")
+    finally:
+        conn.close()
+
+CAMPOS_METRICAS = ['views', 'watch_time_min', 'ctr', 'likes', 'comentarios']
+
+# Condição de "algum campo informado mudou" entre a linha nova e a gravada
+_MUDOU = " OR ".join(f"({{novo}}.{campo} IS NOT NULL AND {{novo}}.{campo} IS NOT {{atual}}.{campo})"
+                     for campo in CAMPOS_METRICAS)
+
+# Cada gravação passa por uma tabela temporária (uma linha por vídeo e dia;
+# repetições no mesmo lote se somam como upserts seguidos)
+_SQL_CRIAR_LOTE = f'''
+    CREATE TEMP TABLE IF NOT EXISTS lote_metricas (
+        chave_id TEXT, data TEXT, {", ".join(CAMPOS_METRICAS)}, fonte TEXT, atualizado_em REAL,
+        PRIMARY KEY (chave_id, data)
+    )
+'''
+_SQL_LOTE_METRICAS = f'''
+    INSERT INTO temp.lote_metricas VALUES ({", ".join("?" * (len(CAMPOS_METRICAS) + 4))})
+    ON CONFLICT (chave_id, data) DO UPDATE SET
+        {", ".join(f"{campo} = COALESCE(excluded.{campo}, {campo})" for campo in CAMPOS_METRICAS)},
+        fonte = excluded.fonte
+'''
+
+# Upsert que só reescreve a linha se algum campo informado mudou: reimportar
+# os mesmos números não gera escrita (nem muda a versão das métricas).
+_SQL_GRAVAR_METRICAS = f'''
+    INSERT INTO metricas_diarias (chave_id, data, {", ".join(CAMPOS_METRICAS)}, fonte, atualizado_em)
+    SELECT chave_id, data, {", ".join(CAMPOS_METRICAS)}, fonte, atualizado_em FROM temp.lote_metricas WHERE 1
+    ON CONFLICT (chave_id, data) DO UPDATE SET
+        {", ".join(f"{campo} = COALESCE(excluded.{campo}, {campo})" for campo in CAMPOS_METRICAS)},
+        fonte = excluded.fonte,
+        atualizado_em = excluded.atualizado_em
+    WHERE {_MUDOU.format(novo="excluded", atual="metricas_diarias")}
+'''
+
+_LOTE_GRAVADO = "temp.lote_metricas l CROSS JOIN metricas_diarias m ON m.chave_id = l.chave_id AND m.data = l.data"
+
+def gravar_metricas(linhas, fonte="manual", conn=None):
+    """
+    Grava (ou atualiza) métricas diárias numa transação só. Cada linha é um
+    dict com chave_id, data (AAAA-MM-DD) e qualquer um de CAMPOS_METRICAS;
+    campos ausentes mantêm o valor já gravado. Retorna o número de linhas
+    novas ou alteradas. Com `conn`, grava na transação de quem chama (sem
+    commit), para importações em lote.
+
+    Os agregados (`metricas_rollup` e `metricas_video_mes`) são ajustados
+    para o lote inteiro de uma vez: subtrai as linhas que vão mudar, grava,
+    soma as linhas gravadas. Os gatilhos por linha ficam suspensos enquanto
+    isso.
+    """
+    agora = time.time()
+    registros = [
+        (l['chave_id'], l['data'], *[l.get(campo) for campo in CAMPOS_METRICAS], l.get('fonte', fonte), agora)
+        for l in linhas
+    ]
+    if not registros:
+        return 0
+    propria = conn is None
+    if propria:
+        conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute(_SQL_CRIAR_LOTE)
+        c.execute('DELETE FROM temp.lote_metricas')
+        c.executemany(_SQL_LOTE_METRICAS, registros)
+        c.execute('UPDATE rollup_controle SET adiado = 1 WHERE id = 1')
+        for sql in _sqls_agregados(_MUDOU.format(novo="l", atual="m"), "-", origem=_LOTE_GRAVADO):
+            c.execute(sql)
+        c.execute(_SQL_GRAVAR_METRICAS)
+        alteradas = c.rowcount
+        if alteradas:
+            for sql in _sqls_agregados("m.atualizado_em = ?", origem=_LOTE_GRAVADO):
+                c.execute(sql, (agora,))
+            _nova_versao_metricas(c)
+        c.execute('UPDATE rollup_controle SET adiado = 0 WHERE id = 1')
+        if propria:
+            conn.commit()
+        return alteradas
+    except Exception as e:
+        print(f"Erro gravar_metricas: {e}")
+        conn.rollback()
+        if not propria:
+            raise
+        return 0
+    finally:
+        if propria:
+            conn.close()
+
+def importacao_registrada(hash_arquivo):
+    """Resumo da importação anterior do mesmo arquivo (pelo hash), ou None."""
+    conn = get_connection()
+    try:
+        row = conn.execute('SELECT nome, linhas, gravadas, importado_em FROM importacoes_metricas WHERE hash_arquivo = ?',
+                           (hash_arquivo,)).fetchone()
+        return dict(zip(("nome", "linhas", "gravadas", "importado_em"), row)) if row else None
+    finally:
+        conn.close()
+
+def registrar_importacao(hash_arquivo, nome, linhas, gravadas):
+    conn = get_connection()
+    try:
+        conn.execute('INSERT OR REPLACE INTO importacoes_metricas VALUES (?, ?, ?, ?, ?)',
+                     (hash_arquivo, nome, linhas, gravadas, time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Agregados por dia/semana/mês (tendências do dashboard)
+# ---------------------------------------------------------------------
+# `metricas_rollup` soma as métricas por período e pelas dimensões da
+# produção (tipo de leitura, cor litúrgica, perfil de renderização). Os
+# gatilhos de `metricas_diarias` mantêm os totais na mesma transação de cada
+# escrita (somam a linha nova e subtraem a antiga), então uma importação não
+# precisa recalcular nada. As dimensões vêm de `videos_atributos`; quando os
+# atributos de um vídeo mudam, os totais dele passam de um grupo para outro.
+
+GRANULARIDADES = {
+    "dia": "{d}",
+    "semana": "date({d}, '-6 days', 'weekday 1')",  # segunda-feira da semana
+    "mes": "substr({d}, 1, 7) || '-01'",
+}
+
+_SQL_GRANULARIDADES = "(" + " UNION ALL ".join(f"SELECT '{g}' AS granularidade" for g in GRANULARIDADES) + ")"
+
+
+def _periodo_sql(data):
+    return "CASE g.granularidade " + " ".join(
+        f"WHEN '{g}' THEN {expr.format(d=data)}" for g, expr in GRANULARIDADES.items()) + " END"
+
+
+def _valores_rollup(r, sinal=""):
+    """Colunas somadas no rollup a partir da linha `r` de metricas_diarias."""
+    return [
+        f"{sinal}COALESCE({r}.views, 0)",
+        f"{sinal}COALESCE({r}.watch_time_min, 0)",
+        f"{sinal}COALESCE({r}.ctr * {r}.views, 0)",
+        f"{sinal}(CASE WHEN {r}.ctr IS NOT NULL THEN COALESCE({r}.views, 0) ELSE 0 END)",
+        f"{sinal}COALESCE({r}.likes, 0)",
+        f"{sinal}COALESCE({r}.comentarios, 0)",
+    ]
+
+_COLUNAS_ROLLUP = ['views', 'watch_time_min', 'ctr_views', 'views_ctr', 'likes', 'comentarios']
+
+_SQL_SOMAR_ROLLUP = f'''
+    INSERT INTO metricas_rollup (granularidade, periodo, tipo, cor, perfil_render, {", ".join(_COLUNAS_ROLLUP)})
+    SELECT g.granularidade, {{periodo}}, COALESCE(p.tipo_leitura, ''), COALESCE(a.cor, ''),
+           COALESCE(a.perfil_render, ''), {{valores}}
+    FROM {_SQL_GRANULARIDADES} g {{origem}}
+    LEFT JOIN videos_atributos a ON a.chave_id = {{r}}.chave_id
+    LEFT JOIN producao_status p ON p.chave_id = {{r}}.chave_id
+    WHERE {{filtro}}
+    {{agrupar}}
+    ON CONFLICT (granularidade, periodo, tipo, cor, perfil_render) DO UPDATE SET
+        {", ".join(f"{col} = {col} + excluded.{col}" for col in _COLUNAS_ROLLUP)}
+'''
+
+
+def _sql_rollup_linha(r, sinal=""):
+    """Soma (ou subtrai) uma linha NEW/OLD nos três períodos: corpo dos gatilhos."""
+    return _SQL_SOMAR_ROLLUP.format(periodo=_periodo_sql(f"{r}.data"), valores=", ".join(_valores_rollup(r, sinal)),
+                                    origem="", r=r, filtro="1", agrupar="")
+
+
+def _sql_rollup_agregado(filtro, sinal="", origem="metricas_diarias m"):
+    """Soma (ou subtrai) de uma vez as linhas `m` de metricas_diarias que passam no filtro."""
+    return _SQL_SOMAR_ROLLUP.format(
+        periodo=_periodo_sql("m.data"),
+        valores=", ".join(f"SUM({v})" for v in _valores_rollup("m", sinal)),
+        origem=f"CROSS JOIN {origem}", r="m", filtro=filtro, agrupar="GROUP BY 1, 2, 3, 4, 5",
+    )
+
+
+# `metricas_video_mes` soma as métricas de cada vídeo por mês ('AAAA-MM-01'):
+# o resumo por vídeo de um período lê os meses inteiros daqui e só os dias
+# do mês em que o período começa de `metricas_diarias`. Mantida pelos mesmos
+# gatilhos (e pelo mesmo ajuste em lote) que `metricas_rollup`.
+
+_SQL_SOMAR_VIDEO_MES = f'''
+    INSERT INTO metricas_video_mes (chave_id, mes, {", ".join(_COLUNAS_ROLLUP)})
+    SELECT {{r}}.chave_id, substr({{r}}.data, 1, 7) || '-01', {{valores}}
+    {{origem}}
+    WHERE {{filtro}}
+    {{agrupar}}
+    ON CONFLICT (chave_id, mes) DO UPDATE SET
+        {", ".join(f"{col} = {col} + excluded.{col}" for col in _COLUNAS_ROLLUP)}
+'''
+
+
+def _sql_video_mes_linha(r, sinal=""):
+    return _SQL_SOMAR_VIDEO_MES.format(r=r, valores=", ".join(_valores_rollup(r, sinal)), origem="", filtro="1",
+                                       agrupar="")
+
+
+def _sql_video_mes_agregado(filtro, sinal="", origem="metricas_diarias m"):
+    return _SQL_SOMAR_VIDEO_MES.format(
+        r="m", valores=", ".join(f"SUM({v})" for v in _valores_rollup("m", sinal)),
+        origem=f"FROM {origem}", filtro=filtro, agrupar="GROUP BY 1, 2",
+    )
+
+
+def _sqls_agregados(filtro, sinal="", origem="metricas_diarias m"):
+    """Os dois ajustes (por dimensão e por vídeo) para as linhas `m` que passam no filtro."""
+    return [_sql_rollup_agregado(filtro, sinal, origem), _sql_video_mes_agregado(filtro, sinal, origem)]
+
+
+def create_rollup_tables(conn):
+    create_status_table(conn)  # os gatilhos leem o tipo de leitura da produção
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS videos_atributos (
+            chave_id TEXT PRIMARY KEY,
+            cor TEXT,
+            perfil_render TEXT,
+            provedor_imagem TEXT,
+            duracao_narracao_s REAL,
+            palavras_roteiro INTEGER,
+            atualizado_em REAL
+        )
+    ''')
+    nova = not c.execute("SELECT 1 FROM sqlite_master WHERE name = 'metricas_rollup'").fetchone()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS metricas_rollup (
+            granularidade TEXT,
+            periodo TEXT,
+            tipo TEXT,
+            cor TEXT,
+            perfil_render TEXT,
+            views INTEGER,
+            watch_time_min REAL,
+            ctr_views REAL,
+            views_ctr INTEGER,
+            likes INTEGER,
+            comentarios INTEGER,
+            PRIMARY KEY (granularidade, periodo, tipo, cor, perfil_render)
+        ) WITHOUT ROWID
+    ''')
+    nova_video_mes = not c.execute("SELECT 1 FROM sqlite_master WHERE name = 'metricas_video_mes'").fetchone()
+    c.execute(f'''
+        CREATE TABLE IF NOT EXISTS metricas_video_mes (
+            chave_id TEXT,
+            mes TEXT,
+            {", ".join(f"{col} {'REAL' if col in ('watch_time_min', 'ctr_views') else 'INTEGER'}" for col in _COLUNAS_ROLLUP)},
+            PRIMARY KEY (chave_id, mes)
+        ) WITHOUT ROWID
+    ''')
+    # `adiado` = 1 enquanto gravar_metricas ajusta os agregados do lote inteiro
+    c.execute('CREATE TABLE IF NOT EXISTS rollup_controle (id INTEGER PRIMARY KEY CHECK (id = 1), adiado INTEGER)')
+    c.execute('INSERT OR IGNORE INTO rollup_controle (id, adiado) VALUES (1, 0)')
+    ativo = "WHEN (SELECT adiado FROM rollup_controle WHERE id = 1) = 0"
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON metricas_diarias {ativo} BEGIN
+            {_sql_rollup_linha("NEW")};
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_update AFTER UPDATE ON metricas_diarias {ativo} BEGIN
+            {_sql_rollup_linha("OLD", "-")};
+            {_sql_rollup_linha("NEW")};
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON metricas_diarias {ativo} BEGIN
+            {_sql_rollup_linha("OLD", "-")};
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_video_mes_insert AFTER INSERT ON metricas_diarias {ativo} BEGIN
+            {_sql_video_mes_linha("NEW")};
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_video_mes_update AFTER UPDATE ON metricas_diarias {ativo} BEGIN
+            {_sql_video_mes_linha("OLD", "-")};
+            {_sql_video_mes_linha("NEW")};
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_video_mes_delete AFTER DELETE ON metricas_diarias {ativo} BEGIN
+            {_sql_video_mes_linha("OLD", "-")};
+        END
+    ''')
+    if nova or nova_video_mes:  # banco anterior aos agregados: calcula a partir das métricas já gravadas
+        reconstruir_rollups(conn)
+
+def reconstruir_rollups(conn=None):
+    """Recalcula todos os agregados a partir de metricas_diarias (os gatilhos mantêm depois)."""
+    propria = conn is None
+    if propria:
+        conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('DELETE FROM metricas_rollup')
+        c.execute('DELETE FROM metricas_video_mes')
+        for sql in _sqls_agregados("1"):
+            c.execute(sql)
+        _nova_versao_metricas(c)
+        conn.commit()
+    finally:
+        if propria:
+            conn.close()
+
+CAMPOS_ATRIBUTOS = ['cor', 'perfil_render', 'provedor_imagem', 'duracao_narracao_s', 'palavras_roteiro']
+
+def carregar_atributos():
+    """Atributos de produção já registrados: {chave_id: {campo: valor}}."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(f'SELECT chave_id, {", ".join(CAMPOS_ATRIBUTOS)} FROM videos_atributos').fetchall()
+        return {r[0]: dict(zip(CAMPOS_ATRIBUTOS, r[1:])) for r in rows}
+    finally:
+        conn.close()
+
+def registrar_atributos(chave_id, atributos, conn=None):
+    """
+    Grava os atributos de produção de um vídeo (cor litúrgica, perfil de
+    renderização, provedor das imagens, duração da narração, palavras do
+    roteiro). Se mudar uma dimensão dos agregados, as métricas já gravadas
+    do vídeo passam para o grupo novo na mesma transação. Com `conn`, grava
+    na transação de quem chama (sem commit).
+    """
+    propria = conn is None
+    if propria:
+        conn = get_connection()
+    c = conn.cursor()
+    try:
+        antigo = c.execute('SELECT cor, perfil_render FROM videos_atributos WHERE chave_id = ?',
+                           (chave_id,)).fetchone() or ('', '')
+        antigo = tuple(v or '' for v in antigo)
+        mover = antigo != (atributos.get('cor') or '', atributos.get('perfil_render') or '')
+        if mover:
+            c.execute(_sql_rollup_agregado("m.chave_id = ?", "-"), (chave_id,))
+        c.execute(f'''
+            INSERT OR REPLACE INTO videos_atributos (chave_id, {", ".join(CAMPOS_ATRIBUTOS)}, atualizado_em)
+            VALUES ({", ".join("?" * (len(CAMPOS_ATRIBUTOS) + 2))})
+        ''', (chave_id, *[atributos.get(campo) for campo in CAMPOS_ATRIBUTOS], time.time()))
+        if mover:
+            c.execute(_sql_rollup_agregado("m.chave_id = ?"), (chave_id,))
+            # Grupos antigos que ficaram zerados (só nos períodos em que o vídeo tem métricas)
+            inicio = c.execute("SELECT date(MIN(data), 'start of month', '-6 days') FROM metricas_diarias WHERE chave_id = ?",
+                               (chave_id,)).fetchone()[0]
+            if inicio:
+                c.execute(f'''
+                    DELETE FROM metricas_rollup
+                    WHERE granularidade IN ({", ".join(f"'{g}'" for g in GRANULARIDADES)}) AND periodo >= ?
+                      AND cor = ? AND perfil_render = ?
+                      AND views = 0 AND views_ctr = 0 AND watch_time_min = 0 AND likes = 0 AND comentarios = 0
+                ''', (inicio, *antigo))
+        _nova_versao_metricas(c)
+        if propria:
+            conn.commit()
+    except Exception as e:
+        print(f"Erro registrar_atributos: {e}")
+        if not propria:
+            raise
+    finally:
+        if propria:
+            conn.close()
+
+# ---------------------------------------------------------------------
+# Estado dos nós do pipeline (agendador DAG)
+# ---------------------------------------------------------------------
+
+def create_pipeline_table(conn):
+    """Cria tabela com o estado de cada nó (etapa) de cada produção."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_nos (
+            chave_id TEXT,
+            no TEXT,
+            estado TEXT,
+            inicio REAL,
+            fim REAL,
+            erro TEXT,
+            PRIMARY KEY (chave_id, no)
+        )
+    ''')
+    conn.commit()
+
+def load_estado_nos(chave_id):
+    """Retorna {no: {'estado', 'inicio', 'fim', 'erro'}} de uma produção."""
+    conn = get_connection()
+    create_pipeline_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('SELECT no, estado, inicio, fim, erro FROM pipeline_nos WHERE chave_id = ?', (chave_id,))
+        return {
+            no: {"estado": estado, "inicio": inicio, "fim": fim, "erro": erro}
+            for no, estado, inicio, fim, erro in c.fetchall()
+        }
+    except Exception as e:
+        print(f"Erro load_estado_nos: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def update_estado_no(chave_id, no, estado, inicio=None, fim=None, erro=None):
+    """Grava o estado de um nó ('pendente', 'executando', 'concluido', 'falhou', 'bloqueado')."""
+    conn = get_connection()
+    create_pipeline_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            INSERT OR REPLACE INTO pipeline_nos (chave_id, no, estado, inicio, fim, erro)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (chave_id, no, estado, inicio, fim, erro))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro update_estado_no: {e}")
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Fila de produção (modo lote / throughput)
+# ---------------------------------------------------------------------
+
+def create_fila_table(conn):
+    """Cria a fila de jobs (data, leitura) usada pelo modo lote."""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS fila_producao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_ref TEXT,
+            tipo_leitura TEXT,
+            estado TEXT DEFAULT 'pendente',
+            tentativas INTEGER DEFAULT 0,
+            criado_em REAL,
+            iniciado_em REAL,
+            concluido_em REAL,
+            erro TEXT,
+            dono TEXT,
+            batimento_em REAL,
+            UNIQUE (data_ref, tipo_leitura)
+        )
+    ''')
+    # Filas criadas antes do controle de dono e batimento
+    existentes = {row[1] for row in c.execute('PRAGMA table_info(fila_producao)')}
+    for coluna, tipo in (('dono', 'TEXT'), ('batimento_em', 'REAL')):
+        if coluna not in existentes:
+            c.execute(f'ALTER TABLE fila_producao ADD COLUMN {coluna} {tipo}')
+    conn.commit()
+
+def enfileirar_job(data_ref, tipo_leitura, refazer=False):
+    """
+    Adiciona um job à fila. Um job que já falhou volta a 'pendente' (com as
+    tentativas zeradas); um já concluído só volta com `refazer`; um pendente
+    ou em execução não muda. Retorna True se entrou na fila.
+    """
+    conn = get_connection()
+    create_fila_table(conn)
+    c = conn.cursor()
+    estados = ('falhou', 'concluido') if refazer else ('falhou',)
+    try:
+        c.execute(f'''
+            INSERT INTO fila_producao (data_ref, tipo_leitura, estado, criado_em)
+            VALUES (?, ?, 'pendente', ?)
+            ON CONFLICT (data_ref, tipo_leitura) DO UPDATE SET
+                estado = 'pendente', tentativas = 0, dono = NULL, batimento_em = NULL,
+                iniciado_em = NULL, concluido_em = NULL, erro = NULL, criado_em = excluded.criado_em
+            WHERE fila_producao.estado IN ({", ".join("?" * len(estados))})
+        ''', (data_ref, tipo_leitura, time.time(), *estados))
+        conn.commit()
+        return c.rowcount > 0
+    except Exception as e:
+        print(f"Erro enfileirar_job: {e}")
+        return False
+    finally:
+        conn.close()
+
+def pegar_proximo_job(dono):
+    """
+    Reserva atomicamente o próximo job pendente para `dono` ("host:pid");
+    BEGIN IMMEDIATE garante que dois processos não peguem o mesmo.
+    Retorna (id, data_ref, tipo) ou None.
+    """
+    conn = get_connection()
+    create_fila_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('BEGIN IMMEDIATE')
+        c.execute('''
+            SELECT id, data_ref, tipo_leitura FROM fila_producao
+            WHERE estado = 'pendente' ORDER BY data_ref, id LIMIT 1
+        ''')
+        row = c.fetchone()
+        if row:
+            c.execute('''
+                UPDATE fila_producao SET estado = 'executando', tentativas = tentativas + 1, iniciado_em = ?,
+                       dono = ?, batimento_em = ?
+                WHERE id = ?
+            ''', (time.time(), dono, time.time(), row[0]))
+        conn.commit()
+        return row
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro pegar_proximo_job: {e}")
+        return None
+    finally:
+        conn.close()
+
+def finalizar_job(job_id, estado, erro=None):
+    """Marca o job como 'concluido' ou 'falhou'."""
+    conn = get_connection()
+    create_fila_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            UPDATE fila_producao SET estado = ?, concluido_em = ?, erro = ? WHERE id = ?
+        ''', (estado, time.time(), erro, job_id))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro finalizar_job: {e}")
+    finally:
+        conn.close()
+
+def renovar_jobs(dono, ids):
+    """Batimento: renova a reserva dos jobs `ids` que continuam com `dono`."""
+    if not ids:
+        return
+    conn = get_connection()
+    try:
+        conn.executemany('''
+            UPDATE fila_producao SET batimento_em = ? WHERE id = ? AND dono = ? AND estado = 'executando'
+        ''', [(time.time(), job_id, dono) for job_id in ids])
+        conn.commit()
+    except Exception as e:
+        print(f"Erro renovar_jobs: {e}")
+    finally:
+        conn.close()
+
+def recuperar_jobs_interrompidos(prazo_s, max_tentativas, dono_morto=lambda dono: False):
+    """
+    Devolve à fila os jobs 'executando' abandonados: o dono morreu
+    (`dono_morto(dono)`) ou o último batimento tem mais de `prazo_s`. Os de
+    consumidores vivos não são tocados; os que já tiveram `max_tentativas`
+    viram 'falhou'. Retorna (devolvidos, desistidos).
+    """
+    conn = get_connection()
+    create_fila_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('BEGIN IMMEDIATE')
+        c.execute('''
+            SELECT id, dono, COALESCE(batimento_em, iniciado_em, 0), tentativas
+            FROM fila_producao WHERE estado = 'executando'
+        ''')
+        limite = time.time() - prazo_s
+        abandonados = [(job_id, tentativas) for job_id, dono, batimento, tentativas in c.fetchall()
+                       if batimento < limite or not dono or dono_morto(dono)]
+        devolver = [(job_id,) for job_id, tentativas in abandonados if tentativas < max_tentativas]
+        desistir = [(f"interrompido {tentativas} vez(es)", time.time(), job_id)
+                    for job_id, tentativas in abandonados if tentativas >= max_tentativas]
+        c.executemany("UPDATE fila_producao SET estado = 'pendente', dono = NULL WHERE id = ?", devolver)
+        c.executemany("UPDATE fila_producao SET estado = 'falhou', erro = ?, concluido_em = ? WHERE id = ?",
+                      desistir)
+        conn.commit()
+        return len(devolver), len(desistir)
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro recuperar_jobs_interrompidos: {e}")
+        return 0, 0
+    finally:
+        conn.close()
+
+def contar_fila():
+    """Retorna {estado: quantidade} da fila de produção."""
+    conn = get_connection()
+    create_fila_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('SELECT estado, COUNT(*) FROM fila_producao GROUP BY estado')
+        return dict(c.fetchall())
+    except Exception as e:
+        print(f"Erro contar_fila: {e}")
+        return {}
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Fila de publicação (envio resumível ao YouTube)
+# ---------------------------------------------------------------------
+# Uma linha por produção. `sessao_url` e `bytes_confirmados` guardam onde o
+# envio parou: depois de uma queda (do processo ou da rede) o envio continua
+# do último byte confirmado pelo servidor, na mesma sessão de upload.
+
+CAMPOS_PUBLICACAO = ['id', 'chave_id', 'data_ref', 'tipo_leitura', 'caminho', 'metadados_json', 'estado',
+                     'sessao_url', 'bytes_confirmados', 'bytes_total', 'video_id', 'tentativas', 'erro',
+                     'criado_em', 'iniciado_em', 'concluido_em', 'atualizado_em']
+
+def create_publicacao_table(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS fila_publicacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chave_id TEXT UNIQUE,
+            data_ref TEXT,
+            tipo_leitura TEXT,
+            caminho TEXT,
+            metadados_json TEXT,
+            estado TEXT DEFAULT 'pendente',
+            sessao_url TEXT,
+            bytes_confirmados INTEGER DEFAULT 0,
+            bytes_total INTEGER,
+            video_id TEXT,
+            tentativas INTEGER DEFAULT 0,
+            erro TEXT,
+            criado_em REAL,
+            iniciado_em REAL,
+            concluido_em REAL,
+            atualizado_em REAL
+        )
+    ''')
+    conn.commit()
+
+def enfileirar_publicacao(chave_id, data_ref, tipo_leitura, caminho, metadados):
+    """
+    Põe o vídeo na fila de envio. Uma produção que já falhou volta para a
+    fila (com os dados novos, do zero); uma já enviada ou em envio não muda.
+    Retorna True se entrou na fila.
+    """
+    conn = get_connection()
+    create_publicacao_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            INSERT INTO fila_publicacao (chave_id, data_ref, tipo_leitura, caminho, metadados_json, estado,
+                                         bytes_total, criado_em, atualizado_em)
+            VALUES (?, ?, ?, ?, ?, 'pendente', ?, ?, ?)
+            ON CONFLICT (chave_id) DO UPDATE SET
+                caminho = excluded.caminho, metadados_json = excluded.metadados_json, estado = 'pendente',
+                sessao_url = NULL, bytes_confirmados = 0, bytes_total = excluded.bytes_total,
+                tentativas = 0, erro = NULL, atualizado_em = excluded.atualizado_em
+            WHERE fila_publicacao.estado = 'falhou'
+        ''', (chave_id, data_ref, tipo_leitura, caminho, json.dumps(metadados, ensure_ascii=False),
+              os.path.getsize(caminho), time.time(), time.time()))
+        conn.commit()
+        return c.rowcount > 0
+    except Exception as e:
+        print(f"Erro enfileirar_publicacao: {e}")
+        return False
+    finally:
+        conn.close()
+
+def pegar_proxima_publicacao():
+    """Reserva atomicamente o próximo envio pendente. Retorna um dict (CAMPOS_PUBLICACAO) ou None."""
+    conn = get_connection()
+    create_publicacao_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('BEGIN IMMEDIATE')
+        c.execute(f'''
+            SELECT {", ".join(CAMPOS_PUBLICACAO)} FROM fila_publicacao
+            WHERE estado = 'pendente' ORDER BY id LIMIT 1
+        ''')
+        row = c.fetchone()
+        if row:
+            c.execute('''
+                UPDATE fila_publicacao SET estado = 'enviando', tentativas = tentativas + 1,
+                       iniciado_em = ?, atualizado_em = ?
+                WHERE id = ?
+            ''', (time.time(), time.time(), row[0]))
+        conn.commit()
+        return dict(zip(CAMPOS_PUBLICACAO, row)) if row else None
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro pegar_proxima_publicacao: {e}")
+        return None
+    finally:
+        conn.close()
+
+def registrar_progresso_publicacao(pub_id, sessao_url, bytes_confirmados):
+    """Guarda a sessão de upload e o último byte confirmado (chamado a cada bloco)."""
+    conn = get_connection()
+    try:
+        conn.execute('''
+            UPDATE fila_publicacao SET sessao_url = ?, bytes_confirmados = ?, atualizado_em = ? WHERE id = ?
+        ''', (sessao_url, bytes_confirmados, time.time(), pub_id))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro registrar_progresso_publicacao: {e}")
+    finally:
+        conn.close()
+
+def finalizar_publicacao(pub_id, estado, video_id=None, erro=None):
+    """Marca o envio como 'concluido' (com o id do vídeo) ou 'falhou'."""
+    conn = get_connection()
+    try:
+        conn.execute('''
+            UPDATE fila_publicacao SET estado = ?, video_id = COALESCE(?, video_id), erro = ?,
+                   bytes_confirmados = CASE WHEN ? = 'concluido' THEN bytes_total ELSE bytes_confirmados END,
+                   concluido_em = ?, atualizado_em = ?
+            WHERE id = ?
+        ''', (estado, video_id, erro, estado, time.time(), time.time(), pub_id))
+        conn.commit()
+    except Exception as e:
+        print(f"Erro finalizar_publicacao: {e}")
+    finally:
+        conn.close()
+
+def recuperar_publicacoes_interrompidas():
+    """Devolve à fila os envios que ficaram 'enviando' (a sessão e o byte confirmado são mantidos)."""
+    conn = get_connection()
+    create_publicacao_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute("UPDATE fila_publicacao SET estado = 'pendente' WHERE estado = 'enviando'")
+        conn.commit()
+        return c.rowcount
+    except Exception as e:
+        print(f"Erro recuperar_publicacoes_interrompidas: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def listar_publicacoes(chave_id=None):
+    """Envios da fila (os mais recentes primeiro), ou só o da produção `chave_id`."""
+    conn = get_connection()
+    create_publicacao_table(conn)
+    c = conn.cursor()
+    try:
+        filtro, params = ("WHERE chave_id = ?", (chave_id,)) if chave_id else ("", ())
+        c.execute(f'SELECT {", ".join(CAMPOS_PUBLICACAO)} FROM fila_publicacao {filtro} ORDER BY id DESC', params)
+        return [dict(zip(CAMPOS_PUBLICACAO, row)) for row in c.fetchall()]
+    except Exception as e:
+        print(f"Erro listar_publicacoes: {e}")
+        return []
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Rastreamento (tempo e recursos por trecho das etapas)
+# ---------------------------------------------------------------------
+# Gravado em lote por modules/rastreio.py. Um `rastro` agrupa os trechos de
+# uma produção; `pai` liga cada trecho ao que o abriu.
+
+CAMPOS_TRECHO = ['id', 'rastro', 'pai', 'nome', 'thread', 'pid', 'inicio', 'wall_ms', 'cpu_ms', 'cpu_filhos_ms',
+                 'rss_pico_mb', 'rss_filhos_mb', 'bytes_entrada', 'bytes_saida', 'erro', 'atributos_json']
+
+def create_rastreio_table(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rastreio_trechos (
+            id TEXT PRIMARY KEY,
+            rastro TEXT,
+            pai TEXT,
+            nome TEXT,
+            thread TEXT,
+            pid INTEGER,
+            inicio REAL,
+            wall_ms REAL,
+            cpu_ms REAL,
+            cpu_filhos_ms REAL,
+            rss_pico_mb REAL,
+            rss_filhos_mb REAL,
+            bytes_entrada INTEGER,
+            bytes_saida INTEGER,
+            erro TEXT,
+            atributos_json TEXT
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rastreio_rastro ON rastreio_trechos (rastro, inicio)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rastreio_inicio ON rastreio_trechos (inicio)')
+    conn.commit()
+
+def gravar_trechos(linhas):
+    """Grava um lote de trechos (tuplas na ordem de CAMPOS_TRECHO)."""
+    conn = get_connection()
+    create_rastreio_table(conn)
+    try:
+        conn.executemany(
+            f'INSERT OR REPLACE INTO rastreio_trechos ({", ".join(CAMPOS_TRECHO)}) '
+            f'VALUES ({", ".join("?" * len(CAMPOS_TRECHO))})', linhas)
+        conn.commit()
+    finally:
+        conn.close()
+
+def listar_rastros(desde=None, limite=200):
+    """Rastros mais recentes: início, duração total, nº de trechos e de erros."""
+    conn = get_connection()
+    create_rastreio_table(conn)
+    c = conn.cursor()
+    try:
+        c.execute('''
+            SELECT rastro, MIN(inicio), MAX(inicio + wall_ms / 1000.0) - MIN(inicio), COUNT(*), COUNT(erro)
+            FROM rastreio_trechos WHERE inicio >= ?
+            GROUP BY rastro ORDER BY MIN(inicio) DESC LIMIT ?
+        ''', (desde or 0, limite))
+        return [dict(zip(['rastro', 'inicio', 'duracao_s', 'trechos', 'erros'], row)) for row in c.fetchall()]
+    except Exception as e:
+        print(f"Erro listar_rastros: {e}")
+        return []
+    finally:
+        conn.close()
+
+def carregar_trechos(rastro=None, desde=None):
+    """Trechos de um rastro (ou todos desde `desde`), em ordem de início."""
+    conn = get_connection()
+    create_rastreio_table(conn)
+    c = conn.cursor()
+    try:
+        filtro, params = ("rastro = ?", (rastro,)) if rastro else ("inicio >= ?", (desde or 0,))
+        c.execute(f'SELECT {", ".join(CAMPOS_TRECHO)} FROM rastreio_trechos WHERE {filtro} ORDER BY inicio', params)
+        return [dict(zip(CAMPOS_TRECHO, row)) for row in c.fetchall()]
+    except Exception as e:
+        print(f"Erro carregar_trechos: {e}")
+        return []
+    finally:
+        conn.close()
+
+def apagar_trechos(antes_de):
+    """Remove os trechos iniciados antes de `antes_de` (epoch). Retorna quantos."""
+    conn = get_connection()
+    create_rastreio_table(conn)
+    try:
+        c = conn.execute('DELETE FROM rastreio_trechos WHERE inicio < ?', (antes_de,))
+        conn.commit()
+        return c.rowcount
+    finally:
+        conn.close()
+
+# ---------------------------------------------------------------------
+# Metadados de mídia (modules/midia.py)
+# ---------------------------------------------------------------------
+# Uma linha por arquivo sondado. `mtime_ns` e `tamanho` do momento da
+# sondagem validam a linha: se o arquivo mudou, ela é ignorada e refeita.
+
+def create_midia_table(conn):
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS midia_info (
+            caminho TEXT PRIMARY KEY,
+            mtime_ns INTEGER,
+            tamanho INTEGER,
+            info_json TEXT,
+            sondado_em REAL
+        )
+    ''')
+    conn.commit()
+
+def carregar_midia(caminhos):
+    """{caminho: (mtime_ns, tamanho, info)} das linhas em cache para `caminhos`."""
+    conn = get_connection()
+    create_midia_table(conn)
+    c = conn.cursor()
+    try:
+        caminhos = list(caminhos)
+        achados = {}
+        for i in range(0, len(caminhos), 500):  # limite de parâmetros do SQLite
+            lote = caminhos[i:i + 500]
+            c.execute(f'SELECT caminho, mtime_ns, tamanho, info_json FROM midia_info '
+                      f'WHERE caminho IN ({", ".join("?" * len(lote))})', lote)
+            for caminho, mtime_ns, tamanho, info_json in c.fetchall():
+                achados[caminho] = (mtime_ns, tamanho, json.loads(info_json))
+        return achados
+    except Exception as e:
+        print(f"Erro carregar_midia: {e}")
+        return {}
+    finally:
+        conn.close()
+
+def salvar_midia(linhas):
+    """Grava (caminho, mtime_ns, tamanho, info) sondados agora."""
+    conn = get_connection()
+    create_midia_table(conn)
+    try:
+        agora = time.time()
+        conn.executemany(
+            'INSERT OR REPLACE INTO midia_info (caminho, mtime_ns, tamanho, info_json, sondado_em) VALUES (?, ?, ?, ?, ?)',
+            [(caminho, mtime_ns, tamanho, json.dumps(info), agora) for caminho, mtime_ns, tamanho, info in linhas])
+        conn.commit()
+    except Exception as e:
+        print(f"Erro salvar_midia: {e}")
+    finally:
+        conn.close()
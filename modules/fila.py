@@ -0,0 +1,191 @@
+import os
+import time
+import socket
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from modules import database as db
+from modules import avisos
+from modules import liturgia as liturgia_mod
+from modules import producao
+from modules.agendador import criar_pools
+
+# ---------------------------------------------------------------------
+# Modo fila: muitas produções (data, leitura) em paralelo
+# ---------------------------------------------------------------------
+# A fila vive no próprio SQLite (`fila_producao`), sem broker externo. Cada
+# job roda o grafo de etapas da produção, mas todos os jobs compartilham os
+# mesmos dois pools: "io" (LLM, imagens) e "cpu" (Piper, FFmpeg). Os limites
+# de taxa por provedor ficam em modules/limites.py e valem para todos.
+#
+# Vários processos podem consumir a mesma fila: cada job reservado leva o
+# dono ("host:pid") e um batimento renovado enquanto roda. Só volta para a
+# fila o job cujo dono morreu ou cujo batimento venceu o prazo.
+
+DONO = f"{socket.gethostname()}:{os.getpid()}"
+BATIMENTO_S = 30.0        # intervalo de renovação das reservas
+PRAZO_BATIMENTO_S = 180.0  # sem batimento por mais que isso, o job é considerado abandonado
+MAX_TENTATIVAS = 3        # reservas de um job interrompido antes de desistir dele
+
+
+def _dono_morto(dono):
+    """True se `dono` é um processo desta máquina que não existe mais."""
+    host, _, pid = dono.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False  # de outra máquina: só o prazo do batimento decide
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # existe, de outro usuário
+    return False
+
+
+class Estatisticas:
+    """Acumula tempos por pool e por etapa para o relatório de throughput."""
+
+    def __init__(self, workers):
+        self.inicio = time.time()
+        self.workers = dict(workers)
+        self.ocupado = {pool: 0.0 for pool in workers}
+        self.por_etapa = {}
+        self.jobs_ok = 0
+        self.jobs_falha = 0
+        self.lock = threading.Lock()
+
+    def registrar_no(self, nome, pool, inicio, fim, ok):
+        with self.lock:
+            self.ocupado[pool] = self.ocupado.get(pool, 0.0) + (fim - inicio)
+            self.por_etapa[nome] = self.por_etapa.get(nome, 0.0) + (fim - inicio)
+
+    def registrar_job(self, ok):
+        with self.lock:
+            if ok:
+                self.jobs_ok += 1
+            else:
+                self.jobs_falha += 1
+
+    def relatorio(self):
+        decorrido = max(time.time() - self.inicio, 1e-6)
+        fila = db.contar_fila()
+        with self.lock:
+            return {
+                "decorrido_s": round(decorrido, 1),
+                "jobs_concluidos": self.jobs_ok,
+                "jobs_falhos": self.jobs_falha,
+                "jobs_por_hora": round(self.jobs_ok * 3600.0 / decorrido, 2),
+                "profundidade_fila": fila.get("pendente", 0),
+                "em_execucao": fila.get("executando", 0),
+                # fração da capacidade de cada pool efetivamente ocupada
+                "utilizacao_pool": {
+                    pool: round(self.ocupado[pool] / (decorrido * self.workers[pool]), 3)
+                    for pool in self.workers
+                },
+                # média de nós simultâneos de cada etapa
+                "utilizacao_etapa": {
+                    nome: round(seg / decorrido, 3) for nome, seg in sorted(self.por_etapa.items())
+                },
+            }
+
+
+def formatar_relatorio(r):
+    linhas = [
+        f"⏱️ {r['decorrido_s']}s | {r['jobs_concluidos']} ok, {r['jobs_falhos']} falhas | "
+        f"{r['jobs_por_hora']} jobs/h | fila: {r['profundidade_fila']} pendentes, {r['em_execucao']} em execução",
+        "   pools: " + ", ".join(f"{p}={v:.0%}" for p, v in r["utilizacao_pool"].items()),
+    ]
+    if r["utilizacao_etapa"]:
+        linhas.append("   etapas: " + ", ".join(f"{e}={v:.2f}" for e, v in r["utilizacao_etapa"].items()))
+    return "\n".join(linhas)
+
+
+def enfileirar_intervalo(inicio, fim, filtros, todas_formas=False, refazer=False, notificar=avisos.console):
+    """
+    Busca as liturgias do intervalo e enfileira as leituras escolhidas. Jobs
+    que falharam voltam para a fila; com `refazer`, também os já concluídos.
+    """
+    novos = 0
+    dia = inicio
+    while dia <= fim:
+        liturgia = liturgia_mod.fetch_liturgia(dia, notificar=notificar)
+        if liturgia:
+            for leitura in liturgia_mod.selecionar_leituras(liturgia['leituras'], filtros, todas_formas):
+                novos += db.enfileirar_job(liturgia['data'], leitura['tipo'], refazer)
+        dia += datetime.timedelta(days=1)
+    return novos
+
+
+def _executar_job(job, pools, stats, opcoes, notificar):
+    job_id, data_ref, tipo = job
+    try:
+        liturgia = liturgia_mod.fetch_liturgia(datetime.date.fromisoformat(data_ref), notificar=notificar)
+        leitura = next((l for l in (liturgia or {}).get('leituras', []) if l['tipo'] == tipo), None)
+        if not leitura:
+            db.finalizar_job(job_id, "falhou", "leitura não encontrada")
+            stats.registrar_job(False)
+            return
+
+        leitura = {**leitura, 'cor': liturgia.get('cor', '')}
+        prod = producao.produzir_leitura(
+            leitura, data_ref, pools=pools, ao_concluir_no=stats.registrar_no, notificar=notificar, **opcoes
+        )
+        ok = not prod["falhou_em"]
+        db.finalizar_job(job_id, "concluido" if ok else "falhou", prod["falhou_em"])
+        stats.registrar_job(ok)
+    except Exception as e:
+        db.finalizar_job(job_id, "falhou", str(e))
+        stats.registrar_job(False)
+
+
+def processar_fila(simultaneas=4, max_io=8, max_cpu=None, intervalo_relatorio=30.0,
+                   notificar=avisos.console, **opcoes):
+    """
+    Consome a fila até esvaziar. `simultaneas` limita quantas produções estão
+    abertas ao mesmo tempo; as etapas de todas disputam os pools compartilhados.
+    `opcoes` vai para producao.produzir_leitura (client, motor, ...).
+    Retorna o relatório final.
+    """
+    recuperados, desistidos = db.recuperar_jobs_interrompidos(PRAZO_BATIMENTO_S, MAX_TENTATIVAS, _dono_morto)
+    if recuperados:
+        notificar("info", f"{recuperados} job(s) interrompido(s) voltaram para a fila.")
+    if desistidos:
+        notificar("aviso", f"{desistidos} job(s) interrompido(s) {MAX_TENTATIVAS} vezes marcados como falhos.")
+
+    pools = criar_pools(max_io, max_cpu)
+    stats = Estatisticas({nome: pool._max_workers for nome, pool in pools.items()})
+    coordenadores = ThreadPoolExecutor(max_workers=simultaneas, thread_name_prefix="fila-job")
+    em_execucao = {}  # futuro -> id do job
+    proximo_relatorio = time.time() + intervalo_relatorio
+    proximo_batimento = time.time() + BATIMENTO_S
+
+    try:
+        while True:
+            while len(em_execucao) < simultaneas:
+                job = db.pegar_proximo_job(DONO)
+                if not job:
+                    break
+                em_execucao[coordenadores.submit(_executar_job, job, pools, stats, opcoes, notificar)] = job[0]
+
+            if not em_execucao:
+                break
+
+            terminados, _ = wait(em_execucao, timeout=min(intervalo_relatorio, BATIMENTO_S),
+                                 return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                del em_execucao[futuro]
+
+            if time.time() >= proximo_batimento:
+                db.renovar_jobs(DONO, list(em_execucao.values()))
+                proximo_batimento = time.time() + BATIMENTO_S
+
+            if time.time() >= proximo_relatorio:
+                notificar("info", formatar_relatorio(stats.relatorio()))
+                proximo_relatorio = time.time() + intervalo_relatorio
+    finally:
+        coordenadores.shutdown(wait=True)
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    return stats.relatorio()
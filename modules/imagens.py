@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modules import avisos
+from modules import rastreio
+from modules import provedores_imagem
+from modules.provedores_imagem import ErroProvedor
+
+MOTORES = ["Pollinations (Grátis/Rápido)", "Google Imagen (Alta Qualidade)"]
+MODELOS_GOOGLE = ["imagen-3.0-generate-001", "imagen-3.0-fast-generate-001"]
+
+
+def gerar_imagens(prompts_lista, motor, pasta, data_str, api_key_google="", modelo_google=MODELOS_GOOGLE[0],
+                  ao_progredir=None, notificar=avisos.console, paralelas=4, provedores=None):
+    """
+    Gera e salva as imagens das cenas (em paralelo, com failover entre
+    provedores), baixando direto para o disco em blocos. Retorna a lista
+    de caminhos gravados, na ordem das cenas.
+    `ao_progredir(percentual, texto)` é opcional e sempre chamado nesta thread
+    (a barra de progresso do Streamlit não aceita outras threads).
+    Se `provedores` for uma lista, recebe o provedor de cada imagem gravada.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    backend = provedores_imagem.montar_backend(motor, api_key_google, modelo_google)
+    caminhos = [None] * len(prompts_lista)
+    usados = [None] * len(prompts_lista)
+    carimbo = int(time.time())
+    destinos = [os.path.join(pasta, f"img_{data_str}_{i+1}_{carimbo}.png") for i in range(len(prompts_lista))]
+
+    if ao_progredir:
+        ao_progredir(0, f"Gerando {len(prompts_lista)} cenas...")
+
+    def gerar_cena(i, prompt):
+        with rastreio.trecho("imagens.cena", cena=i + 1):
+            return backend.gerar(prompt, destinos[i])
+
+    with rastreio.trecho("imagens.gerar", motor=motor, cenas=len(prompts_lista)), \
+            ThreadPoolExecutor(max_workers=paralelas) as executor:
+        gerar_cena = rastreio.propagar(gerar_cena)
+        futuros = {executor.submit(gerar_cena, i, prompt): i for i, prompt in enumerate(prompts_lista)}
+        for feitos, futuro in enumerate(as_completed(futuros), start=1):
+            i = futuros[futuro]
+            try:
+                provedor = futuro.result()
+            except ErroProvedor as e:
+                notificar("aviso", f"Falha ao gerar cena {i+1}: {e}. Tentando continuar...")
+            else:
+                caminhos[i] = destinos[i]
+                usados[i] = provedor
+                if provedor not in motor.lower():
+                    notificar("info", f"Cena {i+1} gerada pelo provedor reserva ({provedor}).")
+
+            if ao_progredir:
+                ao_progredir(int(feitos * 100 / len(prompts_lista)), f"{feitos} de {len(prompts_lista)} cenas prontas")
+
+    if provedores is not None:
+        provedores[:] = [usados[i] for i, c in enumerate(caminhos) if c]
+    return [c for c in caminhos if c]
+
+
+def provedor_principal(provedores):
+    """Provedor que gerou a maioria das imagens (o do dashboard), ou None."""
+    return max(set(provedores), key=provedores.count) if provedores else None
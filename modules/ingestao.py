@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import time
+import hashlib
+import unicodedata
+
+from modules import database as db
+from modules import metricas
+
+# ---------------------------------------------------------------------
+# Importação em lote de métricas (exportações do YouTube Studio / Analytics)
+# ---------------------------------------------------------------------
+# Lê CSV, JSON Lines ou o JSON da YouTube Analytics API em blocos de
+# TAMANHO_LOTE linhas (memória constante), liga cada linha a uma produção e
+# grava cada bloco numa transação. Reimportar é barato: o mesmo arquivo
+# (mesmo hash) é pulado, e linhas iguais ao que já está no banco não são
+# reescritas. Linha de comando: importar_metricas.py na raiz.
+
+TAMANHO_LOTE = 20_000
+
+# Campo -> cabeçalhos aceitos (comparados sem acento, aspas e maiúsculas)
+COLUNAS = {
+    "data": ["data", "date", "dia", "day"],
+    "chave_id": ["chave_id"],
+    "youtube_id": ["video", "conteudo", "content", "video id", "id do video", "youtube_id"],
+    "titulo": ["video title", "titulo do video", "titulo", "title"],
+    "views": ["views", "visualizacoes"],
+    "watch_time_horas": ["watch time (hours)", "tempo de exibicao (horas)"],
+    "watch_time_min": ["watch_time_min", "watch time (minutes)", "tempo de exibicao (minutos)",
+                       "estimatedminuteswatched"],
+    "ctr": ["ctr", "impressions click-through rate (%)", "taxa de cliques de impressoes (%)"],
+    "likes": ["likes", "marcacoes gostei", "gostei"],
+    "comentarios": ["comentarios", "comments", "comments added", "comentarios adicionados"],
+}
+_POR_CABECALHO = {nome: campo for campo, nomes in COLUNAS.items() for nome in nomes}
+
+_ID_YOUTUBE = re.compile(r"(?:v=|youtu\.be/|shorts/)([\w-]{11})")
+
+
+def _normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return " ".join(sem_acento.replace('"', "").lower().split())
+
+
+def hash_arquivo(arquivo):
+    """sha1 do conteúdo, lido em blocos (caminho ou arquivo aberto em binário)."""
+    h = hashlib.sha1()
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    else:
+        arquivo.seek(0)
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            h.update(bloco)
+        arquivo.seek(0)
+    return h.hexdigest()
+
+
+def indice_producoes():
+    """Mapas para achar a produção de uma linha: por chave, id do YouTube e título."""
+    conn = db.get_connection()
+    try:
+        linhas = conn.execute('''
+            SELECT p.chave_id, v.titulo, v.youtube_url
+            FROM producao_status p LEFT JOIN videos_publicados v ON v.chave_id = p.chave_id
+        ''').fetchall()
+    finally:
+        conn.close()
+    por_youtube, por_titulo = {}, {}
+    for chave, titulo, url in linhas:
+        achado = _ID_YOUTUBE.search(url or "")
+        if achado:
+            por_youtube[achado.group(1)] = chave
+        if titulo:
+            por_titulo[_normalizar(titulo)] = chave
+    return {chave for chave, _, _ in linhas}, por_youtube, por_titulo
+
+
+def ler_blocos(arquivo, nome, tamanho=TAMANHO_LOTE):
+    """DataFrames de até `tamanho` linhas, com as colunas já renomeadas para os campos."""
+    import pandas as pd
+
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao in (".jsonl", ".ndjson"):
+        blocos = pd.read_json(arquivo, lines=True, chunksize=tamanho, dtype=False)
+    elif extensao == ".json":
+        # Resposta da YouTube Analytics API: {"columnHeaders": [{"name": ...}], "rows": [[...]]}.
+        # Não dá para ler em streaming, mas o formato já vem agregado (uma linha por vídeo e dia).
+        if isinstance(arquivo, (str, os.PathLike)):
+            with open(arquivo, encoding="utf-8") as f:
+                dados = json.load(f)
+        else:
+            dados = json.load(arquivo)
+        cabecalhos = [c["name"] for c in dados.get("columnHeaders", [])]
+        linhas = dados.get("rows", [])
+        blocos = (pd.DataFrame(linhas[i:i + tamanho], columns=cabecalhos) for i in range(0, len(linhas), tamanho))
+    else:
+        blocos = pd.read_csv(arquivo, chunksize=tamanho, dtype=str, skipinitialspace=True)
+
+    for bloco in blocos:
+        renomear = {}
+        for coluna in bloco.columns:
+            campo = _POR_CABECALHO.get(_normalizar(coluna))
+            if campo and campo not in renomear.values():
+                renomear[coluna] = campo
+        yield bloco[list(renomear)].rename(columns=renomear)
+
+
+def preparar_bloco(bloco, producoes, data_padrao=None):
+    """
+    Converte um bloco (vetorizado) em linhas para db.gravar_metricas.
+    Retorna (linhas, sem_producao, invalidas).
+    """
+    import pandas as pd
+
+    chaves, por_youtube, por_titulo = producoes
+    chave = pd.Series(pd.NA, index=bloco.index, dtype=object)
+    if "chave_id" in bloco:
+        chave = bloco["chave_id"].where(bloco["chave_id"].isin(chaves))
+    if "youtube_id" in bloco:
+        chave = chave.fillna(bloco["youtube_id"].map(por_youtube))
+    if "titulo" in bloco and chave.isna().any():
+        # Só para as linhas ainda sem produção: normalizar o título é o passo mais caro
+        faltando = chave.isna()
+        chave[faltando] = bloco.loc[faltando, "titulo"].map(
+            lambda t: por_titulo.get(_normalizar(t)) if isinstance(t, str) else None)
+
+    if "data" in bloco:
+        data = pd.to_datetime(bloco["data"], errors="coerce", format="mixed").dt.strftime("%Y-%m-%d")
+    else:
+        data = pd.Series(data_padrao, index=bloco.index, dtype=object)
+
+    saida = pd.DataFrame({"chave_id": chave, "data": data})
+    for campo in db.CAMPOS_METRICAS:
+        if campo in bloco:
+            saida[campo] = pd.to_numeric(bloco[campo], errors="coerce")
+    if "watch_time_horas" in bloco and "watch_time_min" not in bloco:
+        saida["watch_time_min"] = pd.to_numeric(bloco["watch_time_horas"], errors="coerce") * 60
+
+    # Linha "Total" das exportações, datas inválidas e linhas sem nenhuma métrica
+    campos = [c for c in db.CAMPOS_METRICAS if c in saida]
+    validas = saida["data"].notna() & (saida[campos].notna().any(axis=1) if campos else False)
+    com_producao = validas & saida["chave_id"].notna()
+    invalidas = int((~validas).sum())
+    sem_producao = int((validas & saida["chave_id"].isna()).sum())
+
+    saida = saida[com_producao].astype(object)
+    linhas = saida.where(saida.notna(), None).to_dict("records")
+    return linhas, sem_producao, invalidas
+
+
+def importar(arquivo, nome=None, data_padrao=None, forcar=False, tamanho=TAMANHO_LOTE):
+    """
+    Importa um arquivo de métricas (caminho ou arquivo aberto em binário).
+    `data_padrao` vale para exportações sem coluna de data (totais do
+    período). Retorna um relatório com as contagens e o tempo.
+    """
+    inicio = time.perf_counter()
+    nome = nome or os.path.basename(str(getattr(arquivo, "name", arquivo)))
+    resumo = hash_arquivo(arquivo)
+    relatorio = {"arquivo": nome, "linhas": 0, "gravadas": 0, "inalteradas": 0,
+                 "sem_producao": 0, "invalidas": 0, "ja_importado": False}
+
+    anterior = db.importacao_registrada(resumo)
+    if anterior and not forcar:
+        relatorio.update(ja_importado=True, linhas=anterior["linhas"])
+        relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+        return relatorio
+
+    producoes = indice_producoes()
+    com_atributos = set(db.carregar_atributos())
+    conn = db.get_connection()
+    try:
+        for bloco in ler_blocos(arquivo, nome, tamanho):
+            linhas, sem_producao, invalidas = preparar_bloco(bloco, producoes, data_padrao)
+            # Vídeos ainda sem atributos: registra antes, para as métricas já
+            # entrarem nos agregados no grupo certo (cor, perfil de render)
+            novos = {l["chave_id"] for l in linhas} - com_atributos
+            if novos:
+                metricas.atualizar_atributos(novos)
+                com_atributos |= novos
+            gravadas = db.gravar_metricas(linhas, fonte=f"importacao:{nome}", conn=conn)
+            conn.commit()  # uma transação por bloco
+            relatorio["linhas"] += len(bloco)
+            relatorio["gravadas"] += gravadas
+            relatorio["inalteradas"] += len(linhas) - gravadas
+            relatorio["sem_producao"] += sem_producao
+            relatorio["invalidas"] += invalidas
+    finally:
+        conn.close()
+
+    db.registrar_importacao(resumo, nome, relatorio["linhas"], relatorio["gravadas"])
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+
+def formatar_relatorio(r):
+    if r["ja_importado"]:
+        return f"{r['arquivo']}: já importado antes ({r['linhas']} linhas), nada a fazer."
+    return (f"{r['arquivo']}: {r['linhas']} linhas em {r['segundos']}s — {r['gravadas']} gravadas, "
+            f"{r['inalteradas']} sem mudança, {r['sem_producao']} sem produção correspondente, "
+            f"{r['invalidas']} inválidas/total")
+
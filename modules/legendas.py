@@ -0,0 +1,202 @@
+import os
+import re
+
+# ---------------------------------------------------------------------
+# Legendas derivadas do próprio TTS (sem reconhecimento de fala)
+# ---------------------------------------------------------------------
+# O áudio é sintetizado frase a frase; a duração exata de cada frase vem do
+# número de amostras geradas pelo Piper. Dentro de cada frase o tempo é
+# distribuído entre as palavras proporcionalmente ao tamanho delas, o que é
+# suficiente para legendas curtas (2 a 5 palavras) em vídeos verticais.
+
+PAUSA_ENTRE_FRASES = 0.25  # segundos de silêncio inseridos entre frases
+
+ESTILO_PADRAO = {
+    "fonte": "Arial",
+    "tamanho": 64,
+    "cor": "#FFFFFF",
+    "cor_contorno": "#000000",
+    "contorno": 4,
+    "margem_inferior": 520,
+    "max_palavras": 4,
+    "max_caracteres": 28,
+}
+ALTURA_REFERENCIA = 1920  # tamanho, contorno e margem do estilo valem para esta altura
+
+
+def dividir_frases(texto):
+    """Divide o texto limpo em frases (unidade de síntese do TTS)."""
+    if not texto:
+        return []
+    partes = re.split(r'(?<=[.!?])\s+', texto.strip())
+    return [p.strip() for p in partes if p.strip()]
+
+
+def estimar_segmentos(frases, duracao_total):
+    """
+    Distribui a duração total entre as frases pelo número de caracteres.
+    Usado quando o áudio veio do fallback CLI (síntese em bloco único).
+    """
+    total_chars = sum(len(f) for f in frases)
+    if not frases or total_chars == 0 or duracao_total <= 0:
+        return []
+
+    segmentos = []
+    t = 0.0
+    for frase in frases:
+        dur = duracao_total * len(frase) / total_chars
+        segmentos.append({"texto": frase, "inicio": round(t, 3), "fim": round(t + dur, 3)})
+        t += dur
+    return segmentos
+
+
+def tempos_palavras(segmentos):
+    """Converte segmentos (frase, início, fim) em tempos por palavra."""
+    palavras = []
+    for seg in segmentos:
+        itens = seg["texto"].split()
+        if not itens:
+            continue
+        # Pontuação "pesa" um pouco mais (pausa natural do TTS)
+        pesos = [len(p) + (2 if p[-1] in ".,!?;:" else 0) for p in itens]
+        total = float(sum(pesos))
+        dur = seg["fim"] - seg["inicio"]
+        t = seg["inicio"]
+        for p, peso in zip(itens, pesos):
+            d = dur * peso / total
+            palavras.append({"texto": p, "inicio": t, "fim": t + d})
+            t += d
+    return palavras
+
+
+def agrupar_legendas(palavras, max_palavras=4, max_caracteres=28):
+    """Agrupa palavras em cues curtos, quebrando também no fim de frase."""
+    cues = []
+    atual = []
+
+    def fechar():
+        if atual:
+            cues.append({
+                "inicio": atual[0]["inicio"],
+                "fim": atual[-1]["fim"],
+                "texto": " ".join(p["texto"] for p in atual),
+            })
+
+    for p in palavras:
+        tamanho = len(" ".join(x["texto"] for x in atual + [p]))
+        if atual and (len(atual) >= max_palavras or tamanho > max_caracteres):
+            fechar()
+            atual = []
+        atual.append(p)
+        if p["texto"][-1] in ".!?;:":
+            fechar()
+            atual = []
+    fechar()
+    return cues
+
+
+def gerar_cues(segmentos, estilo=None):
+    """Atalho: segmentos do TTS -> cues de legenda agrupados."""
+    estilo = {**ESTILO_PADRAO, **(estilo or {})}
+    return agrupar_legendas(
+        tempos_palavras(segmentos),
+        max_palavras=int(estilo["max_palavras"]),
+        max_caracteres=int(estilo["max_caracteres"]),
+    )
+
+
+# ---------------------------------------------------------------------
+# Formatos de saída
+# ---------------------------------------------------------------------
+
+def _tempo_srt(s):
+    ms = int(round(s * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    seg, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{seg:02d},{ms:03d}"
+
+
+def _tempo_ass(s):
+    cs = int(round(s * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    seg, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{seg:02d}.{cs:02d}"
+
+
+def _cor_ass(hex_cor):
+    """'#RRGGBB' -> '&H00BBGGRR' (formato de cor do ASS)."""
+    h = hex_cor.lstrip("#")
+    if len(h) != 6:
+        h = "FFFFFF"
+    return f"&H00{h[4:6]}{h[2:4]}{h[0:2]}".upper()
+
+
+def nome_familia_fonte(caminho_fonte):
+    """Nome da família da fonte (o libass procura por nome, não por arquivo)."""
+    if not caminho_fonte or not os.path.exists(caminho_fonte):
+        return "Arial"
+    try:
+        from PIL import ImageFont
+        return ImageFont.truetype(caminho_fonte, 10).getname()[0]
+    except Exception:
+        return os.path.splitext(os.path.basename(caminho_fonte))[0].split("-")[0]
+
+
+def formatar_srt(cues):
+    linhas = []
+    for i, c in enumerate(cues, start=1):
+        linhas.append(str(i))
+        linhas.append(f"{_tempo_srt(c['inicio'])} --> {_tempo_srt(c['fim'])}")
+        linhas.append(c["texto"])
+        linhas.append("")
+    return "\n".join(linhas)
+
+
+def formatar_ass(cues, estilo=None, largura=1080, altura=1920, familia="Arial"):
+    estilo = {**ESTILO_PADRAO, **(estilo or {})}
+    escala = altura / ALTURA_REFERENCIA  # 1:1 e 16:9: a mesma legenda, proporcional à altura
+    cabecalho = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {largura}",
+        f"PlayResY: {altura}",
+        "WrapStyle: 0",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{familia},{int(estilo['tamanho'] * escala)},{_cor_ass(estilo['cor'])},&H000000FF,"
+        f"{_cor_ass(estilo['cor_contorno'])},&H64000000,-1,0,0,0,100,100,0,0,1,{int(estilo['contorno'] * escala)},0,"
+        f"2,60,60,{int(estilo['margem_inferior'] * escala)},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    eventos = [
+        f"Dialogue: 0,{_tempo_ass(c['inicio'])},{_tempo_ass(c['fim'])},Default,,0,0,0,,"
+        + c["texto"].replace("{", "(").replace("}", ")")
+        for c in cues
+    ]
+    return "\n".join(cabecalho + eventos) + "\n"
+
+
+def salvar_legendas(cues, caminho_base, estilo=None, caminho_fonte=None):
+    """Grava '<base>.srt' e '<base>.ass'. Retorna (caminho_srt, caminho_ass)."""
+    os.makedirs(os.path.dirname(caminho_base), exist_ok=True)
+    caminho_srt = caminho_base + ".srt"
+    caminho_ass = caminho_base + ".ass"
+    with open(caminho_srt, "w", encoding="utf-8") as f:
+        f.write(formatar_srt(cues))
+    salvar_ass(cues, caminho_ass, estilo, caminho_fonte)
+    return caminho_srt, caminho_ass
+
+
+def salvar_ass(cues, caminho, estilo=None, caminho_fonte=None, largura=1080, altura=1920):
+    """Grava só o '.ass' (ex.: para outro formato de vídeo). Retorna o caminho."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(formatar_ass(cues, estilo, largura, altura, familia=nome_familia_fonte(caminho_fonte)))
+    return caminho
@@ -0,0 +1,60 @@
+import time
+import threading
+
+# ---------------------------------------------------------------------
+# Limite de taxa por provedor (token bucket)
+# ---------------------------------------------------------------------
+
+class TokenBucket:
+    """
+    Balde de fichas thread-safe: `taxa` fichas por segundo, até `capacidade`
+    acumuladas. `adquirir()` bloqueia até haver ficha disponível.
+    """
+
+    def __init__(self, taxa, capacidade=1):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self.fichas = float(capacidade)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.ultimo) * self.taxa)
+        self.ultimo = agora
+
+    def tentar(self, n=1):
+        """Consome `n` fichas se houver; não bloqueia."""
+        with self.lock:
+            self._repor()
+            if self.fichas >= n:
+                self.fichas -= n
+                return True
+            return False
+
+    def adquirir(self, n=1, timeout=None):
+        """Bloqueia até consumir `n` fichas. Retorna False se estourar o timeout."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._repor()
+                if self.fichas >= n:
+                    self.fichas -= n
+                    return True
+                espera = (n - self.fichas) / self.taxa
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            time.sleep(espera)
+
+
+def por_minuto(requisicoes, rajada=1):
+    """Atalho: TokenBucket com `requisicoes` por minuto."""
+    return TokenBucket(requisicoes / 60.0, rajada)
+
+
+# Limites padrão por provedor (planos gratuitos)
+LIMITES = {
+    "groq": por_minuto(30, rajada=4),
+    "pollinations": por_minuto(12, rajada=2),
+    "google": por_minuto(10, rajada=2),
+}
@@ -0,0 +1,147 @@
+from modules import database as db
+from modules import avisos
+from modules import rastreio
+
+BASE_URL = "https://liturgia.up.railway.app/v2/"
+
+
+def formatar_referencia(ref_raw, tipo):
+    """Limpa e padroniza a referência bíblica."""
+    if not ref_raw:
+        return tipo
+    return ref_raw.strip()
+
+
+def selecionar_leituras(leituras, filtros, todas_formas=False):
+    """Leituras cujo tipo começa com um dos filtros (só a 1ª opção de cada, por padrão)."""
+    escolhidas = []
+    for filtro in filtros:
+        achadas = [l for l in leituras if l['tipo'].lower().startswith(filtro.lower())]
+        escolhidas.extend(achadas if todas_formas else achadas[:1])
+    return escolhidas
+
+
+def texto_leitura(data_str, leitura):
+    """Texto da leitura, lendo do banco só se ele ainda não foi carregado."""
+    if 'texto' not in leitura:
+        leitura['texto'] = db.carregar_texto_leitura(data_str, leitura['tipo'])
+    return leitura['texto']
+
+
+@rastreio.medido("liturgia.buscar")
+def fetch_liturgia(date_obj, notificar=avisos.console, textos=True):
+    """
+    Busca a liturgia na API V2 (Railway) respeitando a estrutura de Arrays e Extras.
+    Com `textos=False`, um dia já em cache volta sem o 'texto' das leituras
+    (ver `texto_leitura`).
+    """
+    # 1. Verifica Cache Local
+    date_str_db = date_obj.strftime('%Y-%m-%d')
+    cached = db.carregar_liturgia(date_str_db, textos=textos)
+    rastreio.anotar(data=date_str_db, cache=bool(cached))
+    if cached:
+        return cached
+
+    # 2. Requisição para API V2 (o `requests` só é importado quando o cache falha)
+    import requests
+
+    params = {
+        "dia": date_obj.day,
+        "mes": date_obj.month,
+        "ano": date_obj.year
+    }
+
+    try:
+        response = requests.get(BASE_URL, params=params, timeout=15)
+        rastreio.contar(entrada=len(response.content))
+        
+        if response.status_code == 404:
+            notificar("aviso", "Liturgia não encontrada para esta data.")
+            return None
+            
+        response.raise_for_status()
+        data = response.json()
+
+        # Extração de Metadados
+        cor_liturgica = data.get('cor', 'Verde')
+        nome_dia = data.get('liturgia', data.get('dia', 'Dia Litúrgico'))
+        
+        # Lista final de leituras
+        leituras_formatadas = []
+        
+        obj_leituras = data.get('leituras', {})
+
+        # --- Lógica de Processamento da V2 ---
+        
+        def processar_secao(chave_json, titulo_padrao):
+            itens = obj_leituras.get(chave_json, [])
+            if not itens: return
+            if isinstance(itens, dict): itens = [itens]
+            
+            for i, item in enumerate(itens):
+                tipo_leitura = item.get('tipo', titulo_padrao)
+                
+                # Tratamento para múltiplas opções
+                if len(itens) > 1 and chave_json not in ['extras']:
+                    ref = item.get('referencia', '')
+                    if "Breve" in ref or "Breve" in item.get('titulo', ''):
+                        sufixo = " (Forma Breve)"
+                    elif "Longa" in ref or "Longa" in item.get('titulo', ''):
+                        sufixo = " (Forma Longa)"
+                    else:
+                        sufixo = f" (Opção {i+1})"
+                    tipo_leitura += sufixo
+
+                ref_bruta = item.get('referencia', '')
+                texto = item.get('texto', '')
+                titulo_texto = item.get('titulo', '')
+
+                if chave_json == 'salmo':
+                    tipo_leitura = "Salmo Responsorial"
+                    refrao = item.get('refrao', '')
+                    if refrao:
+                        texto = f"Refrão: {refrao}\n\n{texto}"
+
+                if texto:
+                    leituras_formatadas.append({
+                        'tipo': tipo_leitura,
+                        'titulo': titulo_texto if titulo_texto else tipo_leitura,
+                        'ref': formatar_referencia(ref_bruta, tipo_leitura),
+                        'texto': texto
+                    })
+
+        processar_secao('primeiraLeitura', 'Primeira Leitura')
+        processar_secao('salmo', 'Salmo Responsorial')
+        processar_secao('segundaLeitura', 'Segunda Leitura')
+        processar_secao('evangelho', 'Evangelho')
+        
+        itens_extras = obj_leituras.get('extras', [])
+        for item in itens_extras:
+            tipo = item.get('tipo', item.get('titulo', 'Leitura Extra'))
+            ref = item.get('referencia', '')
+            texto = item.get('texto', '')
+            titulo_texto = item.get('titulo', '')
+            if texto:
+                leituras_formatadas.append({
+                    'tipo': tipo,
+                    'titulo': titulo_texto,
+                    'ref': formatar_referencia(ref, tipo),
+                    'texto': texto
+                })
+
+        if not leituras_formatadas:
+            return None
+
+        final_data = {
+            'data': date_str_db,
+            'nome_dia': nome_dia,
+            'cor': cor_liturgica,
+            'leituras': leituras_formatadas
+        }
+        
+        db.salvar_liturgia(date_str_db, final_data)
+        return final_data
+
+    except Exception as e:
+        notificar("erro", f"Erro de conexão: {e}")
+        return None
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+
+from modules import avisos
+from modules import rastreio
+from modules import midia
+from modules import trilha
+
+# ---------------------------------------------------------------------
+# Masterização da narração: loudness (EBU R128) e armazenamento compacto
+# ---------------------------------------------------------------------
+# Depois da síntese, o WAV do Piper é medido (loudnorm, 1ª passada, só
+# decodifica) e normalizado com ganho linear numa única codificação que
+# grava duas saídas: o arquivo de guarda (FLAC sem perdas ou Opus) e a
+# faixa AAC pronta para o render, que os vídeos copiam sem recodificar.
+# O WAV original é apagado: os dois juntos ocupam menos que ele.
+
+ALVO_LUFS = -14.0        # loudness integrada (a referência do YouTube)
+PICO_MAXIMO_DBTP = -1.5  # true peak máximo depois do ganho
+LRA_MAXIMA = 11.0
+
+FORMATOS_ARQUIVO = {
+    "flac": {"extensao": ".flac", "args": ["-c:a", "flac", "-compression_level", "8"]},
+    "opus": {"extensao": ".opus", "args": ["-c:a", "libopus", "-b:a", "48k", "-ar", "48000"]},
+}
+FORMATO_ARQUIVO = "flac"
+ARGS_AAC = ["-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart"]
+EXTENSAO_AAC = ".m4a"  # o render copia (sem recodificar) o áudio com esta extensão
+
+
+def _filtro_loudnorm(**extra):
+    opcoes = {"I": ALVO_LUFS, "TP": PICO_MAXIMO_DBTP, "LRA": LRA_MAXIMA, "print_format": "json", **extra}
+    return "loudnorm=" + ":".join(f"{k}={v}" for k, v in opcoes.items())
+
+
+def _json_loudnorm(stderr):
+    """O relatório JSON que o loudnorm imprime no fim do stderr."""
+    inicio, fim = stderr.rfind("{"), stderr.rfind("}")
+    if inicio < 0 or fim < inicio:
+        return None
+    try:
+        return json.loads(stderr[inicio:fim + 1])
+    except ValueError:
+        return None
+
+
+def medir_loudness(caminho):
+    """Medidas EBU R128 do arquivo (input_i, input_tp, input_lra, input_thresh, target_offset), ou None."""
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-i", caminho, "-af", _filtro_loudnorm(), "-f", "null", "-"]
+    with rastreio.trecho("ffmpeg.loudnorm_medir"):
+        processo = rastreio.executar(cmd, text=True)
+    if processo.returncode != 0:
+        return None
+    return _json_loudnorm(processo.stderr)
+
+
+@rastreio.medido("audio.masterizar")
+def masterizar(caminho_wav, formato=None, manter_wav=False):
+    """
+    Normaliza a narração e grava '<base>.flac' (ou '.opus') e '<base>.m4a'.
+    Retorna (True, info) ou (False, mensagem); em caso de falha o WAV fica
+    intacto e continua utilizável. `info` traz os caminhos ('arquivo',
+    'aac'), a loudness antes e depois, o pico final e os bytes de cada um.
+    """
+    formato = formato or FORMATO_ARQUIVO
+    base = os.path.splitext(caminho_wav)[0]
+    caminho_arquivo = base + FORMATOS_ARQUIVO[formato]["extensao"]
+    caminho_aac = base + EXTENSAO_AAC
+    inicio = time.perf_counter()
+
+    try:
+        origem = midia.sondar(caminho_wav)
+        medidas = medir_loudness(caminho_wav)
+    except (midia.ErroMidia, OSError) as e:
+        return False, f"Masterização indisponível: {e}"
+    if not medidas:
+        return False, "Masterização indisponível: falha ao medir a loudness."
+
+    # 2ª passada: ganho linear com as medidas (sem compressão dinâmica na fala)
+    # e o loudnorm trabalha a 192 kHz: volta à taxa original antes de dividir
+    filtro = (
+        "[0:a]" + _filtro_loudnorm(
+            measured_I=medidas["input_i"], measured_TP=medidas["input_tp"], measured_LRA=medidas["input_lra"],
+            measured_thresh=medidas["input_thresh"], offset=medidas["target_offset"], linear="true",
+        ) + f",aresample={origem['taxa_amostragem']},asplit=2[guarda][render]"
+    )
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-nostats", "-i", caminho_wav, "-filter_complex", filtro,
+           "-map", "[guarda]", *FORMATOS_ARQUIVO[formato]["args"], caminho_arquivo,
+           "-map", "[render]", *ARGS_AAC, caminho_aac]
+    with rastreio.trecho("ffmpeg.loudnorm", formato=formato):
+        processo = rastreio.executar(cmd, text=True)
+        rastreio.contar(entrada=rastreio.tamanho(caminho_wav), saida=rastreio.tamanho(caminho_arquivo, caminho_aac))
+    if processo.returncode != 0:
+        return False, f"Erro FFmpeg (masterização): {processo.stderr[-500:]}"
+
+    depois = _json_loudnorm(processo.stderr) or {}
+    info = {
+        "arquivo": caminho_arquivo,
+        "aac": caminho_aac,
+        "formato": formato,
+        "lufs_antes": float(medidas["input_i"]),
+        "lufs_depois": float(depois.get("output_i", ALVO_LUFS)),
+        "pico_dbtp_depois": float(depois.get("output_tp", PICO_MAXIMO_DBTP)),
+        "bytes_wav": os.path.getsize(caminho_wav),
+        "bytes_arquivo": os.path.getsize(caminho_arquivo),
+        "bytes_aac": os.path.getsize(caminho_aac),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+    # Mesma duração do WAV: o render não precisa sondar os arquivos novos
+    for caminho in (caminho_arquivo, caminho_aac):
+        midia.registrar(caminho, {"tipo": "audio", "formato": os.path.splitext(caminho)[1][1:],
+                                  "duracao_s": origem["duracao_s"], "canais": origem["canais"]})
+    rastreio.anotar(lufs_antes=info["lufs_antes"], lufs_depois=info["lufs_depois"])
+    if not manter_wav:
+        os.remove(caminho_wav)
+    return True, info
+
+
+def processar(progresso, caminho_wav, notificar=avisos.console):
+    """
+    Masteriza a narração recém-sintetizada e aponta o progresso para os
+    arquivos novos ('audio_path' = guarda, 'audio_aac', 'audio_master'). Se
+    falhar (ex.: sem FFmpeg), avisa e segue com o WAV. Antes, enquanto o WAV
+    existe, grava o envelope de ducking da trilha ('audio_ducking').
+    Retorna True se masterizou.
+    """
+    progresso['audio_path'] = caminho_wav
+    progresso.pop('audio_aac', None)  # a faixa de uma narração anterior não vale mais
+    progresso.pop('audio_master', None)
+    try:
+        progresso['audio_ducking'] = trilha.salvar_envelope(caminho_wav)
+    except (midia.ErroMidia, OSError, ValueError) as e:
+        progresso.pop('audio_ducking', None)
+        notificar("aviso", f"Envelope da trilha não calculado: {e}")
+    sucesso, resultado = masterizar(caminho_wav)
+    if not sucesso:
+        notificar("aviso", f"{resultado} O áudio segue em WAV, sem normalização.")
+        return False
+    progresso['audio_path'] = resultado["arquivo"]
+    progresso['audio_aac'] = resultado["aac"]
+    progresso['audio_master'] = {k: v for k, v in resultado.items() if k not in ("arquivo", "aac")}
+    return True
+
+
+def faixa_render(progresso):
+    """Áudio a entregar ao render: a faixa AAC em cache, se existir; senão o da narração."""
+    aac = progresso.get('audio_aac')
+    if aac and os.path.exists(aac):
+        return aac
+    return progresso.get('audio_path', '')
@@ -0,0 +1,285 @@
+import json
+import datetime
+import threading
+
+from modules import database as db
+
+# ---------------------------------------------------------------------
+# Consultas do dashboard (DataFrames agregados no SQLite, em cache)
+# ---------------------------------------------------------------------
+# As somas e médias saem prontas do SQL; o pandas só recebe o resultado
+# (uma linha por vídeo ou por dia). Nada aqui varre `metricas_diarias`
+# inteira: o resumo por vídeo soma os meses de `metricas_video_mes` (mais os
+# dias do mês em que o período começa) e a série do canal lê os totais por
+# dia de `metricas_rollup`. Cada DataFrame fica em cache até a próxima
+# escrita no banco (db.versao_metricas muda), inclusive escritas feitas por
+# outro processo, como a importação em lote.
+
+PERIODOS = {"Últimos 30 dias": 30, "Últimos 90 dias": 90, "Último ano": 365, "Tudo": None}
+
+# CTR médio ponderado pelas views dos dias que têm CTR
+_AGREGADOS = '''
+    SUM(views) AS views,
+    SUM(watch_time_min) AS watch_time_min,
+    SUM(ctr * views) / NULLIF(SUM(CASE WHEN ctr IS NOT NULL THEN views END), 0) AS ctr,
+    SUM(likes) AS likes,
+    SUM(comentarios) AS comentarios
+'''
+
+# O mesmo, sobre colunas já somadas (ctr_views = Σ ctr·views; views_ctr = Σ views com CTR)
+_AGREGADOS_SOMADOS = '''
+    SUM(views) AS views,
+    SUM(watch_time_min) AS watch_time_min,
+    SUM(ctr_views) / NULLIF(SUM(views_ctr), 0) AS ctr,
+    SUM(likes) AS likes,
+    SUM(comentarios) AS comentarios
+'''
+
+# Métricas do período por vídeo. Parâmetros: primeiro mês inteiro, e o
+# trecho [início, primeiro mês inteiro) lido dia a dia do índice por data.
+_SQL_POR_VIDEO = f'''
+    SELECT chave_id, {_AGREGADOS_SOMADOS}
+    FROM (
+        SELECT chave_id, views, watch_time_min, ctr_views, views_ctr, likes, comentarios
+        FROM metricas_video_mes
+        WHERE mes >= ?
+        UNION ALL
+        SELECT chave_id, COALESCE(views, 0), COALESCE(watch_time_min, 0), COALESCE(ctr * views, 0),
+               CASE WHEN ctr IS NOT NULL THEN COALESCE(views, 0) ELSE 0 END, COALESCE(likes, 0),
+               COALESCE(comentarios, 0)
+        FROM metricas_diarias INDEXED BY idx_metricas_data
+        WHERE data >= ? AND data < ?
+    )
+    GROUP BY chave_id
+'''
+
+# ultima_data: busca pela chave primária (chave_id, data), uma por vídeo
+SQL_RESUMO = f'''
+    SELECT p.chave_id, p.data_ref, p.tipo_leitura AS tipo, p.etapa_atual,
+           v.titulo, v.youtube_url, v.privacidade, v.publicado_em,
+           (COALESCE(p.etapa_atual, 0) >= 7 OR v.publicado_em IS NOT NULL) AS publicado,
+           COALESCE(m.views, 0) AS views, COALESCE(m.watch_time_min, 0) AS watch_time_min,
+           COALESCE(m.ctr, 0) AS ctr, COALESCE(m.likes, 0) AS likes,
+           COALESCE(m.comentarios, 0) AS comentarios,
+           (SELECT MAX(d.data) FROM metricas_diarias d WHERE d.chave_id = p.chave_id AND d.data >= ?) AS ultima_data
+    FROM producao_status p
+    LEFT JOIN videos_publicados v ON v.chave_id = p.chave_id
+    LEFT JOIN ({_SQL_POR_VIDEO}) m ON m.chave_id = p.chave_id
+    ORDER BY p.data_ref DESC, p.chave_id
+'''
+
+SQL_SERIE = f'''
+    SELECT data, {_AGREGADOS}
+    FROM metricas_diarias
+    WHERE data >= ? AND chave_id = ?
+    GROUP BY data
+    ORDER BY data
+'''
+
+# Canal todo: os totais por dia já somados em metricas_rollup
+SQL_SERIE_CANAL = f'''
+    SELECT periodo AS data, {_AGREGADOS_SOMADOS}
+    FROM metricas_rollup
+    WHERE granularidade = 'dia' AND periodo >= ?
+    GROUP BY periodo
+    ORDER BY periodo
+'''
+
+_cache = {}
+_versao_cache = None
+_lock = threading.Lock()
+
+
+def desde(dias):
+    """Data inicial (AAAA-MM-DD) de um período em dias; None = desde sempre."""
+    if not dias:
+        return "0000-00-00"
+    return (datetime.date.today() - datetime.timedelta(days=dias - 1)).isoformat()
+
+
+def _consultar(sql, params, datas=()):
+    """DataFrame da consulta, relido só se o banco mudou desde a última vez."""
+    global _versao_cache
+    import pandas as pd  # adiado: só quem consulta métricas paga o import
+
+    versao = db.versao_metricas()
+    chave = (db.DB_FILE, sql, params)
+    with _lock:
+        if versao != _versao_cache:
+            _cache.clear()
+            _versao_cache = versao
+        if chave in _cache:
+            return _cache[chave]
+
+    conn = db.get_connection()
+    try:
+        df = pd.read_sql_query(sql, conn, params=params, parse_dates=list(datas))
+    finally:
+        conn.close()
+    with _lock:
+        if versao == _versao_cache:
+            _cache[chave] = df
+    return df
+
+
+def _params_por_video(dias):
+    """Parâmetros de _SQL_POR_VIDEO: (primeiro mês inteiro, início, primeiro mês inteiro)."""
+    inicio = desde(dias)
+    if not dias or inicio.endswith("-01"):
+        return inicio, inicio, inicio  # começa num mês inteiro: nenhum dia avulso
+    d = datetime.date.fromisoformat(inicio)
+    mes_seguinte = (d.replace(day=28) + datetime.timedelta(days=4)).replace(day=1).isoformat()
+    return mes_seguinte, inicio, mes_seguinte
+
+
+def resumo_videos(dias=None):
+    """
+    Uma linha por produção: dados de publicação e as métricas somadas no
+    período. O DataFrame é compartilhado pelo cache: não altere no lugar.
+    """
+    return _consultar(SQL_RESUMO, (desde(dias), *_params_por_video(dias)))
+
+
+def serie_diaria(chave_id=None, dias=None):
+    """Métricas por dia (de um vídeo ou do canal todo), com `data` como datetime."""
+    if chave_id:
+        return _consultar(SQL_SERIE, (desde(dias), chave_id), datas=["data"])
+    return _consultar(SQL_SERIE_CANAL, (desde(dias),), datas=["data"])
+
+
+# ---------------------------------------------------------------------
+# Tendências (agregados por dia/semana/mês) e atributos de produção
+# ---------------------------------------------------------------------
+# As séries por período saem de `metricas_rollup`, que o banco mantém a cada
+# gravação de métricas: a consulta lê só as linhas dos períodos pedidos, sem
+# tocar em metricas_diarias.
+
+GRANULARIDADES = {"Dia": "dia", "Semana": "semana", "Mês": "mes"}
+DIMENSOES = {"Tipo de leitura": "tipo", "Cor litúrgica": "cor", "Perfil de renderização": "perfil_render"}
+
+SQL_TENDENCIA = '''
+    SELECT periodo, {dimensao} AS grupo,
+           SUM(views) AS views,
+           SUM(watch_time_min) AS watch_time_min,
+           SUM(ctr_views) / NULLIF(SUM(views_ctr), 0) AS ctr
+    FROM metricas_rollup
+    WHERE granularidade = ? AND periodo >= ?
+    GROUP BY periodo, grupo
+    ORDER BY periodo, grupo
+'''
+
+# Uma linha por vídeo com atributos registrados: métricas do período + atributos
+SQL_ATRIBUTOS = f'''
+    SELECT p.chave_id, p.tipo_leitura AS tipo, a.cor, a.perfil_render, a.provedor_imagem,
+           a.duracao_narracao_s, a.palavras_roteiro,
+           m.views, m.watch_time_min, m.ctr
+    FROM videos_atributos a
+    JOIN producao_status p ON p.chave_id = a.chave_id
+    JOIN ({_SQL_POR_VIDEO}) m ON m.chave_id = a.chave_id
+'''
+
+ATRIBUTOS_NUMERICOS = ["duracao_narracao_s", "palavras_roteiro"]
+RESULTADOS = ["views", "watch_time_min", "ctr"]
+
+
+def inicio_periodo(data, granularidade):
+    """Primeiro dia (AAAA-MM-DD) do período que contém `data`, como no banco."""
+    d = datetime.date.fromisoformat(data)
+    if granularidade == "semana":
+        d -= datetime.timedelta(days=d.weekday())
+    elif granularidade == "mes":
+        d = d.replace(day=1)
+    return d.isoformat()
+
+
+def tendencias(granularidade="semana", dimensao="tipo", dias=None):
+    """
+    Views, watch time e CTR por período (`periodo` como datetime) e por grupo
+    da dimensão (tipo de leitura, cor litúrgica ou perfil de renderização).
+    O primeiro período entra inteiro, mesmo que comece antes de `dias`.
+    """
+    if granularidade not in GRANULARIDADES.values() or dimensao not in DIMENSOES.values():
+        raise ValueError(f"Granularidade/dimensão inválida: {granularidade}/{dimensao}")
+    inicio = inicio_periodo(desde(dias), granularidade) if dias else desde(None)
+    return _consultar(SQL_TENDENCIA.format(dimensao=dimensao), (granularidade, inicio), datas=["periodo"])
+
+
+def videos_com_atributos(dias=None):
+    """Métricas do período por vídeo, ao lado dos atributos de produção dele."""
+    return _consultar(SQL_ATRIBUTOS, _params_por_video(dias))
+
+
+def correlacoes(df, metodo="spearman"):
+    """
+    Correlação (por postos, por padrão: robusta a vídeos virais) entre os
+    atributos numéricos de produção e os resultados. Linhas = atributos.
+    """
+    colunas = ATRIBUTOS_NUMERICOS + RESULTADOS
+    matriz = df[colunas].astype(float).corr(method=metodo, min_periods=3)
+    return matriz.loc[ATRIBUTOS_NUMERICOS, RESULTADOS]
+
+
+def perfil_render(progresso):
+    """Rótulo curto das opções de renderização usadas no vídeo."""
+    partes = []
+    overlay_cfg = progresso.get('overlay_dados')
+    if overlay_cfg:
+        partes.append("overlay")
+        if overlay_cfg.get('visualizer'):
+            partes.append("visualizer")
+    if progresso.get('legendas_ass'):
+        partes.append("legendas")
+    return "+".join(partes) or "simples"
+
+
+def atributos_producao(progresso, data_ref, cor=None):
+    """Atributos de uma produção para db.registrar_atributos (a partir do progresso salvo)."""
+    if cor is None:
+        liturgia = db.carregar_liturgia(data_ref, textos=False) or {}
+        cor = liturgia.get('cor')
+    segmentos = progresso.get('legendas_segmentos') or []
+    palavras = len(progresso.get('texto_roteiro_completo', '').split())
+    return {
+        "cor": cor or None,
+        "perfil_render": perfil_render(progresso) if progresso.get('video') else None,
+        "provedor_imagem": progresso.get('imagens_provedor'),
+        "duracao_narracao_s": segmentos[-1]['fim'] if segmentos else None,
+        "palavras_roteiro": palavras or None,
+    }
+
+
+def atualizar_atributos(chaves=None):
+    """
+    Recalcula os atributos das produções (todas, ou só `chaves`) a partir do
+    progresso salvo e grava os que mudaram. Retorna quantas foram gravadas.
+    """
+    registrados = db.carregar_atributos()
+    sql = 'SELECT chave_id, data_ref, progresso_json FROM producao_status'
+    conn = db.get_connection()
+    try:
+        if chaves is None:
+            linhas = conn.execute(sql).fetchall()
+        else:
+            chaves = list(chaves)
+            linhas = []
+            for i in range(0, len(chaves), 500):  # limite de parâmetros do SQLite
+                parte = chaves[i:i + 500]
+                linhas += conn.execute(f'{sql} WHERE chave_id IN ({", ".join("?" * len(parte))})', parte).fetchall()
+    finally:
+        conn.close()
+
+    cores = {}  # várias leituras por dia: uma consulta da liturgia por data
+    gravadas = 0
+    conn = db.get_connection()
+    try:
+        for chave, data_ref, progresso_json in linhas:
+            if data_ref not in cores:
+                cores[data_ref] = (db.carregar_liturgia(data_ref, textos=False) or {}).get('cor') or ''
+            atributos = atributos_producao(json.loads(progresso_json or "{}"), data_ref, cores[data_ref])
+            if registrados.get(chave) != atributos:
+                db.registrar_atributos(chave, atributos, conn=conn)
+                gravadas += 1
+        conn.commit()
+    finally:
+        conn.close()
+    return gravadas
@@ -0,0 +1,273 @@
+import os
+import json
+import struct
+import threading
+
+from modules import database as db
+from modules import rastreio
+
+# ---------------------------------------------------------------------
+# Metadados de mídia (duração, taxa, canais, dimensões) com cache
+# ---------------------------------------------------------------------
+# WAV, FLAC, PNG, JPEG, WebP e GIF são lidos pelo cabeçalho, em Python; outros
+# formatos passam pelo ffprobe. O resultado fica em memória e no SQLite
+# (`midia_info`), valendo enquanto o arquivo tiver o mesmo mtime e tamanho:
+# sondar os ativos de uma produção já vista é só `os.stat` e consultas a um
+# dicionário.
+
+LEITURA_CABECALHO = 64 * 1024  # o suficiente para o cabeçalho de quase tudo
+
+# caminho absoluto -> (mtime_ns, tamanho, info)
+_memoria = {}
+_lock = threading.Lock()
+
+
+class ErroMidia(Exception):
+    """Arquivo ausente, corrompido ou de formato que não pôde ser lido."""
+
+
+# --- Leitores nativos --------------------------------------------------
+
+def _wav(f, tamanho):
+    riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        return None  # RIFX, RF64...: fica para o ffprobe
+    fmt = None
+    while True:
+        cab = f.read(8)
+        if len(cab) < 8:
+            raise ErroMidia("WAV sem bloco 'data'")
+        nome, n = struct.unpack("<4sI", cab)
+        if nome == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(n - 16 + (n & 1), os.SEEK_CUR)
+        elif nome == b"data":
+            if not fmt:
+                raise ErroMidia("WAV sem bloco 'fmt ' antes dos dados")
+            _, canais, taxa, _, alinhamento, bits = fmt
+            # Gravações interrompidas deixam o tamanho 0 ou 0xFFFFFFFF: vale o que há no disco
+            dados = min(n, tamanho - f.tell()) if n else tamanho - f.tell()
+            if not (taxa and alinhamento):
+                raise ErroMidia("WAV com taxa ou alinhamento zerado")
+            return {"tipo": "audio", "formato": "wav", "duracao_s": dados // alinhamento / taxa,
+                    "taxa_amostragem": taxa, "canais": canais, "bits": bits}
+        else:
+            f.seek(n + (n & 1), os.SEEK_CUR)
+
+
+def _flac(dados):
+    if dados[4] & 0x7F != 0:
+        raise ErroMidia("FLAC sem STREAMINFO")
+    taxa = int.from_bytes(dados[18:21], "big") >> 4
+    canais = ((dados[20] >> 1) & 0x7) + 1
+    bits = (((dados[20] & 1) << 4) | (dados[21] >> 4)) + 1
+    amostras = ((dados[21] & 0x0F) << 32) | int.from_bytes(dados[22:26], "big")
+    if not taxa:
+        raise ErroMidia("FLAC com taxa zerada")
+    return {"tipo": "audio", "formato": "flac", "duracao_s": amostras / taxa,
+            "taxa_amostragem": taxa, "canais": canais, "bits": bits}
+
+
+def _png(dados):
+    if dados[12:16] != b"IHDR":
+        raise ErroMidia("PNG sem IHDR")
+    largura, altura = struct.unpack(">II", dados[16:24])
+    return {"tipo": "imagem", "formato": "png", "largura": largura, "altura": altura}
+
+
+def _jpeg(f):
+    f.seek(2)
+    while True:
+        marca = f.read(2)
+        if len(marca) < 2 or marca[0] != 0xFF:
+            raise ErroMidia("JPEG sem quadro (SOF)")
+        tipo = marca[1]
+        if tipo == 0xFF:  # preenchimento entre marcadores
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if tipo in (0x01, *range(0xD0, 0xD8)):  # marcadores sem tamanho
+            continue
+        n = struct.unpack(">H", f.read(2))[0]
+        if 0xC0 <= tipo <= 0xCF and tipo not in (0xC4, 0xC8, 0xCC):
+            altura, largura = struct.unpack(">xHH", f.read(5))
+            return {"tipo": "imagem", "formato": "jpeg", "largura": largura, "altura": altura}
+        f.seek(n - 2, os.SEEK_CUR)
+
+
+def _webp(dados):
+    bloco = dados[12:16]
+    if bloco == b"VP8 ":
+        largura, altura = struct.unpack("<HH", dados[26:30])
+        largura, altura = largura & 0x3FFF, altura & 0x3FFF
+    elif bloco == b"VP8L":
+        b = int.from_bytes(dados[21:25], "little")
+        largura, altura = (b & 0x3FFF) + 1, ((b >> 14) & 0x3FFF) + 1
+    elif bloco == b"VP8X":
+        largura = int.from_bytes(dados[24:27], "little") + 1
+        altura = int.from_bytes(dados[27:30], "little") + 1
+    else:
+        raise ErroMidia(f"WebP com bloco desconhecido {bloco!r}")
+    return {"tipo": "imagem", "formato": "webp", "largura": largura, "altura": altura}
+
+
+def _nativo(caminho, tamanho):
+    """Metadados lidos do cabeçalho, ou None se o formato não é um dos nativos."""
+    with open(caminho, "rb") as f:
+        dados = f.read(LEITURA_CABECALHO)
+        f.seek(0)
+        try:
+            if dados[:4] == b"RIFF" and dados[8:12] == b"WAVE":
+                return _wav(f, tamanho)
+            if dados[:4] == b"fLaC":
+                return _flac(dados)
+            if dados[:8] == b"\x89PNG\r\n\x1a\n":
+                return _png(dados)
+            if dados[:3] == b"\xff\xd8\xff":
+                return _jpeg(f)
+            if dados[:4] == b"RIFF" and dados[8:12] == b"WEBP":
+                return _webp(dados)
+            if dados[:6] in (b"GIF87a", b"GIF89a"):
+                largura, altura = struct.unpack("<HH", dados[6:10])
+                return {"tipo": "imagem", "formato": "gif", "largura": largura, "altura": altura}
+        except struct.error:
+            raise ErroMidia("cabeçalho truncado")
+    return None
+
+
+@rastreio.medido("ffprobe")
+def _ffprobe(caminho):
+    cmd = ["ffprobe", "-v", "error", "-of", "json",
+           "-show_entries", "format=format_name,duration:stream=codec_type,codec_name,width,height,sample_rate,channels",
+           caminho]
+    try:
+        processo = rastreio.executar(cmd, text=True)
+    except FileNotFoundError:
+        raise ErroMidia("formato não suportado nativamente e ffprobe não encontrado")
+    if processo.returncode != 0:
+        raise ErroMidia(f"ffprobe: {processo.stderr.strip()[:200]}")
+    dados = json.loads(processo.stdout or "{}")
+    formato = dados.get("format", {})
+    streams = dados.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if not (video or audio):
+        raise ErroMidia("nenhum fluxo de áudio ou vídeo")
+
+    info = {"formato": formato.get("format_name", "")}
+    if formato.get("duration") not in (None, "N/A"):
+        info["duracao_s"] = float(formato["duration"])
+    if audio:
+        info.update(taxa_amostragem=int(audio.get("sample_rate") or 0), canais=audio.get("channels"))
+    if video:
+        info.update(largura=video.get("width"), altura=video.get("height"))
+        # Imagens passam pelos demuxers "image2" e "*_pipe" (e não têm duração)
+        estatica = "image" in info["formato"] or "_pipe" in info["formato"] or not info.get("duracao_s")
+        info["tipo"] = "imagem" if estatica else "video"
+    else:
+        info["tipo"] = "audio"
+    return info
+
+
+def _sondar_arquivo(caminho, tamanho):
+    return _nativo(caminho, tamanho) or _ffprobe(caminho)
+
+
+# --- API ---------------------------------------------------------------
+
+def _sondar_todos(caminhos):
+    """{caminho: info ou ErroMidia}: memória, depois banco, depois o arquivo."""
+    resultado, atuais = {}, {}
+    for caminho in caminhos:
+        absoluto = os.path.abspath(caminho)
+        try:
+            st = os.stat(absoluto)
+        except OSError:
+            resultado[caminho] = ErroMidia(f"arquivo não encontrado: {caminho}")
+            continue
+        chave = (st.st_mtime_ns, st.st_size)
+        with _lock:
+            em_memoria = _memoria.get(absoluto)
+        if em_memoria and em_memoria[:2] == chave:
+            resultado[caminho] = em_memoria[2]
+        else:
+            atuais[caminho] = (absoluto, chave)
+    if not atuais:
+        return resultado
+
+    with rastreio.trecho("midia.sondar", arquivos=len(atuais)):
+        no_banco = db.carregar_midia(absoluto for absoluto, _ in atuais.values())
+        novos, do_banco = [], 0
+        for caminho, (absoluto, chave) in atuais.items():
+            salvo = no_banco.get(absoluto)
+            if salvo and salvo[:2] == chave:
+                info = salvo[2]
+                do_banco += 1
+            else:
+                try:
+                    info = _sondar_arquivo(absoluto, chave[1])
+                except (ErroMidia, OSError, ValueError) as e:
+                    resultado[caminho] = e if isinstance(e, ErroMidia) else ErroMidia(f"{caminho}: {e}")
+                    continue
+                novos.append((absoluto, *chave, info))
+            with _lock:
+                _memoria[absoluto] = (*chave, info)
+            resultado[caminho] = info
+        rastreio.anotar(do_banco=do_banco, sondados=len(novos))
+        if novos:
+            db.salvar_midia(novos)
+    return resultado
+
+
+def sondar_varios(caminhos):
+    """
+    {caminho: info} para cada caminho; None nos que não puderam ser lidos
+    (o motivo é impresso). `info` tem 'tipo' ('audio', 'imagem', 'video'),
+    'formato' e, conforme o tipo, 'duracao_s', 'taxa_amostragem', 'canais',
+    'bits', 'largura' e 'altura'.
+    """
+    resultado = {}
+    for caminho, info in _sondar_todos(caminhos).items():
+        if isinstance(info, ErroMidia):
+            print(f"Erro ao ler mídia {caminho}: {info}")
+            info = None
+        resultado[caminho] = info
+    return resultado
+
+
+def sondar(caminho):
+    """Metadados de um arquivo (ver `sondar_varios`). Levanta ErroMidia se não puder ler."""
+    info = _sondar_todos([caminho])[caminho]
+    if isinstance(info, ErroMidia):
+        raise info
+    return info
+
+
+def duracao(caminho):
+    """Duração em segundos de um áudio ou vídeo. Levanta ErroMidia se não houver."""
+    segundos = sondar(caminho).get("duracao_s")
+    if not segundos:
+        raise ErroMidia(f"sem duração: {caminho}")
+    return segundos
+
+
+def dimensoes(caminho):
+    """(largura, altura) de uma imagem ou vídeo. Levanta ErroMidia se não houver."""
+    info = sondar(caminho)
+    if not info.get("largura"):
+        raise ErroMidia(f"sem dimensões: {caminho}")
+    return info["largura"], info["altura"]
+
+
+def registrar(caminho, info):
+    """Guarda metadados já conhecidos de um arquivo recém-gravado (evita sondá-lo)."""
+    absoluto = os.path.abspath(caminho)
+    st = os.stat(absoluto)
+    with _lock:
+        _memoria[absoluto] = (st.st_mtime_ns, st.st_size, info)
+    db.salvar_midia([(absoluto, st.st_mtime_ns, st.st_size, info)])
+
+
+def limpar_memoria():
+    """Esquece o cache em memória (o do banco continua valendo)."""
+    with _lock:
+        _memoria.clear()
@@ -0,0 +1,120 @@
+import os
+import random
+import datetime
+
+# Dimensões de referência da prévia (as posições salvas no overlay usam esta escala)
+PREVIEW_W, PREVIEW_H = 540, 960
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts")
+
+
+def caminho_fonte(font_name):
+    """Caminho absoluto da fonte na pasta 'fonts' (None para a fonte padrão)."""
+    if not font_name or font_name == "Arial":
+        return None
+    path = os.path.join(FONTS_DIR, font_name)
+    return path if os.path.exists(path) else None
+
+
+def desenhar_overlay(config, W=PREVIEW_W, H=PREVIEW_H, fundo=(20, 20, 20), visualizer_fake=True):
+    """
+    Desenha os textos do overlay. Com fundo=None a imagem é RGBA transparente,
+    pronta para ser sobreposta pelo FFmpeg no vídeo final.
+    """
+    from PIL import Image, ImageDraw, ImageFont  # adiado: só quem desenha paga o import
+
+    # Mesma disposição da prévia em qualquer formato: posição proporcional à
+    # altura, fonte pela menor das escalas (9:16 é idêntico à prévia)
+    escala = min(W / PREVIEW_W, H / PREVIEW_H)
+    if fundo is None:
+        img = Image.new('RGBA', (W, H), (0, 0, 0, 0))
+    else:
+        img = Image.new('RGB', (W, H), color=fundo)
+    draw = ImageDraw.Draw(img)
+
+    linhas = [l for l in config['textos'] if l]
+    tamanho = int(config['tamanho_fonte'] * escala)
+
+    font_path = caminho_fonte(config['fonte'])
+    try:
+        if font_path:
+            font_obj = ImageFont.truetype(font_path, tamanho)
+        else:
+            font_obj = ImageFont.load_default()
+    except Exception:
+        font_obj = ImageFont.load_default()
+
+    y_start = config['posicao_y'] * H / PREVIEW_H
+    espacamento = tamanho + 15 * escala
+
+    for i, linha in enumerate(linhas):
+        if hasattr(draw, 'textbbox'):
+            bbox = draw.textbbox((0, 0), linha, font=font_obj)
+            text_w = bbox[2] - bbox[0]
+        else:
+            text_w = draw.textlength(linha, font=font_obj)
+
+        x = (W - text_w) / 2
+        y = y_start + (i * espacamento)
+
+        draw.text((x, y), linha, font=font_obj, fill=config['cor_texto'])
+
+    # Na prévia o visualizer é só ilustrativo; no vídeo ele vem do filtro showwaves
+    if config['visualizer'] and visualizer_fake:
+        draw.line((50, H - 200, W - 50, H - 200), fill="white", width=2)
+        for k in range(60, W - 60, 20):
+            h_bar = random.randint(10, 50)
+            draw.line((k, H - 200 - h_bar, k, H - 200 + h_bar), fill="white", width=3)
+
+    return img
+
+
+def salvar_overlay_png(config, caminho, W=1080, H=1920):
+    """Gera o PNG transparente do overlay na resolução final."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    desenhar_overlay(config, W, H, fundo=None, visualizer_fake=False).save(caminho)
+    return caminho
+
+
+# ---------------------------------------------------------------------
+# Padrões do overlay (usados pela página e pela produção em lote)
+# ---------------------------------------------------------------------
+DEFAULTS = {
+    "posicao_y": 150,
+    "tamanho": 40,
+    "fonte": "Arial",
+    "visualizer": True,
+    "cor": "#FFFFFF"
+}
+
+DIAS_SEMANA = {
+    0: "Segunda-feira", 1: "Terça-feira", 2: "Quarta-feira",
+    3: "Quinta-feira", 4: "Sexta-feira", 5: "Sábado", 6: "Domingo"
+}
+
+
+def formatar_data_overlay(data_str):
+    """'2024-05-12' -> 'Domingo, 12.05.2024'."""
+    dt_obj = None
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            dt_obj = datetime.datetime.strptime(data_str, formato)
+            break
+        except (TypeError, ValueError):
+            continue
+    if dt_obj is None:
+        return data_str
+    return f"{DIAS_SEMANA[dt_obj.weekday()]}, {dt_obj.strftime('%d.%m.%Y')}"
+
+
+def config_overlay_padrao(leitura, data_str, defaults=None):
+    """Configuração de overlay equivalente à da página com os valores iniciais."""
+    d = {**DEFAULTS, **(defaults or {})}
+    return {
+        "textos": [leitura['tipo'], formatar_data_overlay(data_str), leitura.get('ref', ''), leitura.get('cor', '')],
+        "fonte": d['fonte'],
+        "tamanho_fonte": d['tamanho'],
+        "posicao_y": d['posicao_y'],
+        "cor_texto": d['cor'],
+        "visualizer": d['visualizer']
+    }
@@ -0,0 +1,10 @@
+"""
+Núcleo compartilhado do pipeline de produção.
+
+`Producao` (estado de uma leitura em produção, com controle de alterações)
+não depende do Streamlit e também é usado no modo sem interface. A parte de
+interface (sessão e barra de navegação) fica em `modules.pipeline.sessao`.
+"""
+from modules.pipeline.producao import Producao, chave_producao
+
+__all__ = ["Producao", "chave_producao"]
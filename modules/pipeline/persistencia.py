@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+from modules import database as db
+from modules import rastreio
+
+# ---------------------------------------------------------------------
+# Gravação adiada (write-behind) do status das produções
+# ---------------------------------------------------------------------
+# Salvar numa página só registra *o que mudou* (as chaves alteradas do
+# progresso) num diário em disco e numa fila em memória; uma thread junta as
+# alterações de cada produção e grava no SQLite depois de um intervalo sem
+# novas mudanças (debounce), numa troca de página ou ao sair do processo.
+# O custo de salvar não depende do tamanho do progresso, só da alteração.
+#
+# O diário (`<banco>.journal`, uma linha JSON por alteração, com fsync) é
+# reaplicado na próxima execução se o processo cair antes da gravação; as
+# alterações são absolutas (valor novo / chave removida), então reaplicar
+# uma já gravada não muda nada.
+
+ATRASO_DEBOUNCE = 0.5   # segundos sem mudança antes de gravar uma produção
+ATRASO_MAXIMO = 3.0     # nenhuma alteração espera mais que isto na memória
+
+
+def _mesclar(item, alterados, removidos):
+    """Aplica uma alteração sobre as pendentes da mesma produção (a mais nova vence)."""
+    for k in removidos:
+        item["alterados"].pop(k, None)
+        item["removidos"].add(k)
+    for k, v in alterados.items():
+        item["removidos"].discard(k)
+        item["alterados"][k] = v
+
+
+class GravadorStatus:
+    def __init__(self, caminho_diario, debounce=ATRASO_DEBOUNCE, atraso_maximo=ATRASO_MAXIMO):
+        self.caminho_diario = caminho_diario
+        self.debounce = debounce
+        self.atraso_maximo = atraso_maximo
+        # chave -> {"data_ref", "tipo", "etapa", "alterados": {k: json}, "removidos": set, "primeira", "ultima"}
+        self.pendentes = {}
+        self.lock = threading.Lock()
+        self.gravando = threading.Lock()  # uma descarga por vez (thread ou chamada direta)
+        self.acordar = threading.Event()
+        self.encerrado = False
+
+        self._recuperar_diario()
+        self.diario = open(self.caminho_diario, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._laco, name="status-write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.encerrar)
+
+    # --- lado da página -------------------------------------------------
+
+    def registrar(self, chave, data_ref, tipo, etapa, alterados, removidos=()):
+        """
+        Registra uma alteração. `alterados` mapeia chave do progresso -> valor
+        já serializado em JSON. Retorna depois de gravar no diário (fsync).
+        """
+        linha = ('{"chave": %s, "data_ref": %s, "tipo": %s, "etapa": %d, "removidos": %s, "alterados": {%s}}\n' % (
+            json.dumps(chave, ensure_ascii=False), json.dumps(data_ref), json.dumps(tipo, ensure_ascii=False),
+            etapa, json.dumps(sorted(removidos), ensure_ascii=False),
+            ", ".join(f"{json.dumps(k, ensure_ascii=False)}: {v}" for k, v in alterados.items()),
+        ))
+        agora = time.monotonic()
+        with self.lock:
+            self.diario.write(linha)
+            self.diario.flush()
+            os.fsync(self.diario.fileno())
+
+            item = self.pendentes.setdefault(chave, {
+                "alterados": {}, "removidos": set(), "primeira": agora,
+            })
+            item.update(data_ref=data_ref, tipo=tipo, etapa=etapa, ultima=agora)
+            _mesclar(item, alterados, removidos)
+        self.acordar.set()
+
+    def agendar_descarga(self):
+        """Pede a gravação imediata de tudo (troca de página), sem esperar."""
+        with self.lock:
+            for item in self.pendentes.values():
+                item["primeira"] = item["ultima"] = float("-inf")
+        self.acordar.set()
+
+    def pendente(self, chave):
+        with self.lock:
+            return chave in self.pendentes
+
+    # --- gravação ---------------------------------------------------------
+
+    def _aplicar(self, chave, item):
+        with rastreio.trecho("sqlite.status", rastro=chave, alteradas=len(item["alterados"])):
+            progresso, etapa_db, _ = db.load_status_etapa(chave)
+            for k in item["removidos"]:
+                progresso.pop(k, None)
+            for k, v in item["alterados"].items():
+                progresso[k] = json.loads(v)
+            db.update_status(chave, item["data_ref"], item["tipo"], progresso, item.get("etapa", etapa_db))
+            rastreio.contar(saida=sum(len(v) for v in item["alterados"].values()))  # só o que mudou
+
+    def descarregar(self, chaves=None, forcar=True):
+        """
+        Grava no banco as produções pendentes (todas, ou só `chaves`). Sem
+        `forcar`, respeita o debounce. Quando nada mais fica pendente, o
+        diário é esvaziado.
+        """
+        with self.gravando:
+            agora = time.monotonic()
+            with self.lock:
+                prontos = {
+                    chave: item for chave, item in self.pendentes.items()
+                    if (chaves is None or chave in chaves) and (
+                        forcar or agora - item["ultima"] >= self.debounce
+                        or agora - item["primeira"] >= self.atraso_maximo)
+                }
+                for chave in prontos:
+                    del self.pendentes[chave]
+
+            for chave, item in prontos.items():
+                try:
+                    self._aplicar(chave, item)
+                except Exception as e:
+                    print(f"Erro ao gravar status de {chave}: {e}")
+                    with self.lock:  # devolve para a próxima tentativa, sob as alterações mais novas
+                        novo = self.pendentes.get(chave)
+                        if novo:
+                            _mesclar(item, novo["alterados"], novo["removidos"])
+                            item.update({k: novo[k] for k in ("data_ref", "tipo", "etapa", "ultima")})
+                        self.pendentes[chave] = item
+
+            with self.lock:
+                if not self.pendentes:
+                    self.diario.truncate(0)
+                    self.diario.seek(0)
+            return len(prontos)
+
+    def _laco(self):
+        while not self.encerrado:
+            self.acordar.wait(timeout=self.debounce)
+            self.acordar.clear()
+            if self.pendentes:
+                self.descarregar(forcar=False)
+
+    def encerrar(self):
+        self.encerrado = True
+        self.acordar.set()
+        self.descarregar()
+
+    # --- recuperação -------------------------------------------------------
+
+    def _recuperar_diario(self):
+        """Reaplica no banco as alterações que ficaram só no diário (queda do processo)."""
+        if not os.path.exists(self.caminho_diario):
+            return
+        with open(self.caminho_diario, encoding="utf-8") as f:
+            linhas = f.readlines()
+        for linha in linhas:
+            try:
+                e = json.loads(linha)
+            except ValueError:
+                continue  # última linha incompleta (queda no meio da escrita)
+            item = self.pendentes.setdefault(e["chave"], {"alterados": {}, "removidos": set()})
+            item.update(data_ref=e["data_ref"], tipo=e["tipo"], etapa=e["etapa"])
+            _mesclar(item, {k: json.dumps(v, ensure_ascii=False) for k, v in e["alterados"].items()}, e["removidos"])
+        if self.pendentes:
+            print(f"Recuperando {len(self.pendentes)} status não gravado(s) do diário.")
+        for chave, item in self.pendentes.items():
+            self._aplicar(chave, item)
+        self.pendentes.clear()
+        open(self.caminho_diario, "w").close()
+
+
+_gravadores = {}
+_lock_gravadores = threading.Lock()
+
+
+def gravador():
+    """Gravador do banco atual (um por arquivo de banco, criado sob demanda)."""
+    with _lock_gravadores:
+        if db.DB_FILE not in _gravadores:
+            _gravadores[db.DB_FILE] = GravadorStatus(db.DB_FILE + ".journal")
+        return _gravadores[db.DB_FILE]
@@ -0,0 +1,107 @@
+import json
+
+from modules import database as db
+from modules.pipeline import persistencia
+
+
+def chave_producao(data_str, tipo):
+    """Chave de uma produção em `producao_status` (a mesma em todas as páginas)."""
+    return f"{data_str}-{tipo}"
+
+
+def _serializar(valor):
+    return json.dumps(valor, ensure_ascii=False, sort_keys=True, default=str)
+
+
+class ProgressoRastreado(dict):
+    """
+    O dicionário `progresso`, anotando quais chaves foram atribuídas ou
+    removidas. As páginas sempre trocam o valor inteiro de uma chave
+    (`progresso['prompts_imagem'] = {...}`), então isso basta para saber o
+    que serializar ao salvar sem percorrer o progresso todo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tocadas = set()
+
+    def __setitem__(self, chave, valor):
+        self.tocadas.add(chave)
+        super().__setitem__(chave, valor)
+
+    def __delitem__(self, chave):
+        self.tocadas.add(chave)
+        super().__delitem__(chave)
+
+    def pop(self, chave, *padrao):
+        self.tocadas.add(chave)
+        return super().pop(chave, *padrao)
+
+    def setdefault(self, chave, padrao=None):
+        self.tocadas.add(chave)
+        return super().setdefault(chave, padrao)
+
+    def update(self, *args, **kwargs):
+        novos = dict(*args, **kwargs)
+        self.tocadas.update(novos)
+        super().update(novos)
+
+    def clear(self):
+        self.tocadas.update(self)
+        super().clear()
+
+
+class Producao:
+    """
+    Uma leitura em produção: leitura, data e o dicionário `progresso`.
+
+    O progresso é lido do banco uma vez; as páginas alteram `progresso`
+    direto e chamam `salvar(etapa)`. Só as chaves atribuídas desde a última
+    gravação são serializadas e, se mudaram de fato, seguem para o gravador
+    adiado (modules.pipeline.persistencia), que grava em segundo plano.
+    """
+
+    def __init__(self, leitura, data_str):
+        self.leitura = leitura
+        self.data_str = data_str
+        self.chave = chave_producao(data_str, leitura['tipo'])
+        self.recarregar()
+
+    def recarregar(self):
+        gravador = persistencia.gravador()
+        if gravador.pendente(self.chave):
+            gravador.descarregar([self.chave])  # o banco precisa refletir o que já foi salvo
+        progresso, self.etapa, self.existe = db.load_status_etapa(self.chave)
+        self.progresso = ProgressoRastreado(progresso)
+        self._salvo = {k: _serializar(v) for k, v in progresso.items()}
+
+    def alteracoes(self):
+        """(chaves alteradas -> JSON, chaves removidas) desde a última gravação."""
+        alterados, removidos = {}, []
+        for k in self.progresso.tocadas:
+            if k in self.progresso:
+                serializado = _serializar(self.progresso[k])
+                if self._salvo.get(k) != serializado:
+                    alterados[k] = serializado
+            elif k in self._salvo:
+                removidos.append(k)
+        return alterados, removidos
+
+    @property
+    def sujo(self):
+        return any(self.alteracoes())
+
+    def salvar(self, etapa_code):
+        """Registra as mudanças (e a etapa) se houver alguma. Retorna True se registrou."""
+        alterados, removidos = self.alteracoes()
+        if self.existe and etapa_code == self.etapa and not (alterados or removidos):
+            return False
+        persistencia.gravador().registrar(
+            self.chave, self.data_str, self.leitura['tipo'], etapa_code, alterados, removidos)
+        for k in removidos:
+            del self._salvo[k]
+        self._salvo.update(alterados)
+        self.progresso.tocadas.clear()
+        self.etapa = etapa_code
+        self.existe = True
+        return True
@@ -0,0 +1,83 @@
+import streamlit as st
+
+from modules import rastreio
+from modules.pipeline import persistencia
+from modules.pipeline.producao import Producao
+
+# ---------------------------------------------------------------------
+# Produção da sessão e barra de navegação das páginas 1 a 7
+# ---------------------------------------------------------------------
+
+CHAVE_SESSAO = 'producao'
+
+# (rótulo, flag no progresso, página, ícone, ícone bloqueado, liberada quando)
+ETAPAS = [
+    ('Roteiro', 'roteiro', 'pages/1_Roteiro_Viral.py', '📝', '📝', lambda p: True),
+    ('Imagens', 'imagens', 'pages/2_Imagens.py', '🎨', '🔒', lambda p: p.get('roteiro', False)),
+    ('Áudio', 'audio', 'pages/3_Audio_TTS.py', '🔊', '🔒', lambda p: p.get('roteiro', False)),
+    ('Overlay', 'overlay', 'pages/4_Overlay.py', '🖼️', '🔒', lambda p: p.get('audio', False)),
+    ('Legendas', 'legendas', 'pages/5_Legendas.py', '💬', '🔒', lambda p: p.get('audio', False)),
+    ('Vídeo', 'video', 'pages/6_Video_Final.py', '🎬', '🔒', lambda p: p.get('imagens', False) and p.get('audio', False)),
+    ('Publicar', 'publicacao', 'pages/7_Publicar.py', '🚀', '🔒', lambda p: p.get('video', False)),
+]
+
+
+def selecionar_leitura(leitura, data_str):
+    """Troca a leitura em produção (Início, Busca): a próxima página relê do banco."""
+    st.session_state['leitura_atual'] = leitura
+    st.session_state['data_atual_str'] = data_str
+    st.session_state.pop(CHAVE_SESSAO, None)
+
+
+def obter_producao(pagina_atual):
+    """
+    Produção da leitura selecionada, carregada do banco uma vez por sessão
+    (e de novo só quando a leitura muda). Sem leitura selecionada, mostra o
+    aviso com o botão de volta ao Início e interrompe a página.
+    """
+    # Troca de página: grava já o que ficou pendente da página anterior
+    if st.session_state.get('current_page_name') != pagina_atual:
+        persistencia.gravador().agendar_descarga()
+    st.session_state['current_page_name'] = pagina_atual
+
+    leitura = st.session_state.get('leitura_atual')
+    data_str = st.session_state.get('data_atual_str')
+    if not leitura or not data_str:
+        st.warning("⚠️ Nenhuma leitura selecionada. Volte ao Início.")
+        if st.button("🏠 Voltar ao Início"):
+            st.switch_page("Inicio.py")
+        st.stop()
+
+    prod = st.session_state.get(CHAVE_SESSAO)
+    if prod is None or prod.leitura['tipo'] != leitura['tipo'] or prod.data_str != data_str:
+        prod = Producao(leitura, data_str)
+        st.session_state[CHAVE_SESSAO] = prod
+    # O que a página medir (roteiro, imagens, áudio, vídeo) entra no rastro da produção
+    rastreio.definir_rastro(prod.chave)
+    return prod
+
+
+def render_navigation_bar(current_page_title, prod):
+    st.markdown("---")
+    st.markdown(f"## {current_page_title}")
+    st.caption(f"📖 Em Produção: **{prod.leitura['tipo']}** ({prod.data_str}) - *Ref: {prod.leitura.get('ref', '')}*")
+
+    progresso = prod.progresso
+    pagina_atual = st.session_state.get('current_page_name')
+    cols_nav = st.columns(len(ETAPAS))
+
+    for i, (label, key, page, icon_on, icon_off, liberada) in enumerate(ETAPAS):
+        status = progresso.get(key, False)
+        is_current = pagina_atual == page
+
+        icon = icon_on if status or is_current else icon_off
+        display_icon = f"✅ {icon}" if status and not is_current else icon
+        btn_disabled = not liberada(progresso) and not status and not is_current
+
+        with cols_nav[i]:
+            btn_style = "primary" if is_current else "secondary"
+            if st.button(display_icon, key=f"nav_btn_{key}", type=btn_style, disabled=btn_disabled,
+                         help=f"{label} ({'Pronto' if status else 'Pendente'})"):
+                st.switch_page(page)
+
+    st.markdown("---")
@@ -0,0 +1,287 @@
+import os
+import threading
+
+from modules import database as db
+from modules import avisos
+from modules import roteiro
+from modules import imagens
+from modules import audio
+from modules import masterizacao
+from modules import legendas
+from modules import overlay
+from modules import video
+from modules import trilha as trilha_mod
+from modules import conteudo
+from modules.pipeline import chave_producao
+from modules.agendador import Agendador, No, FALHOU
+
+# ---------------------------------------------------------------------
+# Produção sem interface: as mesmas etapas das páginas 1 a 6
+# ---------------------------------------------------------------------
+# Cada etapa lê e atualiza o mesmo dicionário `progresso` gravado em
+# `producao_status` (com o mesmo código de etapa usado pelas páginas), de
+# modo que uma produção iniciada aqui pode ser aberta e continuada na UI.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_DADOS = os.path.join(RAIZ, "data")
+
+def slug_tipo(tipo):
+    return tipo.replace(' ', '_')
+
+
+def carregar_producao(leitura, data_str):
+    """Estado de uma produção: leitura, data, chave e progresso salvo."""
+    chave = chave_producao(data_str, leitura['tipo'])
+    progresso, etapa, _ = db.load_status_etapa(chave)
+    return {"chave": chave, "data_str": data_str, "leitura": leitura, "progresso": progresso,
+            "etapa": etapa, "lock_salvar": threading.Lock()}
+
+
+def salvar_producao(prod, etapa_code):
+    """
+    Grava o progresso inteiro. Etapas paralelas (imagens, áudio, overlay,
+    legendas) alteram o mesmo dicionário: a cópia e a gravação ficam sob o
+    mesmo lock, para uma cópia antiga nunca ser gravada depois de uma mais
+    nova, e a etapa gravada nunca volta para trás (o overlay terminando
+    depois das legendas não rebaixa 5 para 4).
+    """
+    with prod["lock_salvar"]:
+        prod["etapa"] = max(prod["etapa"], etapa_code)
+        db.update_status(prod["chave"], prod["data_str"], prod["leitura"]['tipo'], dict(prod["progresso"]),
+                         prod["etapa"])
+
+
+# ---------------------------------------------------------------------
+# Etapas (retornam True em caso de sucesso)
+# ---------------------------------------------------------------------
+
+def etapa_roteiro(prod, client, notificar=avisos.console, modo=None):
+    leitura, progresso = prod["leitura"], prod["progresso"]
+    b1, b2, b3, b4, p_imgs = roteiro.gerar_conteudo_ia(client, leitura['texto'], leitura['ref'], notificar=notificar,
+                                                       modo=modo)
+    if not b1:
+        return False
+
+    progresso['bloco_leitura'] = b1
+    progresso['bloco_reflexao'] = b2
+    progresso['bloco_aplicacao'] = b3
+    progresso['bloco_oracao'] = b4
+    progresso['prompts_imagem'] = p_imgs
+    progresso['texto_roteiro_completo'] = f"{b1}\n\n{b2}\n\n{b3}\n\n{b4}"
+    progresso['roteiro'] = True
+    salvar_producao(prod, 1)
+    conteudo.registrar(leitura, prod["chave"], progresso, "roteiro")
+    return True
+
+
+def etapa_imagens(prod, motor=imagens.MOTORES[0], api_key_google="", modelo_google=imagens.MODELOS_GOOGLE[0],
+                  notificar=avisos.console):
+    progresso = prod["progresso"]
+    prompts = progresso.get('prompts_imagem', {})
+    if not prompts:
+        notificar("erro", "Nenhum prompt de imagem encontrado. Gere o roteiro primeiro.")
+        return False
+
+    prompts_lista = [prompts.get(f'bloco_{i}', '') for i in range(1, 5)]
+    identificador = f"{prod['data_str']}_{slug_tipo(prod['leitura']['tipo'])}"
+    provedores = []
+    novas = imagens.gerar_imagens(
+        prompts_lista, motor, os.path.join(PASTA_DADOS, "imagens"), identificador,
+        api_key_google=api_key_google, modelo_google=modelo_google, notificar=notificar, provedores=provedores,
+    )
+    if not novas:
+        return False
+
+    progresso['imagens_paths'] = novas
+    progresso['imagens_provedor'] = imagens.provedor_principal(provedores)
+    progresso['imagens'] = True
+    salvar_producao(prod, 2)
+    conteudo.registrar(prod["leitura"], prod["chave"], progresso, "imagens")
+    return True
+
+
+def etapa_audio(prod, notificar=avisos.console):
+    progresso = prod["progresso"]
+    texto_limpo = audio.limpar_texto(roteiro.texto_roteiro(progresso))
+    if not texto_limpo:
+        notificar("erro", "Roteiro vazio.")
+        return False
+
+    pasta = os.path.join(PASTA_DADOS, "audios")
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"audio_{prod['data_str']}_{slug_tipo(prod['leitura']['tipo'])}.wav")
+
+    sucesso, segmentos = audio.gerar_audio_piper_hibrido(texto_limpo, caminho, notificar=notificar)
+    if not sucesso:
+        return False
+
+    masterizacao.processar(progresso, caminho, notificar)
+    progresso['audio'] = True
+    progresso['voz_usada'] = audio.VOZ_PADRAO
+    progresso['legendas_segmentos'] = segmentos
+    progresso['legendas'] = False
+    salvar_producao(prod, 3)
+    conteudo.registrar(prod["leitura"], prod["chave"], progresso, "audio")
+    return True
+
+
+def etapa_overlay(prod, defaults=None):
+    progresso = prod["progresso"]
+    progresso['overlay'] = True
+    progresso['overlay_dados'] = overlay.config_overlay_padrao(prod["leitura"], prod["data_str"], defaults)
+    salvar_producao(prod, 4)
+    return True
+
+
+def etapa_legendas(prod, estilo=None):
+    progresso = prod["progresso"]
+    segmentos = progresso.get('legendas_segmentos', [])
+    estilo = {**legendas.ESTILO_PADRAO, **progresso.get('legendas_estilo', {}), **(estilo or {})}
+
+    if segmentos:
+        base = os.path.join(PASTA_DADOS, "legendas", f"legenda_{prod['data_str']}_{slug_tipo(prod['leitura']['tipo'])}")
+        fonte = overlay.caminho_fonte(estilo['fonte'])
+        path_srt, path_ass = legendas.salvar_legendas(legendas.gerar_cues(segmentos, estilo), base, estilo, fonte)
+    else:
+        path_srt, path_ass = "", ""
+
+    progresso['legendas_srt'] = path_srt
+    progresso['legendas_ass'] = path_ass
+    progresso['legendas_estilo'] = estilo
+    progresso['legendas'] = True
+    salvar_producao(prod, 5)
+    return True
+
+
+def montar_saidas(progresso, slug, formatos=(video.FORMATO_PADRAO,)):
+    """
+    Arquivos de cada formato de vídeo pedido: caminho do MP4, overlay PNG
+    desenhado na resolução do formato e, se houver legendas, o ASS do
+    formato (o de 9:16 é o da etapa de legendas). Lista na ordem de `formatos`.
+    """
+    overlay_cfg = progresso.get('overlay_dados')
+    segmentos = progresso.get('legendas_segmentos', [])
+    estilo = {**legendas.ESTILO_PADRAO, **progresso.get('legendas_estilo', {})}
+    saidas = []
+    for formato in formatos:
+        W, H = video.FORMATOS[formato]
+        sufixo = video.sufixo_formato(formato)
+        saida = {"formato": formato, "video": os.path.join(PASTA_DADOS, "videos", f"video_{slug}{sufixo}.mp4"),
+                 "overlay_png": None, "ass": progresso.get('legendas_ass') or None}
+        if overlay_cfg:
+            saida["overlay_png"] = overlay.salvar_overlay_png(
+                overlay_cfg, os.path.join(PASTA_DADOS, "overlays", f"overlay_{slug}{sufixo}.png"), W, H)
+        if sufixo and saida["ass"] and segmentos:
+            saida["ass"] = legendas.salvar_ass(
+                legendas.gerar_cues(segmentos, estilo),
+                os.path.join(PASTA_DADOS, "legendas", f"legenda_{slug}{sufixo}.ass"),
+                estilo, overlay.caminho_fonte(estilo['fonte']), W, H)
+        saidas.append(saida)
+    return saidas
+
+
+def etapa_video(prod, notificar=avisos.console, formatos=None, trilha=None):
+    progresso = prod["progresso"]
+    if trilha is not None:
+        progresso['trilha'] = trilha  # escolha da produção ({'arquivo', 'volume_db'}); {} = sem trilha
+    if not (progresso.get('imagens') and progresso.get('audio')):
+        notificar("erro", "Faltam imagens ou áudio.")
+        return False
+
+    slug = f"{prod['data_str']}_{slug_tipo(prod['leitura']['tipo'])}"
+    os.makedirs(os.path.join(PASTA_DADOS, "videos"), exist_ok=True)
+    saidas = montar_saidas(progresso, slug, formatos or [video.FORMATO_PADRAO])
+
+    overlay_cfg = progresso.get('overlay_dados')
+    sucesso, msg = video.gerar_videos_formatos(
+        progresso.get('imagens_paths', []), masterizacao.faixa_render(progresso), saidas,
+        visualizer=bool(overlay_cfg and overlay_cfg.get('visualizer')),
+        trilha=trilha_mod.para_render(progresso, progresso.get('trilha'), notificar),
+    )
+    if not sucesso:
+        notificar("erro", msg)
+        return False
+
+    progresso['video'] = True
+    progresso['video_path'] = saidas[0]["video"]
+    progresso['videos_formatos'] = {s["formato"]: s["video"] for s in saidas}
+    salvar_producao(prod, 6)
+    return True
+
+
+def reaproveitar_conteudo(prod, notificar=avisos.console):
+    """
+    Se a mesma passagem já foi produzida em outra data, liga o roteiro (e as
+    imagens e o áudio, quando utilizáveis) a esta produção sem nova geração.
+    Só vale para produções que ainda não têm roteiro.
+    """
+    if prod["progresso"].get('roteiro'):
+        return []
+    achados = conteudo.procurar(prod["leitura"], prod["chave"])
+    if not achados:
+        return []
+    aplicados = conteudo.aplicar(prod["progresso"], achados, prod["chave"])
+    salvar_producao(prod, conteudo.etapa_apos(aplicados))
+    origem = achados["roteiro"]["chave_id"]
+    notificar("info", f"{prod['chave']}: reaproveitando {', '.join(aplicados)} de {origem}.")
+    return aplicados
+
+
+def montar_dag(prod, client=None, motor=imagens.MOTORES[0], api_key_google="",
+               modelo_google=imagens.MODELOS_GOOGLE[0], notificar=avisos.console, formatos=None, trilha=None,
+               modo=None):
+    """
+    Grafo de etapas de uma produção:
+
+        roteiro -> imagens ----------------------.
+                -> audio -> legendas --------------> video
+                -> overlay -----------------------'
+
+    Imagens (rede) e áudio (CPU) só dependem do roteiro e rodam em paralelo.
+    `formatos` (chaves de video.FORMATOS) saem todos do mesmo render, com a
+    `trilha` ({'arquivo', 'volume_db'}) mixada sob a narração, se houver.
+    `modo` é o modo do roteiro (roteiro.MODOS; padrão: roteiro.MODO_PADRAO).
+    """
+    return [
+        No("roteiro", lambda: etapa_roteiro(prod, client, notificar, modo), pool="io"),
+        No("imagens", lambda: etapa_imagens(prod, motor, api_key_google, modelo_google, notificar),
+           depende=["roteiro"], pool="io"),
+        No("audio", lambda: etapa_audio(prod, notificar), depende=["roteiro"], pool="cpu"),
+        No("overlay", lambda: etapa_overlay(prod), depende=["roteiro"], pool="cpu"),
+        No("legendas", lambda: etapa_legendas(prod), depende=["audio"], pool="cpu"),
+        No("video", lambda: etapa_video(prod, notificar, formatos, trilha), depende=["imagens", "overlay", "legendas"],
+           pool="cpu"),
+    ]
+
+
+def produzir_leitura(leitura, data_str, client=None, motor=imagens.MOTORES[0], api_key_google="",
+                     modelo_google=imagens.MODELOS_GOOGLE[0], refazer=False, max_io=4, max_cpu=None,
+                     pools=None, ao_concluir_no=None, notificar=avisos.console, formatos=None, trilha=None,
+                     modo=None):
+    """
+    Executa as etapas pendentes de uma leitura pelo agendador em grafo. Etapas
+    já concluídas (flag True no progresso, a mesma usada pelas páginas) são
+    puladas, a menos que `refazer` seja True; sem `refazer`, os ativos de
+    uma produção anterior da mesma passagem são reaproveitados. `pools` e
+    `ao_concluir_no` são repassados ao agendador (modo fila, com executores
+    compartilhados). `formatos` lista os formatos do vídeo (padrão: 9:16) e
+    `trilha` escolhe a música de fundo (padrão: a já salva na produção);
+    `modo` é o modo do roteiro (padrão: roteiro.MODO_PADRAO).
+    Retorna o dicionário da produção; `prod['falhou_em']` indica a etapa que falhou.
+    """
+    prod = carregar_producao(leitura, data_str)
+    if refazer:
+        prod["etapa"] = 0  # refazendo do início: a etapa gravada acompanha a nova execução
+    else:
+        reaproveitar_conteudo(prod, notificar)
+    nos = montar_dag(prod, client, motor, api_key_google, modelo_google, notificar, formatos, trilha, modo)
+    ja_concluidos = [] if refazer else [n.nome for n in nos if prod["progresso"].get(n.nome)]
+
+    agendador = Agendador(prod["chave"], nos, max_io=max_io, max_cpu=max_cpu,
+                          ja_concluidos=ja_concluidos, retomar=False, pools=pools,
+                          ao_concluir_no=ao_concluir_no, notificar=notificar)
+    prod["estados"] = agendador.executar()
+
+    falhas = [nome for nome, estado in prod["estados"].items() if estado == FALHOU]
+    prod["falhou_em"] = ", ".join(falhas) or None
+    return prod
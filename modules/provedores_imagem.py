@@ -0,0 +1,447 @@
+import os
+import time
+import uuid
+import base64
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from modules import rastreio
+from modules.limites import LIMITES
+
+# ---------------------------------------------------------------------
+# Provedores de imagem com limite de taxa, retentativas, disjuntor,
+# requisições "hedged" e failover
+# ---------------------------------------------------------------------
+# As URLs base podem ser trocadas (argumento ou variável de ambiente) para
+# apontar a servidores locais de teste.
+
+POLLINATIONS_URL = os.environ.get("POLLINATIONS_URL", "https://image.pollinations.ai")
+IMAGEN_URL = os.environ.get("IMAGEN_URL", "https://generativelanguage.googleapis.com")
+
+# Tamanho dos blocos lidos da rede: limita a memória por imagem em download
+TAMANHO_BLOCO = 64 * 1024
+
+
+class ErroProvedor(Exception):
+    """Falha de um provedor. `retentavel` indica se vale tentar de novo."""
+
+    def __init__(self, msg, retentavel=True):
+        super().__init__(msg)
+        self.retentavel = retentavel
+
+
+def _erro_http(nome, response):
+    # 408/429 e 5xx são transitórios; demais 4xx (chave inválida, prompt recusado) não
+    retentavel = response.status_code in (408, 429) or response.status_code >= 500
+    return ErroProvedor(f"{nome} HTTP {response.status_code}: {response.text[:200]}", retentavel)
+
+
+class DecodificadorBase64Json:
+    """
+    Extrai e decodifica, em fluxo, o valor base64 de uma chave de um JSON
+    recebido em blocos, sem montar o documento (nem a imagem) em memória.
+    `alimentar(bloco)` devolve os bytes já decodificados daquele bloco.
+    """
+
+    def __init__(self, chave="bytesBase64Encoded"):
+        self.marcador = f'"{chave}"'.encode()
+        self.estado = "procurando"  # -> "aspas" -> "valor" -> "fim"
+        self.buffer = b""
+        self.resto = b""
+        self.escape = False
+
+    def alimentar(self, bloco):
+        if self.estado == "fim":
+            return b""
+        self.buffer += bloco
+
+        if self.estado == "procurando":
+            pos = self.buffer.find(self.marcador)
+            if pos < 0:
+                # Mantém só o suficiente para achar um marcador partido entre blocos
+                self.buffer = self.buffer[-len(self.marcador):]
+                return b""
+            self.buffer = self.buffer[pos + len(self.marcador):]
+            self.estado = "aspas"
+
+        if self.estado == "aspas":
+            pos = self.buffer.find(b'"')
+            if pos < 0:
+                self.buffer = b""
+                return b""
+            self.buffer = self.buffer[pos + 1:]
+            self.estado = "valor"
+
+        fim = self.buffer.find(b'"')
+        trecho = self.buffer if fim < 0 else self.buffer[:fim]
+        self.buffer = b""
+        if fim >= 0:
+            self.estado = "fim"
+        return self._decodificar(trecho, final=fim >= 0)
+
+    def _decodificar(self, trecho, final=False):
+        # Escapes JSON possíveis num base64: "\/" (barra) e quebras "\n"/"\r"
+        limpo = bytearray()
+        for c in trecho:
+            if self.escape:
+                self.escape = False
+                if c == ord("/"):
+                    limpo.append(c)
+                continue
+            if c == ord("\\"):
+                self.escape = True
+                continue
+            if c not in b"\r\n ":
+                limpo.append(c)
+
+        dados = self.resto + bytes(limpo)
+        corte = len(dados) if final else len(dados) - len(dados) % 4
+        self.resto = dados[corte:]
+        return base64.b64decode(dados[:corte]) if corte else b""
+
+    @property
+    def completo(self):
+        return self.estado == "fim"
+
+
+def caminho_parcial(caminho_final):
+    """Arquivo temporário no mesmo diretório (o rename final é atômico)."""
+    return f"{caminho_final}.{uuid.uuid4().hex[:8]}.part"
+
+
+def publicar_arquivo(caminho_parcial_, caminho_final):
+    """Renomeia atomicamente o arquivo já sincronizado para o destino final."""
+    os.replace(caminho_parcial_, caminho_final)
+    try:
+        fd = os.open(os.path.dirname(caminho_final) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)  # persiste a entrada do diretório
+        finally:
+            os.close(fd)
+    except OSError:
+        pass  # alguns sistemas (Windows) não permitem fsync em diretório
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+class Disjuntor:
+    """
+    Circuit breaker: após `limite_falhas` falhas seguidas o provedor fica
+    "aberto" (não é chamado) por `tempo_reset` segundos; depois deixa passar
+    uma chamada de teste ("meio-aberto").
+    """
+
+    def __init__(self, limite_falhas=3, tempo_reset=60.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_reset = tempo_reset
+        self.falhas = 0
+        self.aberto_em = None
+        self.lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self.lock:
+            if self.aberto_em is None:
+                return "fechado"
+            if time.monotonic() - self.aberto_em >= self.tempo_reset:
+                return "meio-aberto"
+            return "aberto"
+
+    def permite(self):
+        return self.estado != "aberto"
+
+    def sucesso(self):
+        with self.lock:
+            self.falhas = 0
+            self.aberto_em = None
+
+    def falha(self):
+        with self.lock:
+            self.falhas += 1
+            if self.falhas >= self.limite_falhas:
+                self.aberto_em = time.monotonic()
+
+
+class Estatisticas:
+    """Latências recentes e taxa de erro de um provedor."""
+
+    def __init__(self, janela=500):
+        self.latencias = deque(maxlen=janela)
+        self.total = 0
+        self.erros = 0
+        self.lock = threading.Lock()
+
+    def registrar(self, segundos, ok):
+        with self.lock:
+            self.total += 1
+            if ok:
+                self.latencias.append(segundos)
+            else:
+                self.erros += 1
+
+    def resumo(self):
+        with self.lock:
+            lat = sorted(self.latencias)
+            total, erros = self.total, self.erros
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 2) if lat else None
+
+        return {
+            "chamadas": total,
+            "p50_s": pct(0.50),
+            "p95_s": pct(0.95),
+            "taxa_erro": round(erros / total, 3) if total else 0.0,
+        }
+
+
+class ProvedorImagem:
+    """
+    Interface: subclasses implementam `_requisitar(prompt, largura, altura, arquivo)`,
+    gravando a imagem em `arquivo` bloco a bloco.
+    """
+
+    nome = "base"
+
+    def __init__(self, limite=None, disjuntor=None, tentativas=3, backoff_base=1.0):
+        self.limite = limite
+        self.disjuntor = disjuntor or Disjuntor()
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.estatisticas = Estatisticas()
+
+    def disponivel(self):
+        return self.disjuntor.permite()
+
+    def _requisitar(self, prompt, largura, altura, arquivo):
+        raise NotImplementedError
+
+    def _baixar(self, prompt, largura, altura, destino):
+        try:
+            with open(destino, "wb") as arquivo:
+                self._requisitar(prompt, largura, altura, arquivo)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+                rastreio.contar(saida=arquivo.tell())
+        except BaseException:
+            _remover(destino)
+            raise
+
+    def gerar(self, prompt, destino, largura=1080, altura=1920):
+        """
+        Uma geração com limite de taxa e backoff exponencial (com jitter),
+        gravada em `destino` (arquivo parcial; quem chama publica o resultado).
+        """
+        import requests  # adiado: só quem gera imagens paga o import
+        with rastreio.trecho(f"imagem.{self.nome}") as trecho:
+            ultimo_erro = None
+            espera = 0.0
+            for tentativa in range(self.tentativas):
+                if not self.disjuntor.permite():
+                    raise ErroProvedor(f"{self.nome}: disjuntor aberto", retentavel=False)
+                if self.limite:
+                    antes = time.monotonic()
+                    self.limite.adquirir()
+                    espera += time.monotonic() - antes
+                if trecho:
+                    trecho.anotar(tentativas=tentativa + 1, espera_limite_ms=round(espera * 1000, 1))
+
+                inicio = time.monotonic()
+                try:
+                    self._baixar(prompt, largura, altura, destino)
+                    self.estatisticas.registrar(time.monotonic() - inicio, True)
+                    self.disjuntor.sucesso()
+                    return destino
+                except requests.RequestException as e:
+                    ultimo_erro = ErroProvedor(f"{self.nome}: {e}", retentavel=True)
+                except ErroProvedor as e:
+                    ultimo_erro = e
+
+                self.estatisticas.registrar(time.monotonic() - inicio, False)
+                self.disjuntor.falha()
+                if not ultimo_erro.retentavel:
+                    break
+                if tentativa < self.tentativas - 1:
+                    time.sleep(self.backoff_base * (2 ** tentativa) * random.uniform(0.5, 1.5))
+
+            raise ultimo_erro
+
+
+class PollinationsProvedor(ProvedorImagem):
+    nome = "pollinations"
+
+    def __init__(self, base_url=POLLINATIONS_URL, modelo="turbo", timeout=(5, 60), **kwargs):
+        kwargs.setdefault("limite", LIMITES["pollinations"])
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.modelo = modelo
+        self.timeout = timeout
+
+    def _requisitar(self, prompt, largura, altura, arquivo):
+        import requests
+        prompt_safe = requests.utils.quote(prompt)
+        seed = random.randint(0, 999999)
+        # nologo=true remove a marca d'água do pollinations
+        url = (f"{self.base_url}/prompt/{prompt_safe}?model={self.modelo}"
+               f"&width={largura}&height={altura}&seed={seed}&nologo=true")
+        with requests.get(url, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise _erro_http(self.nome, response)
+            for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                arquivo.write(bloco)
+                rastreio.contar(entrada=len(bloco))
+
+
+class ImagenProvedor(ProvedorImagem):
+    nome = "google"
+
+    def __init__(self, api_key, modelo="imagen-3.0-generate-001", base_url=IMAGEN_URL, timeout=(5, 90), **kwargs):
+        kwargs.setdefault("limite", LIMITES["google"])
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.modelo = modelo
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _requisitar(self, prompt, largura, altura, arquivo):
+        import requests
+        url = f"{self.base_url}/v1beta/models/{self.modelo}:predict?key={self.api_key}"
+        data = {
+            "instances": [{"prompt": prompt}],
+            "parameters": {"sampleCount": 1, "aspectRatio": "9:16" if altura > largura else "1:1"},
+        }
+        with requests.post(url, json=data, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise _erro_http(self.nome, response)
+
+            # O Google retorna a imagem em Base64 dentro de 'predictions': decodifica em fluxo
+            decodificador = DecodificadorBase64Json()
+            for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO):
+                arquivo.write(decodificador.alimentar(bloco))
+                rastreio.contar(entrada=len(bloco))
+                if decodificador.completo:
+                    break
+
+        if not decodificador.completo:
+            raise ErroProvedor("A API do Google não retornou nenhuma imagem válida.", retentavel=False)
+
+
+# Threads das requisições (a perdedora de um hedge termina em segundo plano)
+_executor_hedge = ThreadPoolExecutor(max_workers=16, thread_name_prefix="img-req")
+
+
+class BackendImagens:
+    """
+    Tenta os provedores em ordem (failover automático). Se o primeiro não
+    responder em `atraso_hedge` segundos, dispara uma segunda requisição
+    (no próximo provedor disponível, ou no mesmo) e usa a que chegar primeiro.
+    """
+
+    def __init__(self, provedores, atraso_hedge=12.0):
+        self.provedores = list(provedores)
+        self.atraso_hedge = atraso_hedge
+
+    def _candidatos(self):
+        return [p for p in self.provedores if p.disponivel()]
+
+    def gerar(self, prompt, caminho_final, largura=1080, altura=1920):
+        """
+        Grava a imagem em `caminho_final` (rename atômico de um arquivo parcial)
+        e retorna o nome do provedor. Levanta ErroProvedor se todos falharem.
+        """
+        erros = []
+        candidatos = self._candidatos()
+        if not candidatos:
+            raise ErroProvedor("Nenhum provedor de imagem disponível (disjuntores abertos).", retentavel=False)
+
+        for i, provedor in enumerate(candidatos):
+            reserva = candidatos[i + 1] if i + 1 < len(candidatos) else provedor
+            try:
+                return self._gerar_com_hedge(provedor, reserva, prompt, caminho_final, largura, altura)
+            except ErroProvedor as e:
+                erros.append(str(e))
+        raise ErroProvedor(" | ".join(erros), retentavel=False)
+
+    def _gerar_com_hedge(self, principal, reserva, prompt, caminho_final, largura, altura):
+        # Cada requisição grava no seu próprio arquivo parcial
+        futuros = {}
+
+        def disparar(provedor):
+            parcial = caminho_parcial(caminho_final)
+            futuros[_executor_hedge.submit(rastreio.propagar(provedor.gerar), prompt, parcial, largura, altura)] = \
+                (provedor, parcial)
+
+        disparar(principal)
+        feitos, _ = wait(futuros, timeout=self.atraso_hedge)
+        if not feitos and self.atraso_hedge and reserva.disponivel():
+            disparar(reserva)
+
+        ultimo_erro = None
+        pendentes = set(futuros)
+        while pendentes:
+            feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for f in feitos:
+                provedor, parcial = futuros[f]
+                try:
+                    f.result()
+                except ErroProvedor as e:
+                    ultimo_erro = e
+                    continue
+                publicar_arquivo(parcial, caminho_final)
+                # A requisição perdedora, quando terminar, apaga o próprio arquivo
+                for outro in pendentes:
+                    outro.add_done_callback(lambda _f, p=futuros[outro][1]: _remover(p))
+                return provedor.nome
+        raise ultimo_erro
+
+    def estatisticas(self):
+        return {
+            p.nome: {**p.estatisticas.resumo(), "disjuntor": p.disjuntor.estado}
+            for p in self.provedores
+        }
+
+
+# Provedores compartilhados pelo processo: disjuntores e estatísticas
+# sobrevivem aos reruns do Streamlit e valem para todos os jobs da fila.
+_provedores = {}
+_lock_provedores = threading.Lock()
+
+
+def obter_provedor(nome, api_key="", modelo=None):
+    chave = (nome, api_key, modelo)
+    with _lock_provedores:
+        if chave not in _provedores:
+            if nome == "pollinations":
+                _provedores[chave] = PollinationsProvedor()
+            else:
+                _provedores[chave] = ImagenProvedor(api_key, modelo or "imagen-3.0-generate-001")
+        return _provedores[chave]
+
+
+def montar_backend(motor, api_key_google="", modelo_google=None, atraso_hedge=12.0):
+    """Backend com o provedor escolhido primeiro e o outro como failover."""
+    provedor_pollinations = obter_provedor("pollinations")
+    google = obter_provedor("google", api_key_google, modelo_google) if api_key_google else None
+
+    if "Google" in motor and google:
+        ordem = [google, provedor_pollinations]
+    else:
+        ordem = [provedor_pollinations] + ([google] if google else [])
+    return BackendImagens(ordem, atraso_hedge=atraso_hedge)
+
+
+def estatisticas_provedores():
+    """Estatísticas de todos os provedores já usados neste processo."""
+    with _lock_provedores:
+        provedores = list(_provedores.values())
+    return {
+        f"{p.nome} ({getattr(p, 'modelo', '')})": {**p.estatisticas.resumo(), "disjuntor": p.disjuntor.estado}
+        for p in provedores
+    }
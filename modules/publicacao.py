@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import avisos
+from modules import metricas
+from modules import database as db
+from modules.limites import TokenBucket
+from modules.pipeline import persistencia
+
+# ---------------------------------------------------------------------
+# Publicação no YouTube: envio resumível em blocos
+# ---------------------------------------------------------------------
+# Protocolo de upload resumível da YouTube Data API: um POST abre a sessão
+# (metadados + tamanho) e devolve a URL dela; cada bloco vai num PUT com
+# Content-Range, e o servidor responde 308 com o último byte que recebeu
+# (cabeçalho Range) até o último bloco, respondido com o vídeo criado. Em
+# qualquer falha, um PUT vazio com "bytes */total" pergunta onde parou.
+#
+# A fila fica no SQLite (`fila_publicacao`): a URL da sessão e o byte
+# confirmado são gravados a cada bloco, então nem uma queda do processo
+# obriga a reenviar o vídeo inteiro. Vários envios correm em paralelo e
+# dividem um limite de banda comum (token bucket em bytes por segundo).
+#
+# As URLs podem ser trocadas por variável de ambiente para apontar a um
+# servidor local de teste (benchmarks/stub_youtube.py).
+
+UPLOAD_URL = os.environ.get("YOUTUBE_UPLOAD_URL", "https://www.googleapis.com/upload/youtube/v3/videos")
+TOKEN_URL = os.environ.get("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+
+MULTIPLO_BLOCO = 256 * 1024          # o protocolo exige blocos múltiplos de 256 KiB (menos o último)
+TAMANHO_BLOCO = 8 * 1024 * 1024      # bytes por PUT
+TAMANHO_LEITURA = 64 * 1024          # granularidade do limite de banda
+TENTATIVAS = 8                       # falhas seguidas sem avanço antes de desistir
+ESPERA_MAXIMA = 60.0
+
+PRIVACIDADES = ["public", "unlisted", "private"]
+CATEGORIA_PADRAO = "22"  # Pessoas e blogs
+
+
+class ErroPublicacao(Exception):
+    """Falha no envio. `retentavel` indica se vale tentar de novo."""
+
+    def __init__(self, msg, retentavel=True, status=None):
+        super().__init__(msg)
+        self.retentavel = retentavel
+        self.status = status
+
+
+def _erro_http(etapa, response):
+    # 408/429 e 5xx são transitórios; 401 renova o token; 404/410 = sessão expirada
+    status = response.status_code
+    retentavel = status in (401, 404, 408, 410, 429) or status >= 500
+    return ErroPublicacao(f"{etapa}: HTTP {status}: {response.text[:200]}", retentavel, status)
+
+
+def ajustar_bloco(tamanho):
+    """Arredonda o tamanho do bloco para baixo, num múltiplo de 256 KiB (mínimo 256 KiB)."""
+    return max(MULTIPLO_BLOCO, int(tamanho) // MULTIPLO_BLOCO * MULTIPLO_BLOCO)
+
+
+def metadados_video(titulo, descricao="", tags=(), privacidade="public", categoria=CATEGORIA_PADRAO):
+    """Corpo `snippet`/`status` do vídeo, nos limites de tamanho da API."""
+    return {
+        "snippet": {
+            "title": titulo[:100],
+            "description": descricao[:5000],
+            "tags": [t.strip().lstrip("#") for t in tags if t.strip()],
+            "categoryId": categoria,
+            "defaultLanguage": "pt-BR",
+        },
+        "status": {"privacyStatus": privacidade, "selfDeclaredMadeForKids": False},
+    }
+
+
+# --- credenciais -----------------------------------------------------------
+
+class TokenOAuth:
+    """Access token OAuth obtido pelo refresh token e renovado antes de expirar."""
+
+    def __init__(self, client_id, client_secret, refresh_token, url=TOKEN_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.url = url
+        self.token = None
+        self.expira = 0.0
+        self.lock = threading.Lock()
+
+    def obter(self, forcar=False):
+        import requests  # adiado: só quem publica paga o import
+
+        with self.lock:
+            if forcar or not self.token or time.time() >= self.expira:
+                response = requests.post(self.url, data={
+                    "client_id": self.client_id, "client_secret": self.client_secret,
+                    "refresh_token": self.refresh_token, "grant_type": "refresh_token",
+                }, timeout=15)
+                if response.status_code != 200:
+                    raise ErroPublicacao(f"Token OAuth: HTTP {response.status_code}: {response.text[:200]}",
+                                         retentavel=False)
+                dados = response.json()
+                self.token = dados["access_token"]
+                self.expira = time.time() + dados.get("expires_in", 3600) - 60
+            return self.token
+
+
+class TokenFixo:
+    """Token que nunca muda (servidor de teste)."""
+
+    def __init__(self, token="teste"):
+        self.token = token
+
+    def obter(self, forcar=False):
+        return self.token
+
+
+def credenciais(ler_segredo):
+    """TokenOAuth a partir dos segredos YOUTUBE_CLIENT_ID/SECRET/REFRESH_TOKEN, ou None se faltar algum."""
+    nomes = ("YOUTUBE_CLIENT_ID", "YOUTUBE_CLIENT_SECRET", "YOUTUBE_REFRESH_TOKEN")
+    valores = [ler_segredo(n) for n in nomes]
+    return TokenOAuth(*valores) if all(valores) else None
+
+
+# --- envio de um arquivo ------------------------------------------------------
+
+class _TrechoArquivo:
+    """
+    Corpo do PUT: `tamanho` bytes do arquivo a partir de `inicio`, lidos em
+    pedaços de TAMANHO_LEITURA e liberados pelo limite de banda (se houver).
+    """
+
+    def __init__(self, caminho, inicio, tamanho, banda=None):
+        self.arquivo = open(caminho, "rb")
+        self.arquivo.seek(inicio)
+        self.tamanho = tamanho
+        self.restante = tamanho
+        self.banda = banda
+
+    def __len__(self):
+        return self.tamanho
+
+    def read(self, n=-1):
+        n = self.restante if n is None or n < 0 else min(n, self.restante)
+        n = min(n, TAMANHO_LEITURA)
+        if n <= 0:
+            return b""
+        if self.banda:
+            self.banda.adquirir(n)
+        dados = self.arquivo.read(n)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+class EnvioResumivel:
+    """
+    Envia um arquivo pelo protocolo resumível. Uma instância por thread (a
+    sessão HTTP não é compartilhada); o limite de banda pode ser.
+    """
+
+    def __init__(self, credenciais, url=UPLOAD_URL, tamanho_bloco=TAMANHO_BLOCO, banda=None,
+                 tentativas=TENTATIVAS, backoff_base=1.0, timeout=(10, 120)):
+        import requests
+
+        self.credenciais = credenciais
+        self.url = url
+        self.tamanho_bloco = ajustar_bloco(tamanho_bloco)
+        self.banda = banda
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.estatisticas = {"requisicoes": 0, "bytes_enviados": 0, "retentativas": 0, "sessoes": 0}
+
+    def _cabecalhos(self, **extra):
+        return {"Authorization": f"Bearer {self.credenciais.obter()}", **extra}
+
+    def iniciar_sessao(self, total, metadados):
+        """Abre a sessão de upload e retorna a URL dela."""
+        self.estatisticas["requisicoes"] += 1
+        self.estatisticas["sessoes"] += 1
+        response = self.http.post(
+            self.url, params={"uploadType": "resumable", "part": ",".join(metadados)}, json=metadados,
+            headers=self._cabecalhos(**{"X-Upload-Content-Length": str(total), "X-Upload-Content-Type": "video/*"}),
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise _erro_http("Abrir sessão", response)
+        if not response.headers.get("Location"):
+            raise ErroPublicacao("Abrir sessão: resposta sem Location", retentavel=True)
+        return response.headers["Location"]
+
+    def _interpretar(self, response, etapa):
+        """(bytes confirmados, None) numa resposta 308; (total, vídeo criado) ao concluir."""
+        if response.status_code in (200, 201):
+            return None, response.json()
+        if response.status_code == 308:
+            faixa = response.headers.get("Range")  # "bytes=0-N": N é o último byte recebido
+            return (int(faixa.rsplit("-", 1)[1]) + 1 if faixa else 0), None
+        raise _erro_http(etapa, response)
+
+    def consultar(self, sessao_url, total):
+        """Pergunta ao servidor quantos bytes da sessão já recebeu."""
+        self.estatisticas["requisicoes"] += 1
+        response = self.http.put(sessao_url, headers=self._cabecalhos(**{"Content-Range": f"bytes */{total}"}),
+                                 timeout=self.timeout)
+        return self._interpretar(response, "Consultar sessão")
+
+    def _enviar_bloco(self, sessao_url, caminho, inicio, total):
+        fim = min(inicio + self.tamanho_bloco, total)
+        trecho = _TrechoArquivo(caminho, inicio, fim - inicio, self.banda)
+        self.estatisticas["requisicoes"] += 1
+        try:
+            response = self.http.put(sessao_url, data=trecho, timeout=self.timeout, headers=self._cabecalhos(**{
+                "Content-Range": f"bytes {inicio}-{fim - 1}/{total}", "Content-Type": "video/*",
+            }))
+        finally:
+            self.estatisticas["bytes_enviados"] += trecho.tamanho - trecho.restante
+            trecho.close()
+        return self._interpretar(response, "Enviar bloco")
+
+    def enviar(self, caminho, metadados, sessao_url=None, ao_confirmar=None):
+        """
+        Envia o arquivo e retorna o recurso do vídeo criado (dict com 'id').
+        Com `sessao_url`, continua uma sessão anterior de onde o servidor
+        parou. `ao_confirmar(sessao_url, bytes_confirmados, total)` é chamado
+        a cada avanço confirmado (para gravar na fila).
+        """
+        import requests
+
+        total = os.path.getsize(caminho)
+        consultar = bool(sessao_url)
+        confirmado, falhas = 0, 0
+        while True:
+            try:
+                if not sessao_url:
+                    sessao_url, confirmado = self.iniciar_sessao(total, metadados), 0
+                    if ao_confirmar:
+                        ao_confirmar(sessao_url, 0, total)
+                elif consultar:
+                    confirmado, video = self.consultar(sessao_url, total)
+                    if video:
+                        return video
+                consultar = False
+
+                while True:
+                    novo, video = self._enviar_bloco(sessao_url, caminho, confirmado, total)
+                    if video:
+                        return video
+                    if novo <= confirmado:
+                        # 308 sem avanço: conta como falha (com espera) em vez de repetir o bloco sem fim
+                        raise ErroPublicacao(f"O servidor não confirmou bytes além de {confirmado}")
+                    falhas = 0
+                    if ao_confirmar:
+                        ao_confirmar(sessao_url, novo, total)
+                    confirmado = novo
+            except ErroPublicacao as e:
+                if not e.retentavel:
+                    raise
+                if e.status in (404, 410):
+                    sessao_url = None  # sessão expirada: recomeça do zero
+                elif e.status == 401:
+                    self.credenciais.obter(forcar=True)
+                erro = e
+            except requests.RequestException as e:
+                erro = e  # conexão caiu no meio do bloco: o servidor diz onde parou
+
+            falhas += 1
+            self.estatisticas["retentativas"] += 1
+            if falhas > self.tentativas:
+                raise ErroPublicacao(f"Desistindo após {falhas} falhas seguidas: {erro}", retentavel=False)
+            time.sleep(min(ESPERA_MAXIMA, self.backoff_base * (2 ** (falhas - 1))) * random.uniform(0.5, 1.5))
+            consultar = True
+
+
+# --- fila ---------------------------------------------------------------------
+
+class Publicador:
+    """
+    Consome a fila de publicação com `paralelas` envios simultâneos. O limite
+    de banda (`limite_bytes_s`, None = sem limite) vale para todos juntos.
+    """
+
+    def __init__(self, credenciais, paralelas=2, limite_bytes_s=None, url=UPLOAD_URL,
+                 tamanho_bloco=TAMANHO_BLOCO, backoff_base=1.0, notificar=avisos.console):
+        self.credenciais = credenciais
+        self.paralelas = paralelas
+        # rajada de ~50 ms: a vazão média fica colada no limite mesmo em envios curtos
+        self.banda = TokenBucket(limite_bytes_s, max(TAMANHO_LEITURA, limite_bytes_s / 20)) if limite_bytes_s else None
+        self.url = url
+        self.tamanho_bloco = tamanho_bloco
+        self.backoff_base = backoff_base
+        self.notificar = notificar
+        self.estatisticas = {"concluidos": 0, "falhos": 0, "requisicoes": 0, "bytes_enviados": 0,
+                             "retentativas": 0, "sessoes": 0}
+        self.lock = threading.Lock()
+
+    def executar(self, parar=None):
+        """Processa a fila até esvaziar (ou até `parar` ser sinalizado, entre um envio e outro)."""
+        with ThreadPoolExecutor(max_workers=self.paralelas, thread_name_prefix="publicacao") as executor:
+            for futuro in [executor.submit(self._trabalhador, parar) for _ in range(self.paralelas)]:
+                futuro.result()
+        return self.estatisticas
+
+    def _trabalhador(self, parar):
+        envio = EnvioResumivel(self.credenciais, self.url, self.tamanho_bloco, self.banda,
+                               backoff_base=self.backoff_base)
+        while not (parar and parar.is_set()):
+            pub = db.pegar_proxima_publicacao()
+            if not pub:
+                break
+            self._processar(envio, pub)
+        with self.lock:
+            for chave, valor in envio.estatisticas.items():
+                self.estatisticas[chave] += valor
+
+    def _processar(self, envio, pub):
+        metadados = json.loads(pub["metadados_json"])
+        try:
+            video = envio.enviar(
+                pub["caminho"], metadados, sessao_url=pub["sessao_url"],
+                ao_confirmar=lambda url, n, total: db.registrar_progresso_publicacao(pub["id"], url, n),
+            )
+        except (ErroPublicacao, OSError) as e:
+            db.finalizar_publicacao(pub["id"], "falhou", erro=str(e))
+            self.notificar("erro", f"Falha ao publicar {pub['chave_id']}: {e}")
+            with self.lock:
+                self.estatisticas["falhos"] += 1
+            return
+
+        db.finalizar_publicacao(pub["id"], "concluido", video_id=video["id"])
+        marcar_publicado(pub, video["id"], metadados)
+        self.notificar("sucesso", f"{pub['chave_id']} publicado: {url_video(video['id'])}")
+        with self.lock:
+            self.estatisticas["concluidos"] += 1
+
+
+def url_video(video_id):
+    return f"https://www.youtube.com/shorts/{video_id}"
+
+
+def marcar_publicado(pub, video_id, metadados):
+    """Leva o envio concluído para a produção (etapa 7) e para o dashboard."""
+    db.registrar_video(pub["chave_id"], titulo=metadados["snippet"]["title"], youtube_url=url_video(video_id),
+                       privacidade=metadados["status"]["privacyStatus"], publicado_em=datetime.now().isoformat())
+    persistencia.gravador().registrar(pub["chave_id"], pub["data_ref"], pub["tipo_leitura"], 7, {
+        "publicacao": "true", "youtube_id": json.dumps(video_id),
+    })
+    metricas.atualizar_atributos([pub["chave_id"]])
+
+
+# --- execução em segundo plano (página de publicação) -------------------------
+
+_thread = None
+_lock_thread = threading.Lock()
+
+
+def em_execucao():
+    return _thread is not None and _thread.is_alive()
+
+
+def iniciar_em_segundo_plano(credenciais, **opcoes):
+    """
+    Processa a fila numa thread do próprio processo (se ainda não houver
+    uma), para a página acompanhar o progresso pelo banco. Retorna False se
+    já estava rodando.
+    """
+    global _thread
+    with _lock_thread:
+        if em_execucao():
+            return False
+        db.recuperar_publicacoes_interrompidas()
+        publicador = Publicador(credenciais, **opcoes)
+        _thread = threading.Thread(target=publicador.executar, name="fila-publicacao", daemon=True)
+        _thread.start()
+        return True
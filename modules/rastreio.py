@@ -0,0 +1,363 @@
+import os
+import time
+import json
+import atexit
+import functools
+import threading
+import subprocess
+from contextlib import contextmanager
+
+from modules import database as db
+
+# ---------------------------------------------------------------------
+# Rastreamento das etapas: tempo, CPU, memória e bytes por trecho
+# ---------------------------------------------------------------------
+# Um "trecho" (span) mede um pedaço do trabalho: tempo de parede, CPU da
+# thread (mais a das threads filhas e dos subprocessos que ele rodou), pico
+# de RSS do processo enquanto esteve aberto e os bytes que entraram e
+# saíram (contados por quem lê/grava, com `contar`). Os trechos se aninham
+# por thread; `propagar` leva o trecho atual para uma função que vai rodar
+# noutra thread (pools). Todos os trechos de uma produção compartilham o
+# mesmo `rastro` (a chave da produção, quando conhecida).
+#
+# Os trechos fechados vão para uma lista em memória e são gravados em lote
+# no SQLite (`rastreio_trechos`) por uma thread, sem custo de I/O no
+# caminho medido. `RASTREIO=0` no ambiente desliga tudo.
+
+ATIVO = os.environ.get("RASTREIO", "1") != "0"
+INTERVALO_AMOSTRA = 0.02   # segundos entre leituras do RSS enquanto há trechos abertos
+ATRASO_GRAVACAO = 1.0      # segundos entre gravações em lote
+
+try:
+    _PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGINA = 4096
+
+_local = threading.local()
+_lock = threading.Lock()  # somas vindas de outras threads (filhos, contagens)
+
+
+_statm = {}  # pid -> descritor de /proc/<pid>/statm, aberto uma vez (reabrir custa mais que ler)
+
+
+def _rss():
+    """RSS atual do processo em bytes (Linux); fora dele, o pico via getrusage."""
+    try:
+        pid = os.getpid()
+        fd = _statm.get(pid)
+        if fd is None:
+            fd = _statm[pid] = os.open(f"/proc/{pid}/statm", os.O_RDONLY)
+        return int(os.pread(fd, 64, 0).split()[1]) * _PAGINA
+    except (OSError, IndexError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+def _pilha():
+    pilha = getattr(_local, "pilha", None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+class Trecho:
+    def __init__(self, nome, pai=None, rastro=None, atributos=None):
+        self.id = os.urandom(8).hex()
+        self.nome = nome
+        self.pai = pai
+        self.rastro = rastro or (pai.rastro if pai else None) or getattr(_local, "rastro", None) or self.id
+        self.atributos = dict(atributos or {})
+        self.thread = threading.current_thread().name
+        self.ident = threading.get_ident()
+        self.bytes_entrada = 0
+        self.bytes_saida = 0
+        self.cpu_outras = 0.0    # CPU de trechos filhos que rodaram em outras threads
+        self.cpu_filhos = 0.0    # CPU de subprocessos (ver `executar`)
+        self.rss_filhos = 0      # maior RSS de um subprocesso
+        self.erro = None
+
+    def iniciar(self):
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.thread_time()
+        self.rss_pico = _rss()
+        _amostrador.entrar(self)
+
+    def encerrar(self):
+        self.wall = time.perf_counter() - self._t0
+        self.cpu = time.thread_time() - self._cpu0 + self.cpu_outras
+        _amostrador.sair(self)
+        self.rss_pico = max(self.rss_pico, _rss())
+        pai = self.pai
+        if pai is not None:
+            with _lock:
+                # Filho na mesma thread: a CPU dele já está no thread_time do pai
+                pai.cpu_outras += self.cpu if pai.ident != self.ident else self.cpu_outras
+                pai.cpu_filhos += self.cpu_filhos
+                pai.rss_filhos = max(pai.rss_filhos, self.rss_filhos)
+                pai.bytes_entrada += self.bytes_entrada
+                pai.bytes_saida += self.bytes_saida
+
+    def contar(self, entrada=0, saida=0):
+        with _lock:
+            self.bytes_entrada += entrada
+            self.bytes_saida += saida
+
+    def anotar(self, **atributos):
+        self.atributos.update(atributos)
+
+    def linha(self):
+        """Linha de `rastreio_trechos` (ver db.CAMPOS_TRECHO)."""
+        return (
+            self.id, self.rastro, self.pai.id if self.pai else None, self.nome, self.thread, os.getpid(),
+            self.inicio, round(self.wall * 1000, 3), round(self.cpu * 1000, 3), round(self.cpu_filhos * 1000, 3),
+            round(self.rss_pico / 2**20, 1), round(self.rss_filhos / 2**20, 1) if self.rss_filhos else None,
+            self.bytes_entrada, self.bytes_saida, self.erro,
+            json.dumps(self.atributos, ensure_ascii=False, default=str) if self.atributos else None,
+        )
+
+
+class _Amostrador:
+    """Lê o RSS periodicamente enquanto houver trechos abertos e guarda o pico de cada um."""
+
+    def __init__(self):
+        self.abertos = set()
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def entrar(self, trecho):
+        with self.cond:
+            self.abertos.add(trecho)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._laco, name="rastreio-rss", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def sair(self, trecho):
+        with self.cond:
+            self.abertos.discard(trecho)
+
+    def _laco(self):
+        while True:
+            with self.cond:
+                while not self.abertos:
+                    self.cond.wait()  # parada enquanto nada é medido
+                abertos = list(self.abertos)
+            rss = _rss()
+            for trecho in abertos:
+                if rss > trecho.rss_pico:
+                    trecho.rss_pico = rss
+            time.sleep(INTERVALO_AMOSTRA)
+
+
+class _Gravador:
+    """Junta os trechos fechados e grava em lote no banco."""
+
+    def __init__(self):
+        self.linhas = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def adicionar(self, trecho):
+        with self.lock:
+            self.linhas.append(trecho.linha())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._laco, name="rastreio-gravacao", daemon=True)
+                self.thread.start()
+                atexit.register(self.descarregar)
+
+    def descarregar(self):
+        with self.lock:
+            linhas, self.linhas = self.linhas, []
+        if linhas:
+            try:
+                db.gravar_trechos(linhas)
+            except Exception as e:  # diagnóstico nunca derruba a produção
+                print(f"Erro ao gravar rastreio: {e}")
+        return len(linhas)
+
+    def _laco(self):
+        while True:
+            time.sleep(ATRASO_GRAVACAO)
+            self.descarregar()
+
+
+_amostrador = _Amostrador()
+_gravador = _Gravador()
+
+
+# ---------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------
+
+def atual():
+    """Trecho aberto nesta thread (ou o herdado via `propagar`), ou None."""
+    pilha = _pilha()
+    return pilha[-1] if pilha else getattr(_local, "herdado", None)
+
+
+def definir_rastro(rastro):
+    """Rastro dos próximos trechos-raiz desta thread (ex.: a chave da produção aberta na página)."""
+    _local.rastro = rastro
+
+
+@contextmanager
+def trecho(nome, rastro=None, **atributos):
+    """
+    Mede o bloco `with` como um trecho filho do atual. Exceções ficam
+    registradas em `erro` e seguem adiante.
+    """
+    if not ATIVO:
+        yield None
+        return
+    pilha = _pilha()
+    t = Trecho(nome, atual(), rastro, atributos)
+    t.iniciar()
+    pilha.append(t)
+    try:
+        yield t
+    except Exception as e:
+        t.erro = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        # Não necessariamente o topo: geradores podem fechar fora de ordem
+        pilha.remove(t)
+        t.encerrar()
+        _gravador.adicionar(t)
+
+
+def medido(nome=None, **atributos):
+    """Decorador: cada chamada da função vira um trecho."""
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with trecho(nome or funcao.__qualname__, **atributos):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorar
+
+
+def propagar(funcao):
+    """Envolve `funcao` para rodar noutra thread como filha do trecho atual."""
+    pai = atual()
+    if pai is None:
+        return funcao
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        anterior = getattr(_local, "herdado", None)
+        _local.herdado = pai
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _local.herdado = anterior
+    return envolvida
+
+
+def contar(entrada=0, saida=0):
+    """Soma bytes lidos (`entrada`) e gravados/enviados (`saida`) ao trecho atual."""
+    t = atual()
+    if t is not None:
+        t.contar(entrada, saida)
+
+
+def anotar(**atributos):
+    t = atual()
+    if t is not None:
+        t.anotar(**atributos)
+
+
+def tamanho(*caminhos):
+    """Soma dos tamanhos dos arquivos que existem (para `contar`)."""
+    return sum(os.path.getsize(c) for c in caminhos if c and os.path.exists(c))
+
+
+def executar(cmd, entrada=None, text=False):
+    """
+    `subprocess.run(cmd, capture_output=True)` que também registra, no trecho
+    atual, a CPU e o pico de RSS do subprocesso (os.wait4, só POSIX).
+    """
+    if not hasattr(os, "wait4"):
+        return subprocess.run(cmd, input=entrada, capture_output=True, text=text)
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if entrada is not None else subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text)
+    saidas = {}
+
+    def ler(nome, fluxo):
+        saidas[nome] = fluxo.read()
+        fluxo.close()
+
+    leitores = [threading.Thread(target=ler, args=a, daemon=True) for a in (("out", proc.stdout), ("err", proc.stderr))]
+    for leitor in leitores:
+        leitor.start()
+    if entrada is not None:
+        try:
+            proc.stdin.write(entrada)
+        except BrokenPipeError:
+            pass
+        proc.stdin.close()
+    for leitor in leitores:
+        leitor.join()
+
+    try:
+        _, status, uso = os.wait4(proc.pid, 0)
+    except ChildProcessError:  # já recolhido por outro caminho
+        proc.wait()
+    else:
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        t = atual()
+        if t is not None:
+            with _lock:
+                t.cpu_filhos += uso.ru_utime + uso.ru_stime
+                t.rss_filhos = max(t.rss_filhos, uso.ru_maxrss * 1024)  # KiB no Linux
+    return subprocess.CompletedProcess(cmd, proc.returncode, saidas.get("out"), saidas.get("err"))
+
+
+def descarregar():
+    """Grava já os trechos pendentes (fim de um lote, benchmark, exportação)."""
+    return _gravador.descarregar()
+
+
+# ---------------------------------------------------------------------
+# Exportação (Trace Event Format: chrome://tracing, Perfetto, speedscope)
+# ---------------------------------------------------------------------
+
+def chrome_trace(trechos):
+    """
+    Converte trechos (dicts de db.carregar_trechos) em eventos "X" (duração
+    completa), uma faixa por thread, com as medidas em `args`.
+    """
+    eventos, tids = [], {}
+    for t in trechos:
+        tid = tids.setdefault((t["pid"], t["thread"]), len(tids) + 1)
+        args = {
+            "rastro": t["rastro"], "cpu_ms": t["cpu_ms"], "cpu_subprocessos_ms": t["cpu_filhos_ms"],
+            "rss_pico_mb": t["rss_pico_mb"], "bytes_entrada": t["bytes_entrada"], "bytes_saida": t["bytes_saida"],
+        }
+        if t["rss_filhos_mb"]:
+            args["rss_subprocesso_mb"] = t["rss_filhos_mb"]
+        if t["erro"]:
+            args["erro"] = t["erro"]
+        if t["atributos_json"]:
+            args.update(json.loads(t["atributos_json"]))
+        eventos.append({
+            "name": t["nome"], "cat": t["nome"].split(".")[0], "ph": "X",
+            "ts": round(t["inicio"] * 1e6), "dur": round(t["wall_ms"] * 1000),
+            "pid": t["pid"], "tid": tid, "args": args,
+        })
+    for (pid, thread), tid in tids.items():
+        eventos.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+    return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+
+def exportar_chrome_trace(caminho, rastro=None, desde=None):
+    """Grava em `caminho` os trechos do rastro (ou desde `desde`). Retorna quantos."""
+    descarregar()
+    trechos = db.carregar_trechos(rastro=rastro, desde=desde)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(trechos), f, ensure_ascii=False)
+    return len(trechos)
@@ -0,0 +1,513 @@
+# ---------------------------------------------------------------------
+# Roteiro: prompts e geração dos 4 blocos via Groq
+# ---------------------------------------------------------------------
+import re
+import json
+import time
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from modules import avisos
+from modules import database as db
+from modules import rastreio
+from modules.limites import LIMITES
+
+MODELO_GROQ = "llama-3.3-70b-versatile"
+
+# Chaves dos blocos no progresso, na ordem da narração
+BLOCOS = ["bloco_leitura", "bloco_reflexao", "bloco_aplicacao", "bloco_oracao"]
+
+TEMPERATURAS = {
+    "bloco_leitura": 0.3,
+    "bloco_reflexao": 0.5,
+    "bloco_aplicacao": 0.6,
+    "bloco_oracao": 0.6,
+}
+
+# Modos de geração:
+#   "agrupado": uma só requisição com as 4 instruções e o texto enviado uma
+#               vez, resposta em JSON (um campo por bloco);
+#   "por_bloco": uma requisição por bloco, as 4 em paralelo.
+MODOS = ["agrupado", "por_bloco"]
+MODO_PADRAO = "agrupado"
+
+# Campo do JSON (modo agrupado) -> chave do bloco, e o início obrigatório de cada um
+CAMPOS_JSON = {
+    "leitura": "bloco_leitura",
+    "reflexao": "bloco_reflexao",
+    "aplicacao": "bloco_aplicacao",
+    "oracao": "bloco_oracao",
+}
+# (a leitura não tem: o início muda com o livro, "ajuste conforme a referência")
+INICIOS = {
+    "bloco_leitura": "",
+    "bloco_reflexao": "Reflexão.",
+    "bloco_aplicacao": "Aplicação na sua vida.",
+    "bloco_oracao": "Vamos orar:",
+}
+ESQUEMA_ROTEIRO = {
+    "type": "object",
+    "properties": {campo: {"type": "string"} for campo in CAMPOS_JSON},
+    "required": list(CAMPOS_JSON),
+    "additionalProperties": False,
+}
+# Uma temperatura para os 4 blocos juntos (média das individuais)
+TEMPERATURA_AGRUPADA = 0.5
+
+
+def criar_cliente_groq(api_key):
+    """Cria o cliente Groq (import tardio: a lib só é carregada quando usada)."""
+    if not api_key:
+        return None
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+
+# --- BLOCO 1: LEITURA FORMATADA ---
+def prompt_leitura(texto_original, referencia):
+    return f"""
+    Atue como um leitor litúrgico católico.
+    Reescreva o texto abaixo para o formato solene de proclamação.
+    Referência: {referencia}
+    Texto Original: "{texto_original}"
+
+    Regras de Formatação:
+    1. Inicie com: "Proclamação do Evangelho segundo [Nome], capítulo [X], versículos [Y]. Glória a vós, Senhor!" (Ajuste conforme a referência).
+    2. Insira o corpo do texto corrigido e pontuado para leitura em voz alta.
+    3. Termine com: "Palavra da Salvação. Glória a vós, Senhor."
+    4. Não adicione comentários, apenas o texto litúrgico formatado.
+    """
+
+# --- BLOCO 2: REFLEXÃO ---
+def prompt_reflexao(texto_original, referencia=None):
+    return f"""
+    Atue como um especialista em teologia católica e liturgia.
+    Leia o seguinte texto do Evangelho: "{texto_original}"
+
+    Sua tarefa é escrever uma reflexão teológica curta e profunda sobre este texto.
+
+    Regras estritas:
+    1. Inicie o texto EXATAMENTE com a palavra "Reflexão." (com o ponto final e quebra de linha).
+    2. O conteúdo deve ter entre 80 a 100 palavras.
+    3. Use uma linguagem culta, mas acessível, focada na teologia da missão, compaixão e Reino de Deus.
+    4. O texto deve ser um parágrafo único.
+    5. Não use emojis ou formatação de markdown (negrito/itálico) no corpo do texto.
+    """
+
+# --- BLOCO 3: APLICAÇÃO NA VIDA ---
+def prompt_aplicacao(texto_original, referencia=None):
+    return f"""
+    Atue como um diretor espiritual católico focado em vivência prática da fé.
+    Leia o seguinte texto do Evangelho: "{texto_original}"
+
+    Sua tarefa é escrever um parágrafo de aplicação prática para o dia a dia.
+
+    Regras estritas:
+    1. Inicie o texto EXATAMENTE com a frase "Aplicação na sua vida." (com ponto final e quebra de linha).
+    2. O tamanho deve ser semelhante ao exemplo (aprox. 80 a 100 palavras).
+    3. Tom de voz: Desafiador, pessoal (use "você" ou "nós") e motivador.
+    4. Estrutura obrigatória:
+       - Conecte a missão do texto bíblico à identidade do leitor como discípulo.
+       - Inclua uma pergunta direta de reflexão/exame de consciência (ex: "Pergunte-se: ...").
+       - Termine com uma chamada para ação concreta (uso de tempo, talentos ou recursos) e serviço ao próximo.
+    """
+
+# --- BLOCO 4: ORAÇÃO ---
+def prompt_oracao(texto_original, referencia=None):
+    return f"""
+    Atue como um líder espiritual católico inspirador.
+    Com base no texto do Evangelho: "{texto_original}"
+
+    Sua tarefa é escrever a conclusão da reflexão, composta por uma Oração e um Envio Final.
+
+    Regras estritas de Estrutura:
+    1. PRIMEIRA PARTE (Oração):
+       - Inicie EXATAMENTE com o texto: "Vamos orar:" (quebra de linha).
+       - Escreva uma oração de um parágrafo (aprox. 60-80 palavras).
+       - Dirija-se a Jesus ou ao Pai. Agradeça pela mensagem do Evangelho e peça a graça de colocá-la em prática.
+       - Termine com "Amém."
+
+    2. SEGUNDA PARTE (Envio):
+       - Pule uma linha após o "Amém".
+       - Inicie EXATAMENTE com a frase: "Se esta Palavra tocou o seu coração," (quebra de linha).
+       - Escreva um parágrafo de encerramento (aprox. 60-80 palavras).
+       - Incentive o leitor a não guardar a Boa Nova, a realizar uma atitude concreta de caridade hoje (cite uma ação relacionada ao texto) e a compartilhar a mensagem com um amigo.
+    """
+
+PROMPTS = {
+    "bloco_leitura": prompt_leitura,
+    "bloco_reflexao": prompt_reflexao,
+    "bloco_aplicacao": prompt_aplicacao,
+    "bloco_oracao": prompt_oracao,
+}
+
+
+# --- MODO AGRUPADO: AS 4 TAREFAS NUMA SÓ REQUISIÇÃO ---
+def prompt_agrupado(texto_original, referencia):
+    """
+    As mesmas instruções dos 4 prompts, com o texto base enviado uma vez só
+    no topo; cada tarefa se refere a ele em vez de repeti-lo.
+    """
+    tarefas = "\n".join(
+        f"### Campo \"{campo}\"\n{PROMPTS[chave]('(o TEXTO BASE acima)', referencia)}"
+        for campo, chave in CAMPOS_JSON.items()
+    )
+    return f"""
+    Você vai escrever os 4 blocos de um roteiro a partir do mesmo texto bíblico.
+    Referência: {referencia}
+    TEXTO BASE: "{texto_original}"
+
+    Cada bloco é uma tarefa independente, descrita abaixo com suas próprias regras.
+{tarefas}
+
+    Responda APENAS com um objeto JSON neste esquema, um campo por tarefa:
+    {json.dumps(ESQUEMA_ROTEIRO, ensure_ascii=False)}
+    """
+
+
+def validar_agrupado(resposta):
+    """
+    Confere a resposta do modo agrupado. Retorna ({chave_bloco: texto} dos
+    blocos válidos, [chaves_bloco inválidas]).
+    """
+    try:
+        dados = json.loads(resposta)
+    except (TypeError, ValueError):
+        return {}, list(BLOCOS)
+    if not isinstance(dados, dict):
+        return {}, list(BLOCOS)
+
+    validos, invalidos = {}, []
+    for campo, chave in CAMPOS_JSON.items():
+        texto = dados.get(campo)
+        if isinstance(texto, str) and texto.strip() and texto.strip().startswith(INICIOS[chave]):
+            validos[chave] = texto.strip()
+        else:
+            invalidos.append(chave)
+    return validos, invalidos
+
+
+# --- CENAS DAS IMAGENS ---
+# Em vez do texto inteiro da leitura (URLs enormes no Pollinations, payloads
+# grandes no Imagen), cada prompt de imagem recebe uma descrição visual
+# curta, gerada junto com o roteiro e guardada por hash do texto.
+CENAS = ["bloco_1", "bloco_2", "bloco_3", "bloco_4"]
+LIMITE_CENA = 300  # caracteres por cena
+
+
+def prompt_cenas(texto_original, referencia):
+    return f"""
+    Atue como um diretor de arte preparando as imagens de um vídeo.
+    Referência: {referencia}
+    Texto: "{texto_original}"
+
+    Escreva 4 descrições visuais curtas, EM INGLÊS, com no máximo 40 palavras cada:
+    - "bloco_1": o acontecimento principal do texto, no seu cenário bíblico (quem, onde, a ação central).
+    - "bloco_2": o tema central do texto, em poucas palavras concretas (será assunto de uma conversa).
+    - "bloco_3": a lição prática do texto para a vida de hoje.
+    - "bloco_4": o clima espiritual do texto, para um momento de oração.
+
+    Descreva só o que se vê: pessoas, lugar, ação, luz. Sem citações, sem versículos, sem texto na imagem.
+    Responda APENAS com um objeto JSON com as chaves bloco_1, bloco_2, bloco_3 e bloco_4.
+    """
+
+
+def _encurtar(texto, limite=LIMITE_CENA):
+    """Texto numa linha só, cortado no último espaço antes do limite."""
+    texto = " ".join((texto or "").split())
+    if len(texto) <= limite:
+        return texto
+    return texto[:limite].rsplit(" ", 1)[0]
+
+
+def hash_texto(texto_original):
+    return hashlib.sha1(" ".join(texto_original.split()).encode("utf-8")).hexdigest()
+
+
+def validar_cenas(resposta):
+    """As 4 cenas da resposta em JSON, já encurtadas; None se faltar alguma."""
+    try:
+        dados = json.loads(resposta)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(dados, dict):
+        return None
+    cenas = {bloco: _encurtar(dados.get(bloco)) if isinstance(dados.get(bloco), str) else "" for bloco in CENAS}
+    return cenas if all(cenas.values()) else None
+
+
+def gerar_cenas(client, texto_original, referencia, uso=None):
+    """Gera as 4 cenas numa requisição (JSON). Retorna o dict ou None."""
+    prompt = prompt_cenas(texto_original, referencia)
+    with rastreio.trecho("llm.cenas", modelo=MODELO_GROQ):
+        try:
+            _aguardar_limite()
+            completion = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=MODELO_GROQ,
+                temperature=0.4,
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            print(f"Erro ao gerar cenas das imagens: {e}")
+            return None
+        resposta = completion.choices[0].message.content or ""
+        rastreio.contar(entrada=len(resposta.encode()), saida=len(prompt.encode()))
+    _contar_uso(uso, getattr(completion, "usage", None))
+    if not resposta:
+        print("Erro ao gerar cenas das imagens: resposta vazia.")
+        return None
+    return validar_cenas(resposta)
+
+
+def cenas_em_cache(texto_original):
+    return db.carregar_cenas(hash_texto(texto_original))
+
+
+def obter_cenas(client, texto_original, referencia, uso=None):
+    """Cenas do cache (pelo hash do texto) ou geradas e guardadas. None se a geração falhar."""
+    chave = hash_texto(texto_original)
+    cenas = db.carregar_cenas(chave)
+    if cenas is None:
+        cenas = gerar_cenas(client, texto_original, referencia, uso)
+        if cenas:
+            db.salvar_cenas(chave, cenas)
+    return cenas
+
+
+def montar_prompts_imagem(texto_original, cenas=None):
+    """
+    Prompts de imagem das 4 cenas (um por bloco), a partir das descrições
+    curtas em `cenas`. Sem elas, usa o começo do texto: o prompt nunca passa
+    de LIMITE_CENA caracteres de conteúdo, qualquer que seja a leitura.
+    """
+    cenas = cenas or {bloco: _encurtar(texto_original) for bloco in CENAS}
+    # Reforçando o aspecto "contemporâneo/roupas modernas" nos blocos 2, 3 e 4
+    return {
+        "bloco_1": f"A high-quality, cinematic, photorealistic biblical scene: '{cenas['bloco_1']}'. Style: Epic movie shot, First Century Palestine setting, dramatic lighting, 8k resolution, highly detailed texture. Constraint: No text, no typography, no watermarks.",
+        
+        "bloco_2": f"A photorealistic image of Jesus Christ (traditional appearance with robes) sitting in a modern, busy everyday setting (like a coffee shop, a subway station, or a busy park). Action: He is having a friendly conversation with an **ordinary contemporary person wearing casual modern clothes (like jeans, t-shirt, or hoodie)**. Context: They are discussing the biblical theme: '{cenas['bloco_2']}'. Style: Candid photography, depth of field, natural lighting, realistic interactions, vertical 9:16 framing.",
+        
+        "bloco_3": f"A photorealistic image of Jesus Christ (traditional appearance) walking or standing with an **ordinary modern person dressed in contemporary daily attire** in a public urban space (like a street, bus stop, or office). Action: Jesus is gesturing kindly, offering advice or comfort, like a mentor. Context: Applying this biblical lesson to real life: '{cenas['bloco_3']}'. Style: Warm atmosphere, urban photography style, 4k resolution, vertical 9:16 framing.",
+        
+        "bloco_4": f"A serene, photorealistic image of Jesus Christ and an **ordinary person wearing modern casual clothing** in a quiet, calm location (like a peaceful living room or a quiet garden corner). Action: They are praying together, perhaps with eyes closed or hands clasped. Atmosphere: Spiritual, peaceful, soft divine lighting, intimate and comforting. Context: Based on the spirituality of: '{cenas['bloco_4']}'."
+    }
+
+
+# --- STREAMING ---
+# As respostas chegam pedaço a pedaço (stream=True). Cada bloco registra o
+# tempo até o primeiro token e os tokens por segundo em uso["blocos"].
+
+_lock_uso = threading.Lock()
+_FIM = object()
+
+
+def _contar_uso(uso, tokens):
+    """Soma tokens e requisições de uma resposta em `uso` (se informado)."""
+    if uso is None:
+        return
+    with _lock_uso:  # blocos em paralelo somam no mesmo dict
+        uso["requisicoes"] = uso.get("requisicoes", 0) + 1
+        uso["tokens_entrada"] = uso.get("tokens_entrada", 0) + (getattr(tokens, "prompt_tokens", 0) or 0)
+        uso["tokens_saida"] = uso.get("tokens_saida", 0) + (getattr(tokens, "completion_tokens", 0) or 0)
+
+
+def _aguardar_limite():
+    """Espera a vez no limite de taxa do Groq (o tempo de fila fica anotado no trecho)."""
+    inicio = time.perf_counter()
+    LIMITES["groq"].adquirir()
+    rastreio.anotar(espera_limite_ms=round((time.perf_counter() - inicio) * 1000, 1))
+
+
+def _medir_bloco(uso, chave, medidas):
+    if uso is not None:
+        with _lock_uso:
+            uso.setdefault("blocos", {})[chave] = medidas
+
+
+def _transmitir(client, prompt, temperatura, medidas, uso=None, parar=None, **extra):
+    """
+    Gera uma resposta em streaming, produzindo os pedaços de texto. Ao
+    terminar, preenche `medidas` (ttft_s, tokens, tokens_s). Com `parar`
+    acionado (ou o gerador fechado), a conexão é encerrada no meio.
+    """
+    with rastreio.trecho("llm.stream", modelo=MODELO_GROQ) as trecho:
+        _aguardar_limite()
+        inicio = time.perf_counter()
+        stream = client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=MODELO_GROQ,
+            temperature=temperatura,
+            stream=True,
+            **extra,
+        )
+        primeiro, pedacos, tokens, recebidos = None, 0, None, 0
+        try:
+            for chunk in stream:
+                if parar is not None and parar.is_set():
+                    break
+                # O Groq manda o uso de tokens no último pedaço, em x_groq
+                tokens = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) or tokens
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if primeiro is None:
+                        primeiro = time.perf_counter()
+                    pedacos += 1
+                    recebidos += len(delta.encode())
+                    yield delta
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            fim = time.perf_counter()
+            n = getattr(tokens, "completion_tokens", None) or pedacos
+            gerando = fim - primeiro if primeiro else 0
+            medidas.update(
+                ttft_s=round(primeiro - inicio, 3) if primeiro else None,
+                tokens=n,
+                tokens_s=round(n / gerando, 1) if gerando > 0 else None,
+            )
+            _contar_uso(uso, tokens)
+            if trecho:  # o gerador pode ser fechado com outro trecho no topo da pilha
+                trecho.contar(entrada=recebidos, saida=len(prompt.encode()))
+                trecho.anotar(**medidas)
+
+
+def _transmitir_blocos(client, chaves, texto_original, referencia, uso=None):
+    """
+    Um stream por bloco, em paralelo. Produz (chave, texto_até_agora) na
+    thread de quem consome, na ordem em que os pedaços chegam.
+    """
+    fila, parar = queue.Queue(), threading.Event()
+
+    def trabalhar(chave):
+        medidas, texto = {}, ""
+        try:
+            for delta in _transmitir(client, PROMPTS[chave](texto_original, referencia), TEMPERATURAS[chave],
+                                     medidas, uso, parar):
+                texto += delta
+                fila.put((chave, texto))
+            _medir_bloco(uso, chave, medidas)
+            fila.put((chave, _FIM))
+        except Exception as e:
+            fila.put((chave, e))
+
+    pool = ThreadPoolExecutor(max_workers=len(BLOCOS))
+    try:
+        for chave in chaves:
+            pool.submit(rastreio.propagar(trabalhar), chave)
+        ativos = set(chaves)
+        while ativos:
+            chave, item = fila.get()
+            if item is _FIM:
+                ativos.discard(chave)
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield chave, item
+    finally:
+        parar.set()  # consumidor saiu no meio: encerra os streams restantes
+        pool.shutdown(wait=False)
+
+
+_CAMPO_JSON = re.compile(r'"(%s)"\s*:\s*"((?:[^"\\]|\\.)*)' % "|".join(CAMPOS_JSON))
+
+
+def campos_parciais(bruto):
+    """Texto (possivelmente incompleto) de cada campo de um JSON ainda chegando."""
+    campos = {}
+    for campo, valor in _CAMPO_JSON.findall(bruto):
+        if valor.endswith("\\") and not valor.endswith("\\\\"):
+            valor = valor[:-1]  # escape cortado no meio
+        try:
+            campos[CAMPOS_JSON[campo]] = json.loads(f'"{valor}"')
+        except ValueError:
+            pass  # \u cortado no meio: espera o próximo pedaço
+    return campos
+
+
+def _transmitir_agrupado(client, texto_original, referencia, uso=None):
+    """
+    O modo agrupado em streaming: produz (chave, texto_até_agora) à medida
+    que cada campo do JSON chega. Blocos inválidos no fim são refeitos
+    individualmente (também em streaming).
+    """
+    medidas, bruto, inicio = {}, "", time.perf_counter()
+    vistos, primeiros = {}, {}
+    for delta in _transmitir(client, prompt_agrupado(texto_original, referencia), TEMPERATURA_AGRUPADA,
+                             medidas, uso, response_format={"type": "json_object"}):
+        bruto += delta
+        for chave, texto in campos_parciais(bruto).items():
+            if vistos.get(chave) != texto:
+                primeiros.setdefault(chave, round(time.perf_counter() - inicio, 3))
+                vistos[chave] = texto
+                yield chave, texto
+
+    blocos, invalidos = validar_agrupado(bruto)
+    for chave, texto in blocos.items():
+        # tokens/s é o da resposta inteira: os campos chegam um depois do outro
+        _medir_bloco(uso, chave, {"ttft_s": primeiros.get(chave), "tokens_s": medidas["tokens_s"]})
+        yield chave, texto
+    if invalidos:
+        print(f"Resposta agrupada inválida em {', '.join(invalidos)}; gerando esses blocos separadamente.")
+        if uso is not None:
+            uso["refeitos"] = invalidos
+        yield from _transmitir_blocos(client, invalidos, texto_original, referencia, uso)
+
+
+def transmitir_conteudo_ia(client, texto_original, referencia, modo=None, uso=None):
+    """
+    Gera os 4 blocos em streaming, produzindo (chave_bloco, texto_até_agora)
+    a cada pedaço recebido; o último texto de cada chave é o final. Por fim
+    produz ('prompts_imagem', {...}), com as cenas geradas em paralelo (ou do
+    cache). Fechar o gerador no meio encerra as conexões. Se `uso` for um
+    dict, recebe o modo, o tempo, as requisições, os tokens e as medidas de
+    cada bloco.
+    """
+    modo = modo or MODO_PADRAO
+    inicio = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=1)
+    with rastreio.trecho("roteiro.gerar", modo=modo, referencia=referencia):
+        try:
+            futuro_cenas = pool.submit(rastreio.propagar(obter_cenas), client, texto_original, referencia, uso)
+            if modo == "agrupado":
+                yield from _transmitir_agrupado(client, texto_original, referencia, uso)
+            else:
+                yield from _transmitir_blocos(client, BLOCOS, texto_original, referencia, uso)
+            yield "prompts_imagem", montar_prompts_imagem(texto_original, futuro_cenas.result())
+        finally:
+            pool.shutdown(wait=False)
+    if uso is not None:
+        uso.update(modo=modo, segundos=round(time.perf_counter() - inicio, 2))
+
+
+def gerar_conteudo_ia(client, texto_original, referencia, notificar=avisos.console, modo=None, uso=None):
+    """
+    Gera os 4 blocos de texto e os 4 prompts de imagem usando Groq.
+    `modo` é um de MODOS (padrão: MODO_PADRAO). Se `uso` for um dict, recebe
+    o modo, o tempo, as requisições e os tokens gastos.
+    """
+    if not client:
+        notificar("erro", "Chave de API Groq não configurada nos secrets.")
+        return None, None, None, None, None
+
+    blocos = dict(transmitir_conteudo_ia(client, texto_original, referencia, modo, uso))
+    vazios = [chave for chave in BLOCOS if not blocos.get(chave)]
+    if vazios:
+        # Um stream pode terminar sem texto (inclusive o de um bloco refeito)
+        notificar("erro", f"O roteiro veio sem texto em: {', '.join(vazios)}.")
+        return None, None, None, None, None
+    txt_leitura, txt_reflexao, txt_aplicacao, txt_oracao = [blocos[chave] for chave in BLOCOS]
+    prompts_img = blocos.get("prompts_imagem")
+
+    return txt_leitura, txt_reflexao, txt_aplicacao, txt_oracao, prompts_img
+
+
+def texto_roteiro(progresso):
+    """Texto completo do roteiro salvo (ou montado a partir dos blocos)."""
+    texto = progresso.get('texto_roteiro_completo', progresso.get('texto_roteiro', ''))
+    if not texto:
+        # Tenta montar com blocos isolados
+        texto = "\n\n".join(progresso.get(chave, '') for chave in BLOCOS).strip()
+    return texto
@@ -0,0 +1,201 @@
+import os
+import json
+import math
+import struct
+
+import numpy as np
+
+from modules import rastreio
+from modules import midia
+
+# ---------------------------------------------------------------------
+# Trilha sonora de fundo com "ducking" pré-calculado
+# ---------------------------------------------------------------------
+# A música baixa enquanto há fala e volta nas pausas. Em vez de um
+# compressor com sidechain rodando em cada render, a atividade de fala é
+# medida uma vez, logo após a síntese: energia por janela de 20 ms sobre o
+# WAV mapeado em memória (NumPy, sem carregar o arquivo). O envelope
+# resultante (pontos tempo -> ganho em dB) fica ao lado do áudio, em
+# '<base>.ducking.json', e o render só o converte em comandos de volume
+# (asendcmd) dentro do mesmo filtro que já mistura o áudio.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_TRILHAS = os.environ.get("TRILHAS_DIR", os.path.join(RAIZ, "trilhas"))
+EXTENSOES = (".mp3", ".m4a", ".ogg", ".opus", ".flac", ".wav")
+VOLUME_PADRAO_DB = -18.0  # volume da música nas pausas, relativo ao arquivo original
+EXTENSAO_ENVELOPE = ".ducking.json"
+
+JANELA_S = 0.02           # resolução da análise de energia
+BLOCO_JANELAS = 8192      # janelas convertidas para float por vez (memória limitada)
+LIMIAR_MINIMO_DB = -50.0  # abaixo disso é silêncio, qualquer que seja a gravação
+FAIXA_DINAMICA_DB = 30.0  # fala = até 30 dB abaixo do percentil 95 da energia
+ATENUACAO_DB = 12.0       # quanto a música baixa durante a fala
+ATAQUE_S = 0.15           # a música começa a baixar antes da fala (o envelope conhece o futuro)
+LIBERACAO_S = 0.6
+PAUSA_MINIMA_S = 1.2      # pausas menores (entre frases) mantêm a música baixa
+FALA_MINIMA_S = 0.1       # estalos e respirações curtas não contam
+PASSO_RAMPA_S = 0.02      # um comando de volume a cada passo das rampas
+FADE_S = 1.5              # entrada e saída da música
+
+
+def listar():
+    """Arquivos de música disponíveis em PASTA_TRILHAS, em ordem alfabética."""
+    if not os.path.isdir(PASTA_TRILHAS):
+        return []
+    return sorted(os.path.join(PASTA_TRILHAS, nome) for nome in os.listdir(PASTA_TRILHAS)
+                  if nome.lower().endswith(EXTENSOES))
+
+
+def caminho_envelope(caminho_audio):
+    return os.path.splitext(caminho_audio)[0] + EXTENSAO_ENVELOPE
+
+
+def _bloco_dados(caminho_wav):
+    """(início dos dados, bytes, canais, taxa) de um WAV PCM de 16 bits."""
+    with open(caminho_wav, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise midia.ErroMidia(f"não é um WAV RIFF: {caminho_wav}")
+        fmt = None
+        while True:
+            cab = f.read(8)
+            if len(cab) < 8:
+                raise midia.ErroMidia("WAV sem bloco 'data'")
+            nome, n = struct.unpack("<4sI", cab)
+            if nome == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(n - 16 + (n & 1), os.SEEK_CUR)
+            elif nome == b"data":
+                if not fmt or fmt[0] not in (1, 0xFFFE) or fmt[5] != 16:
+                    raise midia.ErroMidia("o envelope só lê WAV PCM de 16 bits")
+                inicio = f.tell()
+                tamanho = os.fstat(f.fileno()).st_size - inicio
+                return inicio, min(n, tamanho) if n else tamanho, fmt[1], fmt[2]
+            else:
+                f.seek(n + (n & 1), os.SEEK_CUR)
+
+
+def energia_db(caminho_wav):
+    """Energia (dBFS) de cada janela de JANELA_S do WAV, todos os canais juntos."""
+    inicio, n_bytes, canais, taxa = _bloco_dados(caminho_wav)
+    por_janela = max(1, int(taxa * JANELA_S)) * canais
+    n = n_bytes // 2 // por_janela
+    if not n:
+        return np.empty(0)
+    amostras = np.memmap(caminho_wav, dtype="<i2", mode="r", offset=inicio, shape=(n * por_janela,))
+    janelas = amostras.reshape(n, por_janela)
+    energia = np.empty(n)
+    for i in range(0, n, BLOCO_JANELAS):
+        bloco = janelas[i:i + BLOCO_JANELAS].astype(np.float32)
+        energia[i:i + len(bloco)] = np.einsum("ij,ij->i", bloco, bloco)
+    return 10 * np.log10(energia / (por_janela * 32768.0 ** 2) + 1e-12)
+
+
+def trechos_de_fala(db):
+    """(inícios, fins) em segundos dos trechos de fala, com as pausas curtas preenchidas."""
+    if not len(db):
+        return np.empty(0), np.empty(0)
+    limiar = max(LIMIAR_MINIMO_DB, float(np.percentile(db, 95)) - FAIXA_DINAMICA_DB)
+    bordas = np.diff(np.concatenate(([0], (db > limiar).astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordas == 1) * JANELA_S
+    fins = np.flatnonzero(bordas == -1) * JANELA_S
+    if not len(inicios):
+        return inicios, fins
+
+    # Une trechos separados por pausas curtas; descarta trechos curtos demais
+    longas = inicios[1:] - fins[:-1] >= PAUSA_MINIMA_S
+    inicios = np.concatenate((inicios[:1], inicios[1:][longas]))
+    fins = np.concatenate((fins[:-1][longas], fins[-1:]))
+    validos = fins - inicios >= FALA_MINIMA_S
+    return inicios[validos], fins[validos]
+
+
+@rastreio.medido("trilha.envelope")
+def calcular_envelope(caminho_wav):
+    """
+    Envelope de ducking da narração: {'duracao_s', 'fala_s', 'pontos'},
+    com `pontos` = [[tempo, ganho_db], ...] (0 nas pausas, -ATENUACAO_DB na
+    fala, rampas lineares entre eles). Levanta ErroMidia se o WAV não puder
+    ser lido.
+    """
+    db = energia_db(caminho_wav)
+    duracao = len(db) * JANELA_S
+    inicios, fins = trechos_de_fala(db)
+    # Quatro pontos por trecho: início da rampa de descida, fala, fala, fim da subida
+    tempos = np.stack([np.maximum(inicios - ATAQUE_S, 0), inicios, fins, np.minimum(fins + LIBERACAO_S, duracao)],
+                      axis=1).ravel()
+    ganhos = np.tile([0.0, -ATENUACAO_DB, -ATENUACAO_DB, 0.0], len(inicios))
+    rastreio.anotar(trechos=len(inicios), duracao_s=round(duracao, 2))
+    return {
+        "duracao_s": round(duracao, 3),
+        "fala_s": round(float(np.sum(fins - inicios)), 3),
+        "pontos": [[round(float(t), 3), float(g)] for t, g in zip(tempos, ganhos)],
+    }
+
+
+def salvar_envelope(caminho_wav, destino=None):
+    """Calcula e grava o envelope ao lado do áudio. Retorna o caminho do JSON."""
+    destino = destino or caminho_envelope(caminho_wav)
+    envelope = calcular_envelope(caminho_wav)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({"versao": 1, "janela_s": JANELA_S, "atenuacao_db": ATENUACAO_DB, **envelope}, f)
+    return destino
+
+
+def carregar_envelope(caminho):
+    """Envelope gravado por `salvar_envelope`, ou None se não houver (ou estiver ilegível)."""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler envelope {caminho}: {e}")
+        return None
+
+
+def _linear(ganho_db):
+    return f"{10 ** (ganho_db / 20):.4f}"
+
+
+def comandos_ffmpeg(envelope, alvo="volume@duck"):
+    """
+    O envelope como comandos do filtro asendcmd ('<tempo> <alvo> volume <ganho>;'),
+    com as rampas em degraus de PASSO_RAMPA_S. Sem envelope, nenhum comando:
+    a música fica no ganho inicial (ver `ganho_inicial_db`).
+    """
+    pontos = (envelope or {}).get("pontos") or []
+    linhas = []
+    for (t0, g0), (t1, g1) in zip(pontos, pontos[1:]):
+        if g0 == g1:
+            continue
+        passos = max(1, math.ceil((t1 - t0) / PASSO_RAMPA_S))
+        for k in range(1, passos + 1):
+            linhas.append(f"{t0 + (t1 - t0) * k / passos:.3f} {alvo} volume {_linear(g0 + (g1 - g0) * k / passos)};")
+    return "".join(linha + "\n" for linha in linhas)
+
+
+def ganho_inicial_db(envelope):
+    """Ganho no início do áudio; sem envelope, a música fica baixa o tempo todo."""
+    if envelope is None:
+        return -ATENUACAO_DB
+    pontos = envelope.get("pontos") or []
+    return pontos[0][1] if pontos and pontos[0][0] <= 0 else 0.0
+
+
+def para_render(progresso, escolha, notificar=None):
+    """
+    A trilha pronta para o render ({'arquivo', 'volume_db', 'envelope'}) a
+    partir da escolha salva ({'arquivo', 'volume_db'}), ou None sem trilha.
+    """
+    if not escolha or not escolha.get("arquivo"):
+        return None
+    if not os.path.exists(escolha["arquivo"]):
+        if notificar:
+            notificar("aviso", f"Trilha não encontrada ({escolha['arquivo']}); vídeo sem música.")
+        return None
+    envelope = carregar_envelope(progresso.get('audio_ducking'))
+    if envelope is None and notificar:
+        notificar("aviso", "Narração sem envelope de ducking: a música fica baixa o vídeo todo.")
+    return {"arquivo": escolha["arquivo"], "volume_db": float(escolha.get("volume_db", VOLUME_PADRAO_DB)),
+            "envelope": envelope}
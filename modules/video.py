@@ -0,0 +1,304 @@
+import os
+
+from modules import rastreio
+from modules import midia
+from modules import masterizacao
+from modules import trilha as trilha_mod
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Formatos de saída (largura, altura). 9:16 é o original (Shorts/Reels/TikTok)
+FORMATOS = {"9:16": (1080, 1920), "1:1": (1080, 1080), "16:9": (1920, 1080)}
+FORMATO_PADRAO = "9:16"
+
+
+def sufixo_formato(formato):
+    """Sufixo dos arquivos de um formato: '' para o padrão, '_1x1', '_16x9'..."""
+    return "" if formato == FORMATO_PADRAO else "_" + formato.replace(":", "x")
+
+
+def args_audio(audio_path):
+    """A faixa AAC da masterização é copiada como está; outros áudios são codificados."""
+    if audio_path.lower().endswith(masterizacao.EXTENSAO_AAC):
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+
+def args_audio_trilha():
+    """Com trilha, o áudio sai do filtro de mixagem e é codificado no próprio render."""
+    return ["-c:a", "aac", "-b:a", "192k"]
+
+
+def criar_arquivo_concat(imagens, duracao_por_imagem, output_txt):
+    with open(output_txt, 'w', encoding='utf-8') as f:
+        for img_path in imagens:
+            safe_path = img_path.replace("'", "'\\''")
+            f.write(f"file '{safe_path}'\n")
+            f.write(f"duration {duracao_por_imagem:.2f}\n")
+        if imagens:
+            safe_last = imagens[-1].replace("'", "'\\''")
+            f.write(f"file '{safe_last}'\n")
+
+
+def escapar_caminho_filtro(path):
+    """Escapa um caminho para uso como argumento de filtro do FFmpeg."""
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "'\\\\\\''")
+
+
+def _ramo_video(entrada, entrada_overlay, entrada_audio, caminho_ass, W, H, sufixo=""):
+    """
+    Camadas de uma saída: fundo (imagens) -> overlay PNG -> visualizer ->
+    legendas ASS -> [vout<sufixo>]. `entrada_audio` (só com visualizer)
+    alimenta o showwaves.
+    """
+    partes = [f"[{entrada}]scale={W}:{H}:force_original_aspect_ratio=increase,crop={W}:{H},setsar=1[bg{sufixo}]"]
+    atual = f"bg{sufixo}"
+
+    if entrada_overlay:
+        partes.append(f"[{atual}][{entrada_overlay}]overlay=0:0[ov{sufixo}]")
+        atual = f"ov{sufixo}"
+
+    if entrada_audio:
+        altura_ondas = 200 * H // 1920  # proporcional à altura, centrado em 79% dela
+        partes.append(f"[{entrada_audio}]showwaves=s={W - 120}x{altura_ondas}:mode=cline:colors=white:rate=30,format=rgba[ondas{sufixo}]")
+        partes.append(f"[{atual}][ondas{sufixo}]overlay=60:{int(H * 0.79) - altura_ondas // 2}:shortest=1[vis{sufixo}]")
+        atual = f"vis{sufixo}"
+
+    if caminho_ass:
+        fonts_dir = os.path.join(RAIZ, "fonts")
+        partes.append(
+            f"[{atual}]ass='{escapar_caminho_filtro(caminho_ass)}':fontsdir='{escapar_caminho_filtro(fonts_dir)}'[leg{sufixo}]"
+        )
+        atual = f"leg{sufixo}"
+
+    partes.append(f"[{atual}]format=yuv420p[vout{sufixo}]")
+    return partes
+
+
+def gravar_comandos_trilha(trilha, base):
+    """
+    Grava os comandos de volume do envelope de ducking em '<base>.ducking.cmd'
+    (lidos pelo asendcmd). Retorna o caminho, ou None se não há comandos.
+    """
+    comandos = trilha_mod.comandos_ffmpeg(trilha.get("envelope"))
+    if not comandos:
+        return None
+    caminho = base + ".ducking.cmd"
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(comandos)
+    return caminho
+
+
+def montar_filtro_trilha(entrada_voz, entrada_musica, trilha, duracao_s, caminho_comandos=None, saida="aout"):
+    """
+    Mistura narração e trilha em [<saida>]: a música (em loop na entrada)
+    recebe o volume escolhido, fades de entrada e saída e o ducking do
+    envelope (asendcmd ajustando o volume@duck); a soma passa por um limitador.
+    """
+    formato = "aformat=sample_rates=48000:channel_layouts=stereo"
+    musica = [formato, f"volume={trilha['volume_db']}dB", f"afade=t=in:d={trilha_mod.FADE_S}",
+              f"afade=t=out:st={max(0.0, duracao_s - trilha_mod.FADE_S):.2f}:d={trilha_mod.FADE_S}"]
+    if caminho_comandos:
+        musica.append(f"asendcmd=f='{escapar_caminho_filtro(caminho_comandos)}'")
+    musica.append(f"volume@duck={10 ** (trilha_mod.ganho_inicial_db(trilha.get('envelope')) / 20):.4f}")
+    return (
+        f"[{entrada_voz}]{formato}[voz];[{entrada_musica}]{','.join(musica)}[musica];"
+        f"[voz][musica]amix=inputs=2:duration=first:dropout_transition=0:normalize=0,"
+        f"alimiter=limit=0.89:level=0[{saida}]"
+    )
+
+
+def montar_filtro_video(tem_overlay, visualizer, caminho_ass, W=1080, H=1920):
+    """
+    Monta o filter_complex único: fundo (imagens) -> overlay PNG -> visualizer
+    -> legendas ASS. Tudo numa só codificação.
+    Entradas: 0 = imagens (concat), 1 = áudio, 2 = overlay PNG (opcional);
+    a trilha, se houver, vem depois (ver `montar_filtro_trilha`).
+    """
+    return ";".join(_ramo_video("0:v", "2:v" if tem_overlay else None, "1:a" if visualizer else None, caminho_ass, W, H))
+
+
+def montar_filtro_multiplo(saidas, visualizer):
+    """
+    Um filter_complex para várias saídas: as imagens (e o áudio do
+    visualizer) são decodificadas uma vez e repartidas com split/asplit; cada
+    ramo tem escala, recorte, overlay e legendas do seu formato e termina em
+    [vout0], [vout1], ... Entradas: 0 = imagens, 1 = áudio, 2.. = os overlays
+    das saídas que têm um, na ordem.
+    """
+    n = len(saidas)
+    partes = ["[0:v]split=%d%s" % (n, "".join(f"[f{k}]" for k in range(n)))]
+    if visualizer:
+        partes.append("[1:a]asplit=%d%s" % (n, "".join(f"[a{k}]" for k in range(n))))
+
+    proxima_entrada = 2
+    for k, saida in enumerate(saidas):
+        W, H = FORMATOS[saida["formato"]]
+        entrada_overlay = None
+        if saida.get("overlay_png"):
+            entrada_overlay = f"{proxima_entrada}:v"
+            proxima_entrada += 1
+        partes += _ramo_video(f"f{k}", entrada_overlay, f"a{k}" if visualizer else None, saida.get("ass"), W, H, str(k))
+    return ";".join(partes)
+
+
+@rastreio.medido("video.render")
+def gerar_video_ffmpeg(imagens, audio_path, output_video, status_container=None, overlay_png=None, visualizer=False,
+                       caminho_ass=None, trilha=None):
+    """
+    Renderiza vídeo + áudio com overlay e legendas queimados numa única passada.
+    `status_container` (opcional) recebe o comando e o andamento (st.status na página).
+    `trilha` (de trilha.para_render) é mixada sob a narração no mesmo filtro.
+    """
+    
+    # 1. Analisa Áudio (cabeçalho do WAV, em cache; ffprobe só para outros formatos)
+    try:
+        duracao_audio = midia.duracao(audio_path)
+    except midia.ErroMidia as e:
+        return False, f"Erro ao ler duração do áudio: {e}"
+    
+    qtd_imgs = len(imagens)
+    if qtd_imgs == 0:
+        return False, "Lista de imagens vazia."
+        
+    tempo_por_img = duracao_audio / qtd_imgs
+    
+    # 2. Cria arquivo de concatenação (um por vídeo: renders podem rodar em paralelo)
+    concat_txt = output_video + ".concat.txt"
+    criar_arquivo_concat(imagens, tempo_por_img, concat_txt)
+
+    tem_overlay = bool(overlay_png and os.path.exists(overlay_png))
+    tem_legenda = caminho_ass if caminho_ass and os.path.exists(caminho_ass) else None
+    
+    # 3. Monta comando FFmpeg (uma entrada por camada, um único encode)
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_txt,  # Input Vídeo
+        "-i", audio_path,                                # Input Áudio
+    ]
+    if tem_overlay:
+        cmd += ["-i", overlay_png]                       # Input Overlay (PNG transparente)
+    filtro = montar_filtro_video(tem_overlay, visualizer, tem_legenda)
+    mapa_audio, codec_audio, comandos_trilha = "1:a", args_audio(audio_path), None
+    if trilha:
+        cmd += ["-stream_loop", "-1", "-i", trilha["arquivo"]]  # Input Trilha (em loop)
+        comandos_trilha = gravar_comandos_trilha(trilha, output_video)
+        filtro += ";" + montar_filtro_trilha("1:a", f"{3 if tem_overlay else 2}:a", trilha, duracao_audio,
+                                             comandos_trilha)
+        mapa_audio, codec_audio = "[aout]", args_audio_trilha()
+    cmd += [
+        "-filter_complex", filtro,
+        "-map", "[vout]", "-map", mapa_audio,
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "30",
+        *codec_audio,
+        "-shortest",
+        output_video
+    ]
+    
+    if status_container is not None:
+        status_container.code(" ".join(cmd)) 
+        status_container.write("⚙️ Renderizando com FFmpeg...")
+    
+    try:
+        with rastreio.trecho("ffmpeg.encode", imagens=qtd_imgs, overlay=tem_overlay, visualizer=bool(visualizer),
+                             legendas=bool(tem_legenda), trilha=bool(trilha), duracao_s=round(duracao_audio, 2)):
+            process = rastreio.executar(cmd, text=True)
+            rastreio.contar(entrada=rastreio.tamanho(*imagens, audio_path, overlay_png, tem_legenda),
+                            saida=rastreio.tamanho(output_video))
+        
+        for temporario in (concat_txt, comandos_trilha):
+            if temporario and os.path.exists(temporario):
+                os.remove(temporario)
+        
+        if process.returncode == 0:
+            return True, "Sucesso"
+        else:
+            return False, f"Erro FFmpeg: {process.stderr}"
+    except Exception as e:
+        return False, str(e)
+
+
+@rastreio.medido("video.render_formatos")
+def gerar_videos_formatos(imagens, audio_path, saidas, status_container=None, visualizer=False, trilha=None):
+    """
+    Renderiza vários formatos num só processo do FFmpeg. `saidas` é uma
+    lista de {'formato' (chave de FORMATOS), 'video', 'overlay_png', 'ass'}.
+    As imagens são decodificadas uma vez (filtro split) e o áudio é
+    codificado em AAC uma vez, antes (ou já vem pronto da masterização), e
+    copiado para cada saída. Com `trilha`, a mixagem é feita nessa mesma
+    codificação do áudio.
+    Com uma saída só, equivale a `gerar_video_ffmpeg`.
+    """
+    if len(saidas) == 1:
+        s = saidas[0]
+        return gerar_video_ffmpeg(imagens, audio_path, s["video"], status_container,
+                                  overlay_png=s.get("overlay_png"), visualizer=visualizer, caminho_ass=s.get("ass"),
+                                  trilha=trilha)
+
+    try:
+        duracao_audio = midia.duracao(audio_path)
+    except midia.ErroMidia as e:
+        return False, f"Erro ao ler duração do áudio: {e}"
+    if not imagens:
+        return False, "Lista de imagens vazia."
+    if not saidas:
+        return False, "Nenhum formato de saída."
+
+    saidas = [{**s,
+               "overlay_png": s.get("overlay_png") if s.get("overlay_png") and os.path.exists(s["overlay_png"]) else None,
+               "ass": s.get("ass") if s.get("ass") and os.path.exists(s["ass"]) else None}
+              for s in saidas]
+    base = saidas[0]["video"]
+    concat_txt = base + ".concat.txt"
+    criar_arquivo_concat(imagens, duracao_audio / len(imagens), concat_txt)
+
+    # Faixa AAC da masterização: já pronta; senão (ou com trilha a mixar), codificada aqui uma vez
+    pronto = not trilha and args_audio(audio_path) == ["-c:a", "copy"]
+    audio_aac = audio_path if pronto else base + ".audio" + masterizacao.EXTENSAO_AAC
+    comandos_trilha = None
+    if trilha:
+        comandos_trilha = gravar_comandos_trilha(trilha, base)
+        cmd_audio = ["ffmpeg", "-y", "-i", audio_path, "-stream_loop", "-1", "-i", trilha["arquivo"],
+                     "-filter_complex", montar_filtro_trilha("0:a", "1:a", trilha, duracao_audio, comandos_trilha),
+                     "-map", "[aout]", *args_audio_trilha(), audio_aac]
+    else:
+        cmd_audio = ["ffmpeg", "-y", "-i", audio_path, "-vn", "-c:a", "aac", "-b:a", "192k", audio_aac]
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_txt, "-i", audio_aac]
+    for s in saidas:
+        if s["overlay_png"]:
+            cmd += ["-i", s["overlay_png"]]
+    cmd += ["-filter_complex", montar_filtro_multiplo(saidas, visualizer)]
+    for k, s in enumerate(saidas):
+        cmd += ["-map", f"[vout{k}]", "-map", "1:a",
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", "30",
+                "-c:a", "copy", "-shortest", s["video"]]
+
+    if status_container is not None:
+        status_container.code(" ".join(cmd))
+        status_container.write(f"⚙️ Renderizando {len(saidas)} formatos com FFmpeg...")
+
+    try:
+        if not pronto:
+            with rastreio.trecho("ffmpeg.audio", trilha=bool(trilha)):
+                process = rastreio.executar(cmd_audio, text=True)
+            if process.returncode != 0:
+                return False, f"Erro FFmpeg (áudio): {process.stderr}"
+
+        with rastreio.trecho("ffmpeg.encode", imagens=len(imagens), formatos=",".join(s["formato"] for s in saidas),
+                             visualizer=bool(visualizer), duracao_s=round(duracao_audio, 2)):
+            process = rastreio.executar(cmd, text=True)
+            rastreio.contar(
+                entrada=rastreio.tamanho(*imagens, audio_aac, *[s["overlay_png"] for s in saidas],
+                                         *[s["ass"] for s in saidas]),
+                saida=rastreio.tamanho(*[s["video"] for s in saidas]),
+            )
+
+        if process.returncode == 0:
+            return True, "Sucesso"
+        return False, f"Erro FFmpeg: {process.stderr}"
+    except Exception as e:
+        return False, str(e)
+    finally:
+        for temporario in (concat_txt, comandos_trilha, None if pronto else audio_aac):
+            if temporario and os.path.exists(temporario):
+                os.remove(temporario)
@@ -0,0 +1,146 @@
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+import sys
+import os
+import re
+import json
+import time
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
+
+from modules import database as db
+from modules import rastreio
+
+st.set_page_config(page_title="Diagnóstico", page_icon="🔬", layout="wide")
+st.title("🔬 Diagnóstico de Desempenho")
+st.caption(
+    "Tempo de parede, CPU (da thread, das threads filhas e dos subprocessos como FFmpeg e Piper), "
+    "pico de memória e bytes de cada trecho medido, nas páginas e no `produzir.py`."
+)
+
+PERIODOS = {"Última hora": 3600, "Últimas 24 horas": 86400, "Últimos 7 dias": 7 * 86400, "Últimos 30 dias": 30 * 86400}
+
+
+def hora(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%d/%m %H:%M:%S")
+
+
+def nome_arquivo(texto):
+    return re.sub(r"[^\w.-]+", "_", texto)[:80]
+
+
+with st.sidebar:
+    st.header("🎯 Escopo")
+    periodo = st.selectbox("Período", list(PERIODOS), index=1)
+    desde = time.time() - PERIODOS[periodo]
+
+rastreio.descarregar()  # o que este processo mediu e ainda não gravou
+trechos = db.carregar_trechos(desde=desde)
+if not trechos:
+    st.info("Nenhum trecho medido no período. Produza algo pelas páginas ou pelo `produzir.py`.")
+    st.stop()
+
+df = pd.DataFrame(trechos)
+
+# -------------------------------------------------------------------
+# Resumo por trecho
+# -------------------------------------------------------------------
+st.subheader("⏱️ Onde vai o tempo")
+st.caption("Tempos inclusivos: um trecho soma o dos trechos internos (ex.: `video.render` inclui `ffmpeg.encode`).")
+
+grupos = df.groupby("nome")
+resumo = grupos.agg(
+    chamadas=("id", "count"),
+    total_s=("wall_ms", lambda s: s.sum() / 1000),
+    p50_ms=("wall_ms", "median"),
+    p95_ms=("wall_ms", lambda s: s.quantile(0.95)),
+    cpu_ms=("cpu_ms", "mean"),
+    cpu_sub_ms=("cpu_filhos_ms", "mean"),
+    rss_pico_mb=("rss_pico_mb", "max"),
+    rss_sub_mb=("rss_filhos_mb", "max"),
+    entrada_mb=("bytes_entrada", lambda s: s.sum() / 1e6),
+    saida_mb=("bytes_saida", lambda s: s.sum() / 1e6),
+    erros=("erro", "count"),
+)
+# CPU / parede: ~0 é espera (rede, limite de taxa); >1 é trabalho em paralelo
+resumo["cpu_parede"] = (grupos["cpu_ms"].sum() + grupos["cpu_filhos_ms"].sum()) / grupos["wall_ms"].sum()
+resumo = resumo.sort_values("total_s", ascending=False)
+
+st.dataframe(
+    resumo.rename(columns={
+        "chamadas": "Chamadas", "total_s": "Total (s)", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+        "cpu_ms": "CPU média (ms)", "cpu_sub_ms": "CPU subprocessos (ms)", "cpu_parede": "CPU/parede",
+        "rss_pico_mb": "Pico RSS (MB)", "rss_sub_mb": "Pico RSS subprocesso (MB)",
+        "entrada_mb": "Entrada (MB)", "saida_mb": "Saída (MB)", "erros": "Erros",
+    }).round(2),
+    use_container_width=True,
+)
+
+# -------------------------------------------------------------------
+# Um rastro (produção) em detalhe
+# -------------------------------------------------------------------
+st.markdown("---")
+st.subheader("🧵 Linha do tempo de uma produção")
+
+rastros = db.listar_rastros(desde=desde)
+idx = st.selectbox(
+    "Rastro",
+    options=range(len(rastros)),
+    format_func=lambda i: (f"{rastros[i]['rastro']} · {hora(rastros[i]['inicio'])} · "
+                           f"{rastros[i]['duracao_s']:.1f}s · {rastros[i]['trechos']} trechos"
+                           + (f" · ⚠️ {rastros[i]['erros']} erro(s)" if rastros[i]['erros'] else "")),
+)
+rastro = rastros[idx]["rastro"]
+selecionados = db.carregar_trechos(rastro=rastro)
+dr = pd.DataFrame(selecionados)
+dr["inicio_dt"] = pd.to_datetime(dr["inicio"], unit="s")
+dr["fim_dt"] = dr["inicio_dt"] + pd.to_timedelta(dr["wall_ms"], unit="ms")
+
+linha = px.timeline(
+    dr, x_start="inicio_dt", x_end="fim_dt", y="nome", color="thread",
+    hover_data={"wall_ms": ":.1f", "cpu_ms": ":.1f", "cpu_filhos_ms": ":.1f", "rss_pico_mb": True,
+                "bytes_entrada": True, "bytes_saida": True, "erro": True, "inicio_dt": False, "fim_dt": False},
+    category_orders={"nome": list(dict.fromkeys(dr["nome"]))},
+)
+linha.update_layout(height=max(240, 28 * dr["nome"].nunique() + 80), margin=dict(l=0, r=0, t=10, b=0))
+st.plotly_chart(linha, use_container_width=True)
+
+with st.expander("📋 Trechos deste rastro"):
+    st.dataframe(
+        dr.assign(Início=dr["inicio"].map(hora))[
+            ["Início", "nome", "thread", "wall_ms", "cpu_ms", "cpu_filhos_ms", "rss_pico_mb", "rss_filhos_mb",
+             "bytes_entrada", "bytes_saida", "erro", "atributos_json"]
+        ],
+        use_container_width=True, hide_index=True,
+    )
+
+# -------------------------------------------------------------------
+# Exportação e limpeza
+# -------------------------------------------------------------------
+st.markdown("---")
+st.subheader("📤 Exportar (Chrome trace)")
+st.caption("Abra em https://ui.perfetto.dev ou chrome://tracing para ver como gráfico de chamas, thread a thread.")
+
+col_e1, col_e2 = st.columns(2)
+with col_e1:
+    st.download_button(
+        "⬇️ Este rastro", json.dumps(rastreio.chrome_trace(selecionados), ensure_ascii=False),
+        file_name=f"trace_{nome_arquivo(rastro)}.json", mime="application/json", use_container_width=True,
+    )
+with col_e2:
+    st.download_button(
+        f"⬇️ Todo o período ({len(trechos)} trechos)", json.dumps(rastreio.chrome_trace(trechos), ensure_ascii=False),
+        file_name=f"trace_{datetime.now():%Y%m%d_%H%M}.json", mime="application/json", use_container_width=True,
+    )
+
+with st.expander("🧹 Limpar trechos antigos"):
+    dias = st.number_input("Apagar trechos com mais de (dias)", min_value=1, value=30)
+    if st.button("Apagar"):
+        apagados = db.apagar_trechos(time.time() - dias * 86400)
+        st.success(f"{apagados} trecho(s) apagados.")
+        st.rerun()
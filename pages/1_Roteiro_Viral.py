@@ -2,24 +2,21 @@ import streamlit as st
 import sys
 import os
 import json
-from datetime import datetime
-
-# Tenta importar a biblioteca Groq
-try:
-    from groq import Groq
-except ImportError:
-    st.error("⚠️ Biblioteca 'groq' não encontrada. Instale usando: pip install groq")
-    st.stop()
+import time
 
 # ---------------------------------------------------------------------
 # 1. CONFIGURAÇÃO DE DIRETÓRIOS E IMPORTAÇÕES
 # ---------------------------------------------------------------------
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
-sys.path.append(parent_dir)
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
 
 try:
-    import modules.database as db
+    from modules.pipeline import sessao
+    import modules.roteiro as roteiro
+    import modules.conteudo as conteudo
+    from modules import avisos
 except ImportError:
     st.error("🚨 Erro: Não foi possível importar o módulo de banco de dados.")
     st.stop()
@@ -32,146 +29,89 @@ st.set_page_config(page_title="1. Roteiro Viral", layout="wide")
 # ---------------------------------------------------------------------
 # 3. RECUPERAÇÃO DE ESTADO
 # ---------------------------------------------------------------------
-if 'leitura_atual' not in st.session_state:
-    st.warning("⚠️ Nenhuma leitura selecionada.")
-    if st.button("Voltar para o Início"):
-        st.switch_page("Inicio.py")
-    st.stop()
-
-leitura = st.session_state['leitura_atual']
-data_str = st.session_state.get('data_atual_str', datetime.today().strftime('%Y-%m-%d'))
-chave_progresso = f"{data_str}-{leitura['tipo']}"
-
-# Carrega status atual do banco
-progresso, em_producao = db.load_status(chave_progresso)
+prod = sessao.obter_producao('pages/1_Roteiro_Viral.py')
+leitura, data_str, progresso = prod.leitura, prod.data_str, prod.progresso
 
 # Inicializa o cliente Groq
 api_key = st.secrets.get("GROQ_API_KEY")
-client = None
-if api_key:
-    client = Groq(api_key=api_key)
+try:
+    client = roteiro.criar_cliente_groq(api_key)
+except ImportError:
+    st.error("⚠️ Biblioteca 'groq' não encontrada. Instale usando: pip install groq")
+    st.stop()
 
 # ---------------------------------------------------------------------
 # 4. FUNÇÕES DE GERAÇÃO (IA)
 # ---------------------------------------------------------------------
 
-def gerar_conteudo_ia(texto_original, referencia):
-    """Gera os 4 blocos de texto e os 4 prompts de imagem usando Groq."""
-    
+# Campos do editor: (chave do bloco, título, rótulo, altura)
+CAMPOS_EDITOR = [
+    ('bloco_leitura', "Bloco 1: Leitura (Formatada)", "Texto Litúrgico", 300),
+    ('bloco_reflexao', "Bloco 2: Reflexão", "Reflexão Teológica", 200),
+    ('bloco_aplicacao', "Bloco 3: Aplicação na sua vida", "Aplicação Prática", 200),
+    ('bloco_oracao', "Bloco 4: Oração", "Oração e Envio", 250),
+]
+INTERVALO_TELA = 0.1       # s entre redesenhos de um mesmo bloco durante o streaming
+INTERVALO_RASCUNHO = 1.0   # s entre gravações do rascunho parcial
+
+
+def salvar_rascunho(parciais, uso=None):
+    """Guarda o texto recebido até agora (sobrevive a fechar a página no meio)."""
+    progresso['rascunho_roteiro'] = dict(parciais)
+    if uso and uso.get('blocos'):
+        progresso['metricas_roteiro'] = {k: uso.get(k) for k in ('modo', 'segundos', 'blocos')}
+    prod.salvar(prod.etapa)
+
+
+def gerar_conteudo_ia(texto_original, referencia, modo):
+    """
+    Gera os 4 blocos em streaming, mostrando cada um no seu campo à medida
+    que os tokens chegam, e os 4 prompts de imagem.
+    """
     if not client:
-        st.error("Chave de API Groq não configurada nos secrets.")
+        st.session_state['avisos_roteiro'] = ["Chave de API Groq não configurada nos secrets."]
         return None, None, None, None, None
 
-    with st.spinner('🤖 A IA está lendo o Evangelho, refletindo e orando... Por favor, aguarde.'):
-        
-        # --- BLOCO 1: LEITURA FORMATADA ---
-        prompt_leitura = f"""
-        Atue como um leitor litúrgico católico.
-        Reescreva o texto abaixo para o formato solene de proclamação.
-        Referência: {referencia}
-        Texto Original: "{texto_original}"
-
-        Regras de Formatação:
-        1. Inicie com: "Proclamação do Evangelho segundo [Nome], capítulo [X], versículos [Y]. Glória a vós, Senhor!" (Ajuste conforme a referência).
-        2. Insira o corpo do texto corrigido e pontuado para leitura em voz alta.
-        3. Termine com: "Palavra da Salvação. Glória a vós, Senhor."
-        4. Não adicione comentários, apenas o texto litúrgico formatado.
-        """
-        
-        completion_1 = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt_leitura}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3
-        )
-        txt_leitura = completion_1.choices[0].message.content
-
-        # --- BLOCO 2: REFLEXÃO ---
-        prompt_reflexao = f"""
-        Atue como um especialista em teologia católica e liturgia.
-        Leia o seguinte texto do Evangelho: "{texto_original}"
-
-        Sua tarefa é escrever uma reflexão teológica curta e profunda sobre este texto.
-
-        Regras estritas:
-        1. Inicie o texto EXATAMENTE com a palavra "Reflexão." (com o ponto final e quebra de linha).
-        2. O conteúdo deve ter entre 80 a 100 palavras.
-        3. Use uma linguagem culta, mas acessível, focada na teologia da missão, compaixão e Reino de Deus.
-        4. O texto deve ser um parágrafo único.
-        5. Não use emojis ou formatação de markdown (negrito/itálico) no corpo do texto.
-        """
-        
-        completion_2 = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt_reflexao}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.5
-        )
-        txt_reflexao = completion_2.choices[0].message.content
-
-        # --- BLOCO 3: APLICAÇÃO NA VIDA ---
-        prompt_aplicacao = f"""
-        Atue como um diretor espiritual católico focado em vivência prática da fé.
-        Leia o seguinte texto do Evangelho: "{texto_original}"
-
-        Sua tarefa é escrever um parágrafo de aplicação prática para o dia a dia.
-
-        Regras estritas:
-        1. Inicie o texto EXATAMENTE com a frase "Aplicação na sua vida." (com ponto final e quebra de linha).
-        2. O tamanho deve ser semelhante ao exemplo (aprox. 80 a 100 palavras).
-        3. Tom de voz: Desafiador, pessoal (use "você" ou "nós") e motivador.
-        4. Estrutura obrigatória:
-           - Conecte a missão do texto bíblico à identidade do leitor como discípulo.
-           - Inclua uma pergunta direta de reflexão/exame de consciência (ex: "Pergunte-se: ...").
-           - Termine com uma chamada para ação concreta (uso de tempo, talentos ou recursos) e serviço ao próximo.
-        """
-        
-        completion_3 = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt_aplicacao}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.6
-        )
-        txt_aplicacao = completion_3.choices[0].message.content
-
-        # --- BLOCO 4: ORAÇÃO ---
-        prompt_oracao = f"""
-        Atue como um líder espiritual católico inspirador.
-        Com base no texto do Evangelho: "{texto_original}"
-
-        Sua tarefa é escrever a conclusão da reflexão, composta por uma Oração e um Envio Final.
-
-        Regras estritas de Estrutura:
-        1. PRIMEIRA PARTE (Oração):
-           - Inicie EXATAMENTE com o texto: "Vamos orar:" (quebra de linha).
-           - Escreva uma oração de um parágrafo (aprox. 60-80 palavras).
-           - Dirija-se a Jesus ou ao Pai. Agradeça pela mensagem do Evangelho e peça a graça de colocá-la em prática.
-           - Termine com "Amém."
-
-        2. SEGUNDA PARTE (Envio):
-           - Pule uma linha após o "Amém".
-           - Inicie EXATAMENTE com a frase: "Se esta Palavra tocou o seu coração," (quebra de linha).
-           - Escreva um parágrafo de encerramento (aprox. 60-80 palavras).
-           - Incentive o leitor a não guardar a Boa Nova, a realizar uma atitude concreta de caridade hoje (cite uma ação relacionada ao texto) e a compartilhar a mensagem com um amigo.
-        """
-        
-        completion_4 = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt_oracao}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.6
-        )
-        txt_oracao = completion_4.choices[0].message.content
-
-        # --- GERAÇÃO DE PROMPTS DE IMAGEM (ATUALIZADO) ---
-        # Reforçando o aspecto "contemporâneo/roupas modernas" nos blocos 2, 3 e 4
-        prompts_img = {
-            "bloco_1": f"A high-quality, cinematic, photorealistic biblical scene depicting the events described in this text: '{texto_original}'. Style: Epic movie shot, First Century Palestine setting, dramatic lighting, 8k resolution, highly detailed texture. Constraint: No text, no typography, no watermarks.",
-            
-            "bloco_2": f"A photorealistic image of Jesus Christ (traditional appearance with robes) sitting in a modern, busy everyday setting (like a coffee shop, a subway station, or a busy park). Action: He is having a friendly conversation with an **ordinary contemporary person wearing casual modern clothes (like jeans, t-shirt, or hoodie)**. Context: They are discussing the biblical theme: '{texto_original}'. Style: Candid photography, depth of field, natural lighting, realistic interactions, vertical 9:16 framing.",
-            
-            "bloco_3": f"A photorealistic image of Jesus Christ (traditional appearance) walking or standing with an **ordinary modern person dressed in contemporary daily attire** in a public urban space (like a street, bus stop, or office). Action: Jesus is gesturing kindly, offering advice or comfort, like a mentor. Context: Applying the lesson of this text to real life: '{texto_original}'. Style: Warm atmosphere, urban photography style, 4k resolution, vertical 9:16 framing.",
-            
-            "bloco_4": f"A serene, photorealistic image of Jesus Christ and an **ordinary person wearing modern casual clothing** in a quiet, calm location (like a peaceful living room or a quiet garden corner). Action: They are praying together, perhaps with eyes closed or hands clasped. Atmosphere: Spiritual, peaceful, soft divine lighting, intimate and comforting. Context: Based on the spirituality of: '{texto_original}'."
-        }
-
-    return txt_leitura, txt_reflexao, txt_aplicacao, txt_oracao, prompts_img
+    areas = {}
+    for chave, titulo, _, _ in CAMPOS_EDITOR:
+        st.markdown(f"### {titulo}")
+        areas[chave] = st.empty()
+
+    uso, parciais, desenhado, prompts_img, problemas = {}, {}, {}, None, []
+    ultimo_rascunho = time.monotonic()
+    fluxo = roteiro.transmitir_conteudo_ia(client, texto_original, referencia, modo=modo, uso=uso)
+    try:
+        for chave, texto in fluxo:
+            if chave == 'prompts_imagem':
+                prompts_img = texto
+                continue
+            parciais[chave] = texto
+            agora = time.monotonic()
+            if agora - desenhado.get(chave, 0) >= INTERVALO_TELA:
+                desenhado[chave] = agora
+                # Só leitura durante o streaming (sem widget); os campos editáveis vêm depois do rerun
+                areas[chave].markdown(texto.replace("\n", "  \n"))
+            if agora - ultimo_rascunho >= INTERVALO_RASCUNHO:
+                ultimo_rascunho = agora
+                salvar_rascunho(parciais)
+    except Exception as e:
+        # Falha no meio do streaming: o que já chegou vai para o editor
+        problemas.append(f"Erro ao gerar o roteiro: {e}")
+    finally:
+        # Também quando a página é fechada ou reexecutada no meio do streaming
+        fluxo.close()
+        if parciais:
+            salvar_rascunho(parciais, uso)
+
+    st.session_state['uso_roteiro'] = {**uso, 'chave': prod.chave}
+    vazios = [titulo for chave, titulo, _, _ in CAMPOS_EDITOR if not parciais.get(chave)]
+    if vazios:
+        # Um stream pode terminar sem texto (inclusive o de um bloco refeito)
+        problemas.append(f"O roteiro veio sem texto em: {', '.join(vazios)}. Complete no editor ou gere de novo.")
+    # Mostrados depois do st.rerun() que leva os blocos para o editor
+    st.session_state['avisos_roteiro'] = problemas
+    b1, b2, b3, b4 = [parciais.get(chave, '') for chave in roteiro.BLOCOS]
+    return b1, b2, b3, b4, prompts_img
 
 # ---------------------------------------------------------------------
 # 5. INTERFACE DO ROTEIRO
@@ -203,6 +143,8 @@ with col_esq:
 # --- COLUNA 2: EDITOR DE ROTEIRO (4 BLOCOS) ---
 with col_dir:
     st.subheader("✍️ Editor de Roteiro")
+    for msg in st.session_state.pop('avisos_roteiro', []):
+        avisos.streamlit("erro", msg)
 
     # Recupera valores salvos ou inicializa vazios
     val_bloco1 = progresso.get('bloco_leitura', '')
@@ -210,19 +152,43 @@ with col_dir:
     val_bloco3 = progresso.get('bloco_aplicacao', '')
     val_bloco4 = progresso.get('bloco_oracao', '')
     
+    # Geração interrompida antes de salvar: volta com o texto parcial
+    rascunho = progresso.get('rascunho_roteiro')
+    if not val_bloco1 and 'temp_b1' not in st.session_state and rascunho:
+        for i, chave in enumerate(roteiro.BLOCOS, start=1):
+            st.session_state[f'temp_b{i}'] = rascunho.get(chave, '')
+        st.session_state['temp_p_imgs'] = roteiro.montar_prompts_imagem(
+            leitura['texto'], roteiro.cenas_em_cache(leitura['texto']))
+        st.warning("📝 Rascunho da última geração recuperado (pode estar incompleto). Revise e salve.")
+
+    # Mesma passagem já produzida em outra data: oferece reaproveitar
+    if not val_bloco1 and 'temp_b1' not in st.session_state:
+        achados = conteudo.procurar(leitura, prod.chave)
+        if achados:
+            origem = achados["roteiro"]["chave_id"]
+            st.success(f"♻️ Esta passagem já foi produzida em **{origem}** ({', '.join(achados)}).")
+            if st.button("♻️ Reaproveitar sem gerar de novo", type="primary"):
+                etapa = conteudo.etapa_apos(conteudo.aplicar(progresso, achados, prod.chave))
+                prod.salvar(etapa)
+                st.rerun()
+
     # Botão de Geração com IA
     if not val_bloco1:
         st.info("O roteiro está vazio. Use a IA para gerar os 4 blocos e preparar as imagens.")
+        modo = st.radio("Modo de geração", roteiro.MODOS, horizontal=True,
+                        format_func={"agrupado": "Uma requisição (JSON)", "por_bloco": "Uma por bloco"}.get,
+                        help="Uma requisição envia o texto uma vez só; se a resposta vier inválida, "
+                             "os blocos com problema são gerados separadamente.")
         if st.button("✨ Gerar Roteiro Completo e Imagens (IA)", type="primary"):
-            b1, b2, b3, b4, p_imgs = gerar_conteudo_ia(leitura['texto'], leitura['ref'])
-            if b1:
-                # Atualiza session state temporário para exibir nos campos
+            b1, b2, b3, b4, p_imgs = gerar_conteudo_ia(leitura['texto'], leitura['ref'], modo)
+            if any((b1, b2, b3, b4)):
+                # Atualiza session state temporário para exibir nos campos (mesmo com blocos faltando)
                 st.session_state['temp_b1'] = b1
                 st.session_state['temp_b2'] = b2
                 st.session_state['temp_b3'] = b3
                 st.session_state['temp_b4'] = b4
                 st.session_state['temp_p_imgs'] = p_imgs
-                st.rerun()
+            st.rerun()
     else:
         # Se já existe no progresso, usa de lá
         if 'temp_b1' not in st.session_state:
@@ -231,6 +197,17 @@ with col_dir:
             st.session_state['temp_b3'] = val_bloco3
             st.session_state['temp_b4'] = val_bloco4
 
+    uso = st.session_state.get('uso_roteiro')
+    if uso and uso['chave'] == prod.chave:
+        refeitos = f" · refeitos à parte: {len(uso['refeitos'])}" if uso.get('refeitos') else ""
+        st.caption(f"Gerado em {uso.get('segundos', '?')}s ({uso.get('modo', '?')}): "
+                   f"{uso.get('requisicoes', 0)} requisição(ões), {uso.get('tokens_entrada', 0)} tokens de entrada, "
+                   f"{uso.get('tokens_saida', 0)} de saída{refeitos}")
+        st.caption(" · ".join(
+            f"{titulo.split(':')[0]}: 1º token {m.get('ttft_s')}s, {m.get('tokens_s')} tokens/s"
+            for chave, titulo, _, _ in CAMPOS_EDITOR if (m := uso.get('blocos', {}).get(chave))
+        ))
+
     # Campos de Edição
     with st.form("form_roteiro"):
         st.markdown("### Bloco 1: Leitura (Formatada)")
@@ -261,13 +238,9 @@ with col_dir:
             # Se o usuário marcou para recriar os prompts OU se eles foram gerados agora pela IA
             if regerar_prompts:
                  # Recria os prompts localmente com a nova string
-                 # (Para evitar chamar a API do Groq só pra isso, montamos aqui com o texto atual)
-                 progresso['prompts_imagem'] = {
-                    "bloco_1": f"A high-quality, cinematic, photorealistic biblical scene depicting the events described in this text: '{leitura['texto']}'. Style: Epic movie shot, First Century Palestine setting, dramatic lighting, 8k resolution, highly detailed texture. Constraint: No text, no typography, no watermarks.",
-                    "bloco_2": f"A photorealistic image of Jesus Christ (traditional appearance with robes) sitting in a modern, busy everyday setting (like a coffee shop, a subway station, or a busy park). Action: He is having a friendly conversation with an **ordinary contemporary person wearing casual modern clothes (like jeans, t-shirt, or hoodie)**. Context: They are discussing the biblical theme: '{leitura['texto']}'. Style: Candid photography, depth of field, natural lighting, realistic interactions, vertical 9:16 framing.",
-                    "bloco_3": f"A photorealistic image of Jesus Christ (traditional appearance) walking or standing with an **ordinary modern person dressed in contemporary daily attire** in a public urban space (like a street, bus stop, or office). Action: Jesus is gesturing kindly, offering advice or comfort, like a mentor. Context: Applying the lesson of this text to real life: '{leitura['texto']}'. Style: Warm atmosphere, urban photography style, 4k resolution, vertical 9:16 framing.",
-                    "bloco_4": f"A serene, photorealistic image of Jesus Christ and an **ordinary person wearing modern casual clothing** in a quiet, calm location (like a peaceful living room or a quiet garden corner). Action: They are praying together, perhaps with eyes closed or hands clasped. Atmosphere: Spiritual, peaceful, soft divine lighting, intimate and comforting. Context: Based on the spirituality of: '{leitura['texto']}'."
-                }
+                 # (Sem chamar a API do Groq: usa as cenas já em cache para esta leitura)
+                 progresso['prompts_imagem'] = roteiro.montar_prompts_imagem(
+                     leitura['texto'], roteiro.cenas_em_cache(leitura['texto']))
             elif 'temp_p_imgs' in st.session_state:
                  progresso['prompts_imagem'] = st.session_state['temp_p_imgs']
             
@@ -275,9 +248,11 @@ with col_dir:
             progresso['texto_roteiro_completo'] = f"{txt_b1}\n\n{txt_b2}\n\n{txt_b3}\n\n{txt_b4}"
             
             progresso['roteiro'] = True 
+            progresso.pop('rascunho_roteiro', None)
             
             # Salva no banco
-            db.update_status(chave_progresso, data_str, leitura['tipo'], progresso, 1)
+            prod.salvar(1)
+            conteudo.registrar(leitura, prod.chave, progresso, "roteiro")
             
             st.success("Roteiro e Prompts de Imagem salvos com sucesso!")
             st.session_state['progresso_leitura_atual'] = progresso
@@ -0,0 +1,102 @@
+import streamlit as st
+import os
+import sys
+
+# ---------------------------------------------------------------------
+# 1. CONFIGURAÇÃO DE DIRETÓRIOS E IMPORTAÇÕES
+# ---------------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
+
+try:
+    from modules.pipeline import sessao
+    import modules.legendas as legendas
+except ImportError:
+    st.error("🚨 Erro: Não foi possível importar o módulo de banco de dados.")
+    st.stop()
+
+st.set_page_config(page_title="Legendas", page_icon="💬", layout="wide")
+
+# ---------------------------------------------------------------------
+# 2. RECUPERAÇÃO DE ESTADO
+# ---------------------------------------------------------------------
+prod = sessao.obter_producao('pages/5_Legendas.py')
+leitura, data_str, progresso = prod.leitura, prod.data_str, prod.progresso
+
+sessao.render_navigation_bar("💬 Legendas Sincronizadas", prod)
+
+# ---------------------------------------------------------------------
+# 3. INTERFACE
+# ---------------------------------------------------------------------
+segmentos = progresso.get('legendas_segmentos', [])
+
+if not segmentos:
+    st.warning("Não há tempos de fala registrados. Gere (ou gere novamente) o áudio no Passo 3.")
+    if st.button("🔙 Ir para o Áudio"):
+        st.switch_page("pages/3_Audio_TTS.py")
+    st.stop()
+
+st.caption("Os tempos vêm da própria síntese do Piper (frase a frase), sem reconhecimento de fala. "
+           "As legendas são gravadas no vídeo na mesma passada do overlay.")
+
+estilo_salvo = {**legendas.ESTILO_PADRAO, **progresso.get('legendas_estilo', {})}
+overlay_dados = progresso.get('overlay_dados', {})
+
+col_config, col_preview = st.columns([1, 1])
+
+with col_config:
+    ativar = st.checkbox("Gravar legendas no vídeo", value=progresso.get('legendas_ass', True) != "")
+
+    pasta_fontes = os.path.join(parent_dir, "fonts")
+    fontes = sorted(f for f in os.listdir(pasta_fontes) if f.endswith(('.ttf', '.otf'))) if os.path.exists(pasta_fontes) else []
+    fontes = fontes or ["Arial"]
+    fonte_padrao = estilo_salvo['fonte'] if estilo_salvo['fonte'] in fontes else overlay_dados.get('fonte', fontes[0])
+    fonte_sel = st.selectbox("Fonte", fontes, index=fontes.index(fonte_padrao) if fonte_padrao in fontes else 0)
+
+    tamanho = st.slider("Tamanho", 30, 120, int(estilo_salvo['tamanho']))
+    margem = st.slider("Distância da base (px em 1080x1920)", 100, 1200, int(estilo_salvo['margem_inferior']))
+    max_palavras = st.slider("Máximo de palavras por legenda", 1, 8, int(estilo_salvo['max_palavras']))
+    cor = st.color_picker("Cor do texto", estilo_salvo['cor'])
+    cor_contorno = st.color_picker("Cor do contorno", estilo_salvo['cor_contorno'])
+    contorno = st.slider("Espessura do contorno", 0, 10, int(estilo_salvo['contorno']))
+
+estilo = {
+    **estilo_salvo,
+    "fonte": fonte_sel,
+    "tamanho": tamanho,
+    "margem_inferior": margem,
+    "max_palavras": max_palavras,
+    "cor": cor,
+    "cor_contorno": cor_contorno,
+    "contorno": contorno,
+}
+cues = legendas.gerar_cues(segmentos, estilo)
+
+with col_preview:
+    st.subheader(f"🕒 {len(cues)} legendas")
+    st.dataframe(
+        [{"Início": f"{c['inicio']:.2f}s", "Fim": f"{c['fim']:.2f}s", "Texto": c['texto']} for c in cues],
+        use_container_width=True,
+        height=420,
+    )
+
+st.divider()
+if st.button("💾 Salvar Legendas e Renderizar ➡️", type="primary"):
+    if ativar:
+        base = os.path.join(parent_dir, "data", "legendas", f"legenda_{data_str}_{leitura['tipo'].replace(' ', '_')}")
+        caminho_fonte = os.path.join(pasta_fontes, fonte_sel)
+        path_srt, path_ass = legendas.salvar_legendas(cues, base, estilo, caminho_fonte)
+        progresso['legendas_srt'] = path_srt
+        progresso['legendas_ass'] = path_ass
+    else:
+        progresso['legendas_srt'] = ""
+        progresso['legendas_ass'] = ""
+
+    progresso['legendas'] = True
+    progresso['legendas_estilo'] = estilo
+    prod.salvar(5)
+
+    st.success("Legendas salvas!")
+    st.switch_page("pages/6_Video_Final.py")
@@ -1,84 +1,31 @@
 import streamlit as st
+import os
+import sys
+from datetime import datetime
 # from groq import Groq # Importar Groq se a chave for configurada
 
-st.set_page_config(page_title="Publicar", page_icon="🚀", layout="wide")
-st.session_state['current_page_name'] = 'pages/7_Publicar.py'
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
 
-# --- Utility Function for Navigation Bar (Identical in all pages 1-7) ---
-def render_navigation_bar(current_page_title):
-    progresso_leituras = st.session_state.get('progresso_leituras', {})
-    leitura_atual = st.session_state.get('leitura_atual')
-    data_atual_str = st.session_state.get('data_atual_str')
-    
-    # Check for selected video
-    if not leitura_atual or not data_atual_str:
-        st.error("Nenhuma leitura selecionada. Por favor, volte ao Dashboard (Início).")
-        if st.button("🏠 Voltar ao Início"):
-            st.switch_page("Inicio.py")
-        st.stop()
-        return
-
-    # Key for the currently active production
-    chave_atual = f"{data_atual_str}-{leitura_atual['tipo']}"
-    progresso = progresso_leituras.get(chave_atual, {})
-    
-    # --- Rótulo e Título ---
-    st.markdown("---")
-    st.markdown(f"## {current_page_title}")
-    st.caption(f"📖 Em Produção: **{leitura_atual['tipo']}** ({data_atual_str}) - *Ref: {leitura_atual.get('ref', '')}*")
+from modules.pipeline import sessao
+from modules import database as db
+from modules import metricas
+from modules import publicacao
 
-    # --- Layout da Barra de Navegação de Etapas ---
-    cols_nav = st.columns([1, 1, 1, 1, 1, 1, 1])
-    
-    # Check if the mandatory assets for the subsequent steps are ready
-    midia_pronta = progresso.get('imagens', False) and progresso.get('audio', False)
-
-    stages = [
-        ('Roteiro', 'roteiro', 'pages/1_Roteiro_Viral.py', '📝', '📝', True),
-        ('Imagens', 'imagens', 'pages/2_Imagens.py', '🎨', '🔒', progresso.get('roteiro', False)),
-        ('Áudio', 'audio', 'pages/3_Audio_TTS.py', '🔊', '🔒', progresso.get('roteiro', False)),
-        ('Overlay', 'overlay', 'pages/4_Overlay.py', '🖼️', '🔒', midia_pronta),
-        ('Legendas', 'legendas', 'pages/5_Legendas.py', '💬', '🔒', midia_pronta),
-        ('Vídeo', 'video', 'pages/6_Video_Final.py', '🎬', '🔒', midia_pronta),
-        ('Publicar', 'publicacao', 'pages/7_Publicar.py', '🚀', '🔒', progresso.get('video', False))
-    ]
-
-    # Render Buttons
-    current_page = st.session_state['current_page_name']
-    
-    for i, (label, key, page, icon_on, icon_off, base_enabled) in enumerate(stages):
-        status = progresso.get(key, False)
-        is_current = current_page == page
-        
-        icon = icon_on if status or is_current else icon_off
-        display_icon = f"✅ {icon}" if status and not is_current else icon
-        
-        # Enable logic
-        enabled = base_enabled
-        btn_disabled = not enabled and not status and not is_current
-        
-        with cols_nav[i]:
-            btn_style = "primary" if is_current else "secondary"
-            if st.button(display_icon, key=f"nav_btn_{key}", type=btn_style, disabled=btn_disabled, help=f"{label} ({'Pronto' if status else 'Pendente'})"):
-                st.switch_page(page)
-
-    st.markdown("---")
-# --- End Utility Function ---
-
-
-if 'leitura_atual' not in st.session_state:
-    st.warning("Selecione uma leitura no Início.")
-    st.stop()
+st.set_page_config(page_title="Publicar", page_icon="🚀", layout="wide")
 
-leitura = st.session_state['leitura_atual']
+prod = sessao.obter_producao('pages/7_Publicar.py')
+progresso = prod.progresso
+leitura = prod.leitura
 roteiro = st.session_state.get('roteiro_gerado', {})
-data_str = st.session_state.get('data_atual_str', '')
 
-render_navigation_bar("🚀 Central de Publicação")
+sessao.render_navigation_bar("🚀 Central de Publicação", prod)
 
 # --- Interface ---
 # SIMULANDO GROQ/IA
-if 'video_final_path' not in st.session_state:
+if not progresso.get('video'):
     st.warning("A etapa Vídeo Final não foi concluída. Gere o vídeo antes de publicar.")
     st.stop()
     
@@ -120,12 +67,66 @@ with col_output:
         
         if st.button("✅ Marcar como Publicado", use_container_width=True, type="secondary"):
             # Atualiza Status Final
-            chave = f"{data_str}-{leitura['tipo']}"
-            if chave in st.session_state.get('progresso_leituras', {}):
-                st.session_state['progresso_leituras'][chave]['publicacao'] = True
+            progresso['publicacao'] = True
+            prod.salvar(7)
+            # Entra no dashboard (métricas são registradas por dia depois)
+            db.registrar_video(prod.chave, titulo=f"{leitura['tipo']} – {leitura.get('ref', '')}",
+                               publicado_em=datetime.now().isoformat())
+            # Atributos de produção (cor, perfil de render, narração...) para as tendências
+            db.registrar_atributos(prod.chave, metricas.atributos_producao(progresso, prod.data_str, leitura.get('cor')))
             
             st.success("🎉 Projeto concluído e marcado como Publicado! Ele será removido do painel principal.")
             if st.button("🏠 Voltar ao Início (Novo Projeto)"):
                 st.switch_page("Inicio.py")
     else:
         st.info("Clique em gerar para ver as sugestões de metadados.")
+
+# --- Envio direto ao YouTube (fila persistida no banco, retomável) ---
+st.markdown("---")
+st.subheader("📤 Enviar ao YouTube")
+
+cred = publicacao.credenciais(lambda nome: st.secrets.get(nome, ""))
+if not cred:
+    st.warning("Configure YOUTUBE_CLIENT_ID, YOUTUBE_CLIENT_SECRET e YOUTUBE_REFRESH_TOKEN nos secrets "
+               "para enviar direto daqui. Sem elas, publique manualmente e marque como publicado acima.")
+
+envio = next(iter(db.listar_publicacoes(prod.chave)), None)
+
+with st.form("form_envio"):
+    titulo_yt = st.text_input("Título", value=f"{leitura['tipo']} – {leitura.get('ref', '')}", max_chars=100)
+    descricao_yt = st.text_area("Descrição", height=100)
+    tags_yt = st.text_input("Tags (separadas por vírgula)", value="BibliaNarrada, EvangelhoDoDia, Shorts")
+    privacidade_yt = st.selectbox("Privacidade", publicacao.PRIVACIDADES)
+    with st.expander("⚙️ Opções de envio"):
+        bloco_mb = st.select_slider("Tamanho do bloco (MB)", options=[1, 2, 4, 8, 16, 32], value=8,
+                                    help="Blocos maiores enviam mais rápido; menores perdem menos numa queda.")
+        paralelas = st.number_input("Envios simultâneos", min_value=1, max_value=4, value=2)
+        limite_mbps = st.number_input("Limite de banda (Mbit/s, 0 = sem limite)", min_value=0.0, value=0.0, step=5.0)
+    enviar = st.form_submit_button("📤 Enfileirar envio", type="primary",
+                                   disabled=not cred or (envio is not None and envio["estado"] != "falhou"))
+
+if enviar:
+    metadados = publicacao.metadados_video(titulo_yt, descricao_yt, [t.strip() for t in tags_yt.split(",")],
+                                           privacidade_yt)
+    if db.enfileirar_publicacao(prod.chave, prod.data_str, leitura['tipo'], progresso['video_path'], metadados):
+        publicacao.iniciar_em_segundo_plano(cred, paralelas=int(paralelas), tamanho_bloco=bloco_mb * 1024 * 1024,
+                                            limite_bytes_s=limite_mbps * 1e6 / 8 or None)
+        st.rerun()
+    st.info("Este vídeo já está na fila.")
+
+if envio:
+    total = envio["bytes_total"] or 0
+    feito = envio["bytes_confirmados"] or 0
+    if envio["estado"] == "concluido":
+        st.success(f"✅ Enviado: {publicacao.url_video(envio['video_id'])}")
+    elif envio["estado"] == "falhou":
+        st.error(f"O envio falhou após {envio['tentativas']} tentativa(s): {envio['erro']}")
+    else:
+        rotulo = "Na fila" if envio["estado"] == "pendente" else "Enviando"
+        st.progress(feito / total if total else 0.0,
+                    text=f"{rotulo}: {feito / 1e6:.1f} de {total / 1e6:.1f} MB confirmados")
+        if cred and not publicacao.em_execucao():
+            # Processo reiniciado com itens na fila: retoma de onde o YouTube confirmou
+            publicacao.iniciar_em_segundo_plano(cred)
+        if st.button("🔄 Atualizar progresso"):
+            st.rerun()
@@ -1,266 +1,282 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+import plotly.express as px
+import sys
+import os
+from datetime import datetime, date
 
-st.set_page_config(page_title="6 – Dashboard de Resultados", layout="wide")
-st.title("📊 6 – Dashboard de Resultados dos Vídeos")
-
-# -------------------------------------------------------------------
-# Integra com o "banco" e seleção do monitor
-# -------------------------------------------------------------------
-def criar_db_vazio():
-    return {"canais": {}}
-
-if "db" not in st.session_state:
-    st.session_state.db = criar_db_vazio()
-db = st.session_state.db
-
-if "canal_atual_id" not in st.session_state:
-    st.session_state.canal_atual_id = None
-if "video_atual_id" not in st.session_state:
-    st.session_state.video_atual_id = None
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
 
-canal_id = st.session_state.canal_atual_id
+from modules import database as db
+from modules import metricas
+from modules import ingestao
+from modules.pipeline import sessao
 
-if not canal_id or canal_id not in db["canais"]:
-    st.error("Nenhum canal selecionado. Vá ao app principal (monitor) e escolha um canal.")
-    st.stop()
-
-canal = db["canais"][canal_id]
-videos = canal["videos"]
+st.set_page_config(page_title="6 – Dashboard de Resultados", layout="wide")
+st.title("📊 6 – Dashboard de Resultados dos Vídeos")
 
 # -------------------------------------------------------------------
-# Sidebar – seleção de vídeo e modo de visualização
+# Sidebar – período e modo de visualização
 # -------------------------------------------------------------------
 with st.sidebar:
-    st.header("📺 Contexto")
-    st.markdown(f"**Canal:** {canal.get('nome','')}")
-    st.markdown(f"**Nicho:** {canal.get('nicho','')}")
-
-    st.markdown("---")
     st.header("🎯 Escopo")
 
+    periodo = st.selectbox("Período das métricas", list(metricas.PERIODOS), index=1)
+    dias = metricas.PERIODOS[periodo]
+
     modo = st.radio(
         "O que deseja ver?",
         ["Resumo de todos os vídeos", "Detalhe de um vídeo"],
         index=0,
     )
 
-    video_id = None
-    if modo == "Detalhe de um vídeo" and videos:
-        vids_ids = list(videos.keys())
-        vids_titulos = [videos[vid]["titulo"] for vid in vids_ids]
-        idx_video = st.selectbox(
-            "Vídeo",
-            options=range(len(vids_ids)),
-            format_func=lambda i: vids_titulos[i],
-            index=0,
-        )
-        video_id = vids_ids[idx_video]
-        st.session_state.video_atual_id = video_id
+# Uma linha por produção, com as métricas do período já somadas no SQLite
+df = metricas.resumo_videos(dias)
+if df.empty:
+    st.info("Ainda não há vídeos no sistema. Produza uma leitura a partir do Início.")
+    st.stop()
 
-# -------------------------------------------------------------------
-# Helper – montar DataFrame com informações de publicação
-# -------------------------------------------------------------------
-def montar_df_videos(canal_obj):
-    linhas = []
-    for vid, v in canal_obj["videos"].items():
-        pub_info = v["artefatos"].get("publicacao_info", {}) if v.get("artefatos") else {}
-        url = v["artefatos"].get("youtube_url") if v.get("artefatos") else None
-
-        linhas.append(
-            {
-                "video_id": vid,
-                "Título": v.get("titulo", ""),
-                "Publicado?": "Sim" if v["status"].get("5_publicacao") else "Não",
-                "URL YouTube": url or "",
-                "Privacidade": pub_info.get("privacy", "-"),
-                "Data publicação": pub_info.get("published_at", "")[:16],
-                "Criado no sistema": v.get("criado_em", "")[:16],
-                # Campos para futuras métricas (manual ou API)
-                "Views (manual)": pub_info.get("manual_views", None),
-                "CTR (manual)": pub_info.get("manual_ctr", None),
-                "Watch time (min, manual)": pub_info.get("manual_watch_time", None),
-            }
-        )
-    if not linhas:
-        return pd.DataFrame()
-    return pd.DataFrame(linhas)
+titulos = (df["titulo"].fillna(df["tipo"] + " – " + df["data_ref"])).tolist()
+vids_ids = df["chave_id"].tolist()
 
 # -------------------------------------------------------------------
 # Modo 1 – Resumo de todos os vídeos
 # -------------------------------------------------------------------
 if modo == "Resumo de todos os vídeos":
-    st.subheader("📚 Visão geral dos vídeos do canal")
-
-    df = montar_df_videos(canal)
-    if df.empty:
-        st.info("Ainda não há vídeos cadastrados para este canal.")
-        st.stop()
+    st.subheader("📚 Visão geral dos vídeos")
 
     # KPIs simples
     total_videos = len(df)
-    publicados = (df["Publicado?"] == "Sim").sum()
+    publicados = int(df["publicado"].sum())
     nao_pub = total_videos - publicados
 
-    col_k1, col_k2, col_k3 = st.columns(3)
+    col_k1, col_k2, col_k3, col_k4 = st.columns(4)
     with col_k1:
         st.metric("Vídeos no sistema", total_videos)
     with col_k2:
         st.metric("Vídeos publicados", publicados)
     with col_k3:
         st.metric("A publicar", nao_pub)
+    with col_k4:
+        st.metric(f"Views ({periodo.lower()})", f"{int(df['views'].sum()):,}".replace(",", "."))
+
+    serie = metricas.serie_diaria(dias=dias)
+    if not serie.empty:
+        st.markdown("### 📈 Views por dia")
+        st.line_chart(serie.set_index("data")[["views"]], height=220)
+
+    # Tendências por período e grupo (agregados mantidos pelo banco a cada gravação)
+    st.markdown("### 📆 Tendências")
+    col_t1, col_t2, col_t3 = st.columns(3)
+    with col_t1:
+        granularidade = st.selectbox("Agrupar por", list(metricas.GRANULARIDADES), index=1)
+    with col_t2:
+        dimensao = st.selectbox("Comparar", list(metricas.DIMENSOES))
+    with col_t3:
+        indicador = st.selectbox("Indicador", ["Views", "Watch time (min)", "CTR (%)"])
+    coluna = {"Views": "views", "Watch time (min)": "watch_time_min", "CTR (%)": "ctr"}[indicador]
+
+    tendencia = metricas.tendencias(metricas.GRANULARIDADES[granularidade], metricas.DIMENSOES[dimensao], dias)
+    if tendencia.empty:
+        st.caption("Nenhuma métrica registrada no período.")
+    else:
+        grafico = px.line(
+            tendencia.assign(grupo=tendencia["grupo"].replace("", "(não informado)")),
+            x="periodo", y=coluna, color="grupo", markers=granularidade != "Dia",
+            labels={"periodo": granularidade, coluna: indicador, "grupo": dimensao},
+        )
+        grafico.update_layout(height=320, margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(grafico, use_container_width=True)
+
+    # Correlação entre atributos de produção e resultados
+    st.markdown("### 🔬 Resultados x atributos de produção")
+    atributos = metricas.videos_com_atributos(dias)
+    if len(atributos) < 3:
+        st.caption("Poucos vídeos publicados com métricas e atributos registrados para comparar.")
+    else:
+        col_c1, col_c2 = st.columns(2)
+        with col_c1:
+            dispersao = px.scatter(
+                atributos, x="duracao_narracao_s", y=coluna, color="provedor_imagem",
+                hover_data=["chave_id", "perfil_render"],
+                labels={"duracao_narracao_s": "Duração da narração (s)", coluna: indicador,
+                        "provedor_imagem": "Provedor das imagens"},
+            )
+            dispersao.update_layout(height=320, margin=dict(l=0, r=0, t=10, b=0))
+            st.plotly_chart(dispersao, use_container_width=True)
+        with col_c2:
+            caixas = px.box(
+                atributos, x="provedor_imagem", y=coluna, points="all",
+                labels={"provedor_imagem": "Provedor das imagens", coluna: indicador},
+            )
+            caixas.update_layout(height=320, margin=dict(l=0, r=0, t=10, b=0))
+            st.plotly_chart(caixas, use_container_width=True)
+
+        st.caption("Correlação de Spearman (−1 a 1) entre atributos numéricos e resultados no período:")
+        st.dataframe(
+            metricas.correlacoes(atributos).rename(
+                index={"duracao_narracao_s": "Duração da narração", "palavras_roteiro": "Palavras do roteiro"},
+                columns={"views": "Views", "watch_time_min": "Watch time", "ctr": "CTR"},
+            ).round(2),
+            use_container_width=True,
+        )
+
+    with st.expander("🔄 Recalcular atributos e agregados"):
+        st.caption(
+            "Os agregados são mantidos a cada gravação de métricas. Use isto depois de "
+            "alterar produções já publicadas (nova renderização, imagens refeitas)."
+        )
+        if st.button("Recalcular"):
+            with st.spinner("Recalculando..."):
+                alterados = metricas.atualizar_atributos()
+                db.reconstruir_rollups()
+            st.success(f"Atributos atualizados em {alterados} vídeo(s).")
+            st.rerun()
 
     st.markdown("### 📋 Tabela de vídeos")
+    tabela = df.assign(
+        **{
+            "Título": titulos,
+            "Publicado?": df["publicado"].map({1: "Sim", 0: "Não"}),
+            "Data publicação": df["publicado_em"].fillna("").str[:16],
+        }
+    ).rename(columns={
+        "data_ref": "Data", "privacidade": "Privacidade", "youtube_url": "URL YouTube",
+        "views": "Views", "ctr": "CTR (%)", "watch_time_min": "Watch time (min)",
+    })
     st.dataframe(
-        df[["Título", "Publicado?", "Privacidade", "Data publicação", "URL YouTube"]],
+        tabela[["Título", "Data", "Publicado?", "Privacidade", "Data publicação",
+                "Views", "CTR (%)", "Watch time (min)", "URL YouTube"]],
         use_container_width=True,
-        height=260,
+        height=360,
+        hide_index=True,
     )
 
     st.markdown("---")
-    st.subheader("📈 Espaço para métricas manuais (views, CTR, watch time)")
+    st.subheader("📥 Importar métricas em lote")
+    st.caption(
+        "Exportação do YouTube Studio (CSV), JSON Lines ou JSON da YouTube Analytics API. "
+        "As linhas são ligadas às produções pelo ID/URL do vídeo ou pelo título; "
+        "reimportar o mesmo arquivo não grava nada de novo."
+    )
+    col_i1, col_i2 = st.columns([3, 1])
+    with col_i1:
+        arquivos = st.file_uploader("Arquivos", type=["csv", "json", "jsonl", "ndjson"], accept_multiple_files=True)
+    with col_i2:
+        data_padrao = st.date_input("Data (arquivos sem coluna de data)", value=date.today(), max_value=date.today())
+        forcar = st.checkbox("Reimportar arquivos já importados")
+    if arquivos and st.button("📥 Importar", type="primary"):
+        for arquivo in arquivos:
+            with st.spinner(f"Importando {arquivo.name}..."):
+                relatorio = ingestao.importar(arquivo, nome=arquivo.name, data_padrao=data_padrao.isoformat(),
+                                              forcar=forcar)
+            st.write(ingestao.formatar_relatorio(relatorio))
+
+    st.markdown("---")
+    st.subheader("📈 Registrar métricas do dia (views, CTR, watch time)")
 
     st.caption(
-        "Por enquanto, este dashboard usa apenas dados manuais. "
-        "Você pode copiar números do YouTube Studio e registrar abaixo; "
-        "depois isso pode ser automatizado via YouTube Analytics API."
+        "Copie os números de um dia do YouTube Studio e registre abaixo; "
+        "cada dia fica guardado no banco e alimenta os gráficos."
     )
 
-    # Formulário para atualizar métricas manuais de um vídeo específico
-    vids_ids = df["video_id"].tolist()
-    vids_titulos = df["Título"].tolist()
     col_f1, col_f2 = st.columns(2)
     with col_f1:
         idx_ed = st.selectbox(
-            "Escolha o vídeo para atualizar métricas manuais",
+            "Escolha o vídeo para registrar métricas",
             options=range(len(vids_ids)),
-            format_func=lambda i: vids_titulos[i],
+            format_func=lambda i: titulos[i],
         )
         vid_sel = vids_ids[idx_ed]
-        v_obj = canal["videos"][vid_sel]
-        pub_info = v_obj["artefatos"].get("publicacao_info", {})
+        dia_sel = st.date_input("Dia", value=date.today(), max_value=date.today())
 
     with col_f2:
-        views_manual = st.number_input(
-            "Views (manual, do YouTube Studio)",
-            min_value=0,
-            value=int(pub_info.get("manual_views", 0) or 0),
-        )
-        ctr_manual = st.number_input(
-            "CTR (%) manual",
-            min_value=0.0,
-            max_value=100.0,
-            value=float(pub_info.get("manual_ctr", 0.0) or 0.0),
-            step=0.1,
-        )
-        wt_manual = st.number_input(
-            "Watch time (minutos, manual)",
-            min_value=0.0,
-            value=float(pub_info.get("manual_watch_time", 0.0) or 0.0),
-            step=1.0,
-        )
-
-    if st.button("💾 Salvar métricas manuais"):
-        if "publicacao_info" not in v_obj["artefatos"]:
-            v_obj["artefatos"]["publicacao_info"] = {}
-        v_obj["artefatos"]["publicacao_info"].update(
-            {
-                "manual_views": views_manual,
-                "manual_ctr": ctr_manual,
-                "manual_watch_time": wt_manual,
-                "manual_atualizado_em": datetime.now().isoformat(),
-            }
-        )
-        v_obj["ultima_atualizacao"] = datetime.now().isoformat()
-        st.success("Métricas manuais salvas para este vídeo.")
-        st.experimental_rerun()
-
-    st.markdown("---")
-    st.caption(
-        "No futuro, esta aba poderá puxar métricas automaticamente da "
-        "YouTube Analytics API (views, watch time, CTR, etc.) e gerar gráficos "
-        "mais avançados. Por enquanto, serve como diário de resultados."
-    )
+        views_manual = st.number_input("Views no dia", min_value=0, value=0)
+        ctr_manual = st.number_input("CTR (%)", min_value=0.0, max_value=100.0, value=0.0, step=0.1)
+        wt_manual = st.number_input("Watch time (minutos)", min_value=0.0, value=0.0, step=1.0)
+
+    if st.button("💾 Salvar métricas do dia"):
+        db.gravar_metricas([{
+            "chave_id": vid_sel,
+            "data": dia_sel.isoformat(),
+            "views": views_manual,
+            "ctr": ctr_manual,
+            "watch_time_min": wt_manual,
+        }])
+        st.success("Métricas salvas para este vídeo.")
+        st.rerun()
 
 # -------------------------------------------------------------------
 # Modo 2 – Detalhe de um vídeo
 # -------------------------------------------------------------------
 else:
-    if not video_id or video_id not in videos:
-        st.warning("Selecione um vídeo na barra lateral.")
-        st.stop()
-
-    v = videos[video_id]
-    pub_info = v["artefatos"].get("publicacao_info", {})
-    youtube_url = v["artefatos"].get("youtube_url")
+    with st.sidebar:
+        idx_video = st.selectbox(
+            "Vídeo",
+            options=range(len(vids_ids)),
+            format_func=lambda i: titulos[i],
+            index=0,
+        )
+    video_id = vids_ids[idx_video]
+    v = df.iloc[idx_video]
+    progresso, _ = db.load_status(video_id)
 
     st.subheader("🎬 Detalhes do vídeo")
 
     col_v1, col_v2 = st.columns([2, 1])
     with col_v1:
-        st.markdown(f"### {v.get('titulo','(sem título)')}")
-        st.caption(v.get("descricao", ""))
+        st.markdown(f"### {titulos[idx_video]}")
+        st.caption(f"{v['tipo']} · {v['data_ref']}")
 
-        if youtube_url:
-            st.markdown(f"[🔗 Abrir no YouTube]({youtube_url})")
+        if v["youtube_url"]:
+            st.markdown(f"[🔗 Abrir no YouTube]({v['youtube_url']})")
         else:
             st.caption("Nenhum link de YouTube registrado ainda.")
 
     with col_v2:
-        st.metric(
-            "Publicado?",
-            "Sim ✅" if v["status"].get("5_publicacao") else "Não",
-        )
-        st.metric(
-            "Canal pronto?",
-            "Sim ✅" if v["status"].get("0_canal") else "Não",
-        )
+        st.metric("Publicado?", "Sim ✅" if v["publicado"] else "Não")
+        if v["publicado_em"]:
+            st.caption(f"Publicado em {v['publicado_em'][:16]}")
+
+    with st.expander("✏️ Dados de publicação"):
+        with st.form("form_publicacao"):
+            titulo = st.text_input("Título", value=v["titulo"] or "")
+            url = st.text_input("URL do YouTube", value=v["youtube_url"] or "")
+            privacidade = st.selectbox("Privacidade", ["public", "unlisted", "private"],
+                                       index=["public", "unlisted", "private"].index(v["privacidade"] or "public"))
+            if st.form_submit_button("💾 Salvar"):
+                db.registrar_video(video_id, titulo=titulo or None, youtube_url=url or None,
+                                   privacidade=privacidade, publicado_em=v["publicado_em"] or datetime.now().isoformat())
+                st.rerun()
 
     st.markdown("---")
 
     # Linha do tempo das etapas
     st.subheader("🧩 Linha do tempo das etapas")
 
-    etapas = [
-        ("0_canal", "Canal pronto"),
-        ("1_roteiro", "Roteiro"),
-        ("2_thumbnail", "Thumbnails"),
-        ("3_audio", "Áudio"),
-        ("4_video", "Vídeo final"),
-        ("5_publicacao", "Publicação"),
-        ("6_dashboard", "Dashboard"),
-    ]
-
-    cols = st.columns(len(etapas))
-    for (key, nome), c in zip(etapas, cols):
+    cols = st.columns(len(sessao.ETAPAS))
+    for (nome, flag, *_), c in zip(sessao.ETAPAS, cols):
         with c:
-            status = v["status"].get(key, False)
-            icone = "✅" if status else "⭕"
+            icone = "✅" if progresso.get(flag) else "⭕"
             st.markdown(f"{icone}\n\n{nome}")
 
     st.markdown("---")
 
-    # Métricas manuais específicas
-    st.subheader("📈 Métricas manuais (preenchidas a partir do YouTube Studio)")
+    st.subheader(f"📈 Métricas ({periodo.lower()})")
 
     col_m1, col_m2, col_m3 = st.columns(3)
     with col_m1:
-        st.metric("Views (manual)", int(pub_info.get("manual_views", 0) or 0))
+        st.metric("Views", int(v["views"]))
     with col_m2:
-        st.metric("CTR (%) manual", f"{float(pub_info.get('manual_ctr', 0.0) or 0.0):.1f}%")
+        st.metric("CTR (%)", f"{float(v['ctr']):.1f}%")
     with col_m3:
-        st.metric(
-            "Watch time (min)",
-            int(float(pub_info.get("manual_watch_time", 0.0) or 0.0)),
-        )
-
-    if pub_info.get("manual_atualizado_em"):
-        st.caption(f"Última atualização manual: {pub_info['manual_atualizado_em'][:16]}")
-
-    st.markdown("---")
-
-    st.caption(
-        "Por enquanto, este dashboard é baseado em dados manuais e no status interno do pipeline. "
-        "Posteriormente, pode ser integrado à YouTube Analytics API para buscar métricas em tempo real."
-    )
+        st.metric("Watch time (min)", int(v["watch_time_min"]))
+
+    serie = metricas.serie_diaria(video_id, dias=dias)
+    if serie.empty:
+        st.caption("Nenhuma métrica registrada para este vídeo no período.")
+    else:
+        st.line_chart(serie.set_index("data")[["views"]], height=220)
+        st.caption(f"Último dia registrado: {v['ultima_data']}")
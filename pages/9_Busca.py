@@ -0,0 +1,88 @@
+import streamlit as st
+import sys
+import os
+import time
+
+# ---------------------------------------------------------------------
+# 1. CONFIGURAÇÃO DE DIRETÓRIOS E IMPORTAÇÕES
+# ---------------------------------------------------------------------
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, '..'))
+if parent_dir not in sys.path:  # a página é reexecutada a cada interação
+    sys.path.append(parent_dir)
+
+try:
+    import modules.database as db
+    from modules.pipeline import sessao
+except ImportError:
+    st.error("🚨 Erro: Não foi possível importar o módulo de banco de dados.")
+    st.stop()
+
+st.set_page_config(page_title="Buscar", page_icon="🔎", layout="wide")
+
+# Página a abrir para continuar uma produção, pela última etapa salva
+PAGINA_POR_ETAPA = {
+    1: "pages/2_Imagens.py",
+    2: "pages/3_Audio_TTS.py",
+    3: "pages/4_Overlay.py",
+    4: "pages/5_Legendas.py",
+    5: "pages/6_Video_Final.py",
+    6: "pages/7_Publicar.py",
+}
+
+ORIGENS = {"Tudo": None, "Leituras": "leitura", "Roteiros produzidos": "roteiro"}
+
+
+@st.cache_resource
+def preparar_indice():
+    """Migra o cache antigo e indexa o que ainda não está no índice (uma vez por processo)."""
+    db.migrar_historico()
+    return db.reindexar_busca()
+
+
+def abrir(hit, pagina):
+    """Carrega a leitura do resultado na sessão e vai para a página."""
+    liturgia = db.carregar_liturgia(hit['data_ref']) or {}
+    leitura = next((l for l in liturgia.get('leituras', []) if l['tipo'] == hit['tipo']), None)
+    if not leitura:
+        st.error("Leitura não encontrada no cache local.")
+        return
+    sessao.selecionar_leitura({**leitura, 'cor': liturgia.get('cor', '')}, hit['data_ref'])
+    st.switch_page(pagina)
+
+
+# ---------------------------------------------------------------------
+# INTERFACE
+# ---------------------------------------------------------------------
+st.title("🔎 Buscar Leituras e Roteiros")
+st.caption("Busca offline por passagem, tema ou palavra (acentos são ignorados).")
+
+total_docs = preparar_indice()
+
+col_busca, col_origem = st.columns([3, 1])
+with col_busca:
+    consulta = st.text_input("Buscar", placeholder="ex.: bom pastor, Jo 10, perdão")
+with col_origem:
+    origem = st.selectbox("Em", list(ORIGENS))
+
+if consulta:
+    inicio = time.perf_counter()
+    resultados = db.buscar(consulta, origem=ORIGENS[origem])
+    decorrido_ms = (time.perf_counter() - inicio) * 1000
+    st.caption(f"{len(resultados)} resultado(s) em {decorrido_ms:.1f} ms ({total_docs} documentos indexados)")
+
+    for i, hit in enumerate(resultados):
+        with st.container(border=True):
+            icone = "📖" if hit['origem'] == 'leitura' else "📝"
+            st.markdown(f"{icone} **{hit['tipo']}** — {hit['ref']} · {hit['data_ref']}")
+            st.markdown(hit['trecho'])
+
+            # Produção já existente: continua de onde parou em vez de gerar de novo
+            if hit['etapa_atual']:
+                pagina = PAGINA_POR_ETAPA.get(hit['etapa_atual'], "pages/1_Roteiro_Viral.py")
+                if st.button("▶️ Abrir produção existente", key=f"abrir_{i}", type="primary"):
+                    abrir(hit, pagina)
+            elif st.button("🎬 Criar Vídeo Viral", key=f"criar_{i}"):
+                abrir(hit, "pages/1_Roteiro_Viral.py")
+elif not total_docs:
+    st.info("Nenhuma liturgia em cache ainda. Abra algumas datas no Início para alimentar o índice.")
@@ -0,0 +1,173 @@
+"""
+Produção em lote sem interface (headless).
+
+Executa roteiro -> (imagens || áudio) -> overlay/legendas -> vídeo para um
+intervalo de datas e um conjunto de tipos de leitura, gravando as mesmas
+linhas em `producao_status` que as páginas do Streamlit usam.
+
+Exemplos:
+    python produzir.py --inicio 2024-05-12 --fim 2024-05-18
+    python produzir.py --inicio 2024-05-12 --leituras "Evangelho" --motor google
+    python produzir.py --inicio 2024-05-12 --formatos 9:16,1:1,16:9
+    python produzir.py --inicio 2024-05-12 --trilha trilhas/piano.mp3 --volume-trilha -20
+
+Modo fila (várias produções em paralelo, fila persistida no SQLite):
+    python produzir.py --fila --inicio 2024-05-01 --fim 2024-05-31 --simultaneas 6
+    python produzir.py --fila          # só consome o que já está na fila
+
+Tempos, CPU, memória e bytes por etapa (ver a página Diagnóstico):
+    python produzir.py --inicio 2024-05-12 --trace execucao.json
+"""
+import os
+import sys
+import time
+import argparse
+import datetime
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(RAIZ)
+
+from modules import liturgia as liturgia_mod
+from modules import producao
+from modules import roteiro
+from modules import imagens
+from modules import video
+from modules import trilha
+from modules import fila
+from modules import rastreio
+from modules.agendador import caminho_critico
+
+LEITURAS_PADRAO = ["Primeira Leitura", "Salmo", "Evangelho"]
+
+
+def ler_segredo(nome):
+    """Busca a chave no ambiente ou em .streamlit/secrets.toml (como st.secrets)."""
+    if os.environ.get(nome):
+        return os.environ[nome]
+    caminho = os.path.join(RAIZ, ".streamlit", "secrets.toml")
+    if os.path.exists(caminho):
+        import tomllib
+        with open(caminho, "rb") as f:
+            return tomllib.load(f).get(nome, "")
+    return ""
+
+
+def datas_no_intervalo(inicio, fim):
+    dia = inicio
+    while dia <= fim:
+        yield dia
+        dia += datetime.timedelta(days=1)
+
+
+def rodar_fila(args, filtros, client, motor, api_key_google):
+    if args.inicio:
+        novos = fila.enfileirar_intervalo(args.inicio, args.fim or args.inicio, filtros, args.todas_formas,
+                                            args.refazer)
+        print(f"{novos} job(s) adicionados à fila.")
+
+    relatorio = fila.processar_fila(
+        simultaneas=args.simultaneas, max_io=args.max_io, max_cpu=args.max_cpu,
+        client=client, motor=motor, api_key_google=api_key_google,
+        modelo_google=args.modelo_google, refazer=args.refazer, formatos=args.formatos, trilha=args.trilha,
+        modo=args.modo_roteiro,
+    )
+    print("\n" + fila.formatar_relatorio(relatorio))
+    return 1 if relatorio["jobs_falhos"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Produção em lote da Bíblia Narrada.")
+    parser.add_argument("--inicio", type=datetime.date.fromisoformat, help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", type=datetime.date.fromisoformat, help="Data final (padrão: igual à inicial)")
+    parser.add_argument("--leituras", default=",".join(LEITURAS_PADRAO),
+                        help="Tipos de leitura separados por vírgula (prefixo do tipo)")
+    parser.add_argument("--todas-formas", action="store_true", help="Produz também as formas breve/longa e opções")
+    parser.add_argument("--motor", choices=["pollinations", "google"], default="pollinations")
+    parser.add_argument("--modelo-google", default=imagens.MODELOS_GOOGLE[0], choices=imagens.MODELOS_GOOGLE)
+    parser.add_argument("--modo-roteiro", choices=roteiro.MODOS, default=roteiro.MODO_PADRAO,
+                        help="Roteiro numa requisição só (agrupado) ou uma por bloco")
+    parser.add_argument("--formatos", default=video.FORMATO_PADRAO,
+                        help=f"Formatos do vídeo, separados por vírgula, num só render ({', '.join(video.FORMATOS)})")
+    parser.add_argument("--trilha", metavar="ARQUIVO",
+                        help="Música de fundo, baixada automaticamente durante a fala (padrão: a salva em cada produção)")
+    parser.add_argument("--volume-trilha", type=float, default=trilha.VOLUME_PADRAO_DB,
+                        help="Volume da música nas pausas, em dB relativos ao arquivo")
+    parser.add_argument("--refazer", action="store_true", help="Refaz etapas já concluídas")
+    parser.add_argument("--max-io", type=int, default=4, help="Threads para etapas de rede (LLM, imagens)")
+    parser.add_argument("--max-cpu", type=int, default=None, help="Threads para etapas locais (TTS, FFmpeg)")
+    parser.add_argument("--fila", action="store_true",
+                        help="Modo throughput: enfileira o intervalo (se informado) e consome a fila")
+    parser.add_argument("--simultaneas", type=int, default=4, help="Produções abertas ao mesmo tempo (modo fila)")
+    parser.add_argument("--trace", metavar="ARQUIVO.json",
+                        help="Exporta os trechos medidos nesta execução no formato Chrome trace (Perfetto)")
+    args = parser.parse_args(argv)
+    if not args.inicio and not args.fila:
+        parser.error("--inicio é obrigatório (exceto com --fila)")
+    args.formatos = [f.strip() for f in args.formatos.split(",") if f.strip()]
+    desconhecidos = [f for f in args.formatos if f not in video.FORMATOS]
+    if desconhecidos:
+        parser.error(f"formato(s) desconhecido(s): {', '.join(desconhecidos)}")
+
+    if args.trilha:
+        if not os.path.exists(args.trilha):
+            parser.error(f"trilha não encontrada: {args.trilha}")
+        args.trilha = {"arquivo": os.path.abspath(args.trilha), "volume_db": args.volume_trilha}
+
+    if args.trace:
+        args.trace = os.path.abspath(args.trace)  # antes do chdir para a raiz
+
+    inicio = time.time()
+    codigo = produzir(args)
+    if args.trace:
+        n = rastreio.exportar_chrome_trace(args.trace, desde=inicio)
+        print(f"🔎 {n} trecho(s) exportados para {args.trace} (abra em https://ui.perfetto.dev)")
+    return codigo
+
+
+def produzir(args):
+    # O banco (liturgia.db) é relativo ao diretório de trabalho, como no `streamlit run Inicio.py`
+    os.chdir(RAIZ)
+
+    client = roteiro.criar_cliente_groq(ler_segredo("GROQ_API_KEY"))
+    motor = imagens.MOTORES[0] if args.motor == "pollinations" else imagens.MOTORES[1]
+    api_key_google = ler_segredo("GOOGLE_API_KEY") if args.motor == "google" else ""
+    filtros = [f.strip() for f in args.leituras.split(",") if f.strip()]
+
+    if args.fila:
+        return rodar_fila(args, filtros, client, motor, api_key_google)
+
+    concluidas, falhas = [], []
+    for dia in datas_no_intervalo(args.inicio, args.fim or args.inicio):
+        liturgia = liturgia_mod.fetch_liturgia(dia)
+        if not liturgia:
+            falhas.append((dia.isoformat(), "liturgia"))
+            continue
+
+        for leitura in liturgia_mod.selecionar_leituras(liturgia['leituras'], filtros, args.todas_formas):
+            leitura = {**leitura, 'cor': liturgia.get('cor', '')}
+            prod = producao.produzir_leitura(
+                leitura, liturgia['data'], client=client, motor=motor,
+                api_key_google=api_key_google, modelo_google=args.modelo_google, refazer=args.refazer,
+                max_io=args.max_io, max_cpu=args.max_cpu, formatos=args.formatos, trilha=args.trilha,
+                modo=args.modo_roteiro,
+            )
+            if prod["falhou_em"]:
+                falhas.append((prod["chave"], prod["falhou_em"]))
+            else:
+                concluidas.append(prod["chave"])
+
+            critico, soma = caminho_critico(prod["chave"], producao.montar_dag(prod))
+            print(f"⏱️ {prod['chave']}: caminho crítico {critico:.1f}s (sequencial seria {soma:.1f}s)")
+
+    print(f"\nConcluídas: {len(concluidas)}")
+    for chave in concluidas:
+        print(f"  ✅ {chave}")
+    if falhas:
+        print(f"Falhas: {len(falhas)}")
+        for chave, etapa in falhas:
+            print(f"  ❌ {chave} (etapa: {etapa})")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())